@@ -38,7 +38,7 @@ setup(
     install_requires=requirements,
     entry_points={
         "console_scripts": [
-            "comfyui-manager=comfyui_manager.main:main",
+            "comfyui-manager=comfyui_manager.cli:main",
         ],
     },
     include_package_data=True,
@@ -0,0 +1,272 @@
+"""
+Background archiver for ComfyUI outputs
+
+ComfyUI writes PNGs with fast, weak compression. Outputs older than a
+configurable age are recompressed in niced worker processes, either to
+optimized PNG (same name) or to lossless WebP with the prompt and
+workflow moved into EXIF the way ComfyUI's own WebP nodes store them.
+Nothing is replaced unless the new file decodes to identical pixels,
+still carries every metadata entry and is actually smaller. The archiver
+backs off while ComfyUI is busy on CPU or disk.
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from .png_metadata import EXIF_PROMPT_TAG, EXIF_FIRST_EXTRA_TAG, exif_text
+from .thumbnails import lower_priority
+from .utils import get_app_dir, process_context
+
+
+def png_metadata(img):
+    """Get the PNG text entries Pillow parsed."""
+    return dict(getattr(img, "text", {}) or {})
+
+
+def same_pixels(original, candidate):
+    """Check two images decode to the same pixel values."""
+    if original.size != candidate.size:
+        return False
+    if original.mode != candidate.mode:
+        original = original.convert(candidate.mode)
+    return original.tobytes() == candidate.tobytes()
+
+
+def recompress(path, image_format="PNG", min_saving=0.02):
+    """Recompress one output losslessly. Runs in a worker process.
+
+    Returns (new path, old bytes, new bytes, reason); new path is None
+    when the file was left untouched.
+    """
+    from PIL import Image
+    from PIL.PngImagePlugin import PngInfo
+
+    old_size = os.path.getsize(path)
+    stat = os.stat(path)
+    suffix = ".png" if image_format == "PNG" else ".webp"
+    destination = os.path.splitext(path)[0] + suffix
+    if destination != path and os.path.exists(destination):
+        return None, old_size, old_size, "destination exists"
+    tmp_path = f"{destination}.{os.getpid()}.archiving"
+
+    with Image.open(path) as original:
+        original.load()
+        metadata = png_metadata(original)
+        icc_profile = original.info.get("icc_profile")
+
+        try:
+            if image_format == "PNG":
+                info = PngInfo()
+                for key, value in metadata.items():
+                    info.add_text(key, value)
+                original.save(tmp_path, "PNG", optimize=True, pnginfo=info, icc_profile=icc_profile)
+            else:
+                if original.mode not in ("RGB", "RGBA", "L", "LA", "P"):
+                    raise ValueError(f"mode {original.mode} not supported by WebP")
+                exif = Image.Exif()
+                tag = EXIF_FIRST_EXTRA_TAG
+                for key, value in metadata.items():
+                    if key == "prompt":
+                        exif[EXIF_PROMPT_TAG] = f"prompt:{value}"
+                    else:
+                        exif[tag] = f"{key}:{value}"
+                        tag -= 1
+                source = original
+                if original.mode in ("L", "LA", "P"):
+                    has_alpha = original.mode == "LA" or "transparency" in original.info
+                    source = original.convert("RGBA" if has_alpha else "RGB")
+                source.save(tmp_path, "WEBP", lossless=True, quality=100, method=6,
+                            exif=exif, icc_profile=icc_profile)
+
+            with Image.open(tmp_path) as candidate:
+                candidate.load()
+                kept = png_metadata(candidate) if image_format == "PNG" else exif_text(candidate.getexif())
+                if not same_pixels(original, candidate):
+                    raise ValueError("pixels differ")
+                if kept != metadata:
+                    raise ValueError("metadata lost")
+            new_size = os.path.getsize(tmp_path)
+            if new_size > old_size * (1 - min_saving):
+                raise ValueError("no saving")
+        except Exception as e:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            if isinstance(e, ValueError):
+                return None, old_size, old_size, str(e)
+            raise
+
+    # Keep the original timestamps so per-day grouping and sorting hold
+    os.utime(tmp_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    os.replace(tmp_path, destination)
+    if destination != path:
+        os.unlink(path)
+    return destination, old_size, new_size, "ok"
+
+
+class OutputArchiver:
+    """Recompresses old outputs in the background."""
+
+    def __init__(self, config, output_index, system_monitor=None, ledger_file=None):
+        self.config = config
+        self.output_index = output_index
+        self.system_monitor = system_monitor
+        self.image_format = config.get("archive_format", "png").upper()
+        self.min_age = config.get("archive_min_age_days", 14) * 86400
+        self.interval = config.get("archive_interval_minutes", 30) * 60
+        self.workers = config.get("archive_workers") or max(1, (os.cpu_count() or 2) // 4)
+        self.cpu_limit = config.get("archive_pause_cpu_percent", 50.0)
+        self.io_limit = config.get("archive_pause_io_mb_s", 20.0) * 1024 * 1024
+
+        self.ledger_file = ledger_file or get_app_dir() / "archive_ledger.json"
+        self.ledger = {}
+        self.totals = {"files": 0, "bytes_before": 0, "bytes_after": 0, "failed": 0}
+        self.load_ledger()
+
+        # (time, bytes saved) per file, for the hourly rate
+        self.recent = deque()
+        self.paused = False
+        self.running = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def load_ledger(self):
+        """Load the list of files already handled."""
+        try:
+            with open(self.ledger_file) as f:
+                data = json.load(f)
+            self.ledger = data.get("files", {})
+            self.totals.update(data.get("totals", {}))
+        except (OSError, ValueError):
+            pass
+
+    def save_ledger(self):
+        """Write the ledger atomically."""
+        tmp_path = self.ledger_file.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"files": self.ledger, "totals": self.totals}, f)
+        os.replace(tmp_path, self.ledger_file)
+
+    def start(self):
+        """Run passes in a background thread."""
+        if self.thread is not None:
+            return
+        self.thread = threading.Thread(target=self.run, name="archiver", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop after the current file."""
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout=10)
+            self.thread = None
+
+    def run(self):
+        """Thread body: wait for the output index, then archive every interval."""
+        self.output_index.ready.wait()
+        while not self.stop_event.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logging.error(f"Archiver pass failed: {e}")
+            self.stop_event.wait(self.interval)
+
+    def candidates(self):
+        """Get PNG outputs older than the minimum age that were not handled yet."""
+        cutoff = time.time() - self.min_age
+        files = []
+        for path, (size, mtime) in self.output_index.snapshot().items():
+            if not path.lower().endswith(".png") or mtime > cutoff:
+                continue
+            if self.ledger.get(path) == size:
+                continue
+            files.append((mtime, path))
+        return [path for _, path in sorted(files)]
+
+    def run_once(self, limit=None):
+        """Archive eligible outputs, oldest first. Returns bytes saved."""
+        with self.running:
+            return self.archive(self.candidates()[:limit])
+
+    def run_in_background(self, limit=None):
+        """Start a pass now unless one is running."""
+        if self.running.locked():
+            return False
+        threading.Thread(target=self.run_once, args=(limit,), name="archiver-pass", daemon=True).start()
+        return True
+
+    def archive(self, paths):
+        """Recompress the given outputs in the worker pool. Returns bytes saved."""
+        if not paths:
+            return 0
+
+        logging.info(f"Archiving {len(paths)} outputs as {self.image_format}")
+        saved = 0
+        with ProcessPoolExecutor(self.workers, mp_context=process_context(),
+                                 initializer=lower_priority, initargs=(19,)) as pool:
+            for start in range(0, len(paths), self.workers):
+                if not self.wait_for_idle():
+                    break
+                batch = paths[start:start + self.workers]
+                futures = [(path, pool.submit(recompress, path, self.image_format)) for path in batch]
+                for path, future in futures:
+                    saved += self.record(path, future)
+                self.save_ledger()
+
+        logging.info(f"Archiver saved {saved / (1024 * 1024):.1f} MB this pass")
+        return saved
+
+    def record(self, path, future):
+        """Book one finished file. Returns bytes saved."""
+        try:
+            new_path, old_size, new_size, reason = future.result()
+        except Exception as e:
+            logging.warning(f"Could not archive {path}: {e}")
+            self.totals["failed"] += 1
+            return 0
+
+        if new_path is None:
+            logging.debug(f"Left {path} as is: {reason}")
+            self.ledger[path] = old_size
+            return 0
+
+        self.ledger.pop(path, None)
+        self.ledger[new_path] = new_size
+        self.totals["files"] += 1
+        self.totals["bytes_before"] += old_size
+        self.totals["bytes_after"] += new_size
+        self.recent.append((time.time(), old_size - new_size))
+        return old_size - new_size
+
+    def wait_for_idle(self):
+        """Block while ComfyUI is busy. Returns False if stopped meanwhile."""
+        while not self.stop_event.is_set():
+            monitor = self.system_monitor
+            busy = monitor is not None and (
+                monitor.comfyui_cpu_percent > self.cpu_limit
+                or monitor.comfyui_io_bytes_per_s > self.io_limit
+            )
+            if not busy:
+                self.paused = False
+                return True
+            if not self.paused:
+                logging.info("Archiver paused while ComfyUI is busy")
+                self.paused = True
+            self.stop_event.wait(5)
+        return False
+
+    def stats(self):
+        """Get totals and the bytes saved over the last hour."""
+        cutoff = time.time() - 3600
+        while self.recent and self.recent[0][0] < cutoff:
+            self.recent.popleft()
+        totals = dict(self.totals)
+        totals["bytes_saved"] = totals["bytes_before"] - totals["bytes_after"]
+        totals["bytes_saved_per_hour"] = sum(saved for _, saved in self.recent)
+        totals["paused"] = self.paused
+        totals["format"] = self.image_format
+        return totals
@@ -0,0 +1,274 @@
+"""
+Workflow backups for ComfyUI Manager
+
+Backs up ComfyUI's user directories (``<comfyui>/user/<user>/workflows``)
+into a content-addressed store: every distinct file is stored once under
+its SHA-256 in ``objects/``, and each backup is a small JSON manifest in
+``snapshots/`` mapping relative paths to hashes. Unchanged workflows cost
+nothing but a manifest line, and a hash cache keyed on size and mtime
+means they are not even read.
+"""
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from .hashing import CHUNK_SIZE, HashCache
+
+
+def user_workflow_dirs(comfyui_path):
+    """Find every user's workflow directory in a ComfyUI install."""
+    user_dir = Path(comfyui_path) / "user"
+    return sorted(p for p in user_dir.glob("*/workflows") if p.is_dir())
+
+
+def hashes(files):
+    """Reduce a manifest file map to {relative path: hash}."""
+    return {rel: info["hash"] for rel, info in files.items()}
+
+
+class BackupEngine:
+    """Content-addressed snapshots of ComfyUI workflow directories."""
+
+    def __init__(self, user_dir, backup_dir, workers=None):
+        self.user_dir = Path(user_dir)
+        self.backup_dir = Path(backup_dir)
+        self.objects_dir = self.backup_dir / "objects"
+        self.snapshots_dir = self.backup_dir / "snapshots"
+        self.workers = workers or min(16, (os.cpu_count() or 1) * 2)
+        self.hash_cache = HashCache(self.backup_dir / "hashcache.json", workers=self.workers)
+
+    @classmethod
+    def from_config(cls, config):
+        """Create an engine from configuration."""
+        base_dir = Path(config.get("base_dir", str(Path.home())))
+        backup_dir = config.get("backup_dir") or base_dir / "backups" / "workflows"
+        user_dir = Path(config.get("comfyui_path") or base_dir / "projects" / "ComfyUI") / "user"
+        return cls(user_dir, backup_dir)
+
+    def scan(self):
+        """Get {relative path: os.stat} for every workflow file."""
+        files = {}
+        for workflow_dir in user_workflow_dirs(self.user_dir.parent):
+            for root, dirs, names in os.walk(workflow_dir):
+                for name in names:
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    files[os.path.relpath(path, self.user_dir)] = stat
+        return files
+
+    def object_path(self, digest):
+        """Location of a stored object."""
+        return self.objects_dir / digest[:2] / digest[2:]
+
+    def store_object(self, source, digest):
+        """Copy a file into the store unless its content is already there.
+
+        The copy is hashed as it is written, so a file saved after ``digest``
+        was computed is stored under its new hash. Returns (digest actually
+        stored, bytes copied).
+        """
+        if self.object_path(digest).exists():
+            return digest, 0
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.objects_dir / f"{digest}.{os.getpid()}.{threading.get_ident()}.tmp"
+        hasher = hashlib.sha256()
+        try:
+            with open(source, "rb") as src, open(tmp_path, "wb") as dst:
+                while True:
+                    chunk = src.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    hasher.update(chunk)
+                    dst.write(chunk)
+            actual = hasher.hexdigest()
+            if actual != digest:
+                logging.info(f"{source} changed while backing up; storing its new content")
+            destination = self.object_path(actual)
+            if destination.exists():
+                return actual, 0
+            destination.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(tmp_path, destination)
+            return actual, os.path.getsize(destination)
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+
+    def current_files(self):
+        """Hash the live workflows: {relative path: {hash, size, mtime}}."""
+        stats = self.scan()
+        absolute = {str(self.user_dir / rel): stat for rel, stat in stats.items()}
+        digests = self.hash_cache.hash_files(list(absolute), absolute)
+
+        files = {}
+        for rel, stat in stats.items():
+            digest = digests.get(str(self.user_dir / rel))
+            if digest is not None:
+                files[rel] = {"hash": digest, "size": stat.st_size, "mtime": stat.st_mtime}
+        return files
+
+    def backup(self):
+        """Take a snapshot. Returns a summary dict, or None if there is nothing to back up.
+
+        No manifest is written when no workflow changed since the last one.
+        """
+        if not self.user_dir.is_dir():
+            logging.error(f"ComfyUI user directory not found: {self.user_dir}")
+            return None
+
+        start = time.perf_counter()
+        files = self.current_files()
+
+        # Copy new content in parallel
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            stored = list(pool.map(
+                lambda item: self.store_object(self.user_dir / item[0], item[1]["hash"]),
+                files.items()
+            ))
+        copied = [size for _, size in stored]
+        for info, (digest, _) in zip(files.values(), stored):
+            if digest != info["hash"]:
+                # Point the manifest at the content that was actually stored
+                info["hash"] = digest
+                info["size"] = os.path.getsize(self.object_path(digest))
+
+        self.hash_cache.retain(str(self.user_dir / rel) for rel in files)
+        self.hash_cache.save()
+
+        latest = self.latest_snapshot()
+        name = latest
+        if latest is None or hashes(self.load_manifest(latest)["files"]) != hashes(files):
+            name = self.write_manifest(files)
+
+        summary = {
+            "snapshot": name,
+            "created": name != latest,
+            "files": len(files),
+            "new_objects": sum(1 for size in copied if size),
+            "new_bytes": sum(copied),
+            "seconds": round(time.perf_counter() - start, 3),
+        }
+        logging.info(
+            f"Workflow backup {name}: {summary['files']} files, "
+            f"{summary['new_objects']} new objects in {summary['seconds']} s"
+        )
+        return summary
+
+    def write_manifest(self, files):
+        """Write a snapshot manifest and return its name."""
+        self.snapshots_dir.mkdir(parents=True, exist_ok=True)
+        name = time.strftime("%Y%m%d-%H%M%S")
+        suffix = 1
+        while (self.snapshots_dir / f"{name}.json").exists():
+            suffix += 1
+            name = f"{time.strftime('%Y%m%d-%H%M%S')}-{suffix}"
+
+        manifest = {"name": name, "created": time.time(), "user_dir": str(self.user_dir), "files": files}
+        path = self.snapshots_dir / f"{name}.json"
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, path)
+        return name
+
+    def snapshot_names(self):
+        """Get snapshot names, oldest first."""
+        if not self.snapshots_dir.is_dir():
+            return []
+        return sorted(p.stem for p in self.snapshots_dir.glob("*.json"))
+
+    def latest_snapshot(self):
+        """Get the newest snapshot name, or None."""
+        names = self.snapshot_names()
+        return names[-1] if names else None
+
+    def load_manifest(self, name):
+        """Load a snapshot manifest. Raises FileNotFoundError for unknown names."""
+        with open(self.snapshots_dir / f"{name}.json") as f:
+            return json.load(f)
+
+    def list_snapshots(self):
+        """Get name, creation time, file count and total size of every snapshot."""
+        snapshots = []
+        for name in self.snapshot_names():
+            manifest = self.load_manifest(name)
+            snapshots.append({
+                "name": name,
+                "created": manifest["created"],
+                "files": len(manifest["files"]),
+                "bytes": sum(f["size"] for f in manifest["files"].values()),
+            })
+        return snapshots
+
+    def diff(self, old, new=None):
+        """Compare two snapshots, or a snapshot with the live workflows."""
+        old_files = self.load_manifest(old)["files"]
+        new_files = self.load_manifest(new)["files"] if new else self.current_files()
+        return {
+            "added": sorted(set(new_files) - set(old_files)),
+            "removed": sorted(set(old_files) - set(new_files)),
+            "changed": sorted(
+                path for path in set(old_files) & set(new_files)
+                if old_files[path]["hash"] != new_files[path]["hash"]
+            ),
+        }
+
+    def restore(self, name, paths=None, target=None):
+        """Restore files from a snapshot. Returns the number of files written.
+
+        Restores into the live user directory by default, after taking a
+        snapshot of it so the restore itself can be undone. Files that are
+        not in the snapshot are left alone.
+        """
+        files = self.load_manifest(name)["files"]
+        if paths:
+            files = {rel: info for rel, info in files.items() if rel in paths}
+
+        if target is None:
+            target = self.user_dir
+            self.backup()
+        target = Path(target)
+
+        restored = 0
+        for rel, info in files.items():
+            destination = target / rel
+            try:
+                if destination.exists() and self.hash_cache.hash(str(destination)) == info["hash"]:
+                    continue
+                destination.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = destination.with_name(f".{destination.name}.restore")
+                shutil.copyfile(self.object_path(info["hash"]), tmp_path)
+                os.utime(tmp_path, (info["mtime"], info["mtime"]))
+                os.replace(tmp_path, destination)
+                restored += 1
+            except OSError as e:
+                logging.error(f"Failed to restore {rel}: {e}")
+
+        logging.info(f"Restored {restored} files from {name} to {target}")
+        return restored
+
+    def prune(self, keep):
+        """Delete all but the newest ``keep`` snapshots and unreferenced objects."""
+        names = self.snapshot_names()
+        for name in names[:-max(1, keep)]:
+            (self.snapshots_dir / f"{name}.json").unlink()
+
+        referenced = set()
+        for name in self.snapshot_names():
+            referenced.update(f["hash"] for f in self.load_manifest(name)["files"].values())
+
+        removed = 0
+        for path in self.objects_dir.glob("*/*"):
+            if path.parent.name + path.name not in referenced:
+                path.unlink()
+                removed += 1
+        return removed
@@ -0,0 +1,1060 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for ComfyUI Manager
+
+Run with: python -m comfyui_manager.benchmarks <name> [options]
+"""
+
+import os
+import sys
+import shutil
+import json
+import time
+import argparse
+import threading
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+def bench_console(args):
+    """Feed the output console at a fixed line rate and measure Tk loop lag."""
+    import tkinter as tk
+    from comfyui_manager.widgets.console import ConsoleWidget
+
+    root = tk.Tk()
+    console = ConsoleWidget(root, max_lines=args.max_lines)
+    console.pack(fill=tk.BOTH, expand=True)
+    root.update()
+
+    rate = args.rate
+    duration = args.duration
+    stop = threading.Event()
+    sent = [0]
+
+    def producer():
+        # Write in 1 ms slices to approximate a steady stream
+        start = time.perf_counter()
+        while not stop.is_set():
+            due = int((time.perf_counter() - start) * rate)
+            while sent[0] < due:
+                console.write(f"[{sent[0]:08d}] sampling step {sent[0] % 30}/30 | it/s 4.21")
+                sent[0] += 1
+            time.sleep(0.001)
+
+    # A 10 ms heartbeat on the Tk loop; lateness is the lag users feel
+    interval = 10
+    lags = []
+    last = [time.perf_counter()]
+
+    def heartbeat():
+        now = time.perf_counter()
+        lags.append(max(0.0, (now - last[0]) * 1000 - interval))
+        last[0] = now
+        root.after(interval, heartbeat)
+
+    thread = threading.Thread(target=producer, daemon=True)
+    thread.start()
+    root.after(interval, heartbeat)
+    root.after(int(duration * 1000), root.quit)
+    root.mainloop()
+    stop.set()
+    thread.join()
+
+    lags.sort()
+    result = {
+        "lines_sent": sent[0],
+        "lines_per_second": rate,
+        "lines_in_widget": console._line_count,
+        "dropped_lines": console.dropped_lines,
+        "lag_p50_ms": round(lags[len(lags) // 2], 2) if lags else 0.0,
+        "lag_p99_ms": round(lags[int(len(lags) * 0.99)], 2) if lags else 0.0,
+        "lag_max_ms": round(lags[-1], 2) if lags else 0.0,
+    }
+    root.destroy()
+    return result
+
+
+def bench_startup(args):
+    """Measure headless import time and CLI round trips, checking tkinter stays out."""
+    import subprocess
+
+    src_dir = str(Path(__file__).parent.parent)
+    probe = (
+        "import sys, time; t = time.perf_counter();"
+        "import comfyui_manager.cli, comfyui_manager.supervisor;"
+        "print(time.perf_counter() - t, 'tkinter' in sys.modules)"
+    )
+
+    import_times = []
+    cli_times = []
+    tkinter_loaded = False
+    for _ in range(args.runs):
+        output = subprocess.run(
+            [sys.executable, "-c", probe],
+            capture_output=True, text=True, cwd=src_dir, check=True
+        ).stdout.split()
+        import_times.append(float(output[0]) * 1000)
+        tkinter_loaded = tkinter_loaded or output[1] == "True"
+
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-m", "comfyui_manager.cli", "status"],
+            capture_output=True, cwd=src_dir
+        )
+        cli_times.append((time.perf_counter() - start) * 1000)
+
+    import_times.sort()
+    cli_times.sort()
+    return {
+        "runs": args.runs,
+        "import_ms_median": round(import_times[len(import_times) // 2], 1),
+        "cli_status_ms_median": round(cli_times[len(cli_times) // 2], 1),
+        "tkinter_imported": tkinter_loaded,
+    }
+
+
+def bench_control(args):
+    """Measure control API latency and throughput with concurrent clients."""
+    import tempfile
+    from comfyui_manager.supervisor import Supervisor
+    from comfyui_manager.control_server import ControlServer
+    from comfyui_manager.control_client import ControlClient
+
+    config = {"output_dir": tempfile.gettempdir()}
+    supervisor = Supervisor(config)
+    socket_path = str(Path(tempfile.mkdtemp()) / "bench.sock")
+    server = ControlServer(supervisor, socket_path)
+    server.start()
+
+    latencies = []
+    lock = threading.Lock()
+
+    def client_worker():
+        client = ControlClient(socket_path)
+        local = []
+        for _ in range(args.calls):
+            start = time.perf_counter()
+            client.call(args.method)
+            local.append((time.perf_counter() - start) * 1000)
+        client.close()
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client_worker) for _ in range(args.clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    server.stop()
+
+    latencies.sort()
+    return {
+        "method": args.method,
+        "clients": args.clients,
+        "calls": len(latencies),
+        "requests_per_second": round(len(latencies) / elapsed, 1),
+        "latency_p50_ms": round(latencies[len(latencies) // 2], 3),
+        "latency_p99_ms": round(latencies[int(len(latencies) * 0.99)], 3),
+    }
+
+
+def make_synthetic_outputs(root, files, per_dir=1000):
+    """Create an output tree of empty PNG-named files (reused if present)."""
+    root = Path(root)
+    marker = root / f".synthetic_{files}"
+    if marker.exists():
+        return root
+    root.mkdir(parents=True, exist_ok=True)
+    for i in range(files):
+        directory = root / f"2024-01-{i // per_dir % 28 + 1:02d}" / f"batch_{i // per_dir:04d}"
+        if i % per_dir == 0:
+            directory.mkdir(parents=True, exist_ok=True)
+        (directory / f"ComfyUI_{i:05d}_.png").touch()
+    marker.touch()
+    return root
+
+
+def bench_output_index(args):
+    """Crawl a synthetic output tree serially and in parallel, then time a live update."""
+    import tempfile
+    from comfyui_manager.output_index import OutputIndex
+
+    root = make_synthetic_outputs(
+        args.root or Path(tempfile.gettempdir()) / "comfyui_bench_outputs", args.files
+    )
+
+    result = {"files": args.files}
+    for workers in sorted({1, args.workers}):
+        index = OutputIndex(root, workers=workers)
+        index.crawl()
+        result[f"crawl_s_workers_{workers}"] = round(index.crawl_seconds, 3)
+        result[f"files_per_s_workers_{workers}"] = round(index.count / index.crawl_seconds)
+
+    # Time from file creation to the index seeing it
+    index = OutputIndex(root, workers=args.workers)
+    index.start()
+    index.ready.wait()
+    time.sleep(0.2)
+    before = index.count
+    probe = Path(root) / f"probe_{time.time_ns()}_00001_.png"
+    start = time.perf_counter()
+    probe.write_bytes(b"x")
+    while index.count == before and time.perf_counter() - start < 15:
+        time.sleep(0.001)
+    result["update_latency_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    result["watch_mode"] = index.mode
+    index.stop()
+    probe.unlink()
+
+    start = time.perf_counter()
+    for _ in range(100000):
+        index.stats()
+    result["stats_query_us"] = round((time.perf_counter() - start) * 10, 3)
+    return result
+
+
+def make_synthetic_images(root, count, size=(1024, 1024), image_format="PNG"):
+    """Create noisy test images (reused if present)."""
+    from PIL import Image
+
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    suffix = ".png" if image_format == "PNG" else ".jpg"
+    paths = []
+    base = Image.effect_noise(size, 64).convert("RGB")
+    for i in range(count):
+        path = root / f"ComfyUI_{i:05d}_{suffix}"
+        if not path.exists():
+            options = {"compress_level": 1} if image_format == "PNG" else {"quality": 90}
+            base.rotate(i % 360).save(path, image_format, **options)
+        paths.append(str(path))
+    return paths
+
+
+def bench_thumbnails(args):
+    """Thumbnails per second, cold (decode) and warm (cache hit)."""
+    import tempfile
+    from comfyui_manager.thumbnails import ThumbnailCache
+
+    work_dir = Path(args.root or Path(tempfile.gettempdir()) / "comfyui_bench_thumbs")
+    result = {"images": args.images, "workers": args.workers}
+
+    for image_format in ("PNG", "JPEG"):
+        paths = make_synthetic_images(work_dir / image_format.lower(), args.images, image_format=image_format)
+        cache_dir = work_dir / f"cache_{image_format.lower()}"
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        cache = ThumbnailCache(cache_dir, workers=args.workers)
+
+        start = time.perf_counter()
+        cache.generate(paths)
+        cold = time.perf_counter() - start
+
+        start = time.perf_counter()
+        cache.generate(paths)
+        warm = time.perf_counter() - start
+        cache.close()
+
+        result[f"{image_format.lower()}_cold_per_s"] = round(len(paths) / cold, 1)
+        result[f"{image_format.lower()}_warm_per_s"] = round(len(paths) / warm, 1)
+
+    return result
+
+
+def make_synthetic_caches(base_dir, units, files_per_unit=50, file_size=4096):
+    """Create torch_extensions, huggingface and temp trees with aged units."""
+    cache_dir = Path(base_dir) / "cache"
+    layouts = [
+        cache_dir / "torch_extensions" / "py311_cu121",
+        cache_dir / "huggingface" / "hub",
+        Path(base_dir) / "temp",
+    ]
+    payload = b"\0" * file_size
+    now = time.time()
+    for layout in layouts:
+        for unit in range(units):
+            unit_dir = layout / f"unit_{unit:05d}"
+            if unit_dir.exists():
+                continue
+            unit_dir.mkdir(parents=True)
+            for index in range(files_per_unit):
+                path = unit_dir / f"file_{index:04d}.bin"
+                path.write_bytes(payload)
+                # Older units were used longer ago
+                age = (units - unit) * 3600
+                os.utime(path, (now - age, now - age))
+    return base_dir
+
+
+def bench_cache(args):
+    """Measure synthetic caches serially and in parallel, then enforce small quotas."""
+    import tempfile
+    from comfyui_manager.cache_manager import CacheManager
+
+    base_dir = Path(args.root or Path(tempfile.gettempdir()) / "comfyui_bench_caches")
+    shutil.rmtree(base_dir, ignore_errors=True)
+    make_synthetic_caches(base_dir, args.units)
+    config = {"base_dir": str(base_dir), "cache_grace_minutes": 0}
+
+    result = {"units": args.units * 3, "files": args.units * 3 * 50}
+    for workers in sorted({1, args.workers}):
+        manager = CacheManager(config, workers=workers)
+        start = time.perf_counter()
+        report = manager.measure()
+        result[f"measure_s_workers_{workers}"] = round(time.perf_counter() - start, 3)
+    result["bytes_before"] = sum(info["bytes"] for info in report.values())
+
+    # Keep roughly half of each cache
+    half_mb = args.units * 50 * 4096 / 2 / (1024 * 1024)
+    config["cache_quotas"] = {name: max(1, int(half_mb)) for name in report}
+    manager = CacheManager(config, workers=args.workers)
+    start = time.perf_counter()
+    result["freed_bytes"] = manager.enforce()
+    result["enforce_s"] = round(time.perf_counter() - start, 3)
+    result["bytes_after"] = sum(info["bytes"] for info in manager.measure().values())
+
+    shutil.rmtree(base_dir, ignore_errors=True)
+    return result
+
+
+def make_synthetic_workflows(user_dir, count, users=2):
+    """Create ``count`` workflow JSON files spread over a few users."""
+    for index in range(count):
+        workflow_dir = Path(user_dir) / f"user{index % users}" / "workflows" / f"project{index % 20}"
+        workflow_dir.mkdir(parents=True, exist_ok=True)
+        nodes = [{"id": n, "type": "KSampler", "widgets_values": [index, 20, 7.5]} for n in range(40)]
+        (workflow_dir / f"workflow_{index:06d}.json").write_text(json.dumps({"nodes": nodes}))
+    return user_dir
+
+
+def bench_backup(args):
+    """Time a first backup, an unchanged repeat, and a repeat with a few edits."""
+    import tempfile
+    from comfyui_manager.backup import BackupEngine
+
+    root = Path(args.root or Path(tempfile.gettempdir()) / "comfyui_bench_backup")
+    shutil.rmtree(root, ignore_errors=True)
+    user_dir = make_synthetic_workflows(root / "ComfyUI" / "user", args.workflows)
+
+    result = {"workflows": args.workflows}
+    first = BackupEngine(user_dir, root / "backups").backup()
+    result["first_s"] = first["seconds"]
+    result["first_new_bytes"] = first["new_bytes"]
+
+    # A fresh engine loads the hash cache from disk, like a new process would
+    start = time.perf_counter()
+    repeat = BackupEngine(user_dir, root / "backups").backup()
+    result["unchanged_s"] = round(time.perf_counter() - start, 3)
+    result["unchanged_created_snapshot"] = repeat["created"]
+
+    edited = sorted(Path(user_dir).glob("*/workflows/*/*.json"))[:10]
+    for path in edited:
+        path.write_text(path.read_text() + " ")
+    start = time.perf_counter()
+    changed = BackupEngine(user_dir, root / "backups").backup()
+    result["ten_edits_s"] = round(time.perf_counter() - start, 3)
+    result["ten_edits_new_objects"] = changed["new_objects"]
+
+    shutil.rmtree(root, ignore_errors=True)
+    return result
+
+
+def png_chunk(chunk_type, data):
+    """Encode one PNG chunk."""
+    import zlib
+    import struct
+    return struct.pack(">I", len(data)) + chunk_type + data + struct.pack(">I", zlib.crc32(chunk_type + data))
+
+
+def make_synthetic_pngs(root, count, idat_bytes=256 * 1024, per_dir=1000):
+    """Create PNGs shaped like ComfyUI outputs: prompt and workflow tEXt chunks, then IDAT."""
+    import struct
+    root = Path(root)
+    if root.is_dir() and sum(1 for _ in root.rglob("*.png")) >= count:
+        return root
+
+    samplers = ["euler", "euler_ancestral", "dpmpp_2m", "dpmpp_sde", "uni_pc"]
+    models = ["sd_xl_base_1.0.safetensors", "flux1-dev.safetensors", "juggernautXL_v9.safetensors"]
+    loras = ["detail_tweaker.safetensors", "film_grain.safetensors", "pixel_art.safetensors"]
+    words = "portrait landscape cinematic lighting forest city night neon castle river dragon robot".split()
+    header = png_chunk(b"IHDR", struct.pack(">IIBBBBB", 1024, 1024, 8, 2, 0, 0, 0))
+    pixels = png_chunk(b"IDAT", bytes(idat_bytes)) + png_chunk(b"IEND", b"")
+
+    for index in range(count):
+        directory = root / f"batch_{index // per_dir:04d}"
+        directory.mkdir(parents=True, exist_ok=True)
+        prompt = {
+            "3": {"class_type": "KSampler", "inputs": {
+                "seed": index, "steps": 20 + index % 10, "cfg": 7.0,
+                "sampler_name": samplers[index % len(samplers)], "scheduler": "karras",
+                "model": ["10", 0], "positive": ["6", 0], "negative": ["7", 0], "latent_image": ["5", 0],
+            }},
+            "4": {"class_type": "CheckpointLoaderSimple", "inputs": {"ckpt_name": models[index % len(models)]}},
+            "10": {"class_type": "LoraLoader", "inputs": {
+                "lora_name": loras[index % len(loras)], "strength_model": 0.8, "model": ["4", 0], "clip": ["4", 1],
+            }},
+            "6": {"class_type": "CLIPTextEncode", "inputs": {
+                "text": " ".join(words[(index + i) % len(words)] for i in range(6)), "clip": ["10", 1],
+            }},
+            "7": {"class_type": "CLIPTextEncode", "inputs": {"text": "blurry, lowres", "clip": ["10", 1]}},
+        }
+        workflow = {"nodes": [{"id": n, "type": "Node", "widgets_values": [index]} for n in range(30)]}
+        text = (
+            png_chunk(b"tEXt", b"prompt\0" + json.dumps(prompt).encode())
+            + png_chunk(b"tEXt", b"workflow\0" + json.dumps(workflow).encode())
+        )
+        (directory / f"ComfyUI_{index:06d}_.png").write_bytes(b"\x89PNG\r\n\x1a\n" + header + text + pixels)
+    return root
+
+
+def bench_png_metadata(args):
+    """Metadata extraction and catalogue build speed in files per second."""
+    import tempfile
+    from concurrent.futures import ThreadPoolExecutor
+    from comfyui_manager.png_metadata import read_output_metadata
+    from comfyui_manager.prompt_index import PromptIndex
+
+    root = make_synthetic_pngs(
+        args.root or Path(tempfile.gettempdir()) / "comfyui_bench_pngs", args.files
+    )
+    paths = sorted(str(p) for p in Path(root).rglob("*.png"))[:args.files]
+    result = {"files": len(paths), "file_bytes": os.path.getsize(paths[0])}
+
+    start = time.perf_counter()
+    for path in paths:
+        read_output_metadata(path)
+    result["serial_files_per_s"] = round(len(paths) / (time.perf_counter() - start))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        list(pool.map(read_output_metadata, paths))
+    result["parallel_files_per_s"] = round(len(paths) / (time.perf_counter() - start))
+
+    # Full catalogue build: parse and write to SQLite
+    db_path = Path(tempfile.gettempdir()) / "comfyui_bench_prompts.sqlite"
+    for suffix in ("", "-wal", "-shm"):
+        Path(f"{db_path}{suffix}").unlink(missing_ok=True)
+    index = PromptIndex(db_path, workers=args.workers)
+    files = {path: (os.path.getsize(path), os.path.getmtime(path)) for path in paths}
+    start = time.perf_counter()
+    index.reconcile(files)
+    result["index_files_per_s"] = round(len(paths) / (time.perf_counter() - start))
+
+    start = time.perf_counter()
+    index.reconcile(files)
+    result["unchanged_reconcile_ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+    start = time.perf_counter()
+    found = index.search("neon castle", model="flux", sampler="dpmpp")
+    result["search_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    result["search_results"] = len(found)
+    result["fts"] = index.fts
+    index.stop()
+    return result
+
+
+def bench_dedup(args):
+    """Perceptual hash rate on real images and neighbour search scaling to 500k hashes."""
+    import random
+    import tempfile
+    from comfyui_manager.dedup import DuplicateFinder, MultiIndexHash, UnionFind
+
+    root = Path(args.root or Path(tempfile.gettempdir()) / "comfyui_bench_dedup")
+    paths = make_synthetic_images(root / "images", args.images)
+    files = {path: (os.path.getsize(path), os.path.getmtime(path)) for path in paths}
+    result = {"images": len(paths)}
+
+    for method in ("dhash", "phash"):
+        cache_dir = root / f"cache_{method}"
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        finder = DuplicateFinder(cache_dir, method=method, workers=args.workers)
+        start = time.perf_counter()
+        finder.find(files)
+        result[f"{method}_cold_images_per_s"] = round(len(paths) / (time.perf_counter() - start), 1)
+        start = time.perf_counter()
+        DuplicateFinder(cache_dir, method=method, workers=args.workers).find(files)
+        result[f"{method}_cached_images_per_s"] = round(len(paths) / (time.perf_counter() - start))
+
+    # Neighbour search on synthetic hashes: 1% of images get a near copy
+    rng = random.Random(42)
+    for count in (10000, 100000, 500000):
+        if count > args.max_hashes:
+            break
+        hashes = [rng.getrandbits(64) for _ in range(count)]
+        planted = count // 100
+        for i in range(planted):
+            flipped = hashes[i]
+            for bit in rng.sample(range(64), rng.randint(1, args.max_distance)):
+                flipped ^= 1 << bit
+            hashes[count - planted + i] = flipped
+
+        start = time.perf_counter()
+        index = MultiIndexHash(args.max_distance, expected=count)
+        for value in hashes:
+            index.add(value)
+        sets = UnionFind(count)
+        pairs = 0
+        for a, b in index.pairs():
+            sets.union(a, b)
+            pairs += 1
+        result[f"search_s_{count}"] = round(time.perf_counter() - start, 2)
+        result[f"recall_{count}"] = round(
+            sum(1 for i in range(planted) if sets.find(i) == sets.find(count - planted + i)) / planted, 4
+        )
+
+    return result
+
+
+def make_comfy_outputs(root, count, size=(1024, 1024)):
+    """Create ComfyUI-like outputs: smooth renders saved at compress_level 4 with metadata."""
+    from PIL import Image, ImageDraw, ImageFilter
+    from PIL.PngImagePlugin import PngInfo
+
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for i in range(count):
+        path = root / f"ComfyUI_{i:05d}_.png"
+        img = Image.linear_gradient("L").resize(size).convert("RGB")
+        draw = ImageDraw.Draw(img)
+        for shape in range(12):
+            x, y = (i * 97 + shape * 131) % size[0], (i * 53 + shape * 71) % size[1]
+            draw.ellipse((x, y, x + 200, y + 160), fill=((shape * 40) % 256, (i * 7) % 256, 120))
+        img = img.filter(ImageFilter.GaussianBlur(3))
+        img = Image.blend(img, Image.effect_noise(size, 12).convert("RGB"), 0.08)
+        info = PngInfo()
+        info.add_text("prompt", json.dumps({"3": {"class_type": "KSampler", "inputs": {"seed": i}}}))
+        info.add_text("workflow", json.dumps({"nodes": [{"id": n} for n in range(30)]}))
+        img.save(path, "PNG", compress_level=4, pnginfo=info)
+        paths.append(str(path))
+    return paths
+
+
+def bench_archive(args):
+    """Bytes saved and files per second for PNG and lossless WebP recompression."""
+    import tempfile
+    from comfyui_manager.archiver import OutputArchiver
+
+    root = Path(args.root or Path(tempfile.gettempdir()) / "comfyui_bench_archive")
+    source = sorted(str(p) for p in (root / "source").glob("*.png"))[:args.images]
+    if len(source) < args.images:
+        source = make_comfy_outputs(root / "source", args.images)
+    result = {"images": len(source), "bytes_before": sum(os.path.getsize(p) for p in source)}
+
+    for image_format in ("png", "webp"):
+        work_dir = root / image_format
+        shutil.rmtree(work_dir, ignore_errors=True)
+        work_dir.mkdir(parents=True)
+        paths = []
+        for path in source:
+            copy = work_dir / Path(path).name
+            shutil.copy2(path, copy)
+            paths.append(str(copy))
+
+        config = {"archive_format": image_format, "archive_workers": args.workers}
+        archiver = OutputArchiver(config, None, ledger_file=work_dir / "ledger.json")
+        start = time.perf_counter()
+        saved = archiver.archive(paths)
+        elapsed = time.perf_counter() - start
+        stats = archiver.stats()
+        result[f"{image_format}_saved_percent"] = round(saved / result["bytes_before"] * 100, 1)
+        result[f"{image_format}_files_per_s"] = round(len(paths) / elapsed, 2)
+        result[f"{image_format}_saved_mb_per_hour"] = round(saved / elapsed * 3600 / (1024 * 1024))
+        result[f"{image_format}_replaced"] = stats["files"]
+
+    return result
+
+
+def make_safetensors(path, size, tensors=800, dtype="F16"):
+    """Write a safetensors header and extend the file sparsely to ``size`` bytes."""
+    import struct
+
+    header = {"__metadata__": {"modelspec.architecture": "stable-diffusion-xl-v1-base"}}
+    offset = 0
+    for i in range(tensors):
+        shape = [640, 640, 3, 3] if i % 2 else [1280, 640]
+        end = offset + 2 * shape[0] * shape[1] * (9 if len(shape) == 4 else 1)
+        header[f"model.diffusion_model.block_{i}.weight"] = {"dtype": dtype, "shape": shape, "data_offsets": [offset, end]}
+        offset = end
+    data = json.dumps(header).encode()
+    with open(path, "wb") as f:
+        f.write(struct.pack("<Q", len(data)) + data)
+        f.truncate(size)
+
+
+def bench_models(args):
+    """Model inventory scan time on sparse checkpoints, cold and with a warm cache."""
+    import tempfile
+    from comfyui_manager.model_inventory import ModelInventory, find_models
+
+    root = Path(args.root or Path(tempfile.gettempdir()) / "comfyui_bench_models")
+    models_dir = root / "models"
+    size = int(args.size_gb * 1024 ** 3)
+    for i in range(args.models):
+        folder = models_dir / ("checkpoints" if i % 3 else "loras")
+        folder.mkdir(parents=True, exist_ok=True)
+        path = folder / f"model_{i:04d}.safetensors"
+        # Distinct sizes, so the size prefilter does not force hashing
+        if not path.exists() or path.stat().st_size != size + i:
+            make_safetensors(path, size + i)
+    result = {"models": args.models, "total_gb": round(args.models * args.size_gb, 1)}
+
+    cache_dir = root / "cache"
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    start = time.perf_counter()
+    report = ModelInventory(models_dir, cache_dir).scan(hash_all=False)
+    result["cold_headers_s"] = round(time.perf_counter() - start, 3)
+    result["parameters_per_model"] = report["models"][0]["parameters"]
+
+    # Hashing speed on a real (non-sparse) file
+    hash_dir = root / "hash"
+    hash_dir.mkdir(exist_ok=True)
+    sample = hash_dir / "sample.safetensors"
+    if not sample.exists():
+        with open(sample, "wb") as f:
+            for _ in range(args.hash_mb):
+                f.write(os.urandom(1024 * 1024))
+    inventory = ModelInventory(hash_dir, root / "hash_cache")
+    shutil.rmtree(root / "hash_cache", ignore_errors=True)
+    start = time.perf_counter()
+    inventory.digests.hash_files([str(sample)])
+    result["sha256_mb_per_s"] = round(args.hash_mb / (time.perf_counter() - start))
+
+    # A warm cache as left by an earlier full pass; the digests are placeholders
+    # since reading the sparse files would only measure zero-page copies
+    inventory = ModelInventory(models_dir, cache_dir)
+    for path, stat in find_models(models_dir).items():
+        inventory.digests.store(os.path.realpath(path), stat, f"{stat.st_size:064x}")
+    inventory.digests.save()
+
+    start = time.perf_counter()
+    report = ModelInventory(models_dir, cache_dir).scan(hash_all=True)
+    result["warm_full_scan_s"] = round(time.perf_counter() - start, 3)
+    result["hashed"] = sum(1 for model in report["models"] if model["sha256"])
+    return result
+
+
+def bench_prefetch(args):
+    """First-load time of a large model file from disk versus after prefetching."""
+    import tempfile
+    from comfyui_manager.prefetch import ModelPrefetcher, evict, residency
+
+    root = Path(args.root or Path(tempfile.gettempdir()) / "comfyui_bench_prefetch")
+    root.mkdir(parents=True, exist_ok=True)
+    path = root / "model.safetensors"
+    size = args.size_mb * 1024 * 1024
+    if not path.exists() or path.stat().st_size != size:
+        with open(path, "wb") as f:
+            for _ in range(args.size_mb):
+                f.write(os.urandom(1024 * 1024))
+            f.flush()
+            os.fsync(f.fileno())
+    path = str(path)
+
+    def first_load():
+        # What a loader does: read the whole file once, front to back
+        start = time.perf_counter()
+        with open(path, "rb", buffering=0) as f:
+            buffer = bytearray(8 * 1024 * 1024)
+            while f.readinto(buffer):
+                pass
+        return round(time.perf_counter() - start, 3)
+
+    result = {"size_mb": args.size_mb}
+    evict(path)
+    result["cold_resident_percent"] = round(residency(path)[0] / size * 100, 1)
+    result["cold_load_s"] = first_load()
+
+    evict(path)
+    config = {"prefetch_rate_mb_s": args.rate, "prefetch_workers": 1, "prefetch_max_gb": 1024}
+    progress = ModelPrefetcher(config).prefetch([path])
+    result["prefetch_s"] = progress["seconds"]
+    result["prefetch_mb_per_s"] = round(args.size_mb / max(progress["seconds"], 1e-6))
+    result["warm_resident_percent"] = round(residency(path)[0] / size * 100, 1)
+    result["warm_load_s"] = first_load()
+
+    # A second run only checks residency
+    progress = ModelPrefetcher(config).prefetch([path])
+    result["repeat_prefetch_s"] = progress["seconds"]
+    result["repeat_read_bytes"] = progress["read_bytes"]
+    return result
+
+
+def bench_comfy_api(args):
+    """Request rate against a stub ComfyUI, pooled versus one connection per request."""
+    import asyncio
+    from comfyui_manager.comfy_api import ComfyClient
+    from comfyui_manager.comfy_stub import StubComfyUI
+
+    stub = StubComfyUI(step_time=args.step_time).start()
+
+    async def run_requests(pooled):
+        latencies = []
+        client = ComfyClient(stub.host, stub.port, pool_size=args.concurrency)
+
+        async def worker():
+            for _ in range(args.requests // args.concurrency):
+                start = time.perf_counter()
+                if pooled:
+                    await client.request("GET", args.path)
+                else:
+                    single = ComfyClient(stub.host, stub.port, pool_size=1)
+                    await single.request("GET", args.path)
+                    await single.close()
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - start
+        opened = client.pool.opened
+        await client.close()
+        latencies.sort()
+        return {
+            "requests_per_second": round(len(latencies) / elapsed, 1),
+            "latency_p50_ms": round(latencies[len(latencies) // 2], 3),
+            "latency_p99_ms": round(latencies[int(len(latencies) * 0.99)], 3),
+            "connections": opened if pooled else len(latencies),
+        }
+
+    async def run_events():
+        # Time from queueing to the final pushed event, and events per second
+        client = ComfyClient(stub.host, stub.port)
+        events = client.events()
+        await events.__anext__()
+        start = time.perf_counter()
+        prompt = {"1": {"class_type": "KSampler", "inputs": {"steps": args.steps}},
+                  "2": {"class_type": "SaveImage", "inputs": {"filename_prefix": "bench"}}}
+        await client.queue_prompt(prompt)
+        received = 0
+        async for event in events:
+            received += 1
+            if event.get("type") == "execution_success":
+                break
+        elapsed = time.perf_counter() - start
+        await events.aclose()
+        await client.close()
+        return {"events": received, "seconds": round(elapsed, 3),
+                "expected_seconds": round(args.steps * args.step_time, 3)}
+
+    async def run_all():
+        return {
+            "pooled": await run_requests(True),
+            "new_connection": await run_requests(False),
+            "events": await run_events(),
+        }
+
+    try:
+        result = asyncio.run(run_all())
+    finally:
+        stub.stop()
+    result.update(path=args.path, requests=args.requests, concurrency=args.concurrency)
+    return result
+
+
+def bench_harvest(args):
+    """Harvest throughput and peak memory against a stub serving large images."""
+    import asyncio
+    import tempfile
+    import tracemalloc
+    from comfyui_manager.comfy_api import ComfyAPIError, ComfyClient
+    from comfyui_manager.harvester import Harvester, output_files
+
+    import socket
+    import subprocess
+
+    # The stub runs in its own process so only the harvester's memory is traced
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    stub_process = subprocess.Popen(
+        [sys.executable, "-m", "comfyui_manager.comfy_stub", "--port", str(port), "--step-time", "0",
+         "--image-mb", str(args.image_mb)],
+        cwd=str(Path(__file__).parent.parent), stderr=subprocess.DEVNULL,
+    )
+    config = {"host": "127.0.0.1", "port": port, "output_dir": ""}
+    prompt = {"9": {"class_type": "SaveImage", "inputs": {"filename_prefix": "bench"}}}
+
+    async def queue_all():
+        client = ComfyClient("127.0.0.1", port)
+        for _ in range(100):
+            try:
+                await client.system_stats()
+                break
+            except ComfyAPIError:
+                await asyncio.sleep(0.05)
+        ids = [(await client.queue_prompt(prompt))["prompt_id"] for _ in range(args.prompts)]
+        while len(await client.get_history()) < args.prompts:
+            await asyncio.sleep(0.05)
+        # Build the image once so it is not part of the timings
+        size = len(await client.view("warmup.png"))
+        await client.close()
+        return ids, size
+
+    async def harvest(ids, concurrency, dest):
+        harvester = Harvester(config, dest, "download", concurrency)
+        await harvester.harvest_history(prompt_ids=ids)
+        await harvester.close()
+        return harvester.stats
+
+    async def buffered(ids, dest):
+        # Baseline: whole image in memory, then written
+        client = ComfyClient("127.0.0.1", port)
+        for prompt_id in ids:
+            entry = (await client.get_history(prompt_id))[prompt_id]
+            for output in output_files(entry):
+                data = await client.view(output["filename"], output["subfolder"], output["type"])
+                Path(dest, prompt_id + output["filename"]).write_bytes(data)
+        await client.close()
+
+    def measure(coroutine):
+        tracemalloc.start()
+        start = time.perf_counter()
+        asyncio.run(coroutine)
+        seconds = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        total_mb = args.prompts * image_size / (1024 * 1024)
+        return {"seconds": round(seconds, 3), "mb_per_s": round(total_mb / seconds, 1),
+                "peak_python_mb": round(peak / (1024 * 1024), 1)}
+
+    image_size = 0
+    try:
+        ids, image_size = asyncio.run(queue_all())
+        result = {"prompts": args.prompts, "image_mb": round(image_size / (1024 * 1024), 1)}
+        with tempfile.TemporaryDirectory() as dest:
+            result["buffered_sequential"] = measure(buffered(ids, dest))
+        for concurrency in sorted({1, args.concurrency}):
+            with tempfile.TemporaryDirectory() as dest:
+                result[f"streamed_concurrency_{concurrency}"] = measure(harvest(ids, concurrency, dest))
+    finally:
+        stub_process.terminate()
+        stub_process.wait()
+    return result
+
+
+def bench_scheduler(args):
+    """Per-class latency under a batch flood: ComfyUI's FIFO versus the fair scheduler."""
+    from comfyui_manager.comfy_stub import StubComfyUI
+    from comfyui_manager.scheduler import FairScheduler
+
+    def sampler_prompt(steps):
+        return {"3": {"class_type": "KSampler", "inputs": {"steps": steps, "seed": 1}},
+                "9": {"class_type": "SaveImage", "inputs": {"filename_prefix": "bench"}}}
+
+    def simulate(policy):
+        stub = StubComfyUI(step_time=args.step_time).start()
+        # FIFO with an unbounded depth is what submitting straight to ComfyUI does
+        config = {"host": stub.host, "port": stub.port, "scheduler_poll_interval": 1.0,
+                  "scheduler_depth": args.depth if policy == "fair" else 1000000}
+        scheduler = FairScheduler(config, policy)
+        scheduler.start()
+        total = args.batch_jobs * 2 + args.previews
+        start = time.perf_counter()
+        try:
+            for index in range(args.batch_jobs):
+                scheduler.submit(sampler_prompt(args.batch_steps), "batch-a", "batch")
+                scheduler.submit(sampler_prompt(args.batch_steps), "batch-b", "batch")
+            for index in range(args.previews):
+                time.sleep(args.interval)
+                scheduler.submit(sampler_prompt(args.preview_steps), "artist", "interactive")
+            while len(scheduler.finished) < total:
+                time.sleep(0.05)
+            seconds = time.perf_counter() - start
+            status = scheduler.status()
+        finally:
+            scheduler.stop()
+            stub.stop()
+        return {"seconds": round(seconds, 2), "preempted": status["counters"]["preempted"],
+                "latency": status["latency"]}
+
+    return {
+        "batch_jobs": args.batch_jobs * 2,
+        "previews": args.previews,
+        "step_time": args.step_time,
+        "fifo": simulate("fifo"),
+        "fair": simulate("fair"),
+    }
+
+
+def bench_validate(args):
+    """Time to compile a node schema and to validate a large workflow against it."""
+    from comfyui_manager.comfy_stub import OBJECT_INFO
+    from comfyui_manager.validator import WorkflowValidator, compile_schema
+
+    # A real install has thousands of node classes; pad the stub's with plausible ones
+    object_info = dict(OBJECT_INFO)
+    for index in range(args.classes - len(object_info)):
+        object_info[f"CustomNode{index}"] = {
+            "input": {"required": {"image": ["IMAGE"], "strength": ["FLOAT", {"min": 0.0, "max": 1.0}],
+                                   "mode": [["a", "b", "c"]]}},
+            "output": ["IMAGE"], "output_node": False,
+        }
+
+    prompt = {
+        "1": {"class_type": "CheckpointLoaderSimple", "inputs": {"ckpt_name": "model.safetensors"}},
+        "2": {"class_type": "CLIPTextEncode", "inputs": {"text": "a cat", "clip": ["1", 1]}},
+        "3": {"class_type": "CLIPTextEncode", "inputs": {"text": "blurry", "clip": ["1", 1]}},
+        "4": {"class_type": "EmptyLatentImage", "inputs": {"width": 1024, "height": 1024, "batch_size": 1}},
+    }
+    while len(prompt) < args.nodes:
+        base = len(prompt) + 1
+        prompt[str(base)] = {"class_type": "KSampler", "inputs": {
+            "model": ["1", 0], "seed": base, "steps": 20, "cfg": 7.0, "sampler_name": "euler",
+            "scheduler": "normal", "positive": ["2", 0], "negative": ["3", 0], "latent_image": ["4", 0],
+            "denoise": 1.0}}
+        prompt[str(base + 1)] = {"class_type": "VAEDecode", "inputs": {"samples": [str(base), 0], "vae": ["1", 2]}}
+        prompt[str(base + 2)] = {"class_type": "SaveImage", "inputs": {"images": [str(base + 1), 0],
+                                                                        "filename_prefix": "bench"}}
+
+    start = time.perf_counter()
+    schema = compile_schema(object_info)
+    compile_ms = (time.perf_counter() - start) * 1000
+
+    # No models directory, so only the schema is checked, as for a remote ComfyUI
+    validator = WorkflowValidator({"models_dir": "/nonexistent"})
+    validator.schema = schema
+    errors = validator.validate(prompt)
+
+    timings = []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        validator.validate(prompt)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        "classes": len(object_info),
+        "nodes": len(prompt),
+        "errors": len(errors),
+        "compile_ms": round(compile_ms, 2),
+        "validate_ms_p50": round(timings[len(timings) // 2], 4),
+        "validate_ms_p99": round(timings[int(len(timings) * 0.99)], 4),
+    }
+
+
+BENCHMARKS = {
+    "console": bench_console,
+    "startup": bench_startup,
+    "control": bench_control,
+    "output-index": bench_output_index,
+    "thumbnails": bench_thumbnails,
+    "cache": bench_cache,
+    "backup": bench_backup,
+    "png-metadata": bench_png_metadata,
+    "dedup": bench_dedup,
+    "archive": bench_archive,
+    "models": bench_models,
+    "prefetch": bench_prefetch,
+    "comfy-api": bench_comfy_api,
+    "harvest": bench_harvest,
+    "scheduler": bench_scheduler,
+    "validate": bench_validate,
+}
+
+
+def build_parser():
+    """Build the benchmark argument parser."""
+    parser = argparse.ArgumentParser(description="ComfyUI Manager benchmarks")
+    subparsers = parser.add_subparsers(dest="name", required=True)
+
+    console = subparsers.add_parser("console", help="Output console throughput")
+    console.add_argument("--rate", type=int, default=10000, help="Lines per second")
+    console.add_argument("--duration", type=float, default=5.0, help="Seconds to run")
+    console.add_argument("--max-lines", type=int, default=5000, help="Console line cap")
+
+    startup = subparsers.add_parser("startup", help="Headless startup time")
+    startup.add_argument("--runs", type=int, default=10, help="Number of runs")
+
+    control = subparsers.add_parser("control", help="Control API latency and throughput")
+    control.add_argument("--clients", type=int, default=8, help="Concurrent clients")
+    control.add_argument("--calls", type=int, default=1000, help="Calls per client")
+    control.add_argument("--method", default="status", help="Method to call")
+
+    output_index = subparsers.add_parser("output-index", help="Output directory crawl speed")
+    output_index.add_argument("--files", type=int, default=100000, help="Synthetic files")
+    output_index.add_argument("--workers", type=int, default=16, help="Crawl threads")
+    output_index.add_argument("--root", help="Where to build the synthetic tree")
+
+    thumbnails = subparsers.add_parser("thumbnails", help="Thumbnail generation rate")
+    thumbnails.add_argument("--images", type=int, default=200, help="Synthetic 1024x1024 images")
+    thumbnails.add_argument("--workers", type=int, default=4, help="Worker processes")
+    thumbnails.add_argument("--root", help="Where to build the synthetic images")
+
+    cache = subparsers.add_parser("cache", help="Cache measurement and eviction speed")
+    cache.add_argument("--units", type=int, default=200, help="Synthetic units per cache")
+    cache.add_argument("--workers", type=int, default=16, help="Walk threads")
+    cache.add_argument("--root", help="Where to build the synthetic caches")
+
+    backup = subparsers.add_parser("backup", help="Workflow backup speed")
+    backup.add_argument("--workflows", type=int, default=5000, help="Synthetic workflows")
+    backup.add_argument("--root", help="Where to build the synthetic workflows")
+
+    png_metadata = subparsers.add_parser("png-metadata", help="PNG prompt extraction and indexing speed")
+    png_metadata.add_argument("--files", type=int, default=20000, help="Synthetic outputs")
+    png_metadata.add_argument("--workers", type=int, default=8, help="Reader threads")
+    png_metadata.add_argument("--root", help="Where to build the synthetic outputs")
+
+    dedup = subparsers.add_parser("dedup", help="Duplicate detection speed and scaling")
+    dedup.add_argument("--images", type=int, default=200, help="Synthetic 1024x1024 images to hash")
+    dedup.add_argument("--workers", type=int, default=4, help="Hashing workers")
+    dedup.add_argument("--max-distance", type=int, default=4, help="Hamming distance for near duplicates")
+    dedup.add_argument("--max-hashes", type=int, default=500000, help="Largest synthetic hash set")
+    dedup.add_argument("--root", help="Where to build the synthetic images")
+
+    archive = subparsers.add_parser("archive", help="Output recompression savings and speed")
+    archive.add_argument("--images", type=int, default=40, help="Synthetic 1024x1024 outputs")
+    archive.add_argument("--workers", type=int, default=4, help="Worker processes")
+    archive.add_argument("--root", help="Where to build the synthetic outputs")
+
+    models = subparsers.add_parser("models", help="Model inventory scan time")
+    models.add_argument("--models", type=int, default=250, help="Synthetic sparse checkpoints")
+    models.add_argument("--size-gb", type=float, default=2.0, help="Apparent size of each checkpoint")
+    models.add_argument("--hash-mb", type=int, default=256, help="Real data to measure SHA-256 speed")
+    models.add_argument("--root", help="Where to build the synthetic models")
+
+    prefetch = subparsers.add_parser("prefetch", help="Cold versus prefetched model load time")
+    prefetch.add_argument("--size-mb", type=int, default=1024, help="Synthetic model size")
+    prefetch.add_argument("--rate", type=int, default=0, help="Prefetch rate cap in MB/s (0 = none)")
+    prefetch.add_argument("--root", help="Where to write the synthetic model")
+
+    comfy_api = subparsers.add_parser("comfy-api", help="ComfyUI API request rate against a stub server")
+    comfy_api.add_argument("--requests", type=int, default=5000, help="Requests per mode")
+    comfy_api.add_argument("--concurrency", type=int, default=8, help="Concurrent requests")
+    comfy_api.add_argument("--path", default="/queue", help="Endpoint to request")
+    comfy_api.add_argument("--steps", type=int, default=200, help="Sampler steps for the event test")
+    comfy_api.add_argument("--step-time", type=float, default=0.001, help="Stub seconds per step")
+
+    harvest = subparsers.add_parser("harvest", help="Result harvesting throughput from a stub server")
+    harvest.add_argument("--prompts", type=int, default=32, help="Finished prompts to harvest")
+    harvest.add_argument("--image-mb", type=int, default=16, help="Size of each served image")
+    harvest.add_argument("--concurrency", type=int, default=4, help="Parallel downloads")
+
+    scheduler = subparsers.add_parser("scheduler", help="Fair scheduler latency against a stub server")
+    scheduler.add_argument("--batch-jobs", type=int, default=30, help="Batch prompts per batch user (two users)")
+    scheduler.add_argument("--batch-steps", type=int, default=20, help="Sampler steps per batch prompt")
+    scheduler.add_argument("--previews", type=int, default=10, help="Interactive prompts")
+    scheduler.add_argument("--preview-steps", type=int, default=4, help="Sampler steps per interactive prompt")
+    scheduler.add_argument("--interval", type=float, default=0.5, help="Seconds between interactive prompts")
+    scheduler.add_argument("--depth", type=int, default=2, help="Scheduler's ComfyUI queue depth")
+    scheduler.add_argument("--step-time", type=float, default=0.005, help="Stub seconds per step")
+
+    validate = subparsers.add_parser("validate", help="Workflow validation speed")
+    validate.add_argument("--nodes", type=int, default=200, help="Nodes in the synthetic workflow")
+    validate.add_argument("--classes", type=int, default=3000, help="Node classes in the schema")
+    validate.add_argument("--runs", type=int, default=2000, help="Validations to time")
+
+    return parser
+
+
+def main(argv=None):
+    """Run a benchmark and print its results as JSON."""
+    args = build_parser().parse_args(argv)
+    result = BENCHMARKS[args.name](args)
+    print(json.dumps(result, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
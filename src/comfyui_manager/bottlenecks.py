@@ -0,0 +1,226 @@
+"""
+Bottleneck report for recorded workflows
+
+Groups the node timings in the timing database by workflow (prompts with
+the same set of node classes), ranks nodes by the time they take across
+runs, attributes each to ComfyUI or the custom node package providing it
+(``python_module`` in /object_info), and flags node classes whose time
+per unit of work went up after their package was last updated.
+``folded()`` turns a report into collapsed stacks for flamegraph.pl,
+inferno or speedscope.
+"""
+
+import os
+import json
+from datetime import datetime
+
+from .timings import prompt_model, prompt_shape
+
+CORE_PACKAGE = "ComfyUI"
+
+
+def package_of(python_module):
+    """Package name from a node class's ``python_module``, or None if unknown."""
+    if not python_module:
+        return None
+    parts = python_module.split(".")
+    if parts[0] == "custom_nodes" and len(parts) > 1:
+        return parts[1]
+    return CORE_PACKAGE
+
+
+def node_packages(object_info):
+    """Map node classes to the package that provides them."""
+    return {class_type: package_of(info.get("python_module")) for class_type, info in object_info.items()}
+
+
+def package_updated_at(path):
+    """Newest modification time of a package's Python files, or None."""
+    newest = None
+    for root, dirs, files in os.walk(path):
+        dirs[:] = [name for name in dirs if not name.startswith(".") and name != "__pycache__"]
+        for name in files:
+            if name.endswith(".py"):
+                try:
+                    mtime = os.path.getmtime(os.path.join(root, name))
+                except OSError:
+                    continue
+                newest = mtime if newest is None else max(newest, mtime)
+    return newest
+
+
+def custom_node_updates(comfyui_path, packages):
+    """Last update time of every custom node package in ``packages`` found on disk."""
+    custom_nodes = os.path.join(comfyui_path, "custom_nodes")
+    updates = {}
+    for package in set(packages.values()) - {None, CORE_PACKAGE}:
+        updated_at = package_updated_at(os.path.join(custom_nodes, package))
+        if updated_at is not None:
+            updates[package] = updated_at
+    return updates
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def load_runs(database, last=200):
+    """Node runs of the newest ``last`` followed prompts in a TimingDatabase."""
+    with database.lock:
+        rows = database.db.execute(
+            "SELECT p.prompt_id, p.prompt, p.started_at, p.finished_at, n.node_id, n.class_type, n.units, "
+            "n.duration, n.vram_delta, n.finished_at FROM prompt_runs p JOIN node_runs n ON n.prompt_id = p.prompt_id "
+            "WHERE p.prompt_id IN (SELECT prompt_id FROM prompt_runs ORDER BY finished_at DESC LIMIT ?) "
+            "ORDER BY n.finished_at", (last,)).fetchall()
+    prompts = {}
+    runs = []
+    for prompt_id, prompt, started_at, finished_at, node_id, class_type, units, duration, vram, at in rows:
+        if prompt_id not in prompts:
+            prompts[prompt_id] = json.loads(prompt)
+        runs.append({"prompt_id": prompt_id, "prompt": prompts[prompt_id], "prompt_duration": finished_at - started_at,
+                     "node_id": node_id, "class_type": class_type, "units": units, "duration": duration,
+                     "vram_delta": vram, "finished_at": at})
+    return runs
+
+
+def bottleneck_report(runs, packages=None, updates=None, threshold=0.2, min_runs=3, workflow=None):
+    """Rank nodes by execution time per workflow and overall, and find regressions.
+
+    ``runs`` come from ``load_runs``; ``packages`` maps classes to packages
+    and ``updates`` packages to their last update time. A class regressed
+    if its median time per unit after the update is more than
+    ``threshold`` above the median before, with ``min_runs`` on each side.
+    """
+    packages = packages or {}
+    updates = updates or {}
+    workflows = {}
+    classes = {}
+    for run in runs:
+        prompt = run["prompt"]
+        key = prompt_shape(prompt)
+        if workflow is not None and not key.startswith(workflow):
+            continue
+        flow = workflows.get(key)
+        if flow is None:
+            flow = workflows[key] = {"workflow": key, "label": f"{len(prompt)} nodes, {prompt_model(prompt) or 'no model'}",
+                                     "prompts": {}, "nodes": {}}
+        flow["prompts"][run["prompt_id"]] = run["prompt_duration"]
+        node = flow["nodes"].setdefault(run["node_id"], {"class_type": run["class_type"], "durations": [],
+                                                         "vram": [], "cached": 0})
+        if run["duration"] is None:
+            node["cached"] += 1
+            continue
+        node["durations"].append(run["duration"])
+        if run["vram_delta"] is not None:
+            node["vram"].append(run["vram_delta"])
+        samples = classes.setdefault(run["class_type"], [])
+        samples.append((run["finished_at"], run["duration"], run["duration"] / max(1, run["units"])))
+
+    report_workflows = []
+    for flow in workflows.values():
+        total = sum(sum(node["durations"]) for node in flow["nodes"].values()) or 1.0
+        nodes = []
+        for node_id, node in flow["nodes"].items():
+            durations = node["durations"]
+            nodes.append({
+                "node_id": node_id,
+                "class_type": node["class_type"],
+                "package": packages.get(node["class_type"]),
+                "runs": len(durations),
+                "cached": node["cached"],
+                "total_s": round(sum(durations), 3),
+                "mean_s": round(sum(durations) / len(durations), 3) if durations else 0.0,
+                "p90_s": round(percentile(durations, 0.9), 3) if durations else 0.0,
+                "share": round(sum(durations) / total, 4),
+                "vram_mb": round(sum(node["vram"]) / len(node["vram"]), 1) if node["vram"] else None,
+            })
+        nodes.sort(key=lambda item: -item["total_s"])
+        durations = list(flow["prompts"].values())
+        report_workflows.append({
+            "workflow": flow["workflow"],
+            "label": flow["label"],
+            "runs": len(durations),
+            "mean_s": round(sum(durations) / len(durations), 3),
+            "nodes": nodes,
+        })
+    report_workflows.sort(key=lambda item: -item["runs"] * item["mean_s"])
+
+    all_time = sum(duration for samples in classes.values() for _, duration, _ in samples) or 1.0
+    hotspots = sorted(({
+        "class_type": class_type,
+        "package": packages.get(class_type),
+        "runs": len(samples),
+        "total_s": round(sum(duration for _, duration, _ in samples), 3),
+        "share": round(sum(duration for _, duration, _ in samples) / all_time, 4),
+    } for class_type, samples in classes.items()), key=lambda item: -item["total_s"])
+
+    regressions = []
+    for class_type, samples in classes.items():
+        updated_at = updates.get(packages.get(class_type))
+        if updated_at is None:
+            continue
+        before = [rate for at, _, rate in samples if at < updated_at]
+        after = [rate for at, _, rate in samples if at >= updated_at]
+        if len(before) < min_runs or len(after) < min_runs:
+            continue
+        before_median = percentile(before, 0.5)
+        after_median = percentile(after, 0.5)
+        if after_median > before_median * (1 + threshold):
+            regressions.append({
+                "class_type": class_type,
+                "package": packages[class_type],
+                "updated_at": updated_at,
+                "runs_before": len(before),
+                "runs_after": len(after),
+                "before_s": round(before_median, 4),
+                "after_s": round(after_median, 4),
+                "change_pct": round((after_median / before_median - 1) * 100, 1) if before_median else None,
+            })
+    regressions.sort(key=lambda item: -(item["change_pct"] or 0))
+
+    return {"workflows": report_workflows, "hotspots": hotspots, "regressions": regressions,
+            "packages_known": bool(packages), "updates_known": sorted(updates)}
+
+
+def folded(report):
+    """Collapsed stacks ("workflow;package;node ms" per line) of a report's total node times."""
+    lines = []
+    for flow in report["workflows"]:
+        root = f"{flow['workflow'][:8]} ({flow['label']})"
+        for node in flow["nodes"]:
+            milliseconds = round(node["total_s"] * 1000)
+            if milliseconds <= 0:
+                continue
+            frames = [root, node["package"] or "unknown", f"{node['class_type']} #{node['node_id']}"]
+            lines.append(";".join(frame.replace(";", ",") for frame in frames) + f" {milliseconds}")
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+def format_report(report, limit=10):
+    """Human-readable text of a report."""
+    lines = []
+    for flow in report["workflows"]:
+        lines.append(f"Workflow {flow['workflow'][:8]} ({flow['label']}): {flow['runs']} runs, "
+                     f"mean {flow['mean_s']:.2f}s")
+        for rank, node in enumerate(flow["nodes"][:limit], 1):
+            vram = f"{node['vram_mb']:+.0f} MB" if node["vram_mb"] is not None else "-"
+            cached = f", cached {node['cached']}x" if node["cached"] else ""
+            lines.append(f"  {rank:2}. #{node['node_id']:<5} {node['class_type']:28} {node['package'] or '?':20} "
+                         f"mean {node['mean_s']:7.3f}s  p90 {node['p90_s']:7.3f}s  {node['share'] * 100:5.1f}%  "
+                         f"VRAM {vram}{cached}")
+    if report["hotspots"]:
+        lines.append("Hot spots across all workflows:")
+        for item in report["hotspots"][:limit]:
+            lines.append(f"  {item['class_type']:28} {item['package'] or '?':20} {item['total_s']:9.2f}s  "
+                         f"{item['share'] * 100:5.1f}%  {item['runs']} runs")
+    if report["regressions"]:
+        lines.append("Slower since their package was updated:")
+        for item in report["regressions"]:
+            updated = datetime.fromtimestamp(item["updated_at"]).strftime("%Y-%m-%d %H:%M")
+            lines.append(f"  {item['class_type']} ({item['package']}): {item['before_s']:.3f}s -> "
+                         f"{item['after_s']:.3f}s per unit (+{item['change_pct']}%) since {updated}")
+    elif not report["packages_known"]:
+        lines.append("Custom node packages unknown (ComfyUI not reachable); regressions not checked")
+    return "\n".join(lines)
@@ -0,0 +1,282 @@
+"""
+Quota-driven cache management for ComfyUI Manager
+
+Manages the directories the launcher points TORCH_EXTENSIONS_DIR, HF_HOME
+and XDG_CACHE_HOME at, plus the ComfyUI temp directory. Caches are
+measured with parallel directory walks and evicted least recently used
+first, one unit at a time (an extension build, a Hugging Face repo, a
+top-level cache entry), so partially deleted entries are never left
+behind. Anything the running ComfyUI process has open is never touched.
+"""
+
+import os
+import time
+import shutil
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from pathlib import Path
+
+MB = 1024 * 1024
+
+# Default quotas in MB
+DEFAULT_QUOTAS = {
+    "torch_extensions": 4096,
+    "huggingface": 51200,
+    "xdg": 10240,
+    "temp": 5120,
+}
+
+
+def scan_tree(path):
+    """Scan one directory: return (files as (path, size, last_used), subdirs)."""
+    files = []
+    subdirs = []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    else:
+                        stat = entry.stat(follow_symlinks=False)
+                        # Many mounts use relatime, so take the later of atime and mtime
+                        files.append((entry.path, stat.st_size, max(stat.st_atime, stat.st_mtime)))
+                except OSError:
+                    continue
+    except OSError:
+        pass
+    return files, subdirs
+
+
+def walk_parallel(root, workers, exclude=()):
+    """List every file under ``root`` using a pool of scandir workers."""
+    files = []
+    exclude = {os.path.abspath(p) for p in exclude}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = {pool.submit(scan_tree, root)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                dir_files, subdirs = future.result()
+                files.extend(dir_files)
+                for subdir in subdirs:
+                    if os.path.abspath(subdir) not in exclude:
+                        pending.add(pool.submit(scan_tree, subdir))
+    return files
+
+
+class CacheUnit:
+    """A group of files evicted together."""
+
+    def __init__(self, path):
+        self.path = path
+        self.size = 0
+        self.files = 0
+        self.last_used = 0.0
+        self.in_use = False
+
+
+class CacheManager:
+    """Measures caches and enforces per-cache quotas."""
+
+    def __init__(self, config, process_manager=None, workers=None):
+        self.config = config
+        self.process_manager = process_manager
+        self.workers = workers or min(32, (os.cpu_count() or 1) * 4)
+        self.lock = threading.Lock()
+        self.job = None
+        self.enforcer = None
+        self.stop_event = threading.Event()
+
+        # Progress of the current background job
+        self.progress = {"running": False, "done": 0, "total": 0, "freed_bytes": 0, "message": ""}
+
+    def cache_dir(self):
+        """Get the cache directory shared with the launch script."""
+        return Path(self.config.get("cache_dir") or Path(self.config.get("base_dir", str(Path.home()))) / "cache")
+
+    def caches(self):
+        """Get {name: (path, unit depth, excluded subdirs)}."""
+        cache_dir = self.cache_dir()
+        torch_dir = cache_dir / "torch_extensions"
+        hf_dir = cache_dir / "huggingface"
+        temp_dir = Path(self.config.get("temp_dir") or Path(self.config.get("base_dir", str(Path.home()))) / "temp")
+        return {
+            "torch_extensions": (torch_dir, 2, ()),
+            "huggingface": (hf_dir, 2, ()),
+            "xdg": (cache_dir, 1, (torch_dir, hf_dir)),
+            "temp": (temp_dir, 1, ()),
+        }
+
+    def quota_bytes(self, name):
+        """Get the quota of a cache in bytes (0 = unlimited)."""
+        quotas = dict(DEFAULT_QUOTAS)
+        quotas.update(self.config.get("cache_quotas") or {})
+        return int(quotas.get(name, 0)) * MB
+
+    def open_paths(self):
+        """Get files held open or mapped by the running ComfyUI process tree.
+
+        Without a process manager (no daemon), ComfyUI may still have been
+        started by hand, so look for it among all processes.
+        """
+        if self.process_manager is None:
+            from .process_manager import find_comfyui_processes, open_paths
+            return open_paths(find_comfyui_processes(self.config.get("comfyui_path")))
+        return self.process_manager.get_open_paths()
+
+    def units(self, name, open_paths=None):
+        """Group a cache's files into eviction units."""
+        root, depth, exclude = self.caches()[name]
+        if not root.is_dir():
+            return []
+        if open_paths is None:
+            open_paths = self.open_paths()
+
+        units = {}
+        root_str = str(root)
+        for path, size, last_used in walk_parallel(root_str, self.workers, exclude):
+            parts = os.path.relpath(path, root_str).split(os.sep)
+            unit_path = os.path.join(root_str, *parts[:min(depth, len(parts))])
+            unit = units.get(unit_path)
+            if unit is None:
+                unit = units[unit_path] = CacheUnit(unit_path)
+            unit.size += size
+            unit.files += 1
+            unit.last_used = max(unit.last_used, last_used)
+            if path in open_paths:
+                unit.in_use = True
+        return list(units.values())
+
+    def measure(self):
+        """Get {name: {path, bytes, files, quota_bytes, in_use_bytes}} for every cache."""
+        open_paths = self.open_paths()
+        report = {}
+        for name, (root, _, _) in self.caches().items():
+            units = self.units(name, open_paths)
+            report[name] = {
+                "path": str(root),
+                "bytes": sum(u.size for u in units),
+                "files": sum(u.files for u in units),
+                "quota_bytes": self.quota_bytes(name),
+                "in_use_bytes": sum(u.size for u in units if u.in_use),
+            }
+        return report
+
+    def plan_enforce(self, name, open_paths):
+        """Pick the least recently used units to delete to get under quota."""
+        quota = self.quota_bytes(name)
+        units = self.units(name, open_paths)
+        total = sum(u.size for u in units)
+        if not quota or total <= quota:
+            return []
+
+        grace = self.config.get("cache_grace_minutes", 30) * 60
+        now = time.time()
+        victims = []
+        for unit in sorted(units, key=lambda u: u.last_used):
+            if total <= quota:
+                break
+            if unit.in_use or now - unit.last_used < grace:
+                continue
+            victims.append(unit)
+            total -= unit.size
+        return victims
+
+    def plan_clear(self, name, open_paths):
+        """Pick every unit of a cache that is safe to delete."""
+        return [u for u in self.units(name, open_paths) if not u.in_use]
+
+    def enforce(self, progress=None):
+        """Evict least recently used units until every cache is under quota."""
+        open_paths = self.open_paths()
+        victims = []
+        for name in self.caches():
+            victims.extend(self.plan_enforce(name, open_paths))
+        return self.delete_units(victims, progress)
+
+    def clear(self, names=None, progress=None):
+        """Delete everything not in use from the given caches (default: all)."""
+        open_paths = self.open_paths()
+        victims = []
+        for name in names or list(self.caches()):
+            victims.extend(self.plan_clear(name, open_paths))
+        return self.delete_units(victims, progress)
+
+    def delete_units(self, units, progress=None):
+        """Delete units, re-checking open files right before each one."""
+        freed = 0
+        total = len(units)
+        for done, unit in enumerate(units, start=1):
+            if self.unit_in_use(unit.path):
+                logging.info(f"Skipping cache entry in use: {unit.path}")
+            else:
+                try:
+                    if os.path.isdir(unit.path) and not os.path.islink(unit.path):
+                        shutil.rmtree(unit.path)
+                    else:
+                        os.unlink(unit.path)
+                    freed += unit.size
+                except OSError as e:
+                    logging.warning(f"Could not delete {unit.path}: {e}")
+            if progress is not None:
+                progress(done, total, freed, unit.path)
+
+        logging.info(f"Cache cleanup freed {freed / MB:.1f} MB from {total} entries")
+        return freed
+
+    def unit_in_use(self, unit_path):
+        """Check whether ComfyUI currently holds any file inside a unit."""
+        prefix = unit_path.rstrip(os.sep) + os.sep
+        return any(p == unit_path or p.startswith(prefix) for p in self.open_paths())
+
+    def run_in_background(self, action, names=None):
+        """Run "enforce" or "clear" in a thread; poll ``progress`` for status."""
+        with self.lock:
+            if self.job is not None and self.job.is_alive():
+                return False
+            self.progress = {"running": True, "done": 0, "total": 0, "freed_bytes": 0, "message": "Measuring caches..."}
+
+        def update(done, total, freed, path):
+            self.progress = {
+                "running": True,
+                "done": done,
+                "total": total,
+                "freed_bytes": freed,
+                "message": f"Removed {os.path.basename(path)}",
+            }
+
+        def worker():
+            try:
+                if action == "clear":
+                    freed = self.clear(names, update)
+                else:
+                    freed = self.enforce(update)
+                message = f"Freed {freed / MB:.1f} MB"
+            except Exception as e:
+                logging.error(f"Cache {action} failed: {e}")
+                freed = self.progress["freed_bytes"]
+                message = f"Failed: {e}"
+            self.progress = dict(self.progress, running=False, freed_bytes=freed, message=message)
+
+        self.job = threading.Thread(target=worker, name="cache-manager", daemon=True)
+        self.job.start()
+        return True
+
+    def start_enforcer(self):
+        """Enforce quotas periodically in the background."""
+        interval = self.config.get("cache_enforce_interval_hours", 6) * 3600
+        if not interval or self.enforcer is not None:
+            return
+
+        def loop():
+            while not self.stop_event.wait(interval):
+                self.run_in_background("enforce")
+
+        self.enforcer = threading.Thread(target=loop, name="cache-enforcer", daemon=True)
+        self.enforcer.start()
+
+    def stop(self):
+        """Stop the periodic enforcer."""
+        self.stop_event.set()
@@ -0,0 +1,1507 @@
+#!/usr/bin/env python3
+"""
+Command line interface for ComfyUI Manager
+
+Everything except the ``gui`` subcommand runs without importing tkinter,
+so the manager can be driven on servers without a display.
+"""
+
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+import subprocess
+from pathlib import Path
+from datetime import datetime
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from comfyui_manager.config_manager import ConfigManager
+from comfyui_manager.utils import setup_logging, get_run_dir, format_bytes
+from comfyui_manager.supervisor import Supervisor, read_daemon_pid, read_daemon_state
+from comfyui_manager.control_client import ControlClient, ControlError
+from comfyui_manager.cache_manager import DEFAULT_QUOTAS
+from comfyui_manager.comfy_stub import DISTRIBUTIONS
+
+MODES = ["auto", "lowvram", "normalvram", "highvram", "cpu"]
+
+
+def cmd_gui(args):
+    """Run the Tk application."""
+    from comfyui_manager.main import main as gui_main
+    gui_main()
+    return 0
+
+
+def cmd_daemon(args):
+    """Run the supervisor and monitor headless in the foreground."""
+    setup_logging()
+    supervisor = Supervisor(ConfigManager())
+    return 0 if supervisor.run_daemon(args.mode, autostart=not args.no_start) else 1
+
+
+def get_client():
+    """Get a control client if a manager is serving the socket, else None."""
+    client = ControlClient()
+    return client if client.is_available() else None
+
+
+def cmd_start(args):
+    """Start ComfyUI through a running manager, or in a new background daemon."""
+    client = get_client()
+    if client is not None:
+        if client.status().get("running"):
+            print("ComfyUI is already running")
+            return 1
+        if not client.start(args.mode):
+            print("Failed to start ComfyUI; check the manager log")
+            return 1
+        print_status(client.status())
+        return 0
+
+    pid = read_daemon_pid()
+    if pid is not None:
+        state = read_daemon_state() or {}
+        if state.get("status", {}).get("running"):
+            print(f"ComfyUI is already running (daemon pid {pid})")
+            return 1
+        os.kill(pid, signal.SIGUSR1)
+        print(f"Asked daemon {pid} to start ComfyUI")
+        return 0
+
+    command = [sys.executable, "-m", "comfyui_manager.cli", "daemon"]
+    if args.mode:
+        command += ["--mode", args.mode]
+
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        p for p in (str(Path(__file__).parent.parent), env.get("PYTHONPATH")) if p
+    )
+
+    subprocess.Popen(
+        command,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+        env=env,
+    )
+
+    # Wait for the daemon to publish its first state
+    deadline = time.time() + args.timeout
+    while time.time() < deadline:
+        state = read_daemon_state()
+        if state:
+            print_status(state["status"])
+            return 0
+        time.sleep(0.1)
+
+    print("Daemon did not report ready in time; check the manager log")
+    return 1
+
+
+def cmd_stop(args):
+    """Stop ComfyUI and the daemon."""
+    pid = read_daemon_pid()
+    if pid is None:
+        client = get_client()
+        if client is None:
+            print("ComfyUI Manager daemon is not running")
+            return 1
+        # A desktop manager owns the socket: stop ComfyUI but leave the app open
+        print("Stopped" if client.stop() else "ComfyUI is not running")
+        return 0
+
+    client = get_client()
+    if client is not None:
+        client.shutdown()
+    else:
+        os.kill(pid, signal.SIGTERM)
+    deadline = time.time() + args.timeout
+    while time.time() < deadline:
+        if read_daemon_pid() is None:
+            print("Stopped")
+            return 0
+        time.sleep(0.1)
+
+    print(f"Daemon {pid} did not exit within {args.timeout:.0f}s")
+    return 1
+
+
+def cmd_restart(args):
+    """Restart ComfyUI."""
+    client = get_client()
+    if client is not None:
+        if not client.restart(args.mode):
+            print("Failed to restart ComfyUI; check the manager log")
+            return 1
+        print_status(client.status())
+        return 0
+
+    pid = read_daemon_pid()
+    if pid is not None and not args.mode:
+        os.kill(pid, signal.SIGHUP)
+        print(f"Asked daemon {pid} to restart ComfyUI")
+        return 0
+
+    if pid is not None and cmd_stop(args) != 0:
+        return 1
+    return cmd_start(args)
+
+
+def cmd_status(args):
+    """Show process status."""
+    client = get_client()
+    state = read_daemon_state()
+    if client is not None:
+        status = client.status()
+    elif state is None:
+        status = {"running": False, "manager_pid": None}
+    else:
+        status = state["status"]
+
+    if args.json:
+        print(json.dumps(status, indent=2))
+    else:
+        print_status(status)
+    return 0 if status.get("running") else 3
+
+
+def cmd_logs(args):
+    """Print (and optionally follow) ComfyUI output."""
+    client = get_client()
+    if client is not None:
+        try:
+            if args.follow:
+                for line in client.follow_logs(args.lines):
+                    print(line, flush=True)
+            else:
+                for line in client.logs_tail(args.lines):
+                    print(line)
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    log_path = get_run_dir() / "comfyui_output.log"
+    if not log_path.exists():
+        print("No ComfyUI output captured yet")
+        return 1
+
+    with open(log_path, "r", errors="replace") as f:
+        for line in tail_lines(f, args.lines):
+            print(line)
+
+        if args.follow:
+            f.seek(0, os.SEEK_END)
+            try:
+                while True:
+                    line = f.readline()
+                    if line:
+                        sys.stdout.write(line)
+                        sys.stdout.flush()
+                    else:
+                        time.sleep(0.2)
+            except KeyboardInterrupt:
+                pass
+    return 0
+
+
+def cmd_metrics(args):
+    """Show system metrics from the manager, or sample them locally."""
+    client = get_client()
+    state = read_daemon_state()
+    if client is not None:
+        metrics = client.metrics()
+    elif state is not None:
+        metrics = state["metrics"]
+    else:
+        import psutil
+        metrics = {
+            "cpu_percent": psutil.cpu_percent(interval=0.2),
+            "memory_percent": psutil.virtual_memory().percent,
+        }
+
+    if args.json:
+        print(json.dumps(metrics, indent=2))
+    else:
+        for key, value in metrics.items():
+            print(f"{key:>18}: {value}")
+    return 0
+
+
+def cmd_mode(args):
+    """Set the startup memory mode."""
+    client = get_client()
+    if client is not None:
+        saved = client.set_mode(args.mode)
+    else:
+        config = ConfigManager()
+        config.set("startup_mode", args.mode)
+        saved = config.save()
+    print(f"Startup mode set to {args.mode}" if saved else "Failed to save configuration")
+    return 0 if saved else 1
+
+
+def cmd_advise(args):
+    """Recommend a memory mode for a workflow on this GPU."""
+    workflow = None
+    if args.workflow:
+        from comfyui_manager.png_metadata import read_output_text
+        try:
+            if args.workflow.lower().endswith((".png", ".webp")):
+                chunks = read_output_text(args.workflow)
+                workflow = json.loads(chunks.get("prompt") or chunks["workflow"])
+            else:
+                with open(args.workflow) as f:
+                    workflow = json.load(f)
+        except (OSError, KeyError, ValueError) as e:
+            print(f"Cannot read a workflow from {args.workflow}: {e}")
+            return 1
+
+    client = get_client()
+    if client is not None and args.vram_gb is None:
+        advice = client.advise(workflow)
+    else:
+        from comfyui_manager.system_monitor import SystemMonitorThread
+        from comfyui_manager.vram_advisor import VramAdvisor
+
+        config = ConfigManager()
+        if args.vram_gb is not None:
+            config.set("gpu_vram_gb", args.vram_gb)
+        prompt_index = None
+        if workflow is None and config.get("prompt_index_enabled", True):
+            from comfyui_manager.prompt_index import PromptIndex
+            prompt_index = PromptIndex.from_config(config)
+        advice = VramAdvisor(config, SystemMonitorThread(config), prompt_index).recommend(workflow)
+
+    if args.json:
+        print(json.dumps(advice, indent=2))
+        return 0
+    for model in advice["models"]:
+        print(f"{format_bytes(model['bytes']):>10}  {model['role']:12}  {model['path']}")
+    for name in advice["missing"]:
+        print(f"   missing  {name}")
+    estimate = advice["estimate"]
+    print(f"All resident: {format_bytes(estimate['all_resident'])}, "
+          f"largest stage: {format_bytes(estimate['staged_peak'])}, "
+          f"VRAM: {format_bytes(advice['vram_bytes']) if advice['vram_bytes'] else 'unknown'}")
+    print(f"Recommended: {advice['mode']} ({advice['reason']}; sized from {advice['source']})")
+    return 0
+
+
+def cmd_tui(args):
+    """Open the curses dashboard."""
+    client = get_client()
+    if client is None:
+        print("No ComfyUI Manager is running; start one with: comfyui-manager daemon --no-start")
+        return 1
+
+    from comfyui_manager.tui import run_tui
+    config = ConfigManager()
+    run_tui(
+        client,
+        refresh_hz=args.hz or config.get("tui_refresh_hz", 4),
+        cpu_budget=args.cpu_budget or config.get("tui_cpu_budget_percent", 2.0),
+    )
+    return 0
+
+
+def cmd_cache(args):
+    """Show cache usage, enforce quotas or clear caches."""
+    from comfyui_manager.cache_manager import CacheManager
+
+    unknown = set(args.names) - set(DEFAULT_QUOTAS)
+    if unknown:
+        print(f"Unknown cache: {', '.join(sorted(unknown))} (choose from {', '.join(DEFAULT_QUOTAS)})")
+        return 1
+
+    client = get_client()
+    if client is None:
+        # No manager running; ComfyUI started by hand is found by scanning processes
+        cache_manager = CacheManager(ConfigManager())
+        if args.action == "enforce":
+            freed = cache_manager.enforce()
+        elif args.action == "clear":
+            freed = cache_manager.clear(args.names or None)
+        else:
+            freed = None
+        report = cache_manager.measure()
+    else:
+        if args.action in ("enforce", "clear"):
+            if args.action == "enforce":
+                started = client.cache_enforce()
+            else:
+                started = client.cache_clear(args.names or None)
+            if not started:
+                print("A cache cleanup is already running")
+                return 1
+            progress = client.cache_progress()
+            while progress["running"]:
+                print(f"\r{progress['done']}/{progress['total']} {progress['message'][:60]:<60}", end="", flush=True)
+                time.sleep(0.5)
+                progress = client.cache_progress()
+                if not progress["running"]:
+                    print()
+            freed = progress["freed_bytes"]
+        else:
+            freed = None
+        report = client.cache_stats()
+
+    if freed is not None:
+        print(f"Freed {format_bytes(freed)}")
+    for name, info in report.items():
+        quota = format_bytes(info["quota_bytes"]) if info["quota_bytes"] else "unlimited"
+        print(f"{name:<17} {format_bytes(info['bytes']):>10} / {quota:<10} "
+              f"in use {format_bytes(info['in_use_bytes']):>10}  {info['path']}")
+    return 0
+
+
+def cmd_backup(args):
+    """Snapshot, list, diff, restore or prune workflow backups."""
+    from comfyui_manager.backup import BackupEngine
+
+    engine = BackupEngine.from_config(ConfigManager())
+    action = args.action or "create"
+
+    if action == "create":
+        summary = engine.backup()
+        if summary is None:
+            return 1
+        state = "created" if summary["created"] else "unchanged, latest is"
+        print(f"Snapshot {state} {summary['snapshot']}: {summary['files']} files, "
+              f"{summary['new_objects']} new objects ({format_bytes(summary['new_bytes'])}) "
+              f"in {summary['seconds']} s")
+    elif action == "list":
+        for snapshot in engine.list_snapshots():
+            created = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(snapshot["created"]))
+            print(f"{snapshot['name']:<20} {created}  {snapshot['files']:>6} files  {format_bytes(snapshot['bytes']):>10}")
+    elif action == "diff":
+        try:
+            changes = engine.diff(args.old, args.new)
+        except FileNotFoundError as e:
+            print(f"Unknown snapshot: {e.filename}")
+            return 1
+        for kind, marker in (("added", "+"), ("removed", "-"), ("changed", "M")):
+            for path in changes[kind]:
+                print(f"{marker} {path}")
+    elif action == "restore":
+        try:
+            restored = engine.restore(args.snapshot, args.paths or None, args.target)
+        except FileNotFoundError as e:
+            print(f"Unknown snapshot: {e.filename}")
+            return 1
+        print(f"Restored {restored} files from {args.snapshot}")
+    elif action == "prune":
+        removed = engine.prune(args.keep)
+        print(f"Kept {len(engine.snapshot_names())} snapshots, removed {removed} unreferenced objects")
+    return 0
+
+
+def cmd_search(args):
+    """Search outputs by prompt text and generation settings."""
+    text = " ".join(args.text) or None
+    query = (text, args.model, args.lora, args.sampler, args.seed, args.limit)
+
+    client = get_client()
+    if client is not None:
+        results = client.search_outputs(*query)
+    else:
+        from comfyui_manager.prompt_index import PromptIndex
+        prompt_index = PromptIndex.from_config(ConfigManager())
+        results = prompt_index.search(*query)
+        prompt_index.stop()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+    for result in results:
+        created = time.strftime("%Y-%m-%d %H:%M", time.localtime(result["mtime"]))
+        settings = " ".join(result["samplers"] + [f"seed={s}" for s in result["seeds"]])
+        print(f"{created}  {result['path']}")
+        print(f"    {', '.join(result['models'] + result['loras'])}  {settings}")
+        if result["prompt"]:
+            print(f"    {result['prompt'].splitlines()[0][:100]}")
+    print(f"{len(results)} results")
+    return 0
+
+
+def cmd_dupes(args):
+    """Report duplicate and near-duplicate outputs."""
+    from comfyui_manager.output_index import OutputIndex
+    from comfyui_manager.dedup import DuplicateFinder
+
+    config = ConfigManager()
+    index = OutputIndex.from_config(config)
+    if not os.path.isdir(index.root):
+        print(f"Output directory not found: {index.root or '(not configured)'}")
+        return 1
+    index.crawl()
+
+    finder = DuplicateFinder.from_config(config)
+    if args.max_distance is not None:
+        finder.max_distance = args.max_distance
+    report = finder.find(index.snapshot(), similar=not args.exact_only)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return 0
+    for kind in ("exact", "similar"):
+        for group in report[kind]:
+            print(f"[{kind}] keep {group['keep']}  ({format_bytes(group['reclaimable_bytes'])} reclaimable)")
+            for path in group["duplicates"]:
+                print(f"    {path}")
+    print(f"{len(report['exact'])} exact and {len(report['similar'])} similar groups, "
+          f"{format_bytes(report['reclaimable_bytes'])} reclaimable")
+    return 0
+
+
+def cmd_models(args):
+    """List ComfyUI's models with header details and duplicates."""
+    from comfyui_manager.model_inventory import ModelInventory
+
+    inventory = ModelInventory.from_config(ConfigManager())
+    if not inventory.models_dir.is_dir():
+        print(f"Models directory not found: {inventory.models_dir}")
+        return 1
+    report = inventory.scan(hash_all=not args.no_hash)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return 0
+    if not args.duplicates:
+        for model in report["models"]:
+            details = model["format"]
+            if model.get("parameters"):
+                dtypes = "/".join(sorted(model["dtypes"]))
+                details = f"{model['parameters'] / 1e6:,.0f}M params, {model['tensors']} tensors, {dtypes}"
+            if model["link"]:
+                details += f", link to {model['link']}"
+            digest = (model["sha256"] or "")[:12]
+            print(f"{format_bytes(model['size']):>10}  {digest:12}  {model['folder']}/{model['name']}  ({details})")
+    for group in report["duplicates"]:
+        print(f"[duplicate] keep {group['keep']}  ({format_bytes(group['reclaimable_bytes'])} reclaimable)")
+        for path in group["duplicates"]:
+            print(f"    {path}")
+    print(f"{len(report['models'])} models, {format_bytes(report['total_bytes'])}, "
+          f"{len(report['duplicates'])} duplicate groups, "
+          f"{format_bytes(report['reclaimable_bytes'])} reclaimable ({report['seconds']} s)")
+    return 0
+
+
+def cmd_prefetch(args):
+    """Warm the page cache for models, or show what is cached."""
+    paths = [os.path.abspath(p) for p in args.paths] or None
+    client = get_client()
+    if client is not None:
+        try:
+            if args.action == "run":
+                started = client.prefetch_run(paths)
+                print("Prefetch started" if started else "A prefetch is already running")
+            status = client.prefetch_status()
+        except ControlError as e:
+            print(f"{e}; set prefetch_enabled to prefetch from the manager")
+            return 1
+    else:
+        from comfyui_manager.prefetch import ModelPrefetcher, residency
+
+        config = ConfigManager()
+        prompt_index = None
+        if config.get("prompt_index_enabled", True):
+            from comfyui_manager.prompt_index import PromptIndex
+            prompt_index = PromptIndex.from_config(config)
+        prefetcher = ModelPrefetcher(config, prompt_index)
+        if args.action == "run":
+            prefetcher.prefetch(paths)
+        status = prefetcher.status()
+        if paths:
+            status["models"] = [dict(zip(("path", "resident_bytes", "size"), (p,) + residency(p))) for p in paths]
+
+    if args.json:
+        print(json.dumps(status, indent=2))
+        return 0
+    for model in status["models"]:
+        resident = model["resident_bytes"]
+        cached = "?" if resident is None else f"{resident / max(1, model['size']) * 100:3.0f}%"
+        print(f"{cached:>5} of {format_bytes(model['size']):>10}  {model['path']}")
+    if not status["models"]:
+        print("No models selected; set prefetch_models or generate something first")
+    if status["progress"]["message"]:
+        print(status["progress"]["message"])
+    return 0
+
+
+def cmd_queue(args):
+    """Show ComfyUI's queue and progress, or follow it live."""
+    import asyncio
+    from comfyui_manager.comfy_api import ComfyAPIError, ComfyClient
+    from comfyui_manager.queue_monitor import QueueMonitor
+
+    if args.action == "watch":
+        monitor = QueueMonitor(ConfigManager())
+
+        async def watch():
+            client = ComfyClient.from_config(monitor.config)
+            monitor.client = client
+            try:
+                async for event in client.events():
+                    if event.get("type") == "connected":
+                        await monitor.resync()
+                    monitor.apply(event)
+                    if event.get("type") != "binary":
+                        print(format_queue_state(monitor.snapshot()), flush=True)
+            finally:
+                await client.close()
+
+        try:
+            asyncio.run(watch())
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    if args.action == "eta":
+        return show_queue_eta(args)
+
+    client = get_client()
+    state = None
+    if client is not None:
+        try:
+            state = client.queue_status()
+        except ControlError:
+            state = None
+    if state is None:
+        # No live monitor to ask: read the queue once
+        async def read_queue():
+            comfy = ComfyClient.from_config(ConfigManager(), timeout=5.0)
+            try:
+                return await comfy.get_queue()
+            finally:
+                await comfy.close()
+
+        try:
+            queue = asyncio.run(read_queue())
+        except ComfyAPIError as e:
+            print(str(e))
+            return 1
+        running = queue.get("queue_running") or []
+        state = dict(QueueMonitor.empty_state(), connected=True,
+                     queue_remaining=len(running) + len(queue.get("queue_pending") or []),
+                     prompt_id=running[0][1] if running else None)
+
+    if args.json:
+        print(json.dumps(state, indent=2))
+    else:
+        print(format_queue_state(state))
+    return 0
+
+
+def show_queue_eta(args):
+    """Print estimated finish times of queued prompts."""
+    import asyncio
+    from comfyui_manager.comfy_api import ComfyAPIError, ComfyClient
+    from comfyui_manager.queue_monitor import QueueMonitor
+    from comfyui_manager.timings import TimingDatabase, format_duration, queue_eta
+
+    client = get_client()
+    eta = None
+    if client is not None:
+        try:
+            eta = client.queue_eta()
+        except ControlError:
+            eta = None
+    if eta is None:
+        # Estimate here from the recorded timings, without live progress
+        async def read_queue():
+            comfy = ComfyClient.from_config(ConfigManager(), timeout=5.0)
+            try:
+                return await comfy.get_queue()
+            finally:
+                await comfy.close()
+
+        try:
+            queue = asyncio.run(read_queue())
+        except ComfyAPIError as e:
+            print(str(e))
+            return 1
+        database = TimingDatabase.from_config(ConfigManager())
+        try:
+            eta = queue_eta(database, queue, QueueMonitor.empty_state())
+        finally:
+            database.close()
+
+    if args.json:
+        print(json.dumps(eta, indent=2))
+        return 0
+    if not eta["prompts"]:
+        print("Queue is empty")
+        return 0
+    for item in eta["prompts"]:
+        finishes = datetime.fromtimestamp(item["finishes_at"]).strftime("%H:%M:%S")
+        state = "running" if item["running"] else "pending"
+        print(f"{item['prompt_id']}  {state:8} ~{format_duration(item['remaining_s']):>8}  "
+              f"done {finishes}  ({item['source']})")
+    print(f"Queue done in ~{format_duration(eta['remaining_s'])} "
+          f"at {datetime.fromtimestamp(eta['finishes_at']).strftime('%H:%M:%S')}")
+    return 0
+
+
+def format_queue_state(state):
+    """One-line summary of a queue monitor snapshot."""
+    if not state["connected"]:
+        return f"Not connected ({state['last_error'] or 'waiting for ComfyUI'})"
+    line = f"Queue: {state['queue_remaining']}"
+    if state["prompt_id"]:
+        line += f"  running {state['prompt_id']}"
+        if state["node"]:
+            line += f" node {state['node']}"
+        if state["progress_max"]:
+            line += f"  {state['progress']}/{state['progress_max']}"
+    else:
+        line += "  idle"
+    return line
+
+
+def cmd_sweep(args):
+    """Run, resume, list or cancel batch parameter sweeps."""
+    import asyncio
+    from comfyui_manager.comfy_api import ComfyAPIError
+    from comfyui_manager.sweep import SweepRunner, list_sweeps, load_workflow
+
+    if args.action == "list":
+        sweeps = list_sweeps()
+        if args.json:
+            print(json.dumps(sweeps, indent=2))
+            return 0
+        for sweep in sweeps:
+            print(format_sweep(sweep))
+        if not sweeps:
+            print("No sweeps yet")
+        return 0
+
+    config = ConfigManager()
+    try:
+        if args.action == "run":
+            if len(args.args) != 2:
+                print("Usage: comfyui-manager sweep run WORKFLOW SPEC [--name NAME]")
+                return 1
+            workflow = load_workflow(args.args[0])
+            with open(args.args[1]) as f:
+                spec = json.load(f)
+            name = args.name or time.strftime("sweep-%Y%m%d-%H%M%S")
+            runner = SweepRunner(config, name, workflow, spec, args.depth)
+        else:
+            if len(args.args) != 1:
+                print(f"Usage: comfyui-manager sweep {args.action} NAME")
+                return 1
+            runner = SweepRunner(config, args.args[0], depth=args.depth)
+    except (OSError, ValueError) as e:
+        print(f"Cannot load sweep: {e}")
+        return 1
+
+    if args.action == "status":
+        progress = runner.progress()
+        print(json.dumps(progress, indent=2) if args.json else format_sweep(progress))
+        return 0
+    if args.action == "cancel":
+        try:
+            removed = asyncio.run(runner.cancel())
+        except ComfyAPIError as e:
+            print(str(e))
+            return 1
+        print(f"Cancelled {runner.name}: {removed} queued prompts removed")
+        return 0
+
+    print(f"Sweep {runner.name}: {runner.sweep.total} prompts, queue depth {runner.depth} (Ctrl+C pauses)")
+    if not args.json:
+        runner.add_listener(lambda progress: print(f"\r{format_sweep(progress)}", end="", flush=True))
+    try:
+        progress = asyncio.run(runner.run())
+    except KeyboardInterrupt:
+        progress = runner.progress()
+        print(f"\nPaused; resume with: comfyui-manager sweep resume {runner.name}")
+        return 130
+    print()
+    if args.json:
+        print(json.dumps(progress, indent=2))
+    elif progress["message"]:
+        print(progress["message"])
+    return 0 if progress["status"] == "done" else 1
+
+
+def format_sweep(sweep):
+    """One-line summary of a sweep."""
+    return (f"{sweep['name']}: {sweep['status']}, {sweep['succeeded']}/{sweep['total']} done, "
+            f"{sweep['queued']} queued, {sweep['failed']} failed")
+
+
+def cmd_harvest(args):
+    """Collect the outputs of finished prompts into a folder with a manifest."""
+    import asyncio
+    from comfyui_manager.comfy_api import ComfyAPIError
+    from comfyui_manager.harvester import Harvester
+
+    try:
+        harvester = Harvester(ConfigManager(), args.dest, args.mode, args.concurrency)
+    except ValueError as e:
+        print(str(e))
+        return 1
+
+    async def run():
+        try:
+            if args.sweep:
+                return await harvester.harvest_sweep(args.sweep, args.follow)
+            return await harvester.harvest_history(prompt_ids=args.prompts, limit=args.limit, follow=args.follow)
+        finally:
+            await harvester.close()
+
+    start = time.perf_counter()
+    try:
+        manifest = asyncio.run(run())
+    except (ComfyAPIError, ValueError) as e:
+        print(str(e))
+        return 1
+    except KeyboardInterrupt:
+        manifest = None
+    seconds = time.perf_counter() - start
+
+    stats = harvester.stats
+    if args.json:
+        print(json.dumps({"stats": stats, "manifest": manifest}, indent=2))
+        return 0
+    collection = args.sweep or "history"
+    print(f"Harvested {stats['prompts']} prompts, {stats['files']} files ({format_bytes(stats['bytes'])}: "
+          f"{stats['downloaded']} downloaded, {stats['linked']} linked) in {seconds:.1f} s "
+          f"into {harvester.dest / collection}")
+    if stats["errors"]:
+        print(f"{stats['errors']} files failed, see the log")
+    return 0
+
+
+def cmd_submit(args):
+    """Queue one workflow, answering it from the prompt cache when possible."""
+    import asyncio
+    import uuid
+    from comfyui_manager.comfy_api import ComfyAPIError, ComfyClient
+    from comfyui_manager.prompt_cache import CachingComfyClient, PromptCache
+    from comfyui_manager.sweep import load_workflow
+    from comfyui_manager.validator import WorkflowValidator, format_errors
+
+    config = ConfigManager()
+    try:
+        prompt = load_workflow(args.workflow)
+    except (OSError, ValueError) as e:
+        print(f"Cannot load workflow: {e}")
+        return 1
+
+    async def run():
+        client_id = uuid.uuid4().hex
+        if args.no_cache or not config.get("prompt_cache_enabled", True):
+            client = ComfyClient.from_config(config, client_id=client_id, timeout=30.0)
+        else:
+            client = CachingComfyClient.from_config(config, client_id=client_id, timeout=30.0,
+                                                    cache=PromptCache.from_config(config))
+        events = client.events()
+        try:
+            # Subscribe before queueing so the prompt's events can't be missed
+            if not args.no_wait:
+                async for event in events:
+                    if event.get("type") == "connected":
+                        break
+            if config.get("validate_prompts", True):
+                validator = WorkflowValidator(config)
+                await validator.load(client)
+                errors = validator.validate(prompt)
+                if errors:
+                    return {"prompt_id": None, "error": f"invalid workflow: {format_errors(errors)}"}
+            response = await client.queue_prompt(prompt)
+            if response.get("cached") or args.no_wait:
+                return response
+            async for event in events:
+                data = event.get("data") or {}
+                if data.get("prompt_id") != response["prompt_id"]:
+                    continue
+                if event["type"] == "execution_success":
+                    if isinstance(client, CachingComfyClient):
+                        response["stored"] = await client.record_result(response["prompt_id"])
+                    return response
+                if event["type"] in ("execution_error", "execution_interrupted"):
+                    response["error"] = data.get("exception_message") or event["type"].replace("_", " ")
+                    return response
+            return response
+        finally:
+            await events.aclose()
+            await client.close()
+
+    start = time.perf_counter()
+    try:
+        response = asyncio.run(run())
+    except ComfyAPIError as e:
+        print(str(e))
+        return 1
+    except KeyboardInterrupt:
+        return 130
+    seconds = time.perf_counter() - start
+
+    if args.json:
+        print(json.dumps(response, indent=2))
+        return 1 if response.get("error") else 0
+    if response.get("cached"):
+        entry = response["cached"]
+        print(f"Cached result of {entry['prompt_id']} ({seconds * 1000:.0f} ms):")
+        for output in entry["files"]:
+            print(f"  {os.path.join(entry['dir'], output['name'])}")
+    elif response.get("error"):
+        print(f"Prompt {response['prompt_id'] or 'not queued'}: {response['error']}")
+        return 1
+    elif args.no_wait:
+        print(f"Queued {response['prompt_id']}")
+    else:
+        print(f"Prompt {response['prompt_id']} finished in {seconds:.1f} s"
+              + (", result cached" if response.get("stored") else ""))
+    return 0
+
+
+def cmd_validate(args):
+    """Check workflows against ComfyUI's node schema and the models on disk."""
+    from comfyui_manager.comfy_api import ComfyAPIError
+    from comfyui_manager.sweep import load_workflow
+    from comfyui_manager.validator import WorkflowValidator
+
+    client = get_client()
+    validator = None
+    results = {}
+    for path in args.workflows:
+        try:
+            prompt = load_workflow(path)
+        except (OSError, ValueError) as e:
+            results[path] = [{"node": None, "class_type": None, "input": None, "message": f"cannot load: {e}"}]
+            continue
+        if client is not None:
+            # The manager keeps the schema cached until ComfyUI restarts
+            results[path] = client.validate(prompt)
+            continue
+        if validator is None:
+            validator = WorkflowValidator(ConfigManager())
+            try:
+                validator.load_blocking()
+            except ComfyAPIError as e:
+                print(f"Cannot read ComfyUI's node schema: {e}")
+                return 1
+        results[path] = validator.validate(prompt)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for path, errors in results.items():
+            print(f"{path}: {'OK' if not errors else f'{len(errors)} problems'}")
+            for error in errors:
+                where = f"node {error['node']} ({error['class_type']})" if error["node"] else "workflow"
+                if error["input"]:
+                    where += f" {error['input']}"
+                print(f"  {where}: {error['message']}")
+    return 1 if any(results.values()) else 0
+
+
+def cmd_schedule(args):
+    """Submit prompts to the manager's fair-share scheduler, or show its queues."""
+    import getpass
+    from comfyui_manager.sweep import load_workflow
+
+    client = get_client()
+    if client is None:
+        print("ComfyUI Manager daemon is not running")
+        return 1
+
+    if args.action == "submit":
+        try:
+            prompts = [load_workflow(path) for path in args.args]
+        except (OSError, ValueError) as e:
+            print(f"Cannot load workflow: {e}")
+            return 1
+        if not prompts:
+            print("Usage: comfyui-manager schedule submit WORKFLOW... [--user USER] [--priority CLASS]")
+            return 1
+        user = args.user or getpass.getuser()
+        jobs = [client.scheduler_submit(prompt, user, args.priority) for prompt in prompts]
+        if args.json:
+            print(json.dumps(jobs, indent=2))
+        else:
+            for job in jobs:
+                print(f"Job {job['id']}: {job['priority']} for {job['user']}, cost {job['cost']}")
+        return 0
+    if args.action == "cancel":
+        cancelled = [job_id for job_id in args.args if client.scheduler_cancel(job_id)]
+        print(f"Cancelled {len(cancelled)} of {len(args.args)} jobs")
+        return 0 if len(cancelled) == len(args.args) else 1
+
+    status = client.scheduler_status()
+    if args.json:
+        print(json.dumps(status, indent=2))
+        return 0
+    print(f"Policy {status['policy']}, ComfyUI queue depth {status['depth']}, "
+          f"preemption {'on' if status['preempt'] else 'off'}")
+    for priority, backlog in status["backlog"].items():
+        if backlog:
+            print(f"  {priority} backlog: " + ", ".join(f"{user} {count}" for user, count in backlog.items()))
+    for job in status["jobs"]:
+        if job["status"] != "pending":
+            print(f"  {job['id']} {job['status']:<8} {job['priority']:<11} {job['user']}")
+    for priority, latency in status["latency"].items():
+        if latency["jobs"]:
+            print(f"  {priority}: {latency['jobs']} done, wait p50 {latency['wait'].get('p50', 0):.1f} s "
+                  f"p99 {latency['wait'].get('p99', 0):.1f} s, latency p50 {latency['latency']['p50']:.1f} s "
+                  f"p99 {latency['latency']['p99']:.1f} s")
+    return 0
+
+
+def cmd_prompt_cache(args):
+    """Show prompt cache statistics or clear it."""
+    from comfyui_manager.prompt_cache import PromptCache
+
+    cache = PromptCache.from_config(ConfigManager())
+    if args.action == "clear":
+        print(f"Removed {cache.clear()} cached prompt results")
+        return 0
+
+    stats = cache.stats()
+    if args.json:
+        print(json.dumps(stats, indent=2))
+        return 0
+    hit_rate = f"{stats['hit_rate'] * 100:.0f}%" if stats["hit_rate"] is not None else "n/a"
+    print(f"{stats['entries']} entries, {format_bytes(stats['total_bytes'])} of {format_bytes(stats['max_bytes'])}")
+    print(f"Hits {stats['hits']}, misses {stats['misses']} (hit rate {hit_rate}), "
+          f"bypassed {stats['bypassed']}, stored {stats['stored']}")
+    return 0
+
+
+def cmd_timings(args):
+    """Show recorded execution timings or backtest the ETA estimator on them."""
+    from comfyui_manager.timings import TimingDatabase
+
+    database = TimingDatabase.from_config(ConfigManager())
+    try:
+        result = database.backtest() if args.action == "backtest" else database.summary()
+    finally:
+        database.close()
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return 0
+    if args.action == "backtest":
+        if not result["predicted"]:
+            print(f"{result['prompts']} recorded prompts; need at least two to backtest")
+            return 0
+        print(f"Predicted {result['predicted']} of {result['prompts']} recorded prompts "
+              f"({', '.join(f'{count} from {source}' for source, count in result['sources'].items())})")
+        for name, label in (("estimator", "Estimator"), ("baseline_mean", "Mean of earlier prompts")):
+            errors = result[name]
+            print(f"{label:24} MAE {errors['mae_s']:.2f}s  bias {errors['bias_s']:+.2f}s  "
+                  f"error p50 {errors['ape_p50']}%  p90 {errors['ape_p90']}%")
+        return 0
+    print(f"{result['prompt_runs']} prompts, {result['node_runs']} node runs recorded")
+    for item in result["classes"]:
+        ratio = f"{item['executed_ratio'] * 100:.0f}%" if item["executed_ratio"] is not None else "-"
+        print(f"  {item['class_type']:32} {item['seconds_per_unit']:8.3f} s/unit  "
+              f"{item['runs']:6} runs  runs uncached {ratio}")
+    return 0
+
+
+def cmd_warmup(args):
+    """Show warm-up state and launch history, or warm up ComfyUI now."""
+    from comfyui_manager.warmup import WarmupRunner, launch_history
+
+    client = get_client()
+    if args.action == "run":
+        if client is not None:
+            try:
+                result = client.warmup_run()
+            except ControlError as e:
+                print(f"Error: {e}", file=sys.stderr)
+                return 1
+            print("Warm-up started" if result["started"] else "Warm-up already running")
+            return 0
+        # No daemon: warm up the configured ComfyUI from here
+        runner = WarmupRunner(ConfigManager())
+        runner.launch()
+        try:
+            runner.thread.join()
+        except KeyboardInterrupt:
+            runner.stop()
+            return 1
+        current = runner.status()
+        if args.json:
+            print(json.dumps(current, indent=2))
+            return 0
+        print_warmup(current)
+        return 0 if current["state"] == "ready" else 1
+
+    if client is not None:
+        try:
+            result = client.warmup_status(limit=args.limit)
+        except ControlError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+    else:
+        result = {"current": None, "history": launch_history(args.limit)}
+
+    if args.json:
+        print(json.dumps(result if args.action == "status" else result["history"], indent=2))
+        return 0
+    if args.action == "status":
+        if result["current"] is None:
+            print("Warm-up: no daemon running")
+        else:
+            print_warmup(result["current"])
+        return 0
+    if not result["history"]:
+        print("No launches recorded")
+        return 0
+    for launch in result["history"]:
+        started = datetime.fromtimestamp(launch["launched_at"]).strftime("%Y-%m-%d %H:%M:%S")
+        errors = sum(1 for item in launch["items"] if item["status"] != "done")
+        api_ready = f"{launch['api_ready_s']:.1f}s" if launch.get("api_ready_s") is not None else "-"
+        warmup = f"{launch['warmup_s']:.1f}s" if launch.get("warmup_s") is not None else "-"
+        ready = f"{launch['ready_s']:.1f}s" if launch.get("ready_s") is not None else "-"
+        kind = "rerun " if launch.get("rerun") else "launch"
+        print(f"{started}  {kind} {launch.get('mode') or '-':8} API {api_ready:>7}  warm-up {warmup:>7}  "
+              f"ready {ready:>7}  {launch['total']} prompts" + (f", {errors} failed" if errors else ""))
+    return 0
+
+
+def print_warmup(current):
+    """Print the warm-up state of a launch for humans."""
+    if current["state"] == "ready":
+        print(f"Ready:   {current['ready_s']:.1f}s after launch (API {current['api_ready_s']:.1f}s, "
+              f"warm-up {current['warmup_s']:.1f}s)" if current.get("ready_s") is not None else "Ready:   yes")
+    elif current["state"] == "stopped":
+        print("Ready:   no (ComfyUI stopped)")
+    else:
+        print(f"Ready:   no ({current['state']}, {current['done']}/{current['total']} warm-up prompts)")
+    for item in current["items"]:
+        message = f"  {item['message']}" if item.get("message") else ""
+        print(f"  {item['label']:40} {item['status']:6} {item['seconds']:7.2f}s{message}")
+
+
+def cmd_bottlenecks(args):
+    """Rank the slowest nodes of recorded workflows and flag regressions after custom node updates."""
+    import asyncio
+    from comfyui_manager.bottlenecks import (
+        bottleneck_report, custom_node_updates, folded, format_report, load_runs, node_packages,
+    )
+    from comfyui_manager.comfy_api import ComfyAPIError, ComfyClient
+    from comfyui_manager.timings import TimingDatabase, TimingRecorder, replay_session
+
+    config = ConfigManager()
+    if args.replay:
+        # Recorded websocket sessions instead of the timing database
+        database = TimingDatabase(":memory:")
+        recorder = TimingRecorder(database)
+        for path in args.replay:
+            try:
+                replay_session(path, recorder)
+            except (OSError, ValueError) as e:
+                print(f"Cannot replay {path}: {e}")
+                return 1
+    else:
+        database = TimingDatabase.from_config(config)
+    try:
+        runs = load_runs(database, args.last)
+    finally:
+        database.close()
+
+    async def read_object_info():
+        client = ComfyClient.from_config(config, timeout=10.0)
+        try:
+            return await client.object_info()
+        finally:
+            await client.close()
+
+    try:
+        packages = node_packages(asyncio.run(read_object_info()))
+    except ComfyAPIError:
+        # Without ComfyUI, nodes cannot be attributed to packages
+        packages = {}
+    updates = custom_node_updates(config.get("comfyui_path", ""), packages) if config.get("comfyui_path") else {}
+    for item in args.updated or []:
+        package, _, when = item.partition("=")
+        try:
+            updates[package] = datetime.fromisoformat(when).timestamp()
+        except ValueError:
+            print(f"Bad --updated value {item!r}; expected PACKAGE=YYYY-MM-DDTHH:MM")
+            return 1
+
+    report = bottleneck_report(runs, packages, updates, threshold=args.threshold / 100, workflow=args.workflow)
+    if args.flamegraph:
+        Path(args.flamegraph).write_text(folded(report))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    elif not report["workflows"]:
+        print("No node timings recorded yet; run prompts through a sweep or the scheduler")
+    else:
+        print(format_report(report, args.limit))
+    return 0
+
+
+def cmd_loadtest(args):
+    """Drive simulated clients against ComfyUI (or a stub) and report latency percentiles."""
+    import asyncio
+    from comfyui_manager.comfy_api import ComfyAPIError, ComfyClient
+    from comfyui_manager.comfy_stub import StubComfyUI
+    from comfyui_manager.loadgen import LoadGenerator, format_report, render_html
+    from comfyui_manager.sweep import load_workflow
+
+    workflow = None
+    if args.workflow:
+        try:
+            workflow = load_workflow(args.workflow)
+        except (OSError, ValueError) as e:
+            print(f"Cannot load {args.workflow}: {e}")
+            return 1
+
+    stub = None
+    if args.stub:
+        stub = StubComfyUI(step_time=args.stub_step_time, node_time=args.stub_node_time,
+                           distribution=args.stub_distribution, cv=args.stub_cv, seed=args.seed).start()
+        host, port = stub.host, stub.port
+    else:
+        client = ComfyClient.from_config(ConfigManager())
+        host, port = client.host, client.port
+
+    generator = LoadGenerator(host, port, workflow, clients=args.clients, rate=args.rate, duration=args.duration,
+                              max_prompts=args.prompts, think_time=args.think, drain_timeout=args.drain_timeout,
+                              seed=args.seed)
+    try:
+        report = asyncio.run(generator.run())
+    except (ComfyAPIError, asyncio.TimeoutError, OSError) as e:
+        print(f"Load test failed: {e or 'ComfyUI did not accept websocket clients'}")
+        return 1
+    finally:
+        if stub is not None:
+            stub.stop()
+    if stub is not None:
+        report["stub"] = {"step_time": args.stub_step_time, "node_time": args.stub_node_time,
+                          "distribution": args.stub_distribution, "cv": args.stub_cv}
+
+    if args.report:
+        Path(args.report).write_text(json.dumps(report, indent=2))
+    if args.html:
+        Path(args.html).write_text(render_html(report))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(format_report(report))
+    return 0 if report["counts"]["completed"] else 1
+
+
+def cmd_archive(args):
+    """Show archiver totals or run a recompression pass."""
+    client = get_client()
+    if client is not None:
+        try:
+            if args.action == "run":
+                started = client.archive_run(args.limit)
+                print("Archiver pass started" if started else "An archiver pass is already running")
+            stats = client.archive_stats()
+        except ControlError as e:
+            print(f"{e}; set archive_enabled to use the archiver in the manager")
+            return 1
+    else:
+        from comfyui_manager.output_index import OutputIndex
+        from comfyui_manager.archiver import OutputArchiver
+
+        config = ConfigManager()
+        archiver = OutputArchiver(config, OutputIndex.from_config(config))
+        if args.action == "run":
+            archiver.output_index.crawl()
+            saved = archiver.run_once(args.limit)
+            print(f"Saved {format_bytes(saved)}")
+        stats = archiver.stats()
+
+    if args.json:
+        print(json.dumps(stats, indent=2))
+        return 0
+    print(f"Format:    {stats['format']}")
+    print(f"Archived:  {stats['files']} files ({stats['failed']} failed)")
+    print(f"Saved:     {format_bytes(stats['bytes_saved'])} of {format_bytes(stats['bytes_before'])}")
+    print(f"Last hour: {format_bytes(stats['bytes_saved_per_hour'])}/h"
+          + (" (paused, ComfyUI busy)" if stats["paused"] else ""))
+    return 0
+
+
+def print_status(status):
+    """Print a status dict for humans."""
+    if status.get("running"):
+        print(f"ComfyUI: running (pid {status.get('pid')}, mode {status.get('mode')})")
+        if status.get("mode_reason"):
+            print(f"Mode:    picked automatically, {status['mode_reason']}")
+        print(f"Web UI:  http://localhost:{status.get('port', 8188)}")
+    else:
+        print("ComfyUI: stopped")
+    if status.get("manager_pid"):
+        print(f"Daemon:  pid {status['manager_pid']}")
+    if status.get("startup_ms") is not None:
+        print(f"Startup: {status['startup_ms']:.0f} ms")
+    if status.get("running") and status.get("warmup"):
+        warmup = status["warmup"]
+        if warmup["state"] == "ready":
+            print(f"Ready:   yes ({warmup['total']} warm-up prompts)" if warmup.get("ready_s") is None else
+                  f"Ready:   {warmup['ready_s']:.1f}s after launch, warm-up {warmup['warmup_s']:.1f}s")
+        else:
+            print(f"Ready:   no ({warmup['state']}, {warmup['done']}/{warmup['total']} warm-up prompts)")
+
+
+def tail_lines(f, count):
+    """Read the last ``count`` lines of a file without loading all of it."""
+    f.seek(0, os.SEEK_END)
+    size = f.tell()
+    block = 64 * 1024
+    offset = max(0, size - block)
+    while True:
+        f.seek(offset)
+        data = f.read()
+        lines = data.splitlines()
+        if len(lines) > count or offset == 0:
+            return lines[-count:] if count else []
+        offset = max(0, offset - block)
+
+
+def build_parser():
+    """Build the command line parser."""
+    parser = argparse.ArgumentParser(
+        prog="comfyui-manager",
+        description="Manage ComfyUI from the desktop or the command line"
+    )
+    subparsers = parser.add_subparsers(dest="command")
+
+    subparsers.add_parser("gui", help="Open the desktop application (default)")
+
+    daemon = subparsers.add_parser("daemon", help="Run headless in the foreground")
+    daemon.add_argument("--mode", choices=MODES, help="Memory mode")
+    daemon.add_argument("--no-start", action="store_true", help="Do not start ComfyUI on launch")
+
+    start = subparsers.add_parser("start", help="Start ComfyUI in a background daemon")
+    start.add_argument("--mode", choices=MODES, help="Memory mode")
+    start.add_argument("--timeout", type=float, default=10.0, help="Seconds to wait for the daemon")
+
+    stop = subparsers.add_parser("stop", help="Stop ComfyUI and the daemon")
+    stop.add_argument("--timeout", type=float, default=15.0, help="Seconds to wait for exit")
+
+    restart = subparsers.add_parser("restart", help="Restart ComfyUI")
+    restart.add_argument("--mode", choices=MODES, help="Switch to this memory mode")
+    restart.add_argument("--timeout", type=float, default=15.0, help="Seconds to wait")
+
+    status = subparsers.add_parser("status", help="Show ComfyUI status")
+    status.add_argument("--json", action="store_true", help="Print JSON")
+
+    logs = subparsers.add_parser("logs", help="Show ComfyUI output")
+    logs.add_argument("-n", "--lines", type=int, default=50, help="Number of lines")
+    logs.add_argument("-f", "--follow", action="store_true", help="Follow new output")
+
+    metrics = subparsers.add_parser("metrics", help="Show system metrics")
+    metrics.add_argument("--json", action="store_true", help="Print JSON")
+
+    mode = subparsers.add_parser("mode", help="Set the startup memory mode")
+    mode.add_argument("mode", choices=MODES, help="Memory mode")
+
+    advise = subparsers.add_parser("advise", help="Recommend a memory mode for a workflow")
+    advise.add_argument("workflow", nargs="?",
+                        help="Workflow JSON or output image (default: the latest output)")
+    advise.add_argument("--vram-gb", type=float, help="Assume this much VRAM instead of detecting it")
+    advise.add_argument("--json", action="store_true", help="Print JSON")
+
+    tui = subparsers.add_parser("tui", help="Open the terminal dashboard")
+    tui.add_argument("--hz", type=float, help="Refresh rate (default 4)")
+    tui.add_argument("--cpu-budget", type=float, help="Own CPU budget in percent (default 2)")
+
+    cache = subparsers.add_parser("cache", help="Show cache usage or clean caches")
+    cache.add_argument("action", nargs="?", choices=["show", "enforce", "clear"], default="show",
+                       help="Show usage, evict down to quotas, or clear caches")
+    cache.add_argument("names", nargs="*", help="Caches to clear (default: all)")
+
+    search = subparsers.add_parser("search", help="Search outputs by prompt and settings")
+    search.add_argument("text", nargs="*", help="Words in the prompt")
+    search.add_argument("--model", help="Checkpoint or UNet name contains")
+    search.add_argument("--lora", help="LoRA name contains")
+    search.add_argument("--sampler", help="Sampler name contains")
+    search.add_argument("--seed", type=int, help="Exact seed")
+    search.add_argument("--limit", type=int, default=20, help="Maximum results")
+    search.add_argument("--json", action="store_true", help="Print JSON")
+
+    dupes = subparsers.add_parser("dupes", help="Find duplicate and near-duplicate outputs")
+    dupes.add_argument("--exact-only", action="store_true", help="Skip perceptual hashing")
+    dupes.add_argument("--max-distance", type=int, help="Hamming distance for near duplicates")
+    dupes.add_argument("--json", action="store_true", help="Print JSON")
+
+    models = subparsers.add_parser("models", help="List models and find duplicates")
+    models.add_argument("--no-hash", action="store_true",
+                        help="Only hash models whose size matches another model")
+    models.add_argument("--duplicates", action="store_true", help="Only list duplicates")
+    models.add_argument("--json", action="store_true", help="Print JSON")
+
+    prefetch = subparsers.add_parser("prefetch", help="Warm the page cache for models")
+    prefetch.add_argument("action", nargs="?", choices=["status", "run"], default="status",
+                          help="Show page-cache residency or prefetch now")
+    prefetch.add_argument("paths", nargs="*", help="Model files (default: configured and recent models)")
+    prefetch.add_argument("--json", action="store_true", help="Print JSON")
+
+    queue = subparsers.add_parser("queue", help="Show ComfyUI's queue and progress")
+    queue.add_argument("action", nargs="?", choices=["show", "watch", "eta"], default="show",
+                       help="Show the queue once, follow events live, or estimate finish times")
+    queue.add_argument("--json", action="store_true", help="Print JSON")
+
+    sweep = subparsers.add_parser("sweep", help="Run batch parameter sweeps")
+    sweep.add_argument("action", choices=["run", "resume", "status", "cancel", "list"],
+                       help="Start a sweep, resume or cancel one, or show progress")
+    sweep.add_argument("args", nargs="*", help="WORKFLOW SPEC for run, NAME otherwise")
+    sweep.add_argument("--name", help="Name for a new sweep (default: sweep-<time>)")
+    sweep.add_argument("--depth", type=int, help="Keep ComfyUI's queue at this many prompts")
+    sweep.add_argument("--json", action="store_true", help="Print JSON")
+
+    harvest = subparsers.add_parser("harvest", help="Collect outputs of finished prompts")
+    harvest.add_argument("prompts", nargs="*", help="Prompt ids (default: the latest in ComfyUI's history)")
+    harvest.add_argument("--sweep", help="Harvest a sweep, one folder per parameter combination")
+    harvest.add_argument("--follow", action="store_true", help="Keep harvesting as prompts finish")
+    harvest.add_argument("--limit", type=int, default=50, help="History entries to look at")
+    harvest.add_argument("--dest", help="Destination (default: harvest_dir or <base_dir>/harvest)")
+    harvest.add_argument("--mode", choices=["auto", "link", "download"], default="auto",
+                         help="Link local outputs, download over HTTP, or link when possible")
+    harvest.add_argument("--concurrency", type=int, help="Parallel downloads")
+    harvest.add_argument("--json", action="store_true", help="Print JSON")
+
+    submit = subparsers.add_parser("submit", help="Queue a workflow, reusing cached results")
+    submit.add_argument("workflow", help="API-format workflow (JSON, or a PNG/WebP with an embedded prompt)")
+    submit.add_argument("--no-cache", action="store_true", help="Always run it in ComfyUI")
+    submit.add_argument("--no-wait", action="store_true", help="Return once queued")
+    submit.add_argument("--json", action="store_true", help="Print JSON")
+
+    validate = subparsers.add_parser("validate", help="Check workflows before queueing them")
+    validate.add_argument("workflows", nargs="+", help="API-format workflows or output images")
+    validate.add_argument("--json", action="store_true", help="Print JSON")
+
+    schedule = subparsers.add_parser("schedule", help="Share ComfyUI fairly between users")
+    schedule.add_argument("action", nargs="?", choices=["status", "submit", "cancel"], default="status",
+                          help="Show queues and latency, submit workflows, or cancel jobs")
+    schedule.add_argument("args", nargs="*", help="Workflows for submit, job ids for cancel")
+    schedule.add_argument("--user", help="Submit as this user (default: login name)")
+    schedule.add_argument("--priority", choices=["interactive", "batch"], default="batch",
+                          help="Interactive jobs go first and preempt queued batch jobs")
+    schedule.add_argument("--json", action="store_true", help="Print JSON")
+
+    prompt_cache = subparsers.add_parser("prompt-cache", help="Show or clear cached prompt results")
+    prompt_cache.add_argument("action", nargs="?", choices=["stats", "clear"], default="stats",
+                              help="Show hit rate and usage, or delete every entry")
+    prompt_cache.add_argument("--json", action="store_true", help="Print JSON")
+
+    timings = subparsers.add_parser("timings", help="Show execution timings or backtest queue ETAs")
+    timings.add_argument("action", nargs="?", choices=["stats", "backtest"], default="stats",
+                         help="Show per-node timings, or replay recorded prompts against the estimator")
+    timings.add_argument("--json", action="store_true", help="Print JSON")
+
+    bottlenecks = subparsers.add_parser("bottlenecks", help="Rank the slowest nodes of recorded workflows")
+    bottlenecks.add_argument("--workflow", help="Only the workflow with this ID (prefix)")
+    bottlenecks.add_argument("--last", type=int, default=200, help="Use the newest N recorded prompts")
+    bottlenecks.add_argument("--limit", type=int, default=10, help="Nodes to list per workflow")
+    bottlenecks.add_argument("--replay", nargs="+", metavar="SESSION", help="Analyse recorded websocket sessions")
+    bottlenecks.add_argument("--updated", action="append", metavar="PACKAGE=TIME",
+                             help="Treat a custom node package as updated at this time")
+    bottlenecks.add_argument("--threshold", type=float, default=20, help="Slowdown (%%) that counts as a regression")
+    bottlenecks.add_argument("--flamegraph", metavar="FILE", help="Write collapsed stacks for flamegraph.pl")
+    bottlenecks.add_argument("--json", action="store_true", help="Print JSON")
+
+    loadtest = subparsers.add_parser("loadtest", help="Measure ComfyUI latency and throughput under synthetic load")
+    loadtest.add_argument("workflow", nargs="?", help="API-format workflow to submit (default: a 20-step sampler)")
+    loadtest.add_argument("--clients", type=int, default=4, help="Simulated clients")
+    loadtest.add_argument("--rate", type=float, help="Open loop: prompts per second (Poisson arrivals)")
+    loadtest.add_argument("--think", type=float, default=0.0,
+                          help="Closed loop: seconds between a result and the next submit")
+    loadtest.add_argument("--duration", type=float, default=30.0, help="Seconds to keep submitting")
+    loadtest.add_argument("--prompts", type=int, help="Stop after this many prompts")
+    loadtest.add_argument("--drain-timeout", type=float, default=120.0, help="Seconds to wait for the last prompts")
+    loadtest.add_argument("--seed", type=int, help="Random seed for arrivals, prompt seeds and stub service times")
+    loadtest.add_argument("--stub", action="store_true", help="Run against a bundled stub ComfyUI")
+    loadtest.add_argument("--stub-step-time", type=float, default=0.02, help="Stub seconds per sampler step")
+    loadtest.add_argument("--stub-node-time", type=float, default=0.0, help="Stub seconds per other node")
+    loadtest.add_argument("--stub-distribution", choices=DISTRIBUTIONS, default="fixed",
+                          help="Stub per-prompt service time distribution")
+    loadtest.add_argument("--stub-cv", type=float, default=0.5, help="Stub service time coefficient of variation")
+    loadtest.add_argument("--report", metavar="FILE", help="Write the JSON report to a file")
+    loadtest.add_argument("--html", metavar="FILE", help="Write an HTML report")
+    loadtest.add_argument("--json", action="store_true", help="Print JSON")
+
+    warmup = subparsers.add_parser("warmup", help="Show or run the warm-up after ComfyUI starts")
+    warmup.add_argument("action", nargs="?", choices=["status", "history", "run"], default="status",
+                        help="Show readiness, list recorded launches, or warm up now")
+    warmup.add_argument("--limit", type=int, default=20, help="Launches to show")
+    warmup.add_argument("--json", action="store_true", help="Print JSON")
+
+    archive = subparsers.add_parser("archive", help="Recompress old outputs losslessly")
+    archive.add_argument("action", nargs="?", choices=["status", "run"], default="status",
+                         help="Show totals or run a pass now")
+    archive.add_argument("--limit", type=int, help="Archive at most this many files")
+    archive.add_argument("--json", action="store_true", help="Print JSON")
+
+    backup = subparsers.add_parser("backup", help="Back up and restore ComfyUI workflows")
+    backup_actions = backup.add_subparsers(dest="action")
+    backup_actions.add_parser("create", help="Take a snapshot (default)")
+    backup_actions.add_parser("list", help="List snapshots")
+    diff = backup_actions.add_parser("diff", help="Compare snapshots")
+    diff.add_argument("old", help="Snapshot name")
+    diff.add_argument("new", nargs="?", help="Snapshot name (default: current workflows)")
+    restore = backup_actions.add_parser("restore", help="Restore files from a snapshot")
+    restore.add_argument("snapshot", help="Snapshot name")
+    restore.add_argument("paths", nargs="*", help="Relative paths to restore (default: all)")
+    restore.add_argument("--target", help="Restore into this directory instead of ComfyUI")
+    prune = backup_actions.add_parser("prune", help="Delete old snapshots")
+    prune.add_argument("--keep", type=int, default=30, help="Snapshots to keep")
+
+    return parser
+
+
+COMMANDS = {
+    None: cmd_gui,
+    "gui": cmd_gui,
+    "daemon": cmd_daemon,
+    "start": cmd_start,
+    "stop": cmd_stop,
+    "restart": cmd_restart,
+    "status": cmd_status,
+    "logs": cmd_logs,
+    "metrics": cmd_metrics,
+    "mode": cmd_mode,
+    "advise": cmd_advise,
+    "tui": cmd_tui,
+    "cache": cmd_cache,
+    "backup": cmd_backup,
+    "search": cmd_search,
+    "dupes": cmd_dupes,
+    "archive": cmd_archive,
+    "models": cmd_models,
+    "prefetch": cmd_prefetch,
+    "queue": cmd_queue,
+    "sweep": cmd_sweep,
+    "harvest": cmd_harvest,
+    "submit": cmd_submit,
+    "prompt-cache": cmd_prompt_cache,
+    "timings": cmd_timings,
+    "bottlenecks": cmd_bottlenecks,
+    "loadtest": cmd_loadtest,
+    "warmup": cmd_warmup,
+    "schedule": cmd_schedule,
+    "validate": cmd_validate,
+}
+
+
+def main(argv=None):
+    """Main entry point for the command line."""
+    args = build_parser().parse_args(argv)
+    try:
+        return COMMANDS[args.command](args)
+    except ControlError as e:
+        print(f"Control API error: {e}")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,428 @@
+"""
+Asyncio client for ComfyUI's HTTP and websocket API
+
+Only the standard library is used: HTTP/1.1 requests go over a small pool
+of keep-alive connections, and ``events()`` follows ComfyUI's websocket,
+reconnecting with backoff whenever the server goes away (restarts, mode
+switches). The HTTP and websocket framing helpers are shared with the
+stub server in ``comfy_stub``.
+"""
+
+import os
+import json
+import uuid
+import base64
+import struct
+import asyncio
+import hashlib
+import logging
+from collections import deque
+from urllib.parse import urlencode, quote
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+# Websocket opcodes
+OP_CONTINUATION = 0x0
+OP_TEXT = 0x1
+OP_BINARY = 0x2
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+MAX_BODY = 512 * 1024 * 1024
+STREAM_CHUNK = 256 * 1024
+
+
+class ComfyAPIError(Exception):
+    """Raised for failed requests and non-2xx responses."""
+
+    def __init__(self, message, status=None, body=None):
+        super().__init__(message)
+        self.status = status
+        self.body = body
+
+
+async def read_http_message(reader, sink=None):
+    """Read one HTTP/1.1 message: (start line, {lower-case header: value}, body).
+
+    With ``sink``, the body is passed to ``sink(chunk)`` as it arrives
+    instead of being buffered, and the returned body is empty. Returns None
+    if the connection closed before a start line arrived.
+    """
+    start_line = await reader.readline()
+    if not start_line:
+        return None
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    chunks = []
+    buffered = sink is None
+    if buffered:
+        sink = chunks.append
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            if size == 0:
+                await reader.readline()
+                break
+            await read_exactly_into(reader, size, sink)
+            await reader.readexactly(2)
+    else:
+        length = int(headers.get("content-length", 0))
+        if length > MAX_BODY and buffered:
+            raise ComfyAPIError(f"Response of {length} bytes is too large")
+        await read_exactly_into(reader, length, sink)
+    return start_line.decode("latin-1").rstrip("\r\n"), headers, b"".join(chunks)
+
+
+async def read_exactly_into(reader, length, sink):
+    """Pass ``length`` bytes from ``reader`` to ``sink`` in STREAM_CHUNK pieces."""
+    while length > 0:
+        chunk = await reader.read(min(length, STREAM_CHUNK))
+        if not chunk:
+            raise asyncio.IncompleteReadError(b"", length)
+        sink(chunk)
+        length -= len(chunk)
+
+
+def websocket_accept(key):
+    """Compute Sec-WebSocket-Accept for a Sec-WebSocket-Key."""
+    return base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+
+
+def encode_frame(opcode, payload, mask):
+    """Build one final websocket frame; clients must mask, servers must not."""
+    header = bytearray([0x80 | opcode])
+    length = len(payload)
+    mask_bit = 0x80 if mask else 0
+    if length < 126:
+        header.append(mask_bit | length)
+    elif length < 1 << 16:
+        header.append(mask_bit | 126)
+        header += struct.pack(">H", length)
+    else:
+        header.append(mask_bit | 127)
+        header += struct.pack(">Q", length)
+    if not mask:
+        return bytes(header) + payload
+    key = os.urandom(4)
+    masked = bytes(b ^ key[i % 4] for i, b in enumerate(payload))
+    return bytes(header) + key + masked
+
+
+async def read_frame(reader):
+    """Read one websocket frame: (final, opcode, payload)."""
+    first, second = await reader.readexactly(2)
+    length = second & 0x7F
+    if length == 126:
+        (length,) = struct.unpack(">H", await reader.readexactly(2))
+    elif length == 127:
+        (length,) = struct.unpack(">Q", await reader.readexactly(8))
+    if length > MAX_BODY:
+        raise ComfyAPIError(f"Websocket frame of {length} bytes is too large")
+    key = await reader.readexactly(4) if second & 0x80 else None
+    payload = await reader.readexactly(length)
+    if key is not None:
+        payload = bytes(b ^ key[i % 4] for i, b in enumerate(payload))
+    return bool(first & 0x80), first & 0x0F, payload
+
+
+async def read_message(reader, writer, mask):
+    """Read one whole websocket message, answering pings. Returns (opcode, payload)."""
+    parts = []
+    opcode = None
+    while True:
+        final, frame_opcode, payload = await read_frame(reader)
+        if frame_opcode == OP_PING:
+            writer.write(encode_frame(OP_PONG, payload, mask))
+            await writer.drain()
+            continue
+        if frame_opcode == OP_PONG:
+            continue
+        if frame_opcode == OP_CLOSE:
+            return OP_CLOSE, payload
+        if frame_opcode != OP_CONTINUATION:
+            opcode = frame_opcode
+        parts.append(payload)
+        if final:
+            return opcode, b"".join(parts)
+
+
+class ConnectionPool:
+    """Keep-alive connections to one host, at most ``size`` in use at once."""
+
+    def __init__(self, host, port, size=8, timeout=30.0):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.idle = deque()
+        self.slots = asyncio.Semaphore(size)
+        self.opened = 0
+
+    async def request(self, method, path, body=None, headers=None, sink=None):
+        """Send one request; returns (status, headers, body).
+
+        With ``sink``, the response body is streamed to ``sink(chunk)``.
+        """
+        async with self.slots:
+            # A pooled connection may have been closed by the server while idle;
+            # retry such a failure once on a fresh connection, unless part of
+            # the body already went to the sink
+            received = [0]
+
+            def counting_sink(chunk):
+                received[0] += len(chunk)
+                sink(chunk)
+
+            for attempt in range(2):
+                fresh = not self.idle
+                reader, writer = self.idle.pop() if self.idle else await self.connect()
+                try:
+                    response = await asyncio.wait_for(
+                        self.exchange(reader, writer, method, path, body, headers,
+                                      counting_sink if sink is not None else None),
+                        self.timeout
+                    )
+                except (ConnectionError, asyncio.IncompleteReadError) as e:
+                    writer.close()
+                    if fresh or attempt or received[0]:
+                        raise ComfyAPIError(f"{method} {path} failed: {e}")
+                    continue
+                except asyncio.TimeoutError:
+                    writer.close()
+                    raise ComfyAPIError(f"{method} {path} timed out after {self.timeout} s")
+                except BaseException:
+                    writer.close()
+                    raise
+                if response is None:
+                    writer.close()
+                    if fresh or attempt:
+                        raise ComfyAPIError(f"{method} {path}: connection closed")
+                    continue
+
+                start_line, response_headers, response_body = response
+                if response_headers.get("connection", "").lower() == "close":
+                    writer.close()
+                else:
+                    self.idle.append((reader, writer))
+                status = int(start_line.split()[1])
+                return status, response_headers, response_body
+
+    async def connect(self):
+        """Open a new connection."""
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port, limit=1024 * 1024), self.timeout
+            )
+        except (OSError, asyncio.TimeoutError) as e:
+            raise ComfyAPIError(f"Cannot connect to ComfyUI at {self.host}:{self.port}: {e}")
+        self.opened += 1
+        return reader, writer
+
+    async def exchange(self, reader, writer, method, path, body, headers, sink=None):
+        """Write a request and read its response."""
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {self.host}:{self.port}", "Connection: keep-alive"]
+        for name, value in (headers or {}).items():
+            lines.append(f"{name}: {value}")
+        if body is not None:
+            lines.append(f"Content-Length: {len(body)}")
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + (body or b""))
+        await writer.drain()
+        return await read_http_message(reader, sink)
+
+    def close(self):
+        """Close idle connections."""
+        while self.idle:
+            _, writer = self.idle.pop()
+            writer.close()
+
+
+class ComfyClient:
+    """ComfyUI API client. Create and use it inside one event loop."""
+
+    def __init__(self, host="127.0.0.1", port=8188, client_id=None, pool_size=8, timeout=30.0):
+        self.host = host
+        self.port = port
+        self.client_id = client_id or uuid.uuid4().hex
+        self.timeout = timeout
+        self.pool = ConnectionPool(host, port, pool_size, timeout)
+        self.websockets = set()
+        self.closed = False
+
+    @classmethod
+    def from_config(cls, config, **kwargs):
+        """Create a client for the configured ComfyUI port."""
+        host = config.get("host", "127.0.0.1")
+        # A wildcard listen address is reached through loopback
+        if host in ("0.0.0.0", "::", ""):
+            host = "127.0.0.1"
+        return cls(host, config.get("port", 8188), **kwargs)
+
+    async def request(self, method, path, payload=None, params=None, raw=False):
+        """Send a request; returns parsed JSON (or bytes with ``raw``)."""
+        if params:
+            path = f"{path}?{urlencode({k: v for k, v in params.items() if v is not None})}"
+        body = None
+        headers = None
+        if payload is not None:
+            body = json.dumps(payload).encode()
+            headers = {"Content-Type": "application/json"}
+        status, _, response = await self.pool.request(method, path, body, headers)
+        if not 200 <= status < 300:
+            raise ComfyAPIError(f"{method} {path} returned {status}", status, response)
+        if raw:
+            return response
+        return json.loads(response) if response else None
+
+    async def queue_prompt(self, prompt, extra_data=None, front=False, prompt_id=None):
+        """Queue an API-format prompt; returns {"prompt_id", "number", "node_errors"}.
+
+        ``prompt_id`` picks the id up front (ComfyUI versions that ignore it assign their own).
+        """
+        payload = {"prompt": prompt, "client_id": self.client_id}
+        if prompt_id:
+            payload["prompt_id"] = prompt_id
+        if extra_data:
+            payload["extra_data"] = extra_data
+        if front:
+            payload["front"] = True
+        return await self.request("POST", "/prompt", payload)
+
+    async def get_queue(self):
+        """Get {"queue_running": [...], "queue_pending": [...]}."""
+        return await self.request("GET", "/queue")
+
+    async def get_history(self, prompt_id=None, max_items=None):
+        """Get history for one prompt, or the latest ``max_items``."""
+        path = f"/history/{quote(prompt_id)}" if prompt_id else "/history"
+        return await self.request("GET", path, params={"max_items": max_items})
+
+    async def view(self, filename, subfolder="", folder_type="output"):
+        """Download an output, input or temp file."""
+        params = {"filename": filename, "subfolder": subfolder, "type": folder_type}
+        return await self.request("GET", "/view", params=params, raw=True)
+
+    async def download(self, filename, dest, subfolder="", folder_type="output"):
+        """Stream an output file to ``dest`` without holding it in memory; returns its size."""
+        params = {"filename": filename, "subfolder": subfolder, "type": folder_type}
+        path = f"/view?{urlencode(params)}"
+        tmp_path = f"{dest}.part"
+        with open(tmp_path, "wb") as f:
+            try:
+                status, _, body = await self.pool.request("GET", path, sink=f.write)
+            except BaseException:
+                f.close()
+                os.unlink(tmp_path)
+                raise
+        if not 200 <= status < 300:
+            os.unlink(tmp_path)
+            raise ComfyAPIError(f"GET {path} returned {status}", status)
+        os.replace(tmp_path, dest)
+        return os.path.getsize(dest)
+
+    async def object_info(self, node_class=None):
+        """Get node definitions, for all nodes or one class."""
+        path = f"/object_info/{quote(node_class)}" if node_class else "/object_info"
+        return await self.request("GET", path)
+
+    async def system_stats(self):
+        """Get ComfyUI's system and device stats."""
+        return await self.request("GET", "/system_stats")
+
+    async def interrupt(self):
+        """Interrupt the running prompt."""
+        await self.request("POST", "/interrupt", {})
+        return True
+
+    async def delete_queued(self, prompt_ids):
+        """Remove pending prompts from the queue."""
+        await self.request("POST", "/queue", {"delete": list(prompt_ids)})
+        return True
+
+    async def events(self, reconnect=True, max_backoff=10.0):
+        """Yield websocket messages as dicts, reconnecting with backoff.
+
+        Text messages are yielded as sent ({"type", "data"}); binary ones
+        (previews) as {"type": "binary", "data": bytes}. After every
+        (re)connect a {"type": "connected"} message is yielded so callers
+        can re-sync state they may have missed.
+        """
+        backoff = 0.5
+        while not self.closed:
+            try:
+                reader, writer = await self.open_websocket()
+            except (ComfyAPIError, OSError, asyncio.TimeoutError) as e:
+                if not reconnect:
+                    raise
+                logging.debug(f"ComfyUI websocket unavailable ({e}), retrying in {backoff:.1f} s")
+                await asyncio.sleep(backoff)
+                backoff = min(max_backoff, backoff * 2)
+                continue
+
+            backoff = 0.5
+            self.websockets.add(writer)
+            try:
+                if self.closed:
+                    # close() raced the handshake
+                    break
+                yield {"type": "connected", "data": {"client_id": self.client_id}}
+                while True:
+                    opcode, payload = await read_message(reader, writer, mask=True)
+                    if opcode == OP_CLOSE:
+                        break
+                    if opcode == OP_TEXT:
+                        try:
+                            yield json.loads(payload)
+                        except ValueError:
+                            continue
+                    else:
+                        yield {"type": "binary", "data": payload}
+            except (ConnectionError, asyncio.IncompleteReadError, ComfyAPIError) as e:
+                logging.debug(f"ComfyUI websocket dropped: {e}")
+            finally:
+                self.websockets.discard(writer)
+                writer.close()
+            if not reconnect or self.closed:
+                return
+            yield {"type": "disconnected", "data": {}}
+
+    async def open_websocket(self):
+        """Connect to /ws and complete the upgrade handshake."""
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port, limit=1024 * 1024), self.timeout
+        )
+        key = base64.b64encode(os.urandom(16)).decode()
+        request = (
+            f"GET /ws?clientId={quote(self.client_id)} HTTP/1.1\r\n"
+            f"Host: {self.host}:{self.port}\r\n"
+            "Upgrade: websocket\r\nConnection: Upgrade\r\n"
+            f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n"
+        )
+        writer.write(request.encode())
+        await writer.drain()
+
+        status_line = (await asyncio.wait_for(reader.readline(), self.timeout)).decode("latin-1")
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        if " 101 " not in status_line or headers.get("sec-websocket-accept") != websocket_accept(key):
+            writer.close()
+            raise ComfyAPIError(f"Websocket upgrade refused: {status_line.strip()}")
+        return reader, writer
+
+    async def close(self):
+        """Close pooled connections and stop ``events()``."""
+        self.closed = True
+        self.pool.close()
+        # Also ends a read a lost cancellation left waiting (asyncio.wait_for can swallow one)
+        for writer in list(self.websockets):
+            writer.close()
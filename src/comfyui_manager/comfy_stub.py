@@ -0,0 +1,450 @@
+"""
+Stub ComfyUI server for tests and benchmarks
+
+Speaks the subset of ComfyUI's API the manager uses: /prompt, /queue,
+/history, /view, /object_info, /system_stats, /interrupt and the /ws
+websocket. Queued prompts are "executed" one at a time: every node emits
+an executing message, KSampler-like nodes emit progress for each step,
+and each SaveImage node produces a small PNG in history. Service times
+can be drawn per prompt from a fixed, exponential, uniform, gamma or
+lognormal distribution, for load tests. Run it with
+``python -m comfyui_manager.comfy_stub --port 8188``.
+"""
+
+import io
+import os
+import sys
+import json
+import math
+import time
+import uuid
+import random
+import asyncio
+import logging
+import argparse
+import threading
+from urllib.parse import urlsplit, parse_qs
+
+from .comfy_api import (
+    OP_CLOSE, OP_TEXT, encode_frame, read_http_message, read_message, websocket_accept,
+)
+
+# Minimal node definitions for /object_info
+OBJECT_INFO = {
+    "CheckpointLoaderSimple": {
+        "input": {"required": {"ckpt_name": [["model.safetensors"]]}},
+        "output": ["MODEL", "CLIP", "VAE"], "output_node": False, "category": "loaders", "python_module": "nodes",
+    },
+    "CLIPTextEncode": {
+        "input": {"required": {"text": ["STRING", {"multiline": True}], "clip": ["CLIP"]}},
+        "output": ["CONDITIONING"], "output_node": False, "category": "conditioning", "python_module": "nodes",
+    },
+    "EmptyLatentImage": {
+        "input": {"required": {
+            "width": ["INT", {"default": 512, "min": 16, "max": 16384, "step": 8}],
+            "height": ["INT", {"default": 512, "min": 16, "max": 16384, "step": 8}],
+            "batch_size": ["INT", {"default": 1, "min": 1, "max": 4096}],
+        }},
+        "output": ["LATENT"], "output_node": False, "category": "latent", "python_module": "nodes",
+    },
+    "KSampler": {
+        "input": {"required": {
+            "model": ["MODEL"],
+            "seed": ["INT", {"default": 0, "min": 0, "max": 0xffffffffffffffff}],
+            "steps": ["INT", {"default": 20, "min": 1, "max": 10000}],
+            "cfg": ["FLOAT", {"default": 8.0, "min": 0.0, "max": 100.0}],
+            "sampler_name": [["euler", "euler_ancestral", "dpmpp_2m", "dpmpp_2m_sde"]],
+            "scheduler": [["normal", "karras", "exponential", "simple"]],
+            "positive": ["CONDITIONING"],
+            "negative": ["CONDITIONING"],
+            "latent_image": ["LATENT"],
+            "denoise": ["FLOAT", {"default": 1.0, "min": 0.0, "max": 1.0}],
+        }},
+        "output": ["LATENT"], "output_node": False, "category": "sampling", "python_module": "nodes",
+    },
+    "VAEDecode": {
+        "input": {"required": {"samples": ["LATENT"], "vae": ["VAE"]}},
+        "output": ["IMAGE"], "output_node": False, "category": "latent", "python_module": "nodes",
+    },
+    "SaveImage": {
+        "input": {"required": {"images": ["IMAGE"], "filename_prefix": ["STRING", {"default": "ComfyUI"}]}},
+        "output": [], "output_node": True, "category": "image", "python_module": "nodes",
+    },
+}
+
+# Shapes for per-prompt service time multipliers (mean 1)
+DISTRIBUTIONS = ("fixed", "exponential", "uniform", "gamma", "lognormal")
+
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 101: "Switching Protocols"}
+
+
+def tiny_png():
+    """A valid 8x8 PNG to serve from /view."""
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (8, 8), (40, 80, 120)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def noise_png(size):
+    """A PNG of random pixels of about ``size`` bytes (noise does not compress)."""
+    from PIL import Image
+
+    side = max(8, int((size / 3) ** 0.5))
+    buffer = io.BytesIO()
+    Image.frombytes("RGB", (side, side), os.urandom(side * side * 3)).save(buffer, "PNG", compress_level=0)
+    return buffer.getvalue()
+
+
+class StubComfyUI:
+    """In-process fake ComfyUI.
+
+    ``step_time`` is seconds per sampler step; ``image_bytes`` makes /view
+    serve a noise PNG of about that size instead of a tiny one. Each prompt's
+    times are scaled by a factor from ``distribution`` with mean 1 and
+    coefficient of variation ``cv`` (exponential is always 1).
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, step_time=0.01, node_time=0.0, image_bytes=0,
+                 distribution="fixed", cv=0.5, seed=None):
+        if distribution not in DISTRIBUTIONS:
+            raise ValueError(f"Unknown service time distribution: {distribution}")
+        self.host = host
+        self.port = port
+        self.step_time = step_time
+        self.node_time = node_time
+        self.image_bytes = image_bytes
+        self.distribution = distribution
+        self.cv = cv
+        self.random = random.Random(seed)
+
+        self.pending = []
+        self.running = None
+        self.history = {}
+        self.number = 0
+        self.interrupted = False
+        self.sockets = {}
+        self.requests = 0
+        self.image = None
+
+        self.loop = None
+        self.server = None
+        self.wakeup = None
+        self.thread = None
+        self.ready = threading.Event()
+
+    # Lifecycle
+
+    async def serve(self):
+        """Bind and start the executor; sets ``port`` when it was 0."""
+        self.wakeup = asyncio.Event()
+        self.server = await asyncio.start_server(self.handle_client, self.host, self.port, limit=1024 * 1024)
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.executor = asyncio.ensure_future(self.execute_loop())
+        logging.info(f"Stub ComfyUI listening on {self.host}:{self.port}")
+
+    def start(self):
+        """Serve from a background thread; returns once listening."""
+        self.thread = threading.Thread(target=self.run, name="comfy-stub", daemon=True)
+        self.thread.start()
+        self.ready.wait(10)
+        return self
+
+    def run(self):
+        """Thread body: run the loop until stopped."""
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_until_complete(self.serve())
+        self.ready.set()
+        self.loop.run_forever()
+        self.loop.close()
+
+    def stop(self):
+        """Close the server, dropping all clients."""
+        if self.loop is None or self.loop.is_closed():
+            return
+
+        async def close():
+            self.server.close()
+            # Cancel the executor and connection handlers; their writers close on the way out
+            tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await asyncio.sleep(0)
+            self.loop.stop()
+
+        asyncio.run_coroutine_threadsafe(close(), self.loop)
+        self.thread.join(timeout=5)
+
+    # HTTP
+
+    async def handle_client(self, reader, writer):
+        """Serve keep-alive HTTP requests, or upgrade to a websocket."""
+        try:
+            while True:
+                message = await read_http_message(reader)
+                if message is None:
+                    break
+                start_line, headers, body = message
+                method, target, _ = start_line.split(" ", 2)
+                url = urlsplit(target)
+                query = {k: v[0] for k, v in parse_qs(url.query).items()}
+                self.requests += 1
+
+                if url.path == "/ws" and headers.get("upgrade", "").lower() == "websocket":
+                    await self.handle_websocket(reader, writer, headers, query)
+                    return
+
+                status, payload, content_type = self.route(method, url.path, query, body)
+                if content_type == "application/json":
+                    payload = json.dumps(payload).encode()
+                writer.write(
+                    f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+                    f"Content-Type: {content_type}\r\nContent-Length: {len(payload)}\r\n"
+                    "Connection: keep-alive\r\n\r\n".encode()
+                )
+                # Separately, so large images are not copied
+                writer.write(payload)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError, asyncio.CancelledError):
+            # Cancelled on stop()
+            pass
+        finally:
+            writer.close()
+
+    def route(self, method, path, query, body):
+        """Handle one request: (status, payload, content type)."""
+        if path == "/prompt" and method == "POST":
+            return self.post_prompt(json.loads(body or b"{}"))
+        if path == "/prompt":
+            return 200, {"exec_info": {"queue_remaining": self.queue_remaining()}}, "application/json"
+        if path == "/queue" and method == "POST":
+            request = json.loads(body or b"{}")
+            if request.get("clear"):
+                self.pending.clear()
+            delete = set(request.get("delete", []))
+            self.pending = [item for item in self.pending if item[1] not in delete]
+            self.broadcast_status()
+            return 200, b"", "text/plain"
+        if path == "/queue":
+            running = [self.running] if self.running else []
+            return 200, {"queue_running": running, "queue_pending": self.pending}, "application/json"
+        if path.startswith("/history"):
+            prompt_id = path[len("/history/"):] if path.startswith("/history/") else None
+            if prompt_id:
+                entry = self.history.get(prompt_id)
+                return 200, ({prompt_id: entry} if entry else {}), "application/json"
+            items = list(self.history.items())
+            max_items = int(query.get("max_items", 0) or 0)
+            if max_items:
+                items = items[-max_items:]
+            return 200, dict(items), "application/json"
+        if path == "/view":
+            if self.image is None:
+                self.image = noise_png(self.image_bytes) if self.image_bytes else tiny_png()
+            return 200, self.image, "image/png"
+        if path.startswith("/object_info"):
+            node_class = path[len("/object_info/"):] if path.startswith("/object_info/") else None
+            if node_class:
+                info = OBJECT_INFO.get(node_class)
+                return 200, ({node_class: info} if info else {}), "application/json"
+            return 200, OBJECT_INFO, "application/json"
+        if path == "/system_stats":
+            return 200, {
+                "system": {"os": sys.platform, "python_version": sys.version, "comfyui_version": "stub"},
+                "devices": [{"name": "stub", "type": "cpu", "vram_total": 0, "vram_free": 0}],
+            }, "application/json"
+        if path == "/interrupt" and method == "POST":
+            self.interrupted = True
+            return 200, b"", "text/plain"
+        return 404, {"error": "not found"}, "application/json"
+
+    def post_prompt(self, request):
+        """Queue a prompt the way ComfyUI's /prompt does."""
+        prompt = request.get("prompt")
+        if not isinstance(prompt, dict) or not prompt:
+            return 400, {"error": {"type": "no_prompt", "message": "No prompt provided"}, "node_errors": {}}, \
+                "application/json"
+        prompt_id = request.get("prompt_id") or str(uuid.uuid4())
+        number = self.number
+        self.number += 1
+        if request.get("front"):
+            number = -number
+        outputs = [node_id for node_id, node in prompt.items() if node.get("class_type") == "SaveImage"]
+        extra = dict(request.get("extra_data") or {}, client_id=request.get("client_id"))
+        item = [number, prompt_id, prompt, extra, outputs]
+        self.pending.append(item)
+        self.pending.sort(key=lambda queued: queued[0])
+        self.broadcast_status()
+        self.wakeup.set()
+        return 200, {"prompt_id": prompt_id, "number": number, "node_errors": {}}, "application/json"
+
+    # Execution
+
+    def queue_remaining(self):
+        """Prompts pending plus the running one."""
+        return len(self.pending) + (1 if self.running else 0)
+
+    async def execute_loop(self):
+        """Run queued prompts one at a time."""
+        while True:
+            if not self.pending:
+                self.wakeup.clear()
+                await self.wakeup.wait()
+                continue
+            self.running = self.pending.pop(0)
+            self.interrupted = False
+            try:
+                await self.execute(self.running)
+            finally:
+                self.running = None
+                self.broadcast_status()
+
+    def service_time(self, node):
+        """Seconds a node takes: step_time per sampler step."""
+        steps = node.get("inputs", {}).get("steps")
+        return self.step_time * steps if isinstance(steps, int) else self.node_time
+
+    def service_factor(self):
+        """Draw the multiplier for one prompt's service times."""
+        cv = self.cv
+        if self.distribution == "fixed" or (cv <= 0 and self.distribution != "exponential"):
+            return 1.0
+        if self.distribution == "exponential":
+            return self.random.expovariate(1.0)
+        if self.distribution == "uniform":
+            # Uniform on [1 - a, 1 + a] has a CV of a / sqrt(3)
+            spread = min(1.0, cv * math.sqrt(3))
+            return self.random.uniform(1 - spread, 1 + spread)
+        if self.distribution == "gamma":
+            return self.random.gammavariate(1 / cv ** 2, cv ** 2)
+        sigma = math.sqrt(math.log(1 + cv ** 2))
+        return self.random.lognormvariate(-sigma ** 2 / 2, sigma)
+
+    async def execute(self, item):
+        """Walk a prompt's nodes, emitting ComfyUI's execution messages."""
+        _, prompt_id, prompt, extra, outputs = item
+        client_id = extra.get("client_id")
+        factor = self.service_factor()
+        started = time.time()
+        self.send("execution_start", {"prompt_id": prompt_id, "timestamp": int(started * 1000)}, client_id)
+        self.broadcast_status()
+
+        results = {}
+        for node_id, node in prompt.items():
+            self.send("executing", {"node": node_id, "display_node": node_id, "prompt_id": prompt_id}, client_id)
+            steps = node.get("inputs", {}).get("steps")
+            if isinstance(steps, int):
+                for step in range(1, steps + 1):
+                    await asyncio.sleep(self.step_time * factor)
+                    if self.interrupted:
+                        break
+                    self.send("progress", {"value": step, "max": steps, "prompt_id": prompt_id, "node": node_id},
+                              client_id)
+            elif self.service_time(node):
+                await asyncio.sleep(self.service_time(node) * factor)
+
+            if self.interrupted:
+                self.send("execution_interrupted", {"prompt_id": prompt_id, "node_id": node_id,
+                                                    "node_type": node.get("class_type")}, client_id)
+                self.history[prompt_id] = self.history_entry(item, {}, "error", started)
+                return
+
+            if node_id in outputs:
+                prefix = node.get("inputs", {}).get("filename_prefix", "ComfyUI")
+                image = {"filename": f"{prefix}_{len(self.history) + 1:05d}_.png", "subfolder": "", "type": "output"}
+                results[node_id] = {"images": [image]}
+                self.send("executed", {"node": node_id, "display_node": node_id, "output": results[node_id],
+                                       "prompt_id": prompt_id}, client_id)
+
+        self.history[prompt_id] = self.history_entry(item, results, "success", started)
+        self.send("executing", {"node": None, "prompt_id": prompt_id}, client_id)
+        self.send("execution_success", {"prompt_id": prompt_id, "timestamp": int(time.time() * 1000)}, client_id)
+
+    def history_entry(self, item, outputs, status, started):
+        """Build a /history entry."""
+        return {
+            "prompt": item,
+            "outputs": outputs,
+            "status": {
+                "status_str": status,
+                "completed": status == "success",
+                "messages": [
+                    ["execution_start", {"prompt_id": item[1], "timestamp": int(started * 1000)}],
+                    [f"execution_{status}", {"prompt_id": item[1], "timestamp": int(time.time() * 1000)}],
+                ],
+            },
+        }
+
+    # Websocket
+
+    async def handle_websocket(self, reader, writer, headers, query):
+        """Complete the upgrade and keep the socket until the client leaves."""
+        client_id = query.get("clientId") or uuid.uuid4().hex
+        writer.write(
+            "HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {websocket_accept(headers.get('sec-websocket-key', ''))}\r\n\r\n".encode()
+        )
+        self.sockets[client_id] = writer
+        self.send("status", self.status_data(client_id), client_id)
+        try:
+            while True:
+                opcode, _ = await read_message(reader, writer, mask=False)
+                if opcode == OP_CLOSE:
+                    break
+        finally:
+            if self.sockets.get(client_id) is writer:
+                del self.sockets[client_id]
+
+    def status_data(self, client_id=None):
+        """Payload of a "status" message."""
+        data = {"status": {"exec_info": {"queue_remaining": self.queue_remaining()}}}
+        if client_id:
+            data["sid"] = client_id
+        return data
+
+    def broadcast_status(self):
+        """Send the queue size to every client, like ComfyUI does on changes."""
+        self.send("status", self.status_data())
+
+    def send(self, event, data, client_id=None):
+        """Send a message to one client, or to all when ``client_id`` is None."""
+        frame = encode_frame(OP_TEXT, json.dumps({"type": event, "data": data}).encode(), mask=False)
+        targets = [self.sockets.get(client_id)] if client_id else list(self.sockets.values())
+        for writer in targets:
+            if writer is not None and not writer.is_closing():
+                writer.write(frame)
+
+
+def main(argv=None):
+    """Run a stub server in the foreground."""
+    parser = argparse.ArgumentParser(description="Stub ComfyUI server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8188)
+    parser.add_argument("--step-time", type=float, default=0.05, help="Seconds per sampler step")
+    parser.add_argument("--node-time", type=float, default=0.0, help="Seconds per non-sampler node")
+    parser.add_argument("--image-mb", type=float, default=0, help="Serve noise images of this size")
+    parser.add_argument("--distribution", choices=DISTRIBUTIONS, default="fixed",
+                        help="Per-prompt service time distribution")
+    parser.add_argument("--cv", type=float, default=0.5, help="Coefficient of variation of service times")
+    parser.add_argument("--seed", type=int, help="Random seed for service times")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    stub = StubComfyUI(args.host, args.port, step_time=args.step_time, node_time=args.node_time,
+                       image_bytes=int(args.image_mb * 1024 * 1024), distribution=args.distribution,
+                       cv=args.cv, seed=args.seed)
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    loop.run_until_complete(stub.serve())
+    try:
+        loop.run_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -74,10 +74,12 @@ class ConfigManager:
             "temp_dir": "",
             "log_dir": "",
             "cache_dir": "",
+            "backup_dir": "",
             
             # Network
             "host": "0.0.0.0",
             "port": 8188,
+            "comfyui_events_enabled": True,
             
             # GPU Settings
             "cuda_device": 0,
@@ -90,14 +92,110 @@ class ConfigManager:
             "mkl_num_threads": "auto",
             
             # Startup Mode
-            "startup_mode": "highvram",
+            "startup_mode": "auto",
             "precision_mode": "fp16",
+            "gpu_vram_gb": 0,
+            "advisor_overhead_mb": 1536,
+            "advisor_headroom": 0.9,
             
             # UI Settings
             "theme": "dark",
             "language": "en",
             "auto_update_check": True,
             "check_updates_on_startup": True,
+            "console_max_lines": 5000,
+            "output_buffer_lines": 5000,
+            "monitor_history_size": 3600,
+            "tui_refresh_hz": 4,
+            "tui_cpu_budget_percent": 2.0,
+            
+            # Output index
+            "output_index_enabled": True,
+            "output_index_workers": 0,
+            "output_index_poll_interval": 5.0,
+            "prompt_index_enabled": True,
+            "prompt_index_path": "",
+            "prompt_index_workers": 0,
+            
+            # Thumbnails
+            "thumbnail_cache_dir": "",
+            "thumbnail_cache_max_mb": 512,
+            "thumbnail_size": 256,
+            "thumbnail_workers": 0,
+            
+            # Archiver
+            "archive_enabled": False,
+            "archive_format": "png",
+            "archive_min_age_days": 14,
+            "archive_interval_minutes": 30,
+            "archive_workers": 0,
+            "archive_pause_cpu_percent": 50.0,
+            "archive_pause_io_mb_s": 20.0,
+            
+            # Models
+            "models_dir": "",
+            "model_hash_workers": 4,
+            
+            # Prefetch (page cache warm-up at launch)
+            "prefetch_enabled": True,
+            "prefetch_models": [],
+            "prefetch_recent": 2,
+            "prefetch_max_gb": 0,
+            "prefetch_rate_mb_s": 200,
+            "prefetch_workers": 2,
+            "prefetch_interval_hours": 0,
+            
+            # Batch sweeps
+            "sweep_queue_depth": 2,
+            "sweep_poll_interval": 5.0,
+            "harvest_dir": "",
+            "harvest_concurrency": 4,
+            "prompt_cache_enabled": True,
+            "prompt_cache_dir": "",
+            "prompt_cache_max_mb": 2048,
+            "validate_prompts": True,
+            "validate_models": True,
+            
+            # Fair-share scheduler (scheduler_weights: {user: weight, "*": default})
+            "scheduler_enabled": False,
+            "scheduler_policy": "fair",
+            "scheduler_depth": 2,
+            "scheduler_preempt": True,
+            "scheduler_weights": {},
+            
+            # Execution timings for queue ETAs
+            "timings_enabled": True,
+            "timings_path": "",
+            "timings_max_rows": 200000,
+            "eta_smoothing": 0.1,
+            "timings_session_dir": "",
+            
+            # Warm-up after launch ([width, height] resolutions, checkpoint names)
+            "warmup_workflows": [],
+            "warmup_resolutions": [],
+            "warmup_models": [],
+            "warmup_steps": 1,
+            "warmup_timeout": 600,
+            "warmup_ready_timeout": 600,
+            
+            # Duplicates
+            "dedup_method": "dhash",
+            "dedup_max_distance": 4,
+            "dedup_workers": 0,
+            
+            # Cache quotas (MB, 0 = unlimited)
+            "cache_quotas": {
+                "torch_extensions": 4096,
+                "huggingface": 51200,
+                "xdg": 10240,
+                "temp": 5120,
+            },
+            "cache_grace_minutes": 30,
+            "cache_enforce_interval_hours": 6,
+            
+            # Control API
+            "control_server": True,
+            "control_socket": "",
             
             # Advanced
             "extra_args": "",
@@ -0,0 +1,250 @@
+"""
+Client library for the ComfyUI Manager control API
+
+Example:
+    client = ControlClient()
+    print(client.status())
+    for line in client.follow_logs():
+        print(line)
+"""
+
+import json
+import socket
+import itertools
+
+
+class ControlError(Exception):
+    """Raised when the control server returns an error or cannot be reached."""
+
+    def __init__(self, message, code=None):
+        super().__init__(message)
+        self.code = code
+
+
+class ControlClient:
+    """Blocking JSON-RPC client for the manager's Unix domain socket."""
+
+    def __init__(self, socket_path=None, timeout=10.0):
+        if socket_path is None:
+            from .control_server import default_socket_path
+            from .config_manager import ConfigManager
+            socket_path = default_socket_path(ConfigManager())
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.sock = None
+        self.reader = None
+        self.ids = itertools.count(1)
+
+    def connect(self):
+        """Open the connection if it is not open yet."""
+        if self.sock is not None:
+            return
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError as e:
+            sock.close()
+            raise ControlError(f"Cannot connect to {self.socket_path}: {e}")
+        self.sock = sock
+        self.reader = sock.makefile("rb")
+
+    def close(self):
+        """Close the connection."""
+        if self.sock is not None:
+            self.reader.close()
+            self.sock.close()
+            self.sock = None
+            self.reader = None
+
+    def __enter__(self):
+        self.connect()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def is_available(self):
+        """Check whether a manager is serving the socket."""
+        try:
+            return self.call("ping") == "pong"
+        except ControlError:
+            return False
+
+    def call(self, method, **params):
+        """Call a method and return its result."""
+        self.connect()
+        request_id = next(self.ids)
+        self.send({"jsonrpc": "2.0", "id": request_id, "method": method, "params": params})
+
+        while True:
+            message = self.receive()
+            if message.get("id") == request_id:
+                break
+
+        if "error" in message:
+            error = message["error"]
+            raise ControlError(error.get("message", "Unknown error"), error.get("code"))
+        return message.get("result")
+
+    def send(self, message):
+        """Send one request line."""
+        try:
+            self.sock.sendall(json.dumps(message).encode() + b"\n")
+        except OSError as e:
+            self.close()
+            raise ControlError(f"Connection lost: {e}")
+
+    def receive(self):
+        """Read one message line."""
+        try:
+            line = self.reader.readline()
+        except OSError as e:
+            self.close()
+            raise ControlError(f"Connection lost: {e}")
+        if not line:
+            self.close()
+            raise ControlError("Connection closed by server")
+        return json.loads(line)
+
+    def status(self):
+        """Get process status."""
+        return self.call("status")
+
+    def metrics(self):
+        """Get the latest system metrics."""
+        return self.call("metrics")
+
+    def metrics_history(self, seconds=None):
+        """Get stored monitor samples as (time, cpu, mem, gpu, vram) lists."""
+        return self.call("metrics.history", seconds=seconds)
+
+    def logs_tail(self, lines=100):
+        """Get the last lines of ComfyUI output."""
+        return self.call("logs.tail", lines=lines)
+
+    def follow_logs(self, lines=0):
+        """Yield ComfyUI output lines as they arrive, starting with a tail.
+
+        Uses its own connection, which is closed when the generator is.
+        """
+        stream = ControlClient(self.socket_path, timeout=None)
+        try:
+            result = stream.call("logs.follow", lines=lines)
+            for line in result.get("tail", []):
+                yield line
+            while True:
+                message = stream.receive()
+                if message.get("method") == "logs.line":
+                    yield message["params"]["line"]
+        finally:
+            stream.close()
+
+    def outputs_stats(self, breakdown=False):
+        """Get output directory totals."""
+        return self.call("outputs.stats", breakdown=breakdown)
+
+    def search_outputs(self, text=None, model=None, lora=None, sampler=None, seed=None, limit=50):
+        """Search outputs by prompt text, model, LoRA, sampler or seed, newest first."""
+        return self.call("outputs.search", text=text, model=model, lora=lora,
+                         sampler=sampler, seed=seed, limit=limit)
+
+    def thumbnails(self, paths):
+        """Get {source: thumbnail path} for output files."""
+        return self.call("thumbnails.get", paths=list(paths))
+
+    def archive_stats(self):
+        """Get archiver totals and bytes saved over the last hour."""
+        return self.call("archive.stats")
+
+    def archive_run(self, limit=None):
+        """Start an archiver pass now."""
+        return self.call("archive.run", limit=limit)
+
+    def advise(self, workflow=None):
+        """Recommend a memory mode for a workflow, or for the latest output's."""
+        return self.call("advisor.recommend", workflow=workflow)
+
+    def prefetch_status(self):
+        """Get the last prefetch run and page-cache residency of the selected models."""
+        return self.call("prefetch.status")
+
+    def prefetch_run(self, paths=None):
+        """Start prefetching the selected models, or the given files."""
+        return self.call("prefetch.run", paths=paths)
+
+    def queue_status(self):
+        """Get ComfyUI's queue depth, running prompt and progress."""
+        return self.call("queue.status")
+
+    def queue_eta(self):
+        """Estimate when each queued prompt and the whole queue will finish."""
+        return self.call("queue.eta")
+
+    def timings_stats(self):
+        """Get recorded timing counts and the slowest node classes."""
+        return self.call("timings.stats")
+
+    def warmup_status(self, limit=20):
+        """Get the current launch's warm-up state and the recorded launches."""
+        return self.call("warmup.status", limit=limit)
+
+    def warmup_run(self):
+        """Run the warm-up workflows again on the running ComfyUI."""
+        return self.call("warmup.run")
+
+    def validate(self, prompt):
+        """Check a prompt; returns a list of errors, empty if it is valid."""
+        return self.call("workflow.validate", prompt=prompt)
+
+    def scheduler_submit(self, prompt, user="default", priority="batch", extra_data=None):
+        """Hold a prompt for fair-share dispatch to ComfyUI."""
+        return self.call("scheduler.submit", prompt=prompt, user=user, priority=priority, extra_data=extra_data)
+
+    def scheduler_status(self):
+        """Get held jobs, per-user backlog and per-class latency percentiles."""
+        return self.call("scheduler.status")
+
+    def scheduler_job(self, job_id):
+        """Get one scheduler job."""
+        return self.call("scheduler.job", job_id=job_id)
+
+    def scheduler_cancel(self, job_id):
+        """Cancel a job that has not started."""
+        return self.call("scheduler.cancel", job_id=job_id)
+
+    def cache_stats(self):
+        """Get size, quota and in-use bytes for every cache."""
+        return self.call("cache.stats")
+
+    def cache_enforce(self):
+        """Start evicting caches down to their quotas."""
+        return self.call("cache.enforce")
+
+    def cache_clear(self, names=None):
+        """Start clearing the given caches (default: all)."""
+        return self.call("cache.clear", names=names)
+
+    def cache_progress(self):
+        """Get the progress of the current cache job."""
+        return self.call("cache.progress")
+
+    def start(self, mode=None):
+        """Start ComfyUI."""
+        return self.call("start", mode=mode)
+
+    def stop(self):
+        """Stop ComfyUI."""
+        return self.call("stop")
+
+    def restart(self, mode=None):
+        """Restart ComfyUI."""
+        return self.call("restart", mode=mode)
+
+    def set_mode(self, mode):
+        """Set the startup memory mode."""
+        return self.call("set_mode", mode=mode)
+
+    def shutdown(self):
+        """Stop ComfyUI and the daemon."""
+        return self.call("shutdown")
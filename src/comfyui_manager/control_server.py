@@ -0,0 +1,494 @@
+"""
+Local control API for ComfyUI Manager
+
+A newline-delimited JSON-RPC 2.0 server on a Unix domain socket. It runs
+its own asyncio loop in a background thread, so clients are served
+without touching the Tk thread.
+"""
+
+import os
+import json
+import asyncio
+import inspect
+import logging
+import threading
+
+from .utils import get_run_dir
+
+# JSON-RPC error codes
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+
+MODES = ("auto", "lowvram", "normalvram", "highvram", "cpu")
+
+
+def default_socket_path(config):
+    """Get the control socket path from config or the run dir."""
+    return config.get("control_socket") or str(get_run_dir() / "control.sock")
+
+
+class ControlServer:
+    """JSON-RPC server over a Unix domain socket."""
+
+    def __init__(self, supervisor, socket_path=None):
+        self.supervisor = supervisor
+        self.socket_path = socket_path or default_socket_path(supervisor.config)
+        self.follow_queue_size = supervisor.config.get("control_follow_queue", 1000)
+
+        self.loop = None
+        self.server = None
+        self.thread = None
+        self.ready = threading.Event()
+        self.clients = 0
+
+        self.methods = {
+            "ping": self.rpc_ping,
+            "status": self.rpc_status,
+            "metrics": self.rpc_metrics,
+            "metrics.history": self.rpc_metrics_history,
+            "logs.tail": self.rpc_logs_tail,
+            "logs.follow": self.rpc_logs_follow,
+            "outputs.stats": self.rpc_outputs_stats,
+            "outputs.search": self.rpc_outputs_search,
+            "thumbnails.get": self.rpc_thumbnails_get,
+            "archive.stats": self.rpc_archive_stats,
+            "archive.run": self.rpc_archive_run,
+            "advisor.recommend": self.rpc_advisor_recommend,
+            "prefetch.status": self.rpc_prefetch_status,
+            "prefetch.run": self.rpc_prefetch_run,
+            "queue.status": self.rpc_queue_status,
+            "queue.eta": self.rpc_queue_eta,
+            "timings.stats": self.rpc_timings_stats,
+            "warmup.status": self.rpc_warmup_status,
+            "warmup.run": self.rpc_warmup_run,
+            "workflow.validate": self.rpc_workflow_validate,
+            "scheduler.submit": self.rpc_scheduler_submit,
+            "scheduler.status": self.rpc_scheduler_status,
+            "scheduler.job": self.rpc_scheduler_job,
+            "scheduler.cancel": self.rpc_scheduler_cancel,
+            "cache.stats": self.rpc_cache_stats,
+            "cache.enforce": self.rpc_cache_enforce,
+            "cache.clear": self.rpc_cache_clear,
+            "cache.progress": self.rpc_cache_progress,
+            "start": self.rpc_start,
+            "stop": self.rpc_stop,
+            "restart": self.rpc_restart,
+            "set_mode": self.rpc_set_mode,
+            "shutdown": self.rpc_shutdown,
+        }
+
+    def start(self):
+        """Start serving in a background thread. Returns False if the socket is taken."""
+        if socket_in_use(self.socket_path):
+            logging.warning(f"Control socket already served by another manager: {self.socket_path}")
+            return False
+
+        self.thread = threading.Thread(target=self.run, name="control-server", daemon=True)
+        self.thread.start()
+        self.ready.wait(5)
+        return self.server is not None
+
+    def run(self):
+        """Thread body: run the asyncio loop until stopped."""
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_until_complete(self.serve())
+            self.loop.run_forever()
+        except Exception as e:
+            logging.error(f"Control server error: {e}")
+        finally:
+            self.ready.set()
+            self.loop.close()
+
+    async def serve(self):
+        """Bind the socket."""
+        try:
+            os.unlink(self.socket_path)
+        except FileNotFoundError:
+            pass
+
+        old_umask = os.umask(0o177)
+        try:
+            self.server = await asyncio.start_unix_server(
+                self.handle_client, path=self.socket_path, limit=1024 * 1024
+            )
+        finally:
+            os.umask(old_umask)
+
+        logging.info(f"Control server listening on {self.socket_path}")
+        self.ready.set()
+
+    def stop(self):
+        """Stop the server and remove the socket."""
+        if self.loop is None or self.loop.is_closed():
+            return
+
+        async def close():
+            if self.server is not None:
+                self.server.close()
+                await self.server.wait_closed()
+            self.loop.stop()
+
+        asyncio.run_coroutine_threadsafe(close(), self.loop)
+        self.thread.join(timeout=5)
+
+        try:
+            os.unlink(self.socket_path)
+        except FileNotFoundError:
+            pass
+        logging.info("Control server stopped")
+
+    async def handle_client(self, reader, writer):
+        """Serve one connection: one JSON request per line."""
+        self.clients += 1
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                await self.handle_line(line, reader, writer)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            logging.debug(f"Control client error: {e}")
+        finally:
+            self.clients -= 1
+            writer.close()
+
+    async def handle_line(self, line, reader, writer):
+        """Dispatch a single request line."""
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError:
+            await self.send(writer, error_response(None, PARSE_ERROR, "Parse error"))
+            return
+
+        if not isinstance(request, dict) or "method" not in request:
+            await self.send(writer, error_response(None, INVALID_REQUEST, "Invalid request"))
+            return
+
+        request_id = request.get("id")
+        method = self.methods.get(request["method"])
+        if method is None:
+            await self.send(writer, error_response(
+                request_id, METHOD_NOT_FOUND, f"Unknown method: {request['method']}"
+            ))
+            return
+
+        params = request.get("params") or {}
+        # Streaming methods write their own responses
+        streaming = request["method"] == "logs.follow"
+        args = [reader, writer, request_id] if streaming else []
+        try:
+            if isinstance(params, list):
+                bound = inspect.signature(method).bind(*args, *params)
+            elif isinstance(params, dict):
+                bound = inspect.signature(method).bind(*args, **params)
+            else:
+                raise TypeError("params must be an array or an object")
+        except TypeError as e:
+            await self.send(writer, error_response(request_id, INVALID_PARAMS, str(e)))
+            return
+
+        try:
+            result = await method(*bound.args, **bound.kwargs)
+        except ValueError as e:
+            await self.send(writer, error_response(request_id, INVALID_PARAMS, str(e)))
+            return
+        except Exception as e:
+            logging.exception(f"Control method {request['method']} failed: {e}")
+            await self.send(writer, error_response(request_id, INTERNAL_ERROR, str(e)))
+            return
+        if streaming:
+            return
+
+        if request_id is not None:
+            await self.send(writer, {"jsonrpc": "2.0", "id": request_id, "result": result})
+
+    async def send(self, writer, message):
+        """Write one message and respect flow control."""
+        writer.write(json.dumps(message).encode() + b"\n")
+        await writer.drain()
+
+    async def blocking(self, func, *args):
+        """Run a blocking supervisor call in the default executor."""
+        return await self.loop.run_in_executor(None, func, *args)
+
+    async def rpc_ping(self):
+        """Check the server is alive."""
+        return "pong"
+
+    async def rpc_status(self):
+        """Get process status."""
+        status = self.supervisor.status()
+        status["control_clients"] = self.clients
+        return status
+
+    async def rpc_metrics(self):
+        """Get the latest system metrics."""
+        return self.supervisor.metrics()
+
+    async def rpc_metrics_history(self, seconds=None):
+        """Get stored monitor samples."""
+        return self.supervisor.system_monitor.get_history(seconds)
+
+    async def rpc_logs_tail(self, lines=100):
+        """Get the last lines of ComfyUI output."""
+        return self.supervisor.logs(int(lines))
+
+    async def rpc_logs_follow(self, reader, writer, request_id, lines=0):
+        """Send the tail, then stream new lines as notifications until disconnect."""
+        queue = asyncio.Queue(maxsize=self.follow_queue_size)
+        dropped = [0]
+
+        def on_line(line):
+            # Called from the output reader thread
+            self.loop.call_soon_threadsafe(put_line, line)
+
+        def put_line(line):
+            try:
+                queue.put_nowait(line)
+            except asyncio.QueueFull:
+                dropped[0] += 1
+
+        process_manager = self.supervisor.process_manager
+        process_manager.add_output_listener(on_line)
+
+        # Stop streaming as soon as the client hangs up
+        eof_task = asyncio.ensure_future(reader.read())
+        try:
+            await self.send(writer, {
+                "jsonrpc": "2.0",
+                "id": request_id,
+                "result": {"streaming": True, "tail": self.supervisor.logs(int(lines)) if lines else []},
+            })
+            while True:
+                get_task = asyncio.ensure_future(queue.get())
+                done, _ = await asyncio.wait(
+                    {get_task, eof_task}, return_when=asyncio.FIRST_COMPLETED
+                )
+                if eof_task in done:
+                    get_task.cancel()
+                    break
+                line = get_task.result()
+                params = {"line": line}
+                if dropped[0]:
+                    params["dropped"] = dropped[0]
+                    dropped[0] = 0
+                await self.send(writer, {"jsonrpc": "2.0", "method": "logs.line", "params": params})
+        finally:
+            eof_task.cancel()
+            process_manager.remove_output_listener(on_line)
+
+    async def rpc_outputs_stats(self, breakdown=False):
+        """Get output directory totals, optionally per day and prefix."""
+        index = self.supervisor.output_index
+        stats = index.stats()
+        if self.supervisor.prompt_index is not None:
+            stats["catalogue"] = self.supervisor.prompt_index.stats()
+        if breakdown:
+            stats["per_day"] = index.per_day()
+            stats["per_prefix"] = index.per_prefix()
+        return stats
+
+    async def rpc_outputs_search(self, text=None, model=None, lora=None, sampler=None, seed=None, limit=50):
+        """Search outputs by prompt text, model, LoRA, sampler or seed."""
+        prompt_index = self.supervisor.prompt_index
+        if prompt_index is None:
+            raise ValueError("Prompt index is disabled")
+        return await self.blocking(
+            lambda: prompt_index.search(text, model, lora, sampler, seed, limit)
+        )
+
+    async def rpc_thumbnails_get(self, paths):
+        """Get thumbnail paths for output files, generating misses."""
+        results = await self.blocking(self.supervisor.thumbnail_cache.generate, list(paths))
+        return {source: str(thumb) for source, thumb in results.items()}
+
+    async def rpc_archive_stats(self):
+        """Get archiver totals and bytes saved over the last hour."""
+        if self.supervisor.archiver is None:
+            raise ValueError("Archiver is disabled")
+        return self.supervisor.archiver.stats()
+
+    async def rpc_archive_run(self, limit=None):
+        """Start an archiver pass now."""
+        if self.supervisor.archiver is None:
+            raise ValueError("Archiver is disabled")
+        return self.supervisor.archiver.run_in_background(limit)
+
+    async def rpc_advisor_recommend(self, workflow=None):
+        """Recommend a memory mode for a workflow, or for the latest output's."""
+        if workflow is not None and not isinstance(workflow, dict):
+            raise ValueError("workflow must be a JSON object")
+        return await self.blocking(self.supervisor.advisor.recommend, workflow)
+
+    async def rpc_prefetch_status(self):
+        """Get the last prefetch run and page-cache residency of the selected models."""
+        if self.supervisor.prefetcher is None:
+            raise ValueError("Prefetch is disabled")
+        return await self.blocking(self.supervisor.prefetcher.status)
+
+    async def rpc_prefetch_run(self, paths=None):
+        """Start prefetching the selected models, or the given files."""
+        if self.supervisor.prefetcher is None:
+            raise ValueError("Prefetch is disabled")
+        return self.supervisor.prefetcher.run_in_background(paths)
+
+    async def rpc_queue_status(self):
+        """Get ComfyUI's queue depth, running prompt and progress."""
+        if self.supervisor.queue_monitor is None:
+            raise ValueError("Queue monitor is disabled")
+        return self.supervisor.queue_monitor.snapshot()
+
+    async def rpc_queue_eta(self):
+        """Estimate when each queued prompt and the whole queue will finish."""
+        monitor = self.supervisor.queue_monitor
+        if monitor is None or monitor.timings is None:
+            raise ValueError("Queue ETAs need the queue monitor and timings enabled")
+        return await self.blocking(monitor.eta)
+
+    async def rpc_timings_stats(self):
+        """Get recorded timing counts and the slowest node classes."""
+        if self.supervisor.timings is None:
+            raise ValueError("Timings are disabled")
+        return await self.blocking(self.supervisor.timings.database.summary)
+
+    async def rpc_warmup_status(self, limit=20):
+        """Get the current launch's warm-up state and the recorded launches."""
+        from .warmup import launch_history
+        history = await self.blocking(launch_history, limit)
+        return {"current": self.supervisor.warmup.status(), "history": history}
+
+    async def rpc_warmup_run(self):
+        """Run the warm-up workflows again on the running ComfyUI."""
+        if not self.supervisor.process_manager.is_running():
+            raise ValueError("ComfyUI is not running")
+        return {"started": self.supervisor.warmup.rerun()}
+
+    async def rpc_workflow_validate(self, prompt):
+        """Check an API-format prompt against ComfyUI's node schema and the models on disk."""
+        from .comfy_api import ComfyAPIError
+        if not isinstance(prompt, dict):
+            raise ValueError("prompt must be a JSON object")
+        validator = self.supervisor.validator
+        try:
+            await self.blocking(validator.load_blocking)
+        except ComfyAPIError as e:
+            raise ValueError(f"Cannot read ComfyUI's node schema: {e}")
+        return validator.validate(prompt)
+
+    def get_scheduler(self):
+        """Get the scheduler, or raise if it is disabled."""
+        if self.supervisor.scheduler is None:
+            raise ValueError("Scheduler is disabled")
+        return self.supervisor.scheduler
+
+    async def rpc_scheduler_submit(self, prompt, user="default", priority="batch", extra_data=None):
+        """Hold a prompt for fair-share dispatch to ComfyUI, rejecting invalid ones."""
+        from .comfy_api import ComfyAPIError
+        from .validator import format_errors
+        scheduler = self.get_scheduler()
+        if self.supervisor.config.get("validate_prompts", True) and isinstance(prompt, dict):
+            validator = self.supervisor.validator
+            try:
+                await self.blocking(validator.load_blocking)
+                errors = validator.validate(prompt)
+            except ComfyAPIError as e:
+                # ComfyUI is down; the scheduler holds the job until it is back
+                logging.debug(f"Skipping validation: {e}")
+                errors = []
+            if errors:
+                raise ValueError(f"Invalid workflow: {format_errors(errors)}")
+        return scheduler.submit(prompt, user, priority, extra_data)
+
+    async def rpc_scheduler_status(self):
+        """Get held jobs, per-user backlog and per-class latency percentiles."""
+        return self.get_scheduler().status()
+
+    async def rpc_scheduler_job(self, job_id):
+        """Get one scheduler job."""
+        job = self.get_scheduler().job(job_id)
+        if job is None:
+            raise ValueError(f"Unknown job: {job_id}")
+        return job
+
+    async def rpc_scheduler_cancel(self, job_id):
+        """Cancel a job that has not started."""
+        return self.get_scheduler().cancel(job_id)
+
+    async def rpc_cache_stats(self):
+        """Get size, quota and in-use bytes for every cache."""
+        return await self.blocking(self.supervisor.cache_manager.measure)
+
+    async def rpc_cache_enforce(self):
+        """Start evicting caches down to their quotas."""
+        return self.supervisor.cache_manager.run_in_background("enforce")
+
+    async def rpc_cache_clear(self, names=None):
+        """Start clearing the given caches (default: all)."""
+        cache_manager = self.supervisor.cache_manager
+        unknown = set(names or ()) - set(cache_manager.caches())
+        if unknown:
+            raise ValueError(f"Unknown cache: {', '.join(sorted(unknown))}")
+        return cache_manager.run_in_background("clear", names)
+
+    async def rpc_cache_progress(self):
+        """Get the progress of the current cache job."""
+        return self.supervisor.cache_manager.progress
+
+    async def rpc_start(self, mode=None):
+        """Start ComfyUI."""
+        check_mode(mode)
+        return await self.blocking(self.supervisor.start, mode)
+
+    async def rpc_stop(self):
+        """Stop ComfyUI."""
+        return await self.blocking(self.supervisor.stop)
+
+    async def rpc_restart(self, mode=None):
+        """Restart ComfyUI."""
+        check_mode(mode)
+        return await self.blocking(self.supervisor.restart, mode)
+
+    async def rpc_set_mode(self, mode):
+        """Set and save the startup memory mode."""
+        check_mode(mode)
+        self.supervisor.config.set("startup_mode", mode)
+        return await self.blocking(self.supervisor.config.save)
+
+    async def rpc_shutdown(self):
+        """Stop the daemon."""
+        self.supervisor.stop_event.set()
+        return True
+
+
+def check_mode(mode):
+    """Validate a memory mode parameter."""
+    if mode is not None and mode not in MODES:
+        raise ValueError(f"Unknown memory mode: {mode}")
+
+
+def error_response(request_id, code, message):
+    """Build a JSON-RPC error response."""
+    return {"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}}
+
+
+def socket_in_use(socket_path):
+    """Check whether something is accepting connections on the socket."""
+    import socket
+
+    if not os.path.exists(socket_path):
+        return False
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+        return True
+    except OSError:
+        return False
+    finally:
+        sock.close()
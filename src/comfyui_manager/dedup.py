@@ -0,0 +1,294 @@
+"""
+Duplicate and near-duplicate detection for ComfyUI outputs
+
+Stage one groups byte-identical files: only files sharing a size are
+hashed, in parallel, through a HashCache. Stage two computes a 64-bit
+perceptual hash (dHash or pHash) of every remaining image in niced worker
+processes and finds Hamming-distance neighbours with multi-index hashing:
+the hash is split into m chunks, and by the pigeonhole principle any pair
+within distance r agrees to within r // m bits on at least one chunk, so
+only those buckets are compared.
+"""
+
+import os
+import math
+import time
+import logging
+from collections import defaultdict
+from itertools import combinations
+from pathlib import Path
+
+from .hashing import HashCache
+from .thumbnails import lower_priority
+from .utils import get_app_dir
+
+HASH_BITS = 64
+
+try:
+    popcount = int.bit_count
+except AttributeError:
+    # Python < 3.10
+    def popcount(value):
+        return bin(value).count("1")
+
+
+def load_gray(path, size):
+    """Decode an image as grayscale at ``size``, using JPEG draft decoding when possible."""
+    from PIL import Image
+
+    with Image.open(path) as img:
+        img.draft("L", (size[0] * 4, size[1] * 4))
+        img = img.convert("L")
+        factor = min(img.width // (size[0] * 4), img.height // (size[1] * 4))
+        if factor >= 2:
+            img = img.reduce(factor)
+        return list(img.resize(size, Image.BILINEAR).getdata())
+
+
+def dhash(path):
+    """Difference hash: compare horizontally adjacent pixels of a 9x8 thumbnail."""
+    pixels = load_gray(path, (9, 8))
+    value = 0
+    for row in range(8):
+        offset = row * 9
+        for col in range(8):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return f"{value:016x}"
+
+
+# Cosine table for the 8 lowest frequencies of a 32-point DCT
+DCT_TABLE = [[math.cos(math.pi * (2 * x + 1) * u / 64) for x in range(32)] for u in range(8)]
+
+
+def phash(path):
+    """Perceptual hash: signs of the low-frequency DCT of a 32x32 thumbnail vs their median."""
+    pixels = load_gray(path, (32, 32))
+    rows = [pixels[y * 32:(y + 1) * 32] for y in range(32)]
+
+    # Separable DCT, keeping only the 8x8 low-frequency block
+    partial = [[sum(c * p for c, p in zip(DCT_TABLE[u], row)) for row in rows] for u in range(8)]
+    coefficients = [sum(c * p for c, p in zip(DCT_TABLE[v], partial[u])) for u in range(8) for v in range(8)]
+
+    # Ignore the DC term when picking the threshold
+    median = sorted(coefficients[1:])[31]
+    value = 0
+    for coefficient in coefficients:
+        value = (value << 1) | (coefficient > median)
+    return f"{value:016x}"
+
+
+PERCEPTUAL_HASHES = {"dhash": dhash, "phash": phash}
+
+
+class MultiIndexHash:
+    """Hamming-distance neighbour search over 64-bit hashes.
+
+    The chunk count is picked for the expected number of hashes: fewer,
+    wider chunks mean more bucket probes per query but emptier buckets.
+    """
+
+    def __init__(self, max_distance, expected=100000):
+        self.max_distance = max_distance
+        self.chunks = choose_chunks(max_distance, expected)
+        self.chunk_radius = max_distance // self.chunks
+
+        # (shift, mask, XOR masks within chunk_radius) per chunk
+        self.layout = []
+        shift = 0
+        for i in range(self.chunks):
+            width = HASH_BITS // self.chunks + (1 if i < HASH_BITS % self.chunks else 0)
+            flips = [0]
+            for radius in range(1, self.chunk_radius + 1):
+                for bits in combinations(range(width), radius):
+                    flip = 0
+                    for bit in bits:
+                        flip |= 1 << bit
+                    flips.append(flip)
+            self.layout.append((shift, (1 << width) - 1, flips))
+            shift += width
+
+        self.tables = [defaultdict(list) for _ in range(self.chunks)]
+        self.hashes = []
+
+    def split(self, value):
+        """Cut a hash into its chunk values."""
+        return [(value >> shift) & mask for shift, mask, _ in self.layout]
+
+    def add(self, value):
+        """Insert a hash and return its id."""
+        item = len(self.hashes)
+        self.hashes.append(value)
+        for table, key in zip(self.tables, self.split(value)):
+            table[key].append(item)
+        return item
+
+    def neighbours(self, value, exclude=None):
+        """Get ids of stored hashes within max_distance of ``value``."""
+        candidates = set()
+        for table, (shift, mask, flips) in zip(self.tables, self.layout):
+            key = (value >> shift) & mask
+            for flip in flips:
+                bucket = table.get(key ^ flip)
+                if bucket:
+                    candidates.update(bucket)
+        candidates.discard(exclude)
+        hashes = self.hashes
+        limit = self.max_distance
+        return [item for item in candidates if popcount(hashes[item] ^ value) <= limit]
+
+    def pairs(self):
+        """Yield every (i, j) with i < j within max_distance."""
+        for item, value in enumerate(self.hashes):
+            for other in self.neighbours(value, exclude=item):
+                if other > item:
+                    yield item, other
+
+
+def choose_chunks(max_distance, expected):
+    """Pick the chunk count with the fewest probes plus expected candidates per query."""
+    best = None
+    for chunks in range(1, HASH_BITS // 8 + 1):
+        width = HASH_BITS // chunks
+        if width > 32:
+            continue
+        radius = max_distance // chunks
+        probes = chunks * sum(math.comb(width, r) for r in range(radius + 1))
+        cost = probes * (1 + expected / 2 ** width)
+        if best is None or cost < best[0]:
+            best = (cost, chunks)
+    return best[1]
+
+
+class UnionFind:
+    """Disjoint sets for grouping neighbour pairs."""
+
+    def __init__(self, size):
+        self.parent = list(range(size))
+
+    def find(self, item):
+        """Get the representative of an item's set."""
+        parent = self.parent
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+
+    def union(self, a, b):
+        """Merge two sets."""
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            self.parent[root_b] = root_a
+
+    def groups(self):
+        """Get lists of members for sets with more than one member."""
+        members = defaultdict(list)
+        for item in range(len(self.parent)):
+            members[self.find(item)].append(item)
+        return [group for group in members.values() if len(group) > 1]
+
+
+class DuplicateFinder:
+    """Finds exact and perceptual duplicates among output files."""
+
+    def __init__(self, cache_dir, method="dhash", max_distance=4, workers=None, niceness=10):
+        self.cache_dir = Path(cache_dir)
+        self.method = method
+        self.max_distance = max_distance
+        self.content_hashes = HashCache(self.cache_dir / "sha256.json", workers=workers)
+        self.perceptual_hashes = HashCache(
+            self.cache_dir / f"{method}.json",
+            algorithm=method,
+            hasher=PERCEPTUAL_HASHES[method],
+            processes=True,
+            workers=workers or max(1, (os.cpu_count() or 2) // 2),
+            initializer=lower_priority,
+            initargs=(niceness,),
+        )
+
+    @classmethod
+    def from_config(cls, config):
+        """Create a finder from configuration."""
+        return cls(
+            get_app_dir() / "cache" / "dedup",
+            method=config.get("dedup_method", "dhash"),
+            max_distance=config.get("dedup_max_distance", 4),
+            workers=config.get("dedup_workers") or None,
+        )
+
+    def find(self, files, similar=True):
+        """Group duplicates among {path: (size, mtime)}.
+
+        Returns {"exact": [group], "similar": [group], "reclaimable_bytes",
+        "seconds"}, where each group is {"keep", "duplicates",
+        "reclaimable_bytes"}. Exact groups keep the oldest copy; similar
+        groups keep the largest file.
+        """
+        start = time.perf_counter()
+        exact = self.find_exact(files)
+
+        similar_groups = []
+        if similar:
+            # One representative per exact group is enough for stage two
+            duplicates = {path for group in exact for path in group["duplicates"]}
+            similar_groups = self.find_similar({p: e for p, e in files.items() if p not in duplicates})
+
+        self.content_hashes.save()
+        self.perceptual_hashes.save()
+
+        report = {
+            "exact": exact,
+            "similar": similar_groups,
+            "reclaimable_bytes": sum(g["reclaimable_bytes"] for g in exact + similar_groups),
+            "seconds": round(time.perf_counter() - start, 3),
+        }
+        logging.info(
+            f"Duplicate scan: {len(exact)} exact and {len(similar_groups)} similar groups, "
+            f"{report['reclaimable_bytes'] / (1024 * 1024):.1f} MB reclaimable in {report['seconds']} s"
+        )
+        return report
+
+    def find_exact(self, files):
+        """Stage one: byte-identical files, hashing only sizes that collide."""
+        by_size = defaultdict(list)
+        for path, (size, mtime) in files.items():
+            if size > 0:
+                by_size[size].append(path)
+        candidates = [path for paths in by_size.values() if len(paths) > 1 for path in paths]
+
+        by_digest = defaultdict(list)
+        for path, digest in self.content_hashes.hash_files(candidates).items():
+            by_digest[digest].append(path)
+
+        groups = []
+        for paths in by_digest.values():
+            if len(paths) > 1:
+                paths.sort(key=lambda p: files[p][1])
+                groups.append(make_group(paths[0], paths[1:], files))
+        return groups
+
+    def find_similar(self, files):
+        """Stage two: perceptual hashes within max_distance, grouped transitively."""
+        hashes = self.perceptual_hashes.hash_files(list(files))
+        paths = list(hashes)
+        index = MultiIndexHash(self.max_distance, expected=len(paths))
+        for path in paths:
+            index.add(int(hashes[path], 16))
+
+        sets = UnionFind(len(paths))
+        for a, b in index.pairs():
+            sets.union(a, b)
+
+        groups = []
+        for members in sets.groups():
+            group_paths = sorted((paths[i] for i in members), key=lambda p: files[p][0], reverse=True)
+            groups.append(make_group(group_paths[0], group_paths[1:], files))
+        return groups
+
+
+def make_group(keep, duplicates, files):
+    """Build a report group."""
+    return {
+        "keep": keep,
+        "duplicates": duplicates,
+        "reclaimable_bytes": sum(files[p][0] for p in duplicates),
+    }
@@ -8,19 +8,23 @@ import logging
 from pathlib import Path
 import webbrowser
 import sys
+import os
+import threading
 
 from .widgets.dialogs import AboutDialog, SettingsDialog
 from .widgets.widgets import StatusBar, SystemMonitor
-from .process_manager import ProcessManager
-from .system_monitor import SystemMonitorThread
+from .supervisor import Supervisor
 
 class ComfyUIManager:
     """Main application window."""
     
     def __init__(self, config):
         self.config = config
-        self.process_manager = ProcessManager(config)
-        self.system_monitor = SystemMonitorThread(config)
+        
+        # The GUI is one client of the headless supervisor
+        self.supervisor = Supervisor(config)
+        self.process_manager = self.supervisor.process_manager
+        self.system_monitor = self.supervisor.system_monitor
         
         self.root = None
         self.notebook = None
@@ -67,6 +71,9 @@ class ComfyUIManager:
         main_frame.columnconfigure(0, weight=1)
         main_frame.rowconfigure(1, weight=1)
         
+        # The dashboard subscribes to queue events, so follow them first
+        self.supervisor.start_queue_monitor()
+        
         # Create notebook for tabs
         self.create_notebook(main_frame)
         
@@ -74,8 +81,15 @@ class ComfyUIManager:
         self.status_bar = StatusBar(main_frame)
         self.status_bar.grid(row=2, column=0, sticky=(tk.W, tk.E), pady=(10, 0))
         
-        # Start system monitor
-        self.system_monitor.start()
+        # Start system monitor and the local control API
+        self.supervisor.start_monitor()
+        self.supervisor.start_output_index()
+        self.supervisor.start_prompt_index()
+        self.supervisor.start_archiver()
+        self.supervisor.start_prefetcher()
+        self.supervisor.start_scheduler()
+        self.supervisor.start_cache_enforcer()
+        self.supervisor.start_control_server()
         self.root.after(1000, self.update_monitor)
     
     def create_notebook(self, parent):
@@ -93,7 +107,14 @@ class ComfyUIManager:
     def create_dashboard_tab(self):
         """Create dashboard tab."""
         from .widgets.widgets import DashboardTab
-        dashboard = DashboardTab(self.notebook, self.config, self.process_manager)
+        dashboard = DashboardTab(
+            self.notebook,
+            self.config,
+            self.process_manager,
+            self.supervisor.output_index,
+            self.supervisor.cache_manager,
+            self.supervisor.queue_monitor
+        )
         self.notebook.add(dashboard, text="📊 Dashboard")
     
     def create_control_tab(self):
@@ -137,6 +158,8 @@ class ComfyUIManager:
         menubar.add_cascade(label="Tools", menu=tools_menu)
         tools_menu.add_command(label="Clear Cache", command=self.clear_cache)
         tools_menu.add_command(label="Backup Workflows", command=self.backup_workflows)
+        tools_menu.add_command(label="Model Inventory", command=self.open_models)
+        tools_menu.add_command(label="Batch Sweep", command=self.open_sweep)
         tools_menu.add_command(label="Open Outputs", command=self.open_outputs)
         
         # Settings menu
@@ -233,22 +256,47 @@ class ComfyUIManager:
         webbrowser.open(f"http://localhost:{port}")
     
     def clear_cache(self):
-        """Clear system cache."""
-        from .widgets.dialogs import confirmation_dialog
-        if confirmation_dialog(self.root, "Clear Cache", "Clear all cache files?"):
-            success = self.process_manager.clear_cache()
-            if success:
-                logging.info("Cache cleared successfully")
-            else:
-                logging.error("Failed to clear cache")
+        """Show cache usage and cleanup."""
+        from .widgets.dialogs import CacheDialog
+        CacheDialog(self.root, self.supervisor.cache_manager)
     
     def backup_workflows(self):
-        """Backup workflows."""
-        success = self.process_manager.backup_workflows()
-        if success:
-            logging.info("Workflows backed up successfully")
-        else:
-            logging.error("Failed to backup workflows")
+        """Snapshot ComfyUI workflows in the background."""
+        from .backup import BackupEngine
+        from .widgets.dialogs import info_dialog
+        
+        def worker():
+            try:
+                summary = BackupEngine.from_config(self.config).backup()
+            except Exception as e:
+                logging.error(f"Failed to backup workflows: {e}")
+                summary = None
+            self.root.after(0, lambda: show_result(summary))
+        
+        def show_result(summary):
+            if summary is None:
+                info_dialog(self.root, "Backup Workflows", "Backup failed, see the log for details")
+            elif summary["created"]:
+                info_dialog(self.root, "Backup Workflows",
+                            f"Snapshot {summary['snapshot']}: {summary['files']} workflows, "
+                            f"{summary['new_objects']} new or changed")
+            else:
+                info_dialog(self.root, "Backup Workflows",
+                            f"No changes since snapshot {summary['snapshot']}")
+        
+        self.status_bar.set_text("Backing up workflows...")
+        threading.Thread(target=worker, daemon=True).start()
+    
+    def open_models(self):
+        """Show the model inventory."""
+        from .model_inventory import ModelInventory
+        from .widgets.dialogs import ModelsDialog
+        ModelsDialog(self.root, ModelInventory.from_config(self.config))
+    
+    def open_sweep(self):
+        """Start or resume a batch parameter sweep."""
+        from .widgets.dialogs import SweepDialog
+        SweepDialog(self.root, self.config)
     
     def open_outputs(self):
         """Open outputs directory."""
@@ -304,12 +352,8 @@ class ComfyUIManager:
             ):
                 return
         
-        # Stop system monitor
-        self.system_monitor.stop()
-        
-        # Stop ComfyUI if running
-        if self.process_manager.is_running():
-            self.process_manager.stop()
+        # Stop ComfyUI and the system monitor
+        self.supervisor.shutdown()
         
         # Save configuration
         self.config.save()
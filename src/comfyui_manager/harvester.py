@@ -0,0 +1,291 @@
+"""
+Result harvester for finished prompts
+
+Collects the output files of finished prompts (a sweep's, given prompt
+ids, or whatever ComfyUI finishes next) into one folder with a manifest.
+Files ComfyUI wrote to the local output directory are hard-linked (or
+symlinked across filesystems); anything else is streamed from /view to
+disk in chunks, a bounded number at a time, so large images never sit in
+memory whole. Sweep results go in one folder per parameter combination.
+"""
+
+import os
+import re
+import json
+import time
+import asyncio
+import logging
+from pathlib import Path
+
+from .comfy_api import ComfyAPIError, ComfyClient
+
+MODES = ("auto", "link", "download")
+
+# Output lists in /history entries that hold files
+FILE_KEYS = ("images", "gifs", "videos", "audio", "files")
+
+
+def default_harvest_dir(config):
+    """Get the configured harvest directory, or <base_dir>/harvest."""
+    base_dir = Path(config.get("base_dir", str(Path.home())))
+    return Path(config.get("harvest_dir") or base_dir / "harvest")
+
+
+def output_files(history_entry, include_temp=False):
+    """Get the {"filename", "subfolder", "type", "node"} outputs of a /history entry."""
+    files = []
+    for node_id, output in (history_entry.get("outputs") or {}).items():
+        for key in FILE_KEYS:
+            for item in output.get(key) or []:
+                if not isinstance(item, dict) or "filename" not in item:
+                    continue
+                if item.get("type", "output") == "temp" and not include_temp:
+                    continue
+                files.append({"filename": item["filename"], "subfolder": item.get("subfolder", ""),
+                              "type": item.get("type", "output"), "node": node_id})
+    return files
+
+
+def param_dirname(params):
+    """Folder name for a parameter combination, e.g. ``seed=3_cfg=7.5``."""
+    short = [key.rpartition(".")[2] for key in params]
+    # Fall back to full keys when two nodes share an input name
+    names = short if len(set(short)) == len(short) else list(params)
+    parts = [f"{name}={value}" for name, value in zip(names, params.values())]
+    return re.sub(r"[^\w.=+,-]+", "-", "_".join(parts))[:200] or "default"
+
+
+class Harvester:
+    """Copies finished prompts' outputs into ``dest/<collection>`` with a manifest."""
+
+    def __init__(self, config, dest=None, mode="auto", concurrency=None):
+        if mode not in MODES:
+            raise ValueError(f"Unknown harvest mode: {mode}")
+        self.config = config
+        self.dest = Path(dest) if dest else default_harvest_dir(config)
+        self.mode = mode
+        self.concurrency = concurrency or config.get("harvest_concurrency", 4)
+        self.output_dir = config.get("output_dir") or ""
+        self.client = None
+        self.slots = None
+        self.activity = None
+        self.prompt_cache = None
+        self.stats = {"prompts": 0, "files": 0, "bytes": 0, "downloaded": 0, "linked": 0, "errors": 0}
+
+    def open(self):
+        """Create the client; call inside the event loop."""
+        if self.client is None:
+            self.client = ComfyClient.from_config(self.config, pool_size=self.concurrency, timeout=300.0)
+            self.slots = asyncio.Semaphore(self.concurrency)
+
+    async def close(self):
+        """Close the client."""
+        if self.client is not None:
+            await self.client.close()
+            self.client = None
+
+    def load_manifest(self, collection):
+        """Read a collection's manifest, or start an empty one."""
+        path = self.dest / collection / "manifest.json"
+        try:
+            return json.loads(path.read_text())
+        except (OSError, ValueError):
+            return {"collection": collection, "created": time.time(), "items": {}}
+
+    def save_manifest(self, collection, manifest):
+        """Atomically write a collection's manifest."""
+        directory = self.dest / collection
+        directory.mkdir(parents=True, exist_ok=True)
+        manifest["updated"] = time.time()
+        tmp_path = directory / "manifest.tmp"
+        tmp_path.write_text(json.dumps(manifest, indent=1))
+        os.replace(tmp_path, directory / "manifest.json")
+
+    async def harvest(self, collection, prompts):
+        """Harvest ``prompts`` ({prompt_id: {"params", "index"}}) not already in the manifest.
+
+        Returns the number of prompts harvested.
+        """
+        self.open()
+        manifest = self.load_manifest(collection)
+        todo = {prompt_id: info for prompt_id, info in prompts.items() if prompt_id not in manifest["items"]}
+        if not todo:
+            return 0
+
+        results = await asyncio.gather(*(self.harvest_prompt(collection, prompt_id, info)
+                                         for prompt_id, info in todo.items()))
+        harvested = 0
+        for prompt_id, item in zip(todo, results):
+            if item is not None:
+                manifest["items"][prompt_id] = item
+                harvested += 1
+        self.save_manifest(collection, manifest)
+        self.stats["prompts"] += harvested
+        return harvested
+
+    async def harvest_prompt(self, collection, prompt_id, info):
+        """Fetch one prompt's history and collect its files; None if not finished."""
+        if info.get("cache_key"):
+            return self.harvest_cached(collection, info)
+        async with self.slots:
+            try:
+                entry = (await self.client.get_history(prompt_id)).get(prompt_id)
+            except ComfyAPIError as e:
+                logging.warning(f"Cannot read history of {prompt_id}: {e}")
+                self.stats["errors"] += 1
+                return None
+        if entry is None:
+            return None
+
+        params = info.get("params") or {}
+        folder = self.dest / collection / (param_dirname(params) if params else prompt_id)
+        folder.mkdir(parents=True, exist_ok=True)
+        files = await asyncio.gather(*(self.collect(output, folder) for output in output_files(entry)))
+        return {
+            "index": info.get("index"),
+            "params": params,
+            "status": entry.get("status", {}).get("status_str"),
+            "files": [f for f in files if f is not None],
+        }
+
+    def harvest_cached(self, collection, info):
+        """Link a prompt answered from the prompt cache; None if the entry is gone."""
+        if self.prompt_cache is None:
+            from .prompt_cache import PromptCache
+            self.prompt_cache = PromptCache.from_config(self.config)
+        entry = self.prompt_cache.read_entry(info["cache_key"])
+        if entry is None:
+            return None
+
+        params = info.get("params") or {}
+        folder = self.dest / collection / (param_dirname(params) if params else entry["prompt_id"])
+        folder.mkdir(parents=True, exist_ok=True)
+        files = []
+        for output in entry["files"]:
+            target = folder / output["filename"]
+            try:
+                if target.exists():
+                    target.unlink()
+                os.link(Path(entry["dir"], output["name"]), target)
+            except OSError as e:
+                logging.warning(f"Cannot link cached {output['filename']}: {e}")
+                self.stats["errors"] += 1
+                continue
+            self.stats["linked"] += 1
+            self.stats["files"] += 1
+            self.stats["bytes"] += output["bytes"]
+            files.append({"filename": output["filename"], "subfolder": output["subfolder"], "type": output["type"],
+                          "node": output["node"], "path": str(target.relative_to(self.dest)),
+                          "bytes": output["bytes"], "method": "cache"})
+        return {"index": info.get("index"), "params": params, "status": "cached", "files": files}
+
+    async def collect(self, output, folder):
+        """Link or download one output file; returns its manifest record."""
+        target = folder / output["filename"]
+        source = Path(self.output_dir, output["subfolder"], output["filename"])
+        local = output["type"] == "output" and self.output_dir and source.is_file()
+        record = dict(output, path=str(target.relative_to(self.dest)))
+
+        if self.mode != "download" and local:
+            try:
+                if target.exists():
+                    target.unlink()
+                try:
+                    os.link(source, target)
+                except OSError:
+                    # Different filesystem
+                    os.symlink(source, target)
+            except OSError as e:
+                logging.warning(f"Cannot link {source}: {e}")
+                self.stats["errors"] += 1
+                return None
+            size = source.stat().st_size
+            self.stats["linked"] += 1
+            record.update(bytes=size, method="link")
+        elif self.mode == "link":
+            logging.warning(f"{output['filename']} is not in the local output directory")
+            self.stats["errors"] += 1
+            return None
+        else:
+            async with self.slots:
+                try:
+                    size = await self.client.download(output["filename"], target, output["subfolder"],
+                                                      output["type"])
+                except (ComfyAPIError, OSError) as e:
+                    logging.warning(f"Cannot download {output['filename']}: {e}")
+                    self.stats["errors"] += 1
+                    return None
+            self.stats["downloaded"] += 1
+            record.update(bytes=size, method="download")
+
+        self.stats["files"] += 1
+        self.stats["bytes"] += size
+        return record
+
+    async def harvest_sweep(self, name, follow=False):
+        """Harvest a sweep's finished prompts; with ``follow``, until the sweep ends."""
+        from .sweep import SUCCESS, sweeps_dir
+
+        path = sweeps_dir() / f"{name}.json"
+        if not path.exists():
+            raise ValueError(f"No sweep named {name!r}")
+        self.open()
+        watcher = asyncio.ensure_future(self.watch_events()) if follow else None
+        try:
+            while True:
+                state = json.loads(path.read_text())
+                done = {item["prompt_id"]: {"params": item["params"], "index": int(index),
+                                            "cache_key": item.get("cache_key")}
+                        for index, item in state["items"].items() if item["status"] == SUCCESS}
+                count = await self.harvest(name, done)
+                if count:
+                    logging.info(f"Harvested {count} prompts of sweep {name}")
+                if not follow or (state["status"] in ("done", "failed", "cancelled") and not count):
+                    break
+                await self.wait_for_activity()
+        finally:
+            if watcher is not None:
+                watcher.cancel()
+        return self.load_manifest(name)
+
+    async def harvest_history(self, collection="history", prompt_ids=None, limit=50, follow=False):
+        """Harvest given prompts, or the latest ``limit`` in /history; ``follow`` keeps going."""
+        self.open()
+        watcher = asyncio.ensure_future(self.watch_events()) if follow else None
+        try:
+            while True:
+                if prompt_ids:
+                    prompts = {prompt_id: {} for prompt_id in prompt_ids}
+                else:
+                    try:
+                        history = await self.client.get_history(max_items=limit)
+                    except ComfyAPIError as e:
+                        if not follow:
+                            raise
+                        logging.debug(f"Harvester: {e}")
+                        history = {}
+                    prompts = {prompt_id: {} for prompt_id in history}
+                await self.harvest(collection, prompts)
+                if not follow:
+                    break
+                await self.wait_for_activity()
+        finally:
+            if watcher is not None:
+                watcher.cancel()
+        return self.load_manifest(collection)
+
+    async def watch_events(self):
+        """Flag queue changes; ComfyUI broadcasts a status message when a prompt finishes."""
+        self.activity = self.activity or asyncio.Event()
+        async for event in self.client.events():
+            if event.get("type") in ("status", "connected", "execution_success"):
+                self.activity.set()
+
+    async def wait_for_activity(self, timeout=10.0):
+        """Wait for a queue change, or ``timeout`` seconds."""
+        self.activity = self.activity or asyncio.Event()
+        try:
+            await asyncio.wait_for(self.activity.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self.activity.clear()
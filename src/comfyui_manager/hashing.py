@@ -0,0 +1,164 @@
+"""
+File hashing with a persistent cache
+
+Files are hashed in a thread pool (hashlib releases the GIL on large
+buffers) and the digests are remembered by path, size and mtime, so a
+file that has not changed is never read again. Any other per-file
+function (perceptual hashes, model headers) can be cached the same way
+by passing it as ``hasher``.
+"""
+
+import os
+import json
+import hashlib
+import logging
+import threading
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from pathlib import Path
+
+from .utils import process_context
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(path, algorithm="sha256"):
+    """Hash a file's contents."""
+    digest = hashlib.new(algorithm)
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def call_hasher(hasher, algorithm, path):
+    """Run one hash in a worker; None if the file cannot be read or decoded."""
+    try:
+        return hasher(path) if hasher is not None else hash_file(path, algorithm)
+    except Exception:
+        return None
+
+
+class HashCache:
+    """Digests keyed on (path, size, mtime), persisted as JSON.
+
+    ``hasher(path)`` replaces the hashlib digest; ``algorithm`` then only
+    names it so a cache file written by another hasher is ignored. CPU-bound
+    hashers should set ``processes=True`` and be module-level functions;
+    ``initializer`` then runs in each worker process.
+    """
+
+    def __init__(self, cache_file, algorithm="sha256", workers=None, hasher=None,
+                 processes=False, initializer=None, initargs=()):
+        self.cache_file = Path(cache_file)
+        self.algorithm = algorithm
+        self.hasher = hasher
+        self.processes = processes
+        self.initializer = initializer
+        self.initargs = initargs
+        self.workers = workers or min(16, (os.cpu_count() or 1) * 2)
+        self.lock = threading.Lock()
+        self.dirty = False
+
+        # path -> [size, mtime_ns, digest]
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self.load()
+
+    def load(self):
+        """Load the cache file, ignoring it if unreadable or for another algorithm."""
+        try:
+            with open(self.cache_file) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("algorithm") == self.algorithm:
+            self.entries = data.get("entries", {})
+
+    def save(self):
+        """Write the cache file atomically if anything changed."""
+        with self.lock:
+            if not self.dirty:
+                return
+            data = {"algorithm": self.algorithm, "entries": self.entries}
+            self.dirty = False
+
+        self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.cache_file.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp_path, self.cache_file)
+
+    def lookup(self, path, stat):
+        """Get the cached digest of a file version, or None."""
+        entry = self.entries.get(path)
+        if entry is not None and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+            return entry[2]
+        return None
+
+    def store(self, path, stat, digest):
+        """Remember the digest of a file version."""
+        with self.lock:
+            self.entries[path] = [stat.st_size, stat.st_mtime_ns, digest]
+            self.dirty = True
+
+    def hash(self, path):
+        """Get a file's digest, hashing it on a miss."""
+        return self.hash_files([path]).get(path)
+
+    def hash_files(self, paths, stats=None):
+        """Return {path: digest}, hashing misses in parallel.
+
+        ``stats`` may map paths to os.stat results already at hand.
+        Unreadable files are left out of the result.
+        """
+        results = {}
+        misses = []
+        for path in paths:
+            path = str(path)
+            try:
+                stat = stats[path] if stats and path in stats else os.stat(path)
+            except OSError:
+                continue
+            digest = self.lookup(path, stat)
+            if digest is None:
+                misses.append((path, stat))
+            else:
+                results[path] = digest
+
+        self.hits += len(results)
+        self.misses += len(misses)
+        if not misses:
+            return results
+
+        if self.processes:
+            pool = ProcessPoolExecutor(self.workers, mp_context=process_context(),
+                                       initializer=self.initializer, initargs=self.initargs)
+            chunksize = max(1, len(misses) // (self.workers * 8))
+        else:
+            pool = ThreadPoolExecutor(self.workers)
+            chunksize = 1
+        task = partial(call_hasher, self.hasher, self.algorithm)
+        with pool:
+            digests = pool.map(task, [path for path, _ in misses], chunksize=chunksize)
+            for (path, stat), digest in zip(misses, digests):
+                if digest is None:
+                    logging.warning(f"Could not hash {path}")
+                    continue
+                self.store(path, stat, digest)
+                results[path] = digest
+        return results
+
+    def retain(self, paths):
+        """Forget every entry not in ``paths``."""
+        keep = {str(p) for p in paths}
+        with self.lock:
+            stale = [p for p in self.entries if p not in keep]
+            for path in stale:
+                del self.entries[path]
+            if stale:
+                self.dirty = True
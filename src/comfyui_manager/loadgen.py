@@ -0,0 +1,312 @@
+"""
+Synthetic load generator for ComfyUI
+
+Simulated clients, each with its own client id and websocket, submit a
+workflow to ComfyUI (or the bundled stub) and time every prompt:
+
+    submit      POST /prompt round trip
+    queue_wait  accepted until execution_start
+    execution   execution_start until execution_success
+    end_to_end  submit sent until execution_success
+
+Open loop (``rate`` set): prompts arrive as a Poisson process at that
+rate whatever ComfyUI manages, which shows where queues start to grow.
+Closed loop: every client waits for its prompt, thinks for
+``think_time`` and submits the next, which measures throughput at a
+fixed concurrency. Seed inputs are randomized so ComfyUI cannot answer
+from its cache.
+"""
+
+import copy
+import html
+import json
+import time
+import uuid
+import random
+import asyncio
+import logging
+
+from .comfy_api import ComfyAPIError, ComfyClient
+
+PHASES = ("submit", "queue_wait", "execution", "end_to_end")
+
+# Inputs randomized per prompt
+SEED_INPUTS = ("seed", "noise_seed")
+
+# Workflow used when none is given; the stub times it by its steps
+DEFAULT_WORKFLOW = {
+    "3": {"class_type": "KSampler", "inputs": {"steps": 20, "seed": 0}},
+    "9": {"class_type": "SaveImage", "inputs": {"filename_prefix": "loadtest"}},
+}
+
+
+def randomize_seeds(prompt, rng):
+    """Copy of a prompt with fresh values in its seed inputs."""
+    prompt = copy.deepcopy(prompt)
+    for node in prompt.values():
+        inputs = node.get("inputs") or {}
+        for name in SEED_INPUTS:
+            if isinstance(inputs.get(name), int):
+                inputs[name] = rng.randrange(2 ** 48)
+    return prompt
+
+
+def summarize(values):
+    """Count, mean and p50/p95/p99/max of durations in seconds."""
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+
+    def rank(fraction):
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * fraction))], 4)
+
+    return {"count": len(ordered), "mean": round(sum(ordered) / len(ordered), 4), "p50": rank(0.5),
+            "p95": rank(0.95), "p99": rank(0.99), "max": round(ordered[-1], 4)}
+
+
+class SimulatedClient:
+    """One client: a ComfyUI connection and the prompts it is waiting for."""
+
+    def __init__(self, host, port, index):
+        self.index = index
+        self.client = ComfyClient(host, port, client_id=uuid.uuid4().hex, pool_size=2, timeout=60.0)
+        self.waiting = {}
+        self.connected = asyncio.Event()
+        self.events = None
+
+    async def follow(self):
+        """Complete prompts from this client's execution messages."""
+        async for event in self.client.events():
+            kind = event.get("type")
+            if kind == "connected":
+                self.connected.set()
+                continue
+            data = event.get("data") or {}
+            record = self.waiting.get(data.get("prompt_id"))
+            if record is None:
+                continue
+            now = time.perf_counter()
+            if kind == "execution_start":
+                record["started"] = now
+            elif kind == "execution_success":
+                record.update(finished=now, status="completed")
+                self.waiting.pop(data["prompt_id"])["done"].set()
+            elif kind in ("execution_error", "execution_interrupted"):
+                record.update(finished=now, status="failed", message=data.get("exception_message") or kind)
+                self.waiting.pop(data["prompt_id"])["done"].set()
+
+
+class LoadGenerator:
+    """Drives simulated clients against one ComfyUI and collects per-prompt timings."""
+
+    def __init__(self, host, port, workflow=None, clients=4, rate=None, duration=30.0, max_prompts=None,
+                 think_time=0.0, drain_timeout=120.0, seed=None):
+        self.host = host
+        self.port = port
+        self.workflow = workflow or DEFAULT_WORKFLOW
+        self.clients = max(1, clients)
+        self.rate = rate
+        self.duration = duration
+        self.max_prompts = max_prompts
+        self.think_time = think_time
+        self.drain_timeout = drain_timeout
+        self.rng = random.Random(seed)
+        self.records = []
+        self.started = None
+
+    @property
+    def mode(self):
+        """"open" with an arrival rate, else "closed"."""
+        return "open" if self.rate else "closed"
+
+    def more(self):
+        """Check whether another prompt may be submitted."""
+        if self.max_prompts is not None and len(self.records) >= self.max_prompts:
+            return False
+        return time.perf_counter() - self.started < self.duration
+
+    async def submit(self, simulated):
+        """Submit one prompt and register it; returns its record."""
+        prompt = randomize_seeds(self.workflow, self.rng)
+        record = {"client": simulated.index, "sent": time.perf_counter(), "status": "submitted",
+                  "done": asyncio.Event()}
+        self.records.append(record)
+        # Register before sending so an instant execution_start is not missed
+        prompt_id = str(uuid.uuid4())
+        simulated.waiting[prompt_id] = record
+        try:
+            response = await simulated.client.queue_prompt(prompt, prompt_id=prompt_id)
+        except ComfyAPIError as e:
+            simulated.waiting.pop(prompt_id, None)
+            record.update(accepted=time.perf_counter(), status="rejected", message=str(e))
+            record["done"].set()
+            return record
+        record["accepted"] = time.perf_counter()
+        if response["prompt_id"] != prompt_id and record["status"] == "submitted":
+            # Older ComfyUI assigns its own ids
+            simulated.waiting[response["prompt_id"]] = simulated.waiting.pop(prompt_id)
+        record["prompt_id"] = response["prompt_id"]
+        return record
+
+    async def run_open(self, simulated):
+        """Poisson arrivals at ``rate`` per second, spread round-robin over the clients."""
+        pending = []
+        next_arrival = time.perf_counter()
+        turn = 0
+        while self.more():
+            # Submissions only reach self.records once they run, so count the scheduled ones too
+            if self.max_prompts is not None and turn >= self.max_prompts:
+                break
+            delay = next_arrival - time.perf_counter()
+            # Yield even when behind schedule so submissions and events keep running
+            await asyncio.sleep(max(0.0, delay))
+            pending.append(asyncio.ensure_future(self.submit(simulated[turn % len(simulated)])))
+            turn += 1
+            next_arrival += self.rng.expovariate(self.rate)
+        records = await asyncio.gather(*pending)
+        await self.drain(records)
+
+    async def run_closed(self, simulated):
+        """Each client submits, waits for its prompt, thinks, and repeats."""
+        async def loop(client):
+            while self.more():
+                record = await self.submit(client)
+                await self.drain([record])
+                if self.think_time:
+                    await asyncio.sleep(self.think_time)
+
+        await asyncio.gather(*(loop(client) for client in simulated))
+
+    async def drain(self, records):
+        """Wait for prompts to finish, up to the drain timeout."""
+        try:
+            await asyncio.wait_for(asyncio.gather(*(record["done"].wait() for record in records)),
+                                   self.drain_timeout)
+        except asyncio.TimeoutError:
+            logging.warning(f"Load test: {sum(not r['done'].is_set() for r in records)} prompts did not finish")
+
+    async def run(self):
+        """Run the load test; returns the report."""
+        simulated = [SimulatedClient(self.host, self.port, index) for index in range(self.clients)]
+        for client in simulated:
+            client.events = asyncio.ensure_future(client.follow())
+        try:
+            await asyncio.wait_for(asyncio.gather(*(client.connected.wait() for client in simulated)), 30.0)
+            self.started = time.perf_counter()
+            if self.mode == "open":
+                await self.run_open(simulated)
+            else:
+                await self.run_closed(simulated)
+            elapsed = time.perf_counter() - self.started
+        finally:
+            for client in simulated:
+                client.events.cancel()
+                await client.client.close()
+            await asyncio.gather(*(client.events for client in simulated), return_exceptions=True)
+        return self.report(elapsed)
+
+    def report(self, elapsed):
+        """Latency percentiles, counts, throughput and a per-second timeline."""
+        phases = {phase: [] for phase in PHASES}
+        counts = dict.fromkeys(("submitted", "completed", "failed", "rejected", "unfinished"), 0)
+        timeline = {}
+        for record in self.records:
+            counts["submitted"] += 1
+            status = record["status"] if record["status"] != "submitted" else "unfinished"
+            counts[status] += 1
+            if "accepted" in record:
+                phases["submit"].append(record["accepted"] - record["sent"])
+            second = int(record["sent"] - self.started)
+            bucket = timeline.setdefault(second, {"t": second, "submitted": 0, "completed": 0, "end_to_end": []})
+            bucket["submitted"] += 1
+            if status != "completed":
+                continue
+            if "started" in record:
+                phases["queue_wait"].append(max(0.0, record["started"] - record["accepted"]))
+                phases["execution"].append(record["finished"] - record["started"])
+            phases["end_to_end"].append(record["finished"] - record["sent"])
+            second = int(record["finished"] - self.started)
+            bucket = timeline.setdefault(second, {"t": second, "submitted": 0, "completed": 0, "end_to_end": []})
+            bucket["completed"] += 1
+            bucket["end_to_end"].append(record["finished"] - record["sent"])
+
+        return {
+            "target": f"{self.host}:{self.port}",
+            "mode": self.mode,
+            "clients": self.clients,
+            "rate": self.rate,
+            "think_time": self.think_time,
+            "duration_s": self.duration,
+            "elapsed_s": round(elapsed, 3),
+            "counts": counts,
+            "throughput_per_s": round(counts["completed"] / elapsed, 3) if elapsed else 0.0,
+            "latency": {phase: summarize(values) for phase, values in phases.items()},
+            "timeline": [{"t": bucket["t"], "submitted": bucket["submitted"], "completed": bucket["completed"],
+                          "end_to_end_p95": summarize(bucket["end_to_end"]).get("p95")}
+                         for _, bucket in sorted(timeline.items())],
+        }
+
+
+def svg_chart(points, width=720, height=180, color="#3b7dd8"):
+    """Polyline chart of (x, y) points as inline SVG."""
+    points = [(x, y) for x, y in points if y is not None]
+    if not points:
+        return "<p>No data</p>"
+    max_x = max(x for x, _ in points) or 1
+    max_y = max(y for _, y in points) or 1
+    coords = " ".join(f"{x / max_x * (width - 50) + 40:.1f},{height - 20 - y / max_y * (height - 40):.1f}"
+                      for x, y in points)
+    return (f'<svg width="{width}" height="{height}" xmlns="http://www.w3.org/2000/svg">'
+            f'<line x1="40" y1="{height - 20}" x2="{width - 10}" y2="{height - 20}" stroke="#999"/>'
+            f'<line x1="40" y1="20" x2="40" y2="{height - 20}" stroke="#999"/>'
+            f'<text x="2" y="24" font-size="11">{max_y:.3g}</text>'
+            f'<text x="{width - 40}" y="{height - 4}" font-size="11">{max_x}s</text>'
+            f'<polyline fill="none" stroke="{color}" stroke-width="2" points="{coords}"/></svg>')
+
+
+def render_html(report):
+    """Self-contained HTML page for a load test report."""
+    def row(cells, tag="td"):
+        return "<tr>" + "".join(f"<{tag}>{html.escape(str(cell))}</{tag}>" for cell in cells) + "</tr>"
+
+    settings = [("Target", report["target"]), ("Mode", report["mode"]), ("Clients", report["clients"]),
+                ("Arrival rate", f"{report['rate']}/s" if report["rate"] else "-"),
+                ("Duration", f"{report['elapsed_s']} s"), ("Throughput", f"{report['throughput_per_s']}/s")]
+    settings += [(name.capitalize(), count) for name, count in report["counts"].items()]
+    latency = [row(["Phase", "Count", "Mean", "p50", "p95", "p99", "Max"], "th")]
+    for phase, stats in report["latency"].items():
+        latency.append(row([phase] + [stats.get(key, "-") for key in ("count", "mean", "p50", "p95", "p99", "max")]))
+    timeline = report["timeline"]
+    # Raw JSON for scripts; "</" must not end the script element early
+    data = json.dumps(report).replace("</", "<\\/")
+    return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>ComfyUI load test</title>
+<style>body{{font-family:sans-serif;margin:2em}}table{{border-collapse:collapse;margin-bottom:1.5em}}
+td,th{{border:1px solid #ccc;padding:4px 10px;text-align:right}}td:first-child{{text-align:left}}</style>
+</head><body>
+<h1>ComfyUI load test</h1>
+<table>{"".join(row(item) for item in settings)}</table>
+<h2>Latency (seconds)</h2>
+<table>{"".join(latency)}</table>
+<h2>Completed per second</h2>
+{svg_chart([(item["t"], item["completed"]) for item in timeline])}
+<h2>End-to-end p95 by completion second</h2>
+{svg_chart([(item["t"], item["end_to_end_p95"]) for item in timeline], color="#d8613b")}
+<script type="application/json" id="report">{data}</script>
+</body></html>
+"""
+
+
+def format_report(report):
+    """Text summary of a load test report."""
+    counts = report["counts"]
+    rate = f" at {report['rate']}/s" if report["rate"] else ""
+    lines = [f"{report['mode'].capitalize()} loop, {report['clients']} clients{rate} against {report['target']}: "
+             f"{counts['completed']}/{counts['submitted']} completed in {report['elapsed_s']:.1f}s "
+             f"({report['throughput_per_s']:.2f}/s), {counts['failed']} failed, {counts['rejected']} rejected, "
+             f"{counts['unfinished']} unfinished"]
+    for phase, stats in report["latency"].items():
+        if stats["count"]:
+            lines.append(f"  {phase:11} p50 {stats['p50']:8.3f}s  p95 {stats['p95']:8.3f}s  "
+                         f"p99 {stats['p99']:8.3f}s  max {stats['max']:8.3f}s")
+    return "\n".join(lines)
@@ -7,6 +7,7 @@ A GUI application to manage ComfyUI with system monitoring and optimizations.
 import sys
 import os
 import logging
+import multiprocessing
 from pathlib import Path
 
 # Add src to path
@@ -31,6 +32,7 @@ def check_system_requirements():
         print("   On Ubuntu/Debian: sudo apt-get install python3-tk")
         print("   On Fedora: sudo dnf install python3-tkinter")
         print("   On Arch: sudo pacman -S tk")
+        print("   Without a display, run headless: comfyui-manager daemon")
         return False
     
     return True
@@ -61,4 +63,6 @@ def main():
     logging.info("Application closed")
 
 if __name__ == "__main__":
+    # Worker pools do not fork; a frozen build must handle their start-up
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
@@ -0,0 +1,232 @@
+"""
+Inventory of the models under ComfyUI's ``models/`` tree
+
+A safetensors file starts with an 8-byte little-endian length and a JSON
+header describing every tensor, so tensor counts, dtypes and parameter
+counts come from a few KB per file without touching the weights. Headers
+and SHA-256 digests are both kept in HashCaches keyed on size and mtime,
+so after the first pass only new or changed models are read.
+"""
+
+import os
+import json
+import time
+import struct
+import logging
+from collections import defaultdict
+from pathlib import Path
+
+from .hashing import HashCache
+from .utils import get_app_dir
+
+MODEL_EXTENSIONS = {".safetensors", ".sft", ".ckpt", ".pt", ".pth", ".bin", ".gguf"}
+
+# Guard against corrupt length fields
+MAX_HEADER_SIZE = 100 * 1024 * 1024
+
+# Bytes per element for safetensors dtypes
+DTYPE_SIZES = {
+    "F64": 8, "I64": 8, "U64": 8,
+    "F32": 4, "I32": 4, "U32": 4,
+    "F16": 2, "BF16": 2, "I16": 2, "U16": 2,
+    "F8_E4M3": 1, "F8_E5M2": 1, "I8": 1, "U8": 1, "BOOL": 1,
+}
+
+# __metadata__ keys worth showing, as written by kohya and the modelspec tools
+METADATA_KEYS = (
+    "modelspec.architecture", "modelspec.title", "ss_base_model_version",
+    "ss_network_module", "ss_network_dim", "format",
+)
+
+
+# Tensor name prefixes of the parts of a full checkpoint
+COMPONENT_PREFIXES = (
+    ("model.diffusion_model.", "unet"),
+    ("cond_stage_model.", "text_encoder"),
+    ("conditioner.", "text_encoder"),
+    ("text_encoders.", "text_encoder"),
+    ("first_stage_model.", "vae"),
+)
+
+
+def read_safetensors_header(path):
+    """Read the JSON header of a safetensors file."""
+    with open(path, "rb") as f:
+        prefix = f.read(8)
+        if len(prefix) < 8:
+            raise ValueError("File too short")
+        (length,) = struct.unpack("<Q", prefix)
+        if length > MAX_HEADER_SIZE:
+            raise ValueError(f"Header length {length} is not plausible")
+        data = f.read(length)
+    if len(data) < length:
+        raise ValueError("Truncated header")
+    return json.loads(data)
+
+
+def summarize_header(path):
+    """Get tensor count, dtypes and parameter count of a model file.
+
+    Formats other than safetensors only report their format.
+    """
+    suffix = os.path.splitext(path)[1].lower()
+    if suffix not in (".safetensors", ".sft"):
+        return {"format": suffix.lstrip(".")}
+
+    header = read_safetensors_header(path)
+    metadata = header.pop("__metadata__", None) or {}
+    dtypes = defaultdict(int)
+    components = {}
+    parameters = 0
+    for name, tensor in header.items():
+        count = 1
+        for dim in tensor.get("shape", []):
+            count *= dim
+        parameters += count
+        size = count * DTYPE_SIZES.get(tensor.get("dtype"), 0)
+        dtypes[tensor.get("dtype", "?")] += size
+        component = next((c for prefix, c in COMPONENT_PREFIXES if name.startswith(prefix)), "other")
+        totals = components.setdefault(component, [0, 0])
+        totals[0] += count
+        totals[1] += size
+    return {
+        "format": "safetensors",
+        "tensors": len(header),
+        "parameters": parameters,
+        # Bytes of weights per dtype
+        "dtypes": dict(dtypes),
+        # component -> [parameters, bytes]
+        "components": components,
+        "metadata": {k: metadata[k] for k in METADATA_KEYS if k in metadata},
+    }
+
+
+def find_models(root):
+    """List model files under ``root`` as {path: os.stat}, following symlinks."""
+    found = {}
+    for dirpath, dirnames, filenames in os.walk(root, followlinks=True):
+        dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+        for name in filenames:
+            if os.path.splitext(name)[1].lower() not in MODEL_EXTENSIONS:
+                continue
+            path = os.path.join(dirpath, name)
+            try:
+                found[path] = os.stat(path)
+            except OSError:
+                continue
+    return found
+
+
+def configured_models_dir(config):
+    """Get the models directory: ``models_dir`` or ComfyUI's own."""
+    return config.get("models_dir") or os.path.join(config.get("comfyui_path", ""), "models")
+
+
+def model_names(models_dir):
+    """Map the names ComfyUI uses for models to their paths.
+
+    ComfyUI names a model relative to its folder, e.g. "sdxl/base.safetensors"
+    under checkpoints; the bare file name is accepted too.
+    """
+    by_name = {}
+    for path in sorted(find_models(models_dir)):
+        relative = os.path.relpath(path, models_dir)
+        by_name.setdefault(relative.split(os.sep, 1)[-1].replace(os.sep, "/"), path)
+        by_name.setdefault(os.path.basename(path), path)
+    return by_name
+
+
+class ModelInventory:
+    """Scans a models directory into a catalogue with cached headers and hashes."""
+
+    def __init__(self, models_dir, cache_dir, workers=None):
+        self.models_dir = Path(models_dir)
+        cache_dir = Path(cache_dir)
+        self.headers = HashCache(cache_dir / "headers.json", algorithm="safetensors-header-v2",
+                                 hasher=summarize_header, workers=16)
+        self.digests = HashCache(cache_dir / "sha256.json", workers=workers or 4)
+
+    @classmethod
+    def from_config(cls, config):
+        """Create an inventory for the configured ComfyUI install."""
+        return cls(
+            configured_models_dir(config),
+            get_app_dir() / "cache" / "models",
+            workers=config.get("model_hash_workers") or None,
+        )
+
+    def scan(self, hash_all=True):
+        """Catalogue every model.
+
+        Returns {"models": [entry], "duplicates": [group], "total_bytes",
+        "reclaimable_bytes", "seconds"}. With ``hash_all`` off only models
+        sharing a size are hashed, which is enough to find duplicates.
+        """
+        start = time.perf_counter()
+        stats = find_models(self.models_dir)
+
+        # Symlinks to one file are not duplicates, so hash each real file once
+        real_paths = {path: os.path.realpath(path) for path in stats}
+        real_stats = {real_paths[path]: stat for path, stat in stats.items()}
+        headers = self.headers.hash_files(list(real_stats), real_stats)
+
+        if hash_all:
+            to_hash = list(real_stats)
+        else:
+            by_size = defaultdict(list)
+            for real_path, stat in real_stats.items():
+                by_size[stat.st_size].append(real_path)
+            to_hash = [p for paths in by_size.values() if len(paths) > 1 for p in paths]
+        digests = self.digests.hash_files(to_hash, real_stats)
+
+        self.headers.retain(real_stats)
+        self.digests.retain(real_stats)
+        self.headers.save()
+        self.digests.save()
+
+        models = []
+        for path in sorted(stats):
+            real_path = real_paths[path]
+            models.append({
+                "path": path,
+                "folder": os.path.relpath(os.path.dirname(path), self.models_dir),
+                "name": os.path.basename(path),
+                "size": stats[path].st_size,
+                "link": real_path if real_path != os.path.abspath(path) else None,
+                "sha256": digests.get(real_path),
+                **(headers.get(real_path) or {"error": "unreadable header"}),
+            })
+
+        duplicates = find_duplicates(digests, real_stats)
+        report = {
+            "models": models,
+            "duplicates": duplicates,
+            "total_bytes": sum(stat.st_size for stat in real_stats.values()),
+            "reclaimable_bytes": sum(g["reclaimable_bytes"] for g in duplicates),
+            "seconds": round(time.perf_counter() - start, 3),
+        }
+        logging.info(
+            f"Model inventory: {len(models)} models, {len(duplicates)} duplicate groups "
+            f"in {report['seconds']} s"
+        )
+        return report
+
+
+def find_duplicates(digests, stats):
+    """Group real paths sharing a digest; the first in sort order is kept."""
+    by_digest = defaultdict(list)
+    for path, digest in digests.items():
+        by_digest[digest].append(path)
+
+    groups = []
+    for digest, paths in by_digest.items():
+        if len(paths) < 2:
+            continue
+        paths.sort()
+        groups.append({
+            "sha256": digest,
+            "keep": paths[0],
+            "duplicates": paths[1:],
+            "reclaimable_bytes": sum(stats[p].st_size for p in paths[1:]),
+        })
+    return groups
@@ -0,0 +1,423 @@
+"""
+Incremental index of the ComfyUI output directory
+
+One parallel os.scandir crawl builds the index; after that it is kept
+current through inotify (Linux) or, where that is unavailable, by
+re-scanning only directories whose mtime changed. Counts and per-day /
+per-prefix aggregates are maintained on every change, so queries are O(1).
+"""
+
+import os
+import re
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+import logging
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime
+from pathlib import Path
+
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".webp", ".gif"}
+
+# ComfyUI names outputs "<prefix>_<counter>_.png"
+COUNTER_RE = re.compile(r"^(.*?)_\d{5,}_?$")
+
+# inotify constants (from <sys/inotify.h>)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+EVENT_HEADER = struct.Struct("iIII")
+
+
+def output_prefix(relative_path):
+    """Get the filename prefix of an output, including its subfolder."""
+    path = Path(relative_path)
+    match = COUNTER_RE.match(path.stem)
+    stem = match.group(1) if match else path.stem
+    parent = path.parent.as_posix()
+    return stem if parent == "." else f"{parent}/{stem}"
+
+
+def scan_directory(path, extensions):
+    """Scan one directory: return (files, subdirectories, directory mtime)."""
+    files = {}
+    subdirs = []
+    try:
+        dir_mtime = os.stat(path).st_mtime
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    elif os.path.splitext(entry.name)[1].lower() in extensions:
+                        stat = entry.stat(follow_symlinks=False)
+                        files[entry.path] = (stat.st_size, stat.st_mtime)
+                except OSError:
+                    continue
+    except OSError as e:
+        logging.debug(f"Cannot scan {path}: {e}")
+        return files, subdirs, None
+    return files, subdirs, dir_mtime
+
+
+class Inotify:
+    """Minimal ctypes wrapper around the Linux inotify API."""
+
+    def __init__(self):
+        libc_name = ctypes.util.find_library("c")
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.watches = {}
+
+    def add_watch(self, path, mask=WATCH_MASK):
+        """Watch a directory; returns the watch descriptor or -1."""
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err == errno.ENOSPC:
+                logging.warning("inotify watch limit reached (fs.inotify.max_user_watches)")
+            return -1
+        self.watches[wd] = path
+        return wd
+
+    def read_events(self, timeout):
+        """Wait up to ``timeout`` seconds and return (wd, mask, name) tuples."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        events = []
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, _cookie, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0").decode(errors="surrogateescape")
+            offset += length
+            events.append((wd, mask, name))
+        return events
+
+    def close(self):
+        """Close the inotify descriptor."""
+        os.close(self.fd)
+
+
+class OutputIndex:
+    """Live index of the image files under the output directory."""
+
+    def __init__(self, root, workers=None, poll_interval=5.0, extensions=None):
+        self.root = str(root)
+        self.workers = workers or min(32, (os.cpu_count() or 1) * 4)
+        self.poll_interval = poll_interval
+        self.extensions = extensions or IMAGE_EXTENSIONS
+
+        self.lock = threading.Lock()
+        self.files = {}
+        self.dir_mtimes = {}
+        self.count = 0
+        self.total_bytes = 0
+        self.by_day = defaultdict(lambda: [0, 0])
+        self.by_prefix = defaultdict(lambda: [0, 0])
+
+        self.listeners = []
+        self.ready = threading.Event()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.inotify = None
+        self.crawl_seconds = None
+        self.mode = "idle"
+
+    @classmethod
+    def from_config(cls, config):
+        """Create an index for the configured output directory."""
+        return cls(
+            config.get("output_dir") or "",
+            workers=config.get("output_index_workers") or None,
+            poll_interval=config.get("output_index_poll_interval", 5.0),
+        )
+
+    def add_listener(self, callback):
+        """Register ``callback(event, path, entry)`` for "added"/"removed" changes.
+
+        "added" is an upsert, also sent when a file's size or mtime changed.
+        """
+        self.listeners.append(callback)
+
+    def start(self):
+        """Crawl and then watch in a background thread."""
+        if self.thread is not None:
+            return
+        self.thread = threading.Thread(target=self.run, name="output-index", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop watching."""
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout=5)
+            self.thread = None
+
+    def run(self):
+        """Thread body."""
+        if not os.path.isdir(self.root):
+            logging.info(f"Output directory does not exist yet: {self.root}")
+            self.ready.set()
+            self.mode = "polling"
+            while not os.path.isdir(self.root):
+                if self.stop_event.wait(self.poll_interval):
+                    return
+
+        try:
+            self.inotify = Inotify()
+        except (OSError, AttributeError) as e:
+            logging.info(f"inotify unavailable, polling output directory: {e}")
+            self.inotify = None
+
+        self.crawl()
+
+        try:
+            if self.inotify is not None:
+                self.mode = "inotify"
+                self.watch_loop()
+            else:
+                self.mode = "polling"
+                self.poll_loop()
+        except Exception as e:
+            logging.error(f"Output index stopped: {e}")
+        finally:
+            if self.inotify is not None:
+                self.inotify.close()
+
+    def crawl(self):
+        """Build the index with one parallel scandir pass over the tree.
+
+        On a re-crawl only the differences to the current index are applied
+        (and reported to listeners).
+        """
+        start = time.perf_counter()
+        files = {}
+        dir_mtimes = {}
+
+        def submit(pool, path):
+            # Watch first so files written during the scan are not missed
+            if self.inotify is not None:
+                self.inotify.add_watch(path)
+            return pool.submit(scan_directory, path, self.extensions)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            pending = {submit(pool, self.root): self.root}
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    path = pending.pop(future)
+                    dir_files, subdirs, dir_mtime = future.result()
+                    files.update(dir_files)
+                    if dir_mtime is not None:
+                        dir_mtimes[path] = dir_mtime
+                    for subdir in subdirs:
+                        pending[submit(pool, subdir)] = subdir
+
+        with self.lock:
+            self.dir_mtimes = dir_mtimes
+            for path in [path for path in self.files if path not in files]:
+                self._remove(path)
+            for path, entry in files.items():
+                if self.files.get(path) != entry:
+                    self._replace(path, entry)
+
+        self.crawl_seconds = time.perf_counter() - start
+        logging.info(f"Indexed {self.count} outputs in {self.crawl_seconds:.2f}s")
+        self.ready.set()
+
+    def watch_loop(self):
+        """Apply inotify events until stopped."""
+        while not self.stop_event.is_set():
+            for wd, mask, name in self.inotify.read_events(0.5):
+                if mask & IN_Q_OVERFLOW:
+                    logging.warning("inotify queue overflow, re-crawling outputs")
+                    self.crawl()
+                    break
+
+                directory = self.inotify.watches.get(wd)
+                if directory is None:
+                    continue
+                if mask & (IN_IGNORED | IN_DELETE_SELF):
+                    self.inotify.watches.pop(wd, None)
+                    continue
+
+                path = os.path.join(directory, name)
+                if mask & IN_ISDIR:
+                    if mask & (IN_CREATE | IN_MOVED_TO):
+                        self.scan_new_directory(path)
+                    elif mask & (IN_DELETE | IN_MOVED_FROM):
+                        self.remove_tree(path)
+                elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                    self.update_file(path)
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    self.remove_file(path)
+
+    def poll_loop(self):
+        """Re-scan directories whose mtime changed until stopped."""
+        while not self.stop_event.wait(self.poll_interval):
+            for directory, old_mtime in list(self.dir_mtimes.items()):
+                try:
+                    mtime = os.stat(directory).st_mtime
+                except OSError:
+                    self.remove_tree(directory)
+                    continue
+                if mtime != old_mtime:
+                    self.rescan_directory(directory)
+
+    def scan_new_directory(self, path):
+        """Index and watch a directory that appeared after the crawl."""
+        stack = [path]
+        while stack:
+            directory = stack.pop()
+            if self.inotify is not None:
+                self.inotify.add_watch(directory)
+            files, subdirs, dir_mtime = scan_directory(directory, self.extensions)
+            with self.lock:
+                if dir_mtime is not None:
+                    self.dir_mtimes[directory] = dir_mtime
+                for file_path, entry in files.items():
+                    self._replace(file_path, entry)
+            stack.extend(subdirs)
+
+    def rescan_directory(self, directory):
+        """Reconcile one directory with the index (polling mode)."""
+        files, subdirs, dir_mtime = scan_directory(directory, self.extensions)
+        prefix = directory.rstrip(os.sep) + os.sep
+        with self.lock:
+            if dir_mtime is not None:
+                self.dir_mtimes[directory] = dir_mtime
+            stale = [
+                path for path in self.files
+                if path.startswith(prefix) and os.sep not in path[len(prefix):] and path not in files
+            ]
+            for path in stale:
+                self._remove(path)
+            for path, entry in files.items():
+                if self.files.get(path) != entry:
+                    self._replace(path, entry)
+        for subdir in subdirs:
+            if subdir not in self.dir_mtimes:
+                self.scan_new_directory(subdir)
+
+    def update_file(self, path):
+        """Add or refresh one file."""
+        if os.path.splitext(path)[1].lower() not in self.extensions:
+            return
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return
+        with self.lock:
+            self._replace(path, (stat.st_size, stat.st_mtime))
+
+    def remove_file(self, path):
+        """Drop one file."""
+        with self.lock:
+            if path in self.files:
+                self._remove(path)
+
+    def remove_tree(self, directory):
+        """Drop every file under a directory that went away."""
+        prefix = directory.rstrip(os.sep) + os.sep
+        with self.lock:
+            for path in [p for p in self.files if p.startswith(prefix)]:
+                self._remove(path)
+            for path in [d for d in self.dir_mtimes if d == directory or d.startswith(prefix)]:
+                del self.dir_mtimes[path]
+
+    def _replace(self, path, entry):
+        """Insert or update an entry; caller holds the lock."""
+        if path in self.files:
+            self._remove(path)
+        self._add(path, entry)
+
+    def _add(self, path, entry):
+        """Insert an entry and update aggregates; caller holds the lock."""
+        size, mtime = entry
+        self.files[path] = entry
+        self.count += 1
+        self.total_bytes += size
+
+        day = self.by_day[datetime.fromtimestamp(mtime).strftime("%Y-%m-%d")]
+        day[0] += 1
+        day[1] += size
+        prefix = self.by_prefix[output_prefix(os.path.relpath(path, self.root))]
+        prefix[0] += 1
+        prefix[1] += size
+
+        self._notify("added", path, entry)
+
+    def _remove(self, path):
+        """Remove an entry and update aggregates; caller holds the lock."""
+        size, mtime = self.files.pop(path)
+        self.count -= 1
+        self.total_bytes -= size
+
+        day_key = datetime.fromtimestamp(mtime).strftime("%Y-%m-%d")
+        prefix_key = output_prefix(os.path.relpath(path, self.root))
+        for table, key in ((self.by_day, day_key), (self.by_prefix, prefix_key)):
+            totals = table[key]
+            totals[0] -= 1
+            totals[1] -= size
+            if totals[0] <= 0:
+                del table[key]
+
+        self._notify("removed", path, (size, mtime))
+
+    def _notify(self, event, path, entry):
+        """Call listeners; caller holds the lock, so listeners must be quick."""
+        for callback in self.listeners:
+            try:
+                callback(event, path, entry)
+            except Exception as e:
+                logging.debug(f"Output index listener error: {e}")
+
+    def stats(self):
+        """Get the totals."""
+        with self.lock:
+            return {
+                "count": self.count,
+                "total_bytes": self.total_bytes,
+                "ready": self.ready.is_set(),
+                "mode": self.mode,
+                "crawl_seconds": self.crawl_seconds,
+            }
+
+    def per_day(self):
+        """Get {YYYY-MM-DD: (count, bytes)}."""
+        with self.lock:
+            return {day: tuple(totals) for day, totals in self.by_day.items()}
+
+    def per_prefix(self):
+        """Get {prefix: (count, bytes)}."""
+        with self.lock:
+            return {prefix: tuple(totals) for prefix, totals in self.by_prefix.items()}
+
+    def snapshot(self):
+        """Get a copy of {path: (size, mtime)}."""
+        with self.lock:
+            return dict(self.files)
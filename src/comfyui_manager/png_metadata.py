@@ -0,0 +1,170 @@
+"""
+PNG text chunk reader for ComfyUI outputs
+
+ComfyUI stores the API-format prompt and the UI workflow as JSON in
+``tEXt`` chunks ahead of the image data. The reader walks the chunk list
+with seeks, stops at the first ``IDAT`` and never touches pixel data, so
+the cost per file is a few small reads.
+"""
+
+import json
+import zlib
+import struct
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+TEXT_CHUNKS = (b"tEXt", b"zTXt", b"iTXt")
+
+# Guard against corrupt length fields
+MAX_TEXT_CHUNK = 64 * 1024 * 1024
+
+# EXIF tags ComfyUI uses for WebP metadata: Model holds the prompt, Make and
+# the tags below it hold the other entries, each as "key:value"
+EXIF_PROMPT_TAG = 0x0110
+EXIF_FIRST_EXTRA_TAG = 0x010F
+
+# Loader inputs that name a model file
+MODEL_INPUTS = ("ckpt_name", "unet_name", "model_name", "vae_name", "clip_name")
+
+
+def read_png_text(path):
+    """Get {keyword: text} from a PNG's text chunks. Returns {} for non-PNG files."""
+    chunks = {}
+    with open(path, "rb") as f:
+        if f.read(8) != PNG_SIGNATURE:
+            return chunks
+
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                break
+            length, chunk_type = struct.unpack(">I4s", header)
+
+            # Text chunks come before the image data in ComfyUI's files
+            if chunk_type in (b"IDAT", b"IEND"):
+                break
+
+            if chunk_type in TEXT_CHUNKS and length <= MAX_TEXT_CHUNK:
+                data = f.read(length)
+                f.seek(4, 1)
+                try:
+                    keyword, text = decode_text_chunk(chunk_type, data)
+                except (ValueError, zlib.error):
+                    continue
+                chunks[keyword] = text
+            else:
+                # Skip data and CRC
+                f.seek(length + 4, 1)
+    return chunks
+
+
+def exif_text(exif):
+    """Get ComfyUI's "key:value" entries from an EXIF mapping."""
+    metadata = {}
+    for tag in range(EXIF_FIRST_EXTRA_TAG - 16, EXIF_PROMPT_TAG + 1):
+        value = exif.get(tag)
+        if isinstance(value, str) and ":" in value:
+            key, _, text = value.partition(":")
+            metadata[key] = text
+    return metadata
+
+
+def read_webp_text(path):
+    """Get ComfyUI metadata from a WebP's EXIF without decoding pixels."""
+    from PIL import Image
+
+    with Image.open(path) as img:
+        return exif_text(img.getexif())
+
+
+def decode_text_chunk(chunk_type, data):
+    """Decode one tEXt/zTXt/iTXt payload into (keyword, text)."""
+    keyword, _, rest = data.partition(b"\0")
+    keyword = keyword.decode("latin-1")
+
+    if chunk_type == b"tEXt":
+        return keyword, rest.decode("latin-1")
+
+    if chunk_type == b"zTXt":
+        # Compression method byte, then zlib data
+        return keyword, zlib.decompress(rest[1:]).decode("latin-1")
+
+    # iTXt: compression flag, method, language tag\0, translated keyword\0, text
+    if len(rest) < 2:
+        raise ValueError("Truncated iTXt chunk")
+    compressed = rest[0]
+    _, _, rest = rest[2:].partition(b"\0")
+    _, _, text = rest.partition(b"\0")
+    if compressed:
+        text = zlib.decompress(text)
+    return keyword, text.decode("utf-8")
+
+
+def parse_prompt(prompt_json):
+    """Extract searchable fields from an API-format ComfyUI prompt.
+
+    Returns {models, loras, samplers, schedulers, seeds, steps, cfg, text}
+    with list values; links between nodes are ignored.
+    """
+    fields = {
+        "models": [], "loras": [], "samplers": [], "schedulers": [],
+        "seeds": [], "steps": [], "cfg": [], "text": [],
+    }
+    try:
+        prompt = json.loads(prompt_json)
+    except (TypeError, ValueError):
+        return fields
+    if not isinstance(prompt, dict):
+        return fields
+
+    for node in prompt.values():
+        if not isinstance(node, dict):
+            continue
+        class_type = node.get("class_type", "")
+        inputs = node.get("inputs") or {}
+
+        for key, value in inputs.items():
+            # Linked inputs are [node_id, output_index]
+            if isinstance(value, list):
+                continue
+            if key == "lora_name" or ("lora" in class_type.lower() and key.endswith("_name")):
+                add_unique(fields["loras"], value)
+            elif key in MODEL_INPUTS:
+                add_unique(fields["models"], value)
+            elif key == "sampler_name":
+                add_unique(fields["samplers"], value)
+            elif key == "scheduler":
+                add_unique(fields["schedulers"], value)
+            elif key in ("seed", "noise_seed"):
+                add_unique(fields["seeds"], value)
+            elif key == "steps":
+                add_unique(fields["steps"], value)
+            elif key == "cfg":
+                add_unique(fields["cfg"], value)
+            elif key.startswith("text") and isinstance(value, str) and value.strip():
+                add_unique(fields["text"], value)
+    return fields
+
+
+def add_unique(values, value):
+    """Append a value once."""
+    if value not in values:
+        values.append(value)
+
+
+def read_output_text(path):
+    """Get the metadata entries of a PNG or WebP output; {} if unreadable."""
+    try:
+        if path.lower().endswith(".webp"):
+            return read_webp_text(path)
+        return read_png_text(path)
+    except (OSError, SyntaxError):
+        return {}
+
+
+def read_output_metadata(path):
+    """Read and parse a ComfyUI output's prompt. Returns None without one."""
+    chunks = read_output_text(path)
+    if "prompt" not in chunks:
+        return None
+    return parse_prompt(chunks["prompt"])
@@ -0,0 +1,274 @@
+"""
+Page-cache prefetcher for model files
+
+After a reboot the first prompt waits while ComfyUI reads multi-GB
+checkpoints from disk. The prefetcher reads the configured and most
+recently used models into the OS page cache ahead of time: chunks that
+mincore reports as resident are skipped, the next chunk is announced with
+posix_fadvise(WILLNEED) while the current one is read, and reads across
+all workers share one rate limit so ComfyUI's own I/O is not starved.
+"""
+
+import os
+import time
+import mmap
+import ctypes
+import ctypes.util
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .model_inventory import configured_models_dir, model_names
+
+CHUNK_SIZE = 16 * 1024 * 1024
+PAGE_SIZE = mmap.PAGESIZE
+
+# Map at most this much at once for mincore
+WINDOW_SIZE = 1024 * 1024 * 1024
+
+PROT_READ = 0x1
+MAP_SHARED = 0x01
+MAP_FAILED = ctypes.c_void_p(-1).value
+
+
+def load_libc():
+    """Load libc with mmap/mincore signatures, or None where unavailable."""
+    libc_name = ctypes.util.find_library("c")
+    if libc_name is None or not hasattr(os, "posix_fadvise"):
+        return None
+    libc = ctypes.CDLL(libc_name, use_errno=True)
+    libc.mmap.restype = ctypes.c_void_p
+    libc.mmap.argtypes = [ctypes.c_void_p, ctypes.c_size_t, ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_long]
+    libc.munmap.argtypes = [ctypes.c_void_p, ctypes.c_size_t]
+    libc.mincore.argtypes = [ctypes.c_void_p, ctypes.c_size_t, ctypes.c_char_p]
+    return libc
+
+
+libc = load_libc()
+
+
+def resident_pages(fd, offset, length):
+    """Get a mincore vector (one byte per page, bit 0 = resident) for a file range."""
+    address = libc.mmap(None, length, PROT_READ, MAP_SHARED, fd, offset)
+    if address == MAP_FAILED or address is None:
+        raise OSError(ctypes.get_errno(), "mmap failed")
+    try:
+        vector = ctypes.create_string_buffer((length + PAGE_SIZE - 1) // PAGE_SIZE)
+        if libc.mincore(address, length, vector) != 0:
+            raise OSError(ctypes.get_errno(), "mincore failed")
+        return vector.raw
+    finally:
+        libc.munmap(address, length)
+
+
+def chunk_residency(fd, size, chunk_size=CHUNK_SIZE):
+    """Get the resident byte count of every chunk of an open file."""
+    pages_per_chunk = chunk_size // PAGE_SIZE
+    resident = []
+    for window in range(0, size, WINDOW_SIZE):
+        length = min(WINDOW_SIZE, size - window)
+        vector = resident_pages(fd, window, length)
+        for start in range(0, len(vector), pages_per_chunk):
+            # Only bit 0 is defined; the others are reserved and zero
+            pages = vector[start:start + pages_per_chunk]
+            resident.append((len(pages) - pages.count(0)) * PAGE_SIZE)
+    # The last page is partial
+    if resident and size % PAGE_SIZE and resident[-1]:
+        resident[-1] -= PAGE_SIZE - size % PAGE_SIZE
+    return resident
+
+
+def residency(path):
+    """Get (resident bytes, size) of a file, or (None, size) without mincore."""
+    size = os.path.getsize(path)
+    if libc is None or size == 0:
+        return None, size
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        return sum(chunk_residency(fd, size)), size
+    finally:
+        os.close(fd)
+
+
+def evict(path):
+    """Drop a file's clean pages from the page cache."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+
+
+class RateLimiter:
+    """Token bucket shared by reader threads; ``rate`` is bytes per second, 0 = unlimited."""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.lock = threading.Lock()
+        self.next_time = time.monotonic()
+
+    def consume(self, amount):
+        """Block until ``amount`` bytes may be read."""
+        if not self.rate:
+            return
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_time)
+            self.next_time = start + amount / self.rate
+        if start > now:
+            time.sleep(start - now)
+
+
+class ModelPrefetcher:
+    """Warms the page cache for configured and recently used models."""
+
+    def __init__(self, config, prompt_index=None):
+        self.config = config
+        self.prompt_index = prompt_index
+        self.models_dir = configured_models_dir(config)
+        self.workers = config.get("prefetch_workers", 2)
+        self.recent = config.get("prefetch_recent", 2)
+        self.interval = config.get("prefetch_interval_hours", 0) * 3600
+        self.limiter = RateLimiter(config.get("prefetch_rate_mb_s", 200) * 1024 * 1024)
+
+        max_gb = config.get("prefetch_max_gb", 0)
+        if max_gb:
+            self.max_bytes = max_gb * 1024 ** 3
+        else:
+            import psutil
+            # Leave the other half of memory to ComfyUI and everything else
+            self.max_bytes = psutil.virtual_memory().total // 2
+
+        self.lock = threading.Lock()
+        self.progress = {"running": False, "files": 0, "read_bytes": 0, "skipped_bytes": 0,
+                         "seconds": 0.0, "message": ""}
+        self.job = None
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        """Prefetch now and then every interval, in a background thread."""
+        if self.thread is not None:
+            return
+        self.thread = threading.Thread(target=self.run, name="prefetch", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop after the current chunk."""
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout=5)
+            self.thread = None
+
+    def run(self):
+        """Thread body: prefetch at launch, then on schedule if one is set."""
+        # The prompt catalogue knows which models were used last
+        if self.prompt_index is not None:
+            self.prompt_index.ready.wait(60)
+        while not self.stop_event.is_set():
+            try:
+                self.prefetch()
+            except Exception as e:
+                logging.error(f"Prefetch failed: {e}")
+            if not self.interval:
+                return
+            self.stop_event.wait(self.interval)
+
+    def select(self):
+        """Get the model files to warm: configured ones first, then the most recently used."""
+        by_name = model_names(self.models_dir)
+        names = list(self.config.get("prefetch_models", []))
+        if self.recent and self.prompt_index is not None:
+            names += self.prompt_index.recent_values("models", self.recent)
+
+        selected = []
+        total = 0
+        for name in names:
+            path = name if os.path.isabs(name) else by_name.get(name.replace("\\", "/"))
+            if path is None or path in selected or not os.path.isfile(path):
+                continue
+            size = os.path.getsize(path)
+            if total + size > self.max_bytes:
+                logging.info(f"Prefetch budget reached, skipping {name}")
+                continue
+            selected.append(path)
+            total += size
+        return selected
+
+    def prefetch(self, paths=None):
+        """Read files into the page cache. Returns the progress dict."""
+        paths = self.select() if paths is None else paths
+        start = time.perf_counter()
+        self.progress = {"running": True, "files": 0, "read_bytes": 0, "skipped_bytes": 0,
+                         "seconds": 0.0, "message": f"Prefetching {len(paths)} models"}
+        logging.info(self.progress["message"])
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for path, (read, skipped) in zip(paths, pool.map(self.warm_file, paths)):
+                with self.lock:
+                    self.progress["files"] += 1
+                    self.progress["read_bytes"] += read
+                    self.progress["skipped_bytes"] += skipped
+
+        seconds = time.perf_counter() - start
+        read_mb = self.progress["read_bytes"] / (1024 * 1024)
+        message = (f"Prefetched {len(paths)} models: {read_mb:.0f} MB read, "
+                   f"{self.progress['skipped_bytes'] / (1024 * 1024):.0f} MB already cached in {seconds:.1f} s")
+        self.progress = dict(self.progress, running=False, seconds=round(seconds, 2), message=message)
+        logging.info(message)
+        return self.progress
+
+    def warm_file(self, path):
+        """Read the non-resident chunks of one file. Returns (bytes read, bytes skipped)."""
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError as e:
+            logging.warning(f"Cannot prefetch {path}: {e}")
+            return 0, 0
+
+        read = skipped = 0
+        buffer = bytearray(CHUNK_SIZE)
+        try:
+            size = os.fstat(fd).st_size
+            chunks = range(0, size, CHUNK_SIZE)
+            resident = chunk_residency(fd, size) if libc is not None else [0] * len(chunks)
+            missing = [offset for offset, done in zip(chunks, resident) if done < min(CHUNK_SIZE, size - offset)]
+            skipped = size - sum(min(CHUNK_SIZE, size - offset) for offset in missing)
+
+            if missing and hasattr(os, "posix_fadvise"):
+                os.posix_fadvise(fd, missing[0], CHUNK_SIZE, os.POSIX_FADV_WILLNEED)
+            for i, offset in enumerate(missing):
+                if self.stop_event.is_set():
+                    break
+                # Let the kernel start on the next chunk while this one is read
+                if i + 1 < len(missing) and hasattr(os, "posix_fadvise"):
+                    os.posix_fadvise(fd, missing[i + 1], CHUNK_SIZE, os.POSIX_FADV_WILLNEED)
+                length = min(CHUNK_SIZE, size - offset)
+                self.limiter.consume(length)
+                os.lseek(fd, offset, os.SEEK_SET)
+                read += os.readv(fd, [memoryview(buffer)[:length]])
+        except OSError as e:
+            logging.warning(f"Prefetch of {path} stopped: {e}")
+        finally:
+            os.close(fd)
+        return read, skipped
+
+    def run_in_background(self, paths=None):
+        """Prefetch in a thread unless a run is active; poll ``progress`` for status."""
+        with self.lock:
+            if self.progress["running"] or (self.job is not None and self.job.is_alive()):
+                return False
+            self.job = threading.Thread(target=self.prefetch, args=(paths,), name="prefetch-run", daemon=True)
+            self.job.start()
+        return True
+
+    def status(self):
+        """Get the last run's progress and the residency of the selected models."""
+        models = []
+        for path in self.select():
+            try:
+                resident, size = residency(path)
+            except OSError:
+                continue
+            models.append({"path": path, "size": size, "resident_bytes": resident})
+        return {"progress": dict(self.progress), "models": models}
@@ -5,9 +5,61 @@ Simple Process Manager for ComfyUI - Just runs the bash script
 import subprocess
 import os
 import signal
+import threading
+from collections import deque
 from pathlib import Path
 import logging
 
+import psutil
+
+
+def is_comfyui_process(proc, comfyui_path=None):
+    """Check whether a psutil process is a ComfyUI server or its launch script."""
+    try:
+        cmdline = proc.cmdline()
+        cwd = proc.cwd() if any(os.path.basename(arg) == "main.py" for arg in cmdline) else None
+    except psutil.Error:
+        return False
+    for arg in cmdline:
+        name = os.path.basename(arg)
+        if name == "start_comfyui.sh":
+            return True
+        if name == "main.py":
+            directory = os.path.dirname(os.path.join(cwd or "", arg))
+            if comfyui_path and os.path.realpath(directory) == os.path.realpath(comfyui_path):
+                return True
+            if "comfyui" in os.path.basename(directory.rstrip(os.sep)).lower():
+                return True
+    return False
+
+
+def find_comfyui_processes(comfyui_path=None):
+    """Find ComfyUI processes started outside this manager, with their children."""
+    found = {}
+    for proc in psutil.process_iter():
+        if proc.pid == os.getpid() or proc.pid in found or not is_comfyui_process(proc, comfyui_path):
+            continue
+        found[proc.pid] = proc
+        try:
+            for child in proc.children(recursive=True):
+                found.setdefault(child.pid, child)
+        except psutil.Error:
+            continue
+    return list(found.values())
+
+
+def open_paths(processes):
+    """Get files opened or memory-mapped by some processes."""
+    paths = set()
+    for proc in processes:
+        try:
+            paths.update(f.path for f in proc.open_files())
+            paths.update(m.path for m in proc.memory_maps() if m.path.startswith(os.sep))
+        except psutil.Error:
+            continue
+    return paths
+
+
 class ProcessManager:
     """Simple manager that just runs the bash script."""
     
@@ -15,6 +67,19 @@ class ProcessManager:
         self.config = config
         self.process = None
         self.running = False
+        self.mode = None
+        
+        # Picks the memory mode for "auto"; set by the supervisor
+        self.advisor = None
+        self.advice = None
+        
+        # Follows each launch until ComfyUI is warmed up; set by the supervisor
+        self.warmup = None
+        
+        # Captured ComfyUI output
+        self.output_buffer = deque(maxlen=config.get("output_buffer_lines", 5000))
+        self.output_listeners = []
+        self.output_thread = None
         
         # Get script path
         self.script_dir = Path(__file__).parent.parent.parent / "scripts"
@@ -68,12 +133,16 @@ exec python main.py --listen 0.0.0.0 --port 8188 --highvram \\
         
         logging.info(f"Created simple bash script at: {self.script_path}")
     
-    def start(self, mode="highvram"):
+    def start(self, mode="auto"):
         """Start ComfyUI by executing the bash script."""
-        if self.running:
+        if self.is_running():
             logging.warning("ComfyUI is already running")
             return False
         
+        self.advice = None
+        if mode == "auto":
+            mode = self.resolve_auto_mode()
+        
         if not self.script_path.exists():
             logging.error(f"Script not found: {self.script_path}")
             return False
@@ -81,32 +150,85 @@ exec python main.py --listen 0.0.0.0 --port 8188 --highvram \\
         try:
             logging.info(f"Executing bash script: {self.script_path}")
             
-            # Execute the bash script
-            # Use shell=True to run as a shell script
+            # Execute the bash script with the memory mode as its argument
             self.process = subprocess.Popen(
-                [str(self.script_path)],
+                [str(self.script_path), mode],
                 stdout=subprocess.PIPE,
                 stderr=subprocess.STDOUT,
                 text=True,
                 bufsize=1,
-                shell=True,
                 preexec_fn=os.setsid  # Create new process group for proper signal handling
             )
             
             self.running = True
+            self.mode = mode
+            
+            # Drain stdout so the pipe never fills and blocks ComfyUI
+            self.output_thread = threading.Thread(
+                target=self.read_output,
+                args=(self.process,),
+                daemon=True
+            )
+            self.output_thread.start()
+            
             logging.info(f"ComfyUI started with PID: {self.process.pid}")
+            if self.warmup is not None:
+                self.warmup.launch(mode)
             return True
             
         except Exception as e:
             logging.error(f"Failed to start ComfyUI: {e}")
             return False
     
+    def resolve_auto_mode(self):
+        """Ask the VRAM advisor for a memory mode; normalvram without one."""
+        if self.advisor is None:
+            return "normalvram"
+        try:
+            self.advice = self.advisor.recommend()
+            return self.advice["mode"]
+        except Exception as e:
+            logging.warning(f"VRAM advisor failed, using normalvram: {e}")
+            return "normalvram"
+    
+    def add_output_listener(self, callback):
+        """Register a callable that receives each ComfyUI output line."""
+        self.output_listeners.append(callback)
+    
+    def remove_output_listener(self, callback):
+        """Unregister an output listener."""
+        if callback in self.output_listeners:
+            self.output_listeners.remove(callback)
+    
+    def read_output(self, process):
+        """Read process output line by line and fan it out to listeners."""
+        for line in process.stdout:
+            line = line.rstrip("\n")
+            self.output_buffer.append(line)
+            for callback in list(self.output_listeners):
+                try:
+                    callback(line)
+                except Exception as e:
+                    logging.debug(f"Output listener error: {e}")
+        
+        logging.info("ComfyUI output stream closed")
+    
+    def get_output_tail(self, lines=100):
+        """Get the last captured output lines."""
+        return list(self.output_buffer)[-lines:]
+    
     def stop(self):
         """Stop ComfyUI process."""
         if not self.running or not self.process:
             logging.warning("ComfyUI is not running")
             return False
         
+        if self.process.poll() is not None:
+            logging.info(f"ComfyUI already exited with code {self.process.returncode}")
+            self.running = False
+            self.process = None
+            return True
+        
         try:
             logging.info("Stopping ComfyUI...")
             
@@ -143,4 +265,19 @@ exec python main.py --listen 0.0.0.0 --port 8188 --highvram \\
         """Get process PID if running."""
         if self.is_running():
             return self.process.pid
-        return None
\ No newline at end of file
+        return None
+    
+    def get_process_tree(self):
+        """Get psutil processes for ComfyUI and everything it spawned."""
+        pid = self.get_pid()
+        if pid is None:
+            return []
+        try:
+            root = psutil.Process(pid)
+            return [root] + root.children(recursive=True)
+        except psutil.Error:
+            return []
+    
+    def get_open_paths(self):
+        """Get files opened or memory-mapped by the ComfyUI process tree."""
+        return open_paths(self.get_process_tree())
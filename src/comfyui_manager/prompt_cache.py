@@ -0,0 +1,393 @@
+"""
+Prompt result cache
+
+Identical prompts with fixed seeds produce identical images, so the
+manager's client answers a resubmitted prompt from disk instead of
+spending GPU time on it again. The key is a SHA-256 of the canonical
+API-format prompt: node titles dropped, keys sorted, integral floats
+written as ints and other floats rounded to 12 significant digits, plus
+the size and mtime of any input file (LoadImage) or model it references. Prompts
+whose seeds are randomized (linked or negative seeds, or "randomize" set
+in the embedded UI workflow) are never cached. Entries are kept under a
+byte quota with LRU eviction, like the thumbnail cache.
+"""
+
+import os
+import json
+import time
+import fcntl
+import shutil
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from .comfy_api import ComfyAPIError, ComfyClient
+from .harvester import output_files
+from .utils import get_app_dir
+
+# Bump to invalidate every entry when the canonical form changes
+KEY_VERSION = 2
+
+# control_after_generate values that change the seed on every queue
+RANDOM_CONTROLS = ("randomize", "increment", "decrement")
+
+# Counter bumps and seconds between writes of counters.json
+COUNTER_BATCH = 20
+COUNTER_INTERVAL = 5.0
+
+# Seconds before the model name -> path map is rebuilt
+MODEL_NAMES_TTL = 60.0
+
+
+def normalize(value):
+    """Canonical form of a prompt value."""
+    if isinstance(value, bool) or value is None or isinstance(value, (int, str)):
+        return value
+    if isinstance(value, float):
+        if value.is_integer():
+            return int(value)
+        return float(f"{value:.12g}")
+    if isinstance(value, (list, tuple)):
+        return [normalize(item) for item in value]
+    if isinstance(value, dict):
+        return {str(key): normalize(item) for key, item in value.items()}
+    return str(value)
+
+
+def canonical_prompt(prompt):
+    """Canonical JSON of an API-format prompt; titles and other UI metadata are ignored."""
+    nodes = {}
+    for node_id, node in prompt.items():
+        nodes[str(node_id)] = {
+            "class_type": node.get("class_type"),
+            "inputs": normalize(node.get("inputs") or {}),
+        }
+    return json.dumps(nodes, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+def randomized(prompt, extra_data=None):
+    """Get why a prompt's result is not reproducible, or None if it is."""
+    for node_id, node in prompt.items():
+        for name, value in (node.get("inputs") or {}).items():
+            if "seed" not in name.lower():
+                continue
+            if isinstance(value, list):
+                return f"node {node_id} takes {name} from another node"
+            if isinstance(value, (int, float)) and value < 0:
+                return f"node {node_id} has a random {name}"
+
+    workflow = ((extra_data or {}).get("extra_pnginfo") or {}).get("workflow")
+    if isinstance(workflow, dict):
+        for node in workflow.get("nodes") or []:
+            for value in node.get("widgets_values") or []:
+                if value in RANDOM_CONTROLS:
+                    return f"node {node.get('id')} is set to {value} its seed"
+    return None
+
+
+class PromptCache:
+    """On-disk prompt results with a size quota and LRU eviction."""
+
+    def __init__(self, cache_dir, max_bytes=2048 * 1024 * 1024, input_dir=None, output_dir=None, models_dir=None):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.input_dir = input_dir
+        self.output_dir = output_dir
+        self.models_dir = models_dir
+        self.model_paths = {}
+        self.model_paths_at = None
+
+        self.lock = threading.Lock()
+        # key -> bytes, least recently used first
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.counters = {"hits": 0, "misses": 0, "bypassed": 0, "stored": 0}
+        # Bumps not yet added to counters.json
+        self.unsaved = dict.fromkeys(self.counters, 0)
+        self.saved_at = time.monotonic()
+        self.load_index()
+
+    @classmethod
+    def from_config(cls, config):
+        """Create a cache from configuration."""
+        from .model_inventory import configured_models_dir
+
+        comfyui_path = config.get("comfyui_path") or ""
+        return cls(
+            config.get("prompt_cache_dir") or get_app_dir() / "cache" / "prompts",
+            max_bytes=config.get("prompt_cache_max_mb", 2048) * 1024 * 1024,
+            input_dir=os.path.join(comfyui_path, "input") if comfyui_path else None,
+            output_dir=config.get("output_dir") or None,
+            models_dir=configured_models_dir(config) if config.get("models_dir") or comfyui_path else None,
+        )
+
+    def load_index(self):
+        """Rebuild the LRU order from entry files (oldest access first)."""
+        found = []
+        for path in self.cache_dir.glob("*/*/entry.json"):
+            try:
+                entry = json.loads(path.read_text())
+                found.append((path.stat().st_mtime, entry["key"], entry["bytes"]))
+            except (OSError, ValueError, KeyError):
+                continue
+        for _, key, size in sorted(found):
+            self.entries[key] = size
+            self.total_bytes += size
+        try:
+            self.counters.update(json.loads((self.cache_dir / "counters.json").read_text()))
+        except (OSError, ValueError):
+            pass
+
+    def key(self, prompt, extra_data=None):
+        """Get the cache key of a prompt, or None if it must bypass the cache."""
+        reason = randomized(prompt, extra_data)
+        if reason is not None:
+            logging.debug(f"Prompt cache bypassed: {reason}")
+            self.count("bypassed")
+            return None
+
+        digest = hashlib.sha256(f"v{KEY_VERSION}\0".encode())
+        digest.update(canonical_prompt(prompt).encode())
+        # An input image, checkpoint or LoRA replaced under the same name must miss
+        models = self.model_map()
+        for node in prompt.values():
+            for value in (node.get("inputs") or {}).values():
+                if not isinstance(value, str) or not value or os.path.isabs(value):
+                    continue
+                paths = [models.get(value)]
+                if self.input_dir:
+                    paths.append(os.path.join(self.input_dir, value.split(" [")[0]))
+                for path in paths:
+                    if path is None:
+                        continue
+                    try:
+                        stat = os.stat(path)
+                    except (OSError, ValueError):
+                        continue
+                    digest.update(f"\0{value}\0{stat.st_size}\0{stat.st_mtime_ns}".encode())
+        return digest.hexdigest()
+
+    def model_map(self):
+        """Model names ComfyUI accepts mapped to their files, rebuilt every minute."""
+        if not self.models_dir:
+            return {}
+        now = time.monotonic()
+        if self.model_paths_at is None or now - self.model_paths_at > MODEL_NAMES_TTL:
+            from .model_inventory import model_names
+            self.model_paths = model_names(self.models_dir)
+            self.model_paths_at = now
+        return self.model_paths
+
+    def entry_dir(self, key):
+        """On-disk location of a cache entry."""
+        return self.cache_dir / key[:2] / key
+
+    def lookup(self, key):
+        """Get a cached entry ({"key", "prompt_id", "outputs", "files", ...}), or None on a miss."""
+        with self.lock:
+            known = key in self.entries
+            if known:
+                self.entries.move_to_end(key)
+        entry_path = self.entry_dir(key) / "entry.json"
+        try:
+            entry = json.loads(entry_path.read_text()) if known else None
+            if entry is not None:
+                # Persist recency so LRU order survives restarts
+                os.utime(entry_path)
+        except (OSError, ValueError):
+            with self.lock:
+                self.total_bytes -= self.entries.pop(key, 0)
+            entry = None
+
+        self.count("hits" if entry is not None else "misses")
+        if entry is not None:
+            entry["dir"] = str(self.entry_dir(key))
+        return entry
+
+    def read_entry(self, key):
+        """Get an entry without counting a lookup, or None."""
+        try:
+            entry = json.loads((self.entry_dir(key) / "entry.json").read_text())
+        except (OSError, ValueError):
+            return None
+        entry["dir"] = str(self.entry_dir(key))
+        return entry
+
+    async def store(self, client, key, prompt_id):
+        """Copy a finished prompt's outputs into the cache; returns the entry or None."""
+        history = (await client.get_history(prompt_id)).get(prompt_id)
+        if history is None or not history.get("status", {}).get("completed", True):
+            return None
+
+        directory = self.entry_dir(key)
+        tmp_dir = directory.with_name(f"{key}.tmp")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        tmp_dir.mkdir(parents=True)
+        files = []
+        try:
+            for output in output_files(history):
+                name = f"{output['node']}_{output['filename']}"
+                target = tmp_dir / name
+                source = Path(self.output_dir or "", output["subfolder"], output["filename"])
+                if self.output_dir and output["type"] == "output" and source.is_file():
+                    try:
+                        os.link(source, target)
+                    except OSError:
+                        shutil.copyfile(source, target)
+                else:
+                    await client.download(output["filename"], target, output["subfolder"], output["type"])
+                files.append(dict(output, name=name, bytes=target.stat().st_size))
+        except (ComfyAPIError, OSError) as e:
+            logging.warning(f"Cannot cache the result of {prompt_id}: {e}")
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return None
+
+        size = sum(f["bytes"] for f in files)
+        entry = {
+            "key": key,
+            "prompt_id": prompt_id,
+            "created": time.time(),
+            "outputs": history.get("outputs") or {},
+            "files": files,
+            "bytes": size,
+        }
+        (tmp_dir / "entry.json").write_text(json.dumps(entry))
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(tmp_dir, directory)
+
+        with self.lock:
+            self.total_bytes += size - self.entries.pop(key, 0)
+            self.entries[key] = size
+        self.count("stored")
+        self.evict()
+        return entry
+
+    def evict(self):
+        """Delete least recently used entries until under quota."""
+        victims = []
+        with self.lock:
+            while self.total_bytes > self.max_bytes and self.entries:
+                key, size = self.entries.popitem(last=False)
+                self.total_bytes -= size
+                victims.append(key)
+        for key in victims:
+            shutil.rmtree(self.entry_dir(key), ignore_errors=True)
+        if victims:
+            logging.debug(f"Evicted {len(victims)} cached prompt results")
+
+    def clear(self):
+        """Delete every entry and reset the counters."""
+        with self.lock:
+            keys = list(self.entries)
+            self.entries.clear()
+            self.total_bytes = 0
+            self.counters = dict.fromkeys(self.counters, 0)
+            self.unsaved = dict.fromkeys(self.counters, 0)
+        for key in keys:
+            shutil.rmtree(self.entry_dir(key), ignore_errors=True)
+        self.save_counters(reset=True)
+        return len(keys)
+
+    def count(self, name):
+        """Bump a counter; counters.json is written in batches."""
+        with self.lock:
+            self.counters[name] += 1
+            self.unsaved[name] += 1
+            due = (sum(self.unsaved.values()) >= COUNTER_BATCH
+                   or time.monotonic() - self.saved_at >= COUNTER_INTERVAL)
+        if due:
+            self.save_counters()
+
+    def save_counters(self, reset=False):
+        """Add unsaved bumps to counters.json and pick up other processes' counts.
+
+        With ``reset`` the file is overwritten with zeros instead.
+        """
+        with self.lock:
+            deltas = self.unsaved
+            self.unsaved = dict.fromkeys(self.counters, 0)
+            self.saved_at = time.monotonic()
+        path = self.cache_dir / "counters.json"
+        try:
+            with open(self.cache_dir / "counters.lock", "w") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                totals = dict.fromkeys(deltas, 0)
+                if not reset:
+                    try:
+                        totals.update(json.loads(path.read_text()))
+                    except (OSError, ValueError):
+                        pass
+                if reset or any(deltas.values()):
+                    for name, value in deltas.items():
+                        totals[name] = totals.get(name, 0) + value
+                    tmp_path = self.cache_dir / f"counters.{os.getpid()}.tmp"
+                    tmp_path.write_text(json.dumps(totals))
+                    os.replace(tmp_path, path)
+        except OSError as e:
+            logging.warning(f"Cannot save prompt cache counters: {e}")
+            with self.lock:
+                for name, value in deltas.items():
+                    self.unsaved[name] += value
+            return
+        with self.lock:
+            # Include other processes' lookups and bumps made while writing
+            self.counters = {name: totals.get(name, 0) + self.unsaved[name] for name in self.counters}
+
+    def stats(self):
+        """Get cache usage, hit counts and the hit rate of cacheable prompts."""
+        self.save_counters()
+        with self.lock:
+            lookups = self.counters["hits"] + self.counters["misses"]
+            return dict(
+                self.counters,
+                entries=len(self.entries),
+                total_bytes=self.total_bytes,
+                max_bytes=self.max_bytes,
+                hit_rate=round(self.counters["hits"] / lookups, 3) if lookups else None,
+            )
+
+
+class CachingComfyClient(ComfyClient):
+    """ComfyClient that answers cacheable prompts from a PromptCache.
+
+    A hit returns {"prompt_id", "number": None, "node_errors": {}, "cached": entry}
+    without touching ComfyUI. After a miss finishes, call ``record_result``
+    to add it to the cache.
+    """
+
+    def __init__(self, *args, cache=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache = cache
+        self.pending = {}
+
+    async def queue_prompt(self, prompt, extra_data=None, front=False, prompt_id=None):
+        """Queue a prompt unless an identical one is cached."""
+        key = self.cache.key(prompt, extra_data) if self.cache is not None else None
+        if key is not None:
+            entry = self.cache.lookup(key)
+            if entry is not None:
+                return {"prompt_id": entry["prompt_id"], "number": None, "node_errors": {}, "cached": entry}
+        response = await super().queue_prompt(prompt, extra_data, front, prompt_id)
+        if key is not None:
+            self.pending[response["prompt_id"]] = key
+        return response
+
+    async def close(self):
+        """Close the connections and save the cache counters."""
+        await super().close()
+        if self.cache is not None:
+            self.cache.save_counters()
+
+    async def record_result(self, prompt_id):
+        """Cache a finished prompt queued through this client."""
+        key = self.pending.pop(prompt_id, None)
+        if key is None:
+            return None
+        try:
+            return await self.cache.store(self, key, prompt_id)
+        except ComfyAPIError as e:
+            logging.warning(f"Cannot cache the result of {prompt_id}: {e}")
+            return None
@@ -0,0 +1,256 @@
+"""
+Searchable catalogue of ComfyUI outputs
+
+Prompts embedded in output PNGs are parsed into a SQLite database: one row
+per file plus (kind, value) tags for models, LoRAs, samplers and seeds, and
+an FTS5 table for prompt text where SQLite has it. The catalogue follows
+the OutputIndex: after one reconcile pass only new, changed and deleted
+files are touched.
+"""
+
+import os
+import queue
+import sqlite3
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .png_metadata import read_output_metadata
+from .utils import get_app_dir
+
+TAG_KINDS = ("models", "loras", "samplers", "schedulers", "seeds")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outputs (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    prompt TEXT NOT NULL DEFAULT '',
+    steps TEXT NOT NULL DEFAULT '',
+    cfg TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS tags (
+    output_id INTEGER NOT NULL REFERENCES outputs(id) ON DELETE CASCADE,
+    kind TEXT NOT NULL,
+    value TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tags_kind_value ON tags(kind, value);
+CREATE INDEX IF NOT EXISTS tags_output ON tags(output_id);
+"""
+
+
+class PromptIndex:
+    """SQLite catalogue of output prompts, kept in step with an OutputIndex."""
+
+    def __init__(self, db_path, output_index=None, workers=None, batch_size=500):
+        self.db_path = str(db_path)
+        self.output_index = output_index
+        self.workers = workers or min(16, (os.cpu_count() or 1) * 2)
+        self.batch_size = batch_size
+
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("PRAGMA foreign_keys=ON")
+        self.db.executescript(SCHEMA)
+        self.fts = self.create_fts()
+
+        # path -> (size, mtime) of what is in the database
+        self.known = {
+            path: (size, mtime)
+            for path, size, mtime in self.db.execute("SELECT path, size, mtime FROM outputs")
+        }
+
+        self.events = queue.Queue()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.indexed = 0
+        self.ready = threading.Event()
+
+    @classmethod
+    def from_config(cls, config, output_index=None):
+        """Create an index at the configured location."""
+        db_path = config.get("prompt_index_path") or get_app_dir() / "prompt_index.sqlite"
+        return cls(db_path, output_index, workers=config.get("prompt_index_workers") or None)
+
+    def create_fts(self):
+        """Create the full-text table; returns False if SQLite lacks FTS5."""
+        try:
+            self.db.execute("CREATE VIRTUAL TABLE IF NOT EXISTS prompts_fts USING fts5(prompt)")
+            return True
+        except sqlite3.OperationalError:
+            logging.info("SQLite has no FTS5, prompt search will use LIKE")
+            return False
+
+    def start(self):
+        """Follow the output index in a background thread."""
+        if self.thread is not None or self.output_index is None:
+            return
+        self.output_index.add_listener(self.on_output_event)
+        self.thread = threading.Thread(target=self.run, name="prompt-index", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop following and close the database."""
+        self.stop_event.set()
+        self.events.put(None)
+        if self.thread is not None:
+            self.thread.join(timeout=5)
+            self.thread = None
+        with self.lock:
+            self.db.close()
+
+    def on_output_event(self, event, path, entry):
+        """OutputIndex listener; only queues, since it runs under the index lock."""
+        self.events.put((event, path, entry))
+
+    def run(self):
+        """Thread body: reconcile once, then apply queued changes in batches."""
+        self.output_index.ready.wait()
+        self.reconcile(self.output_index.snapshot())
+        self.ready.set()
+
+        while not self.stop_event.is_set():
+            batch = [self.events.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.events.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:
+                return
+
+            changed = {}
+            removed = []
+            for event, path, entry in batch:
+                if event == "added":
+                    if self.known.get(path) != tuple(entry):
+                        changed[path] = tuple(entry)
+                else:
+                    changed.pop(path, None)
+                    removed.append(path)
+            self.update(changed, removed)
+
+    def reconcile(self, files):
+        """Bring the database in line with {path: (size, mtime)}."""
+        changed = {p: tuple(e) for p, e in files.items() if self.known.get(p) != tuple(e)}
+        removed = [p for p in self.known if p not in files]
+        self.update(changed, removed)
+        logging.info(f"Prompt index: {len(changed)} outputs indexed, {len(removed)} removed")
+
+    def update(self, changed, removed):
+        """Parse changed files in parallel and write them in batched transactions."""
+        if removed:
+            with self.lock, self.db:
+                for path in removed:
+                    self.delete_row(path)
+                    self.known.pop(path, None)
+
+        paths = list(changed)
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for start in range(0, len(paths), self.batch_size):
+                if self.stop_event.is_set():
+                    return
+                chunk = paths[start:start + self.batch_size]
+                metadata = list(pool.map(read_output_metadata, chunk))
+                with self.lock, self.db:
+                    for path, fields in zip(chunk, metadata):
+                        self.write_row(path, changed[path], fields)
+                        self.known[path] = changed[path]
+                self.indexed += len(chunk)
+
+    def write_row(self, path, entry, fields):
+        """Insert or replace one output; caller holds the lock and a transaction."""
+        self.delete_row(path)
+        fields = fields or {}
+        text = "\n".join(fields.get("text", []))
+        cursor = self.db.execute(
+            "INSERT INTO outputs (path, size, mtime, prompt, steps, cfg) VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                path, entry[0], entry[1], text,
+                " ".join(str(v) for v in fields.get("steps", [])),
+                " ".join(str(v) for v in fields.get("cfg", [])),
+            ),
+        )
+        output_id = cursor.lastrowid
+        self.db.executemany(
+            "INSERT INTO tags (output_id, kind, value) VALUES (?, ?, ?)",
+            [(output_id, kind, str(value)) for kind in TAG_KINDS for value in fields.get(kind, [])],
+        )
+        if self.fts and text:
+            self.db.execute("INSERT INTO prompts_fts (rowid, prompt) VALUES (?, ?)", (output_id, text))
+
+    def delete_row(self, path):
+        """Delete one output; caller holds the lock and a transaction."""
+        row = self.db.execute("SELECT id FROM outputs WHERE path = ?", (path,)).fetchone()
+        if row is None:
+            return
+        if self.fts:
+            self.db.execute("DELETE FROM prompts_fts WHERE rowid = ?", row)
+        self.db.execute("DELETE FROM outputs WHERE id = ?", row)
+
+    def search(self, text=None, model=None, lora=None, sampler=None, seed=None, limit=50):
+        """Find outputs, newest first. Models, LoRAs and samplers match substrings."""
+        clauses = []
+        params = []
+        if text and text.strip('" '):
+            if self.fts:
+                clauses.append("o.id IN (SELECT rowid FROM prompts_fts WHERE prompts_fts MATCH ?)")
+                params.append(fts_query(text))
+            else:
+                clauses.append("o.prompt LIKE ?")
+                params.append(f"%{text}%")
+        for kind, value in (("models", model), ("loras", lora), ("samplers", sampler)):
+            if value:
+                clauses.append("o.id IN (SELECT output_id FROM tags WHERE kind = ? AND value LIKE ?)")
+                params.extend([kind, f"%{value}%"])
+        if seed is not None:
+            clauses.append("o.id IN (SELECT output_id FROM tags WHERE kind = 'seeds' AND value = ?)")
+            params.append(str(seed))
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        query = f"SELECT o.id, o.path, o.size, o.mtime, o.prompt, o.steps, o.cfg FROM outputs o {where} ORDER BY o.mtime DESC LIMIT ?"
+        params.append(limit)
+
+        with self.lock:
+            rows = self.db.execute(query, params).fetchall()
+            results = []
+            for output_id, path, size, mtime, prompt, steps, cfg in rows:
+                result = {"path": path, "size": size, "mtime": mtime, "prompt": prompt, "steps": steps, "cfg": cfg}
+                for kind in TAG_KINDS:
+                    result[kind] = []
+                for kind, value in self.db.execute("SELECT kind, value FROM tags WHERE output_id = ?", (output_id,)):
+                    result[kind].append(value)
+                results.append(result)
+        return results
+
+    def recent_values(self, kind, limit=5):
+        """Get distinct tag values, most recently used first."""
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT t.value FROM tags t JOIN outputs o ON o.id = t.output_id "
+                "WHERE t.kind = ? GROUP BY t.value ORDER BY MAX(o.mtime) DESC LIMIT ?",
+                (kind, limit),
+            ).fetchall()
+        return [value for (value,) in rows]
+
+    def stats(self):
+        """Get catalogue size and progress."""
+        with self.lock:
+            with_prompt = self.db.execute("SELECT COUNT(*) FROM outputs WHERE prompt != ''").fetchone()[0]
+        return {
+            "outputs": len(self.known),
+            "indexed": self.indexed,
+            "with_prompt": with_prompt,
+            "pending": self.events.qsize(),
+            "ready": self.ready.is_set(),
+            "fts": self.fts,
+        }
+
+
+def fts_query(text):
+    """Quote each word so user input cannot break FTS5 syntax."""
+    words = text.replace('"', " ").split()
+    return " ".join(f'"{word}"' for word in words)
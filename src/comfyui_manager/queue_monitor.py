@@ -0,0 +1,241 @@
+"""
+Live ComfyUI queue state from websocket events
+
+Follows ComfyUI's /ws messages in a background asyncio loop, so queue
+depth, the running prompt and sampler progress are pushed to the
+dashboard instead of being polled. After every (re)connect the state is
+re-seeded from /queue, since events sent while disconnected are lost.
+
+ComfyUI broadcasts "status" (queue size) to every client but sends
+execution and progress events only to the client that queued the prompt.
+So the running prompt is re-read from /queue when the queue size changes,
+and prompts the manager queues itself should use ``client_id`` to get
+step progress too.
+
+With a timing database attached, prompts leaving the queue are recorded
+from /history and ``eta()`` estimates when the queue will be done. The
+monitor thread refreshes ``latest_eta()`` every second for UIs that must
+not query the database themselves.
+"""
+
+import time
+import uuid
+import asyncio
+import logging
+import threading
+
+from .comfy_api import ComfyAPIError, ComfyClient
+from .timings import queue_eta
+
+
+class QueueMonitor:
+    """Tracks ComfyUI's queue and progress; read it with ``snapshot()``."""
+
+    def __init__(self, config):
+        self.config = config
+        self.client_id = uuid.uuid4().hex
+        self.client = None
+        self.loop = None
+        self.thread = None
+        self.task = None
+        # TimingRecorder shared with whoever else follows prompts
+        self.timings = None
+
+        self.lock = threading.Lock()
+        self.listeners = []
+        self.state = self.empty_state()
+        self.queue = {}
+        self.cached_eta = None
+
+    @staticmethod
+    def empty_state():
+        """State before anything is known."""
+        return {
+            "connected": False,
+            "queue_remaining": 0,
+            "prompt_id": None,
+            "node": None,
+            "progress": None,
+            "progress_max": None,
+            "started_at": None,
+            "last_event_at": None,
+            "last_error": None,
+        }
+
+    def start(self):
+        """Follow events in a background thread."""
+        if self.thread is not None:
+            return
+        self.thread = threading.Thread(target=self.run, name="queue-monitor", daemon=True)
+        self.thread.start()
+
+    def run(self):
+        """Thread body: run the event loop until stopped."""
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.task = self.loop.create_task(self.follow())
+        try:
+            self.loop.run_until_complete(self.task)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logging.error(f"Queue monitor error: {e}")
+        finally:
+            self.loop.close()
+
+    def stop(self):
+        """Stop following events."""
+        if self.loop is None or self.loop.is_closed():
+            return
+        self.loop.call_soon_threadsafe(self.task.cancel)
+        if self.client is not None:
+            # Closing the websocket ends the loop even if the cancel is lost
+            asyncio.run_coroutine_threadsafe(self.client.close(), self.loop)
+        self.thread.join(timeout=5)
+        self.thread = None
+
+    async def follow(self):
+        """Apply websocket events to the state until cancelled."""
+        self.client = ComfyClient.from_config(self.config, client_id=self.client_id, pool_size=2, timeout=10.0)
+        estimating = asyncio.ensure_future(self.estimate_forever())
+        try:
+            async for event in self.client.events():
+                self.apply(event)
+                if self.needs_resync(event):
+                    await self.resync()
+        finally:
+            estimating.cancel()
+            await self.client.close()
+            await asyncio.gather(estimating, return_exceptions=True)
+
+    async def estimate_forever(self, interval=1.0):
+        """Keep ``latest_eta()`` current while following events."""
+        loop = asyncio.get_running_loop()
+        while True:
+            if self.timings is not None:
+                try:
+                    # The estimate queries SQLite; keep it off the event loop
+                    eta = await loop.run_in_executor(None, self.eta)
+                except Exception as e:
+                    logging.warning(f"Cannot estimate queue ETA: {e}")
+                    eta = None
+                with self.lock:
+                    self.cached_eta = eta
+            await asyncio.sleep(interval)
+
+    def needs_resync(self, event):
+        """Check whether an event may have changed which prompt is running."""
+        if event.get("type") == "connected":
+            return True
+        if event.get("type") != "status":
+            return False
+        # Execution events for other clients' prompts never reach us
+        state = self.snapshot()
+        return state["queue_remaining"] > 0 or state["prompt_id"] is not None
+
+    async def resync(self):
+        """Seed queue depth and the running prompt from /queue."""
+        try:
+            queue = await self.client.get_queue()
+        except ComfyAPIError as e:
+            self.update(last_error=str(e))
+            return
+        running = queue.get("queue_running") or []
+        prompt_id = running[0][1] if running else None
+        with self.lock:
+            finished = self.state["prompt_id"] if prompt_id != self.state["prompt_id"] else None
+            self.queue = queue
+            if prompt_id != self.state["prompt_id"]:
+                self.state.update(prompt_id=prompt_id, node=None, progress=None, progress_max=None,
+                                  started_at=time.time() if prompt_id else None)
+            self.state["queue_remaining"] = len(running) + len(queue.get("queue_pending") or [])
+        self.notify({"type": "resync", "data": queue})
+        if finished is not None and self.timings is not None:
+            await self.record_finished()
+
+    async def record_finished(self):
+        """Record the run times of recently finished prompts from /history."""
+        try:
+            history = await self.client.get_history(max_items=self.config.get("timings_history_items", 8))
+        except ComfyAPIError as e:
+            logging.debug(f"Cannot read history for timings: {e}")
+            return
+        await asyncio.get_running_loop().run_in_executor(None, self.record_history, history)
+
+    def record_history(self, history):
+        """Store the run times of /history entries in the timing database."""
+        for prompt_id, entry in history.items():
+            try:
+                self.timings.database.record_history(prompt_id, entry)
+            except Exception as e:
+                logging.warning(f"Cannot record timings of {prompt_id}: {e}")
+
+    def eta(self):
+        """Estimate when queued prompts finish (see ``timings.queue_eta``); None without timings."""
+        if self.timings is None:
+            return None
+        with self.lock:
+            queue = self.queue
+        return queue_eta(self.timings.database, queue, self.snapshot(), self.timings)
+
+    def latest_eta(self):
+        """The ETA last computed in the monitor thread, or None."""
+        with self.lock:
+            return self.cached_eta
+
+    def apply(self, event):
+        """Update the state from one websocket message."""
+        kind = event.get("type")
+        data = event.get("data") or {}
+        if kind == "connected":
+            self.update(connected=True, last_error=None)
+        elif kind == "disconnected":
+            self.update(**dict(self.empty_state(), last_error="ComfyUI websocket disconnected"))
+        elif kind == "status":
+            remaining = data.get("status", {}).get("exec_info", {}).get("queue_remaining")
+            if remaining is not None:
+                self.update(queue_remaining=remaining)
+        elif kind == "execution_start":
+            self.update(prompt_id=data.get("prompt_id"), node=None, progress=None, progress_max=None,
+                        started_at=time.time())
+        elif kind == "executing":
+            if data.get("node") is None:
+                # ComfyUI signals the end of a prompt with node=None
+                self.update(prompt_id=None, node=None, progress=None, progress_max=None, started_at=None)
+            else:
+                self.update(prompt_id=data.get("prompt_id"), node=data["node"], progress=None, progress_max=None)
+        elif kind == "progress":
+            self.update(progress=data.get("value"), progress_max=data.get("max"))
+        elif kind in ("execution_error", "execution_interrupted"):
+            self.update(node=None, progress=None, progress_max=None,
+                        last_error=data.get("exception_message") or kind.replace("_", " "))
+        else:
+            return
+        self.notify(event)
+
+    def update(self, **values):
+        """Change state fields."""
+        with self.lock:
+            self.state.update(values, last_event_at=time.time())
+
+    def snapshot(self):
+        """Get a copy of the current state."""
+        with self.lock:
+            return dict(self.state)
+
+    def add_listener(self, callback):
+        """Call ``callback(event)`` from the monitor thread for every applied event."""
+        self.listeners.append(callback)
+
+    def remove_listener(self, callback):
+        """Remove an event listener."""
+        if callback in self.listeners:
+            self.listeners.remove(callback)
+
+    def notify(self, event):
+        """Pass an event to listeners."""
+        for callback in list(self.listeners):
+            try:
+                callback(event)
+            except Exception as e:
+                logging.error(f"Queue listener failed: {e}")
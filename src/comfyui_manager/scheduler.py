@@ -0,0 +1,419 @@
+"""
+Priority and fair-share prompt scheduler
+
+Holds prompts submitted through the manager in per-class, per-user queues
+and releases them to ComfyUI a few at a time, so one user's long batch
+cannot starve everyone else's previews in ComfyUI's FIFO queue.
+
+"interactive" jobs always go before "batch" jobs. Within a class, users
+share ComfyUI by weighted fair queuing (start-time fair queuing): each
+job is tagged max(class virtual time, the user's last finish tag) and
+finishes cost / weight later, where the cost is the prompt's sampler
+steps; the smallest start tag goes next. ComfyUI's queue is kept at
+``scheduler_depth`` prompts (running included) so reordering still
+matters, and an interactive job pulls queued batch prompts back out of
+ComfyUI's queue (never the running one) to get in front of them.
+"""
+
+import time
+import uuid
+import asyncio
+import logging
+import threading
+from collections import deque
+
+from .comfy_api import ComfyAPIError, ComfyClient
+
+CLASSES = ("interactive", "batch")
+POLICIES = ("fair", "fifo")
+
+PENDING = "pending"
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+def prompt_cost(prompt):
+    """Relative cost of a prompt: its total sampler steps times batch size (at least 1)."""
+    steps = 0
+    batch = 1
+    for node in prompt.values():
+        inputs = node.get("inputs") or {}
+        if isinstance(inputs.get("steps"), int):
+            steps += inputs["steps"]
+        if isinstance(inputs.get("batch_size"), int):
+            batch = max(batch, inputs["batch_size"])
+    return max(1, steps * batch)
+
+
+def percentiles(values, points=(50, 90, 99)):
+    """Nearest-rank percentiles of ``values`` as {"p50": ...}, or {} when empty."""
+    if not values:
+        return {}
+    ordered = sorted(values)
+    return {f"p{point}": round(ordered[min(len(ordered) - 1, int(len(ordered) * point / 100))], 3)
+            for point in points}
+
+
+class FairScheduler:
+    """Releases submitted prompts to ComfyUI by priority class and weighted fair share."""
+
+    def __init__(self, config, policy=None):
+        self.config = config
+        self.policy = policy or config.get("scheduler_policy", "fair")
+        if self.policy not in POLICIES:
+            raise ValueError(f"Unknown scheduler policy: {self.policy}")
+        self.depth = max(1, config.get("scheduler_depth", 2))
+        self.weights = config.get("scheduler_weights", {})
+        self.preempt = config.get("scheduler_preempt", True) and self.policy == "fair"
+        self.poll_interval = config.get("scheduler_poll_interval", 5.0)
+        self.client_id = uuid.uuid4().hex
+
+        self.lock = threading.Lock()
+        # class -> user -> jobs in submission order
+        self.queues = {priority: {} for priority in CLASSES}
+        self.virtual_time = dict.fromkeys(CLASSES, 0.0)
+        self.last_finish = {priority: {} for priority in CLASSES}
+        self.jobs = {}
+        self.by_prompt = {}
+        self.sequence = 0
+        self.finished = deque(maxlen=config.get("scheduler_history", 1000))
+        self.counters = {"submitted": 0, "dispatched": 0, "preempted": 0, "done": 0, "failed": 0, "cancelled": 0}
+
+        self.client = None
+        self.loop = None
+        self.thread = None
+        self.task = None
+        self.wake = None
+        # TimingRecorder for the prompts we dispatch, if any
+        self.timings = None
+
+    def start(self):
+        """Run the dispatcher in a background thread."""
+        if self.thread is not None:
+            return
+        ready = threading.Event()
+        self.thread = threading.Thread(target=self.run, args=(ready,), name="scheduler", daemon=True)
+        self.thread.start()
+        ready.wait(5)
+
+    def run(self, ready=None):
+        """Thread body: run the event loop until stopped."""
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.task = self.loop.create_task(self.dispatch_forever())
+        if ready is not None:
+            self.loop.call_soon(ready.set)
+        try:
+            self.loop.run_until_complete(self.task)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logging.error(f"Scheduler error: {e}")
+        finally:
+            self.loop.close()
+
+    def stop(self):
+        """Stop dispatching; prompts already in ComfyUI's queue stay there."""
+        if self.loop is None or self.loop.is_closed():
+            return
+        self.loop.call_soon_threadsafe(self.task.cancel)
+        if self.client is not None:
+            # Closing the websocket ends the loop even if the cancel is lost
+            asyncio.run_coroutine_threadsafe(self.client.close(), self.loop)
+        self.thread.join(timeout=5)
+        self.thread = None
+
+    def weight(self, user):
+        """Share weight of a user (default 1)."""
+        return max(0.01, float(self.weights.get(user, self.weights.get("*", 1.0))))
+
+    def submit(self, prompt, user="default", priority="batch", extra_data=None):
+        """Hold a prompt for dispatch; returns the job. Safe to call from any thread."""
+        if priority not in CLASSES:
+            raise ValueError(f"Unknown priority class: {priority}")
+        if not isinstance(prompt, dict) or not prompt:
+            raise ValueError("prompt must be a non-empty API-format workflow")
+        with self.lock:
+            self.sequence += 1
+            job = {
+                "id": uuid.uuid4().hex[:12],
+                "user": str(user),
+                "priority": priority,
+                "prompt": prompt,
+                "extra_data": extra_data,
+                "cost": prompt_cost(prompt),
+                "sequence": self.sequence,
+                "status": PENDING,
+                "prompt_id": None,
+                "submitted_at": time.time(),
+                "dispatched_at": None,
+                "started_at": None,
+                "finished_at": None,
+                "preempted": 0,
+                "message": None,
+            }
+            self.tag(job)
+            self.queues[priority].setdefault(job["user"], deque()).append(job)
+            self.jobs[job["id"]] = job
+            self.counters["submitted"] += 1
+        self.poke()
+        return self.describe(job)
+
+    def tag(self, job):
+        """Give a job its start and finish tags in its class's virtual time."""
+        last = self.last_finish[job["priority"]]
+        job["start_tag"] = max(self.virtual_time[job["priority"]], last.get(job["user"], 0.0))
+        job["finish_tag"] = job["start_tag"] + job["cost"] / self.weight(job["user"])
+        last[job["user"]] = job["finish_tag"]
+
+    def poke(self):
+        """Wake the dispatcher from any thread."""
+        if self.loop is not None and not self.loop.is_closed() and self.wake is not None:
+            self.loop.call_soon_threadsafe(self.wake.set)
+
+    def next_job(self):
+        """Pop the job to dispatch next, or None. Call with the lock held."""
+        if self.policy == "fifo":
+            # Plain arrival order across classes, like ComfyUI's own queue
+            heads = [queue[0] for by_user in self.queues.values() for queue in by_user.values() if queue]
+            job = min(heads, key=lambda head: head["sequence"], default=None)
+        else:
+            job = None
+            for priority in CLASSES:
+                heads = [queue[0] for queue in self.queues[priority].values() if queue]
+                if heads:
+                    job = min(heads, key=lambda head: (head["start_tag"], head["sequence"]))
+                    self.virtual_time[priority] = max(self.virtual_time[priority], job["start_tag"])
+                    break
+        if job is not None:
+            self.queues[job["priority"]][job["user"]].popleft()
+        return job
+
+    def requeue(self, job):
+        """Put a job back at the front of its user's queue, keeping its tags."""
+        job.update(status=PENDING, prompt_id=None, dispatched_at=None)
+        self.queues[job["priority"]].setdefault(job["user"], deque()).appendleft(job)
+
+    def cancel(self, job_id):
+        """Cancel a job that has not started; returns True if it was cancelled."""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None or job["status"] not in (PENDING, QUEUED):
+                return False
+            if job["status"] == PENDING:
+                self.queues[job["priority"]][job["user"]].remove(job)
+            prompt_id = job["prompt_id"]
+            self.finish(job, CANCELLED)
+        if prompt_id and self.loop is not None and not self.loop.is_closed():
+            asyncio.run_coroutine_threadsafe(self.client.delete_queued([prompt_id]), self.loop)
+        return True
+
+    def finish(self, job, status, message=None):
+        """Record a job's outcome. Call with the lock held."""
+        job.update(status=status, finished_at=time.time(), message=message)
+        self.by_prompt.pop(job["prompt_id"], None)
+        self.jobs.pop(job["id"], None)
+        self.counters[status] += 1
+        # Keep finished jobs for latency stats, without their prompts
+        self.finished.append({key: value for key, value in job.items() if key not in ("prompt", "extra_data")})
+
+    async def dispatch_forever(self):
+        """Dispatch held jobs and track them until cancelled."""
+        self.wake = asyncio.Event()
+        self.client = ComfyClient.from_config(self.config, client_id=self.client_id, timeout=30.0)
+        events = asyncio.ensure_future(self.follow_events())
+        try:
+            while True:
+                self.wake.clear()
+                try:
+                    await self.dispatch()
+                except ComfyAPIError as e:
+                    logging.debug(f"Scheduler: {e}")
+                try:
+                    await asyncio.wait_for(self.wake.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    # Events are lost across reconnects; settle from /queue and /history
+                    try:
+                        await self.reconcile()
+                    except ComfyAPIError as e:
+                        logging.debug(f"Scheduler: {e}")
+        finally:
+            events.cancel()
+            await self.client.close()
+            await asyncio.gather(events, return_exceptions=True)
+
+    async def dispatch(self):
+        """Preempt if needed, then fill ComfyUI's queue up to the target depth."""
+        queue = await self.client.get_queue()
+        running = queue.get("queue_running") or []
+        pending = queue.get("queue_pending") or []
+        if self.preempt:
+            pending = await self.preempt_batch(pending)
+
+        depth = len(running) + len(pending)
+        while depth < self.depth:
+            with self.lock:
+                job = self.next_job()
+                if job is None:
+                    return
+                job.update(status=QUEUED, dispatched_at=time.time())
+            try:
+                response = await self.client.queue_prompt(job["prompt"], job["extra_data"])
+            except ComfyAPIError as e:
+                with self.lock:
+                    # cancel() may have finished the job while we were submitting it
+                    cancelled = job["status"] == CANCELLED
+                    if not cancelled and e.status is None:
+                        # ComfyUI is unreachable; try again later
+                        self.requeue(job)
+                    elif not cancelled:
+                        self.finish(job, FAILED, str(e))
+                if e.status is None:
+                    raise
+                if not cancelled:
+                    logging.warning(f"Scheduler: {job['user']}'s job {job['id']} rejected: {e}")
+                continue
+            with self.lock:
+                cancelled = job["status"] == CANCELLED
+                if not cancelled:
+                    job["prompt_id"] = response["prompt_id"]
+                    self.by_prompt[response["prompt_id"]] = job
+                    self.counters["dispatched"] += 1
+            if cancelled:
+                # cancel() ran before we knew the prompt id, so it could not delete it
+                await self.client.delete_queued([response["prompt_id"]])
+                continue
+            if self.timings is not None:
+                self.timings.expect(response["prompt_id"], job["prompt"])
+            depth += 1
+
+    async def preempt_batch(self, pending):
+        """Pull our queued batch prompts out of ComfyUI's queue while interactive jobs wait.
+
+        Returns ComfyUI's pending list without the removed prompts.
+        """
+        with self.lock:
+            waiting = any(queue for queue in self.queues["interactive"].values())
+            victims = [item[1] for item in pending
+                       if self.by_prompt.get(item[1], {}).get("priority") == "batch"] if waiting else []
+        if not victims:
+            return pending
+        await self.client.delete_queued(victims)
+
+        # A victim may have started between reading and deleting
+        queue = await self.client.get_queue()
+        still_running = {item[1] for item in queue.get("queue_running") or []}
+        with self.lock:
+            for prompt_id in victims:
+                job = self.by_prompt.get(prompt_id)
+                if job is None or prompt_id in still_running:
+                    continue
+                del self.by_prompt[prompt_id]
+                job["preempted"] += 1
+                self.counters["preempted"] += 1
+                self.requeue(job)
+        logging.debug(f"Scheduler preempted {len(victims)} batch prompts")
+        return queue.get("queue_pending") or []
+
+    async def follow_events(self):
+        """Track our prompts from ComfyUI's execution messages."""
+        async for event in self.client.events():
+            if self.timings is not None:
+                self.timings.observe(event)
+            kind = event.get("type")
+            data = event.get("data") or {}
+            if kind == "connected":
+                self.wake.set()
+                continue
+            if kind == "status":
+                # Someone else's prompt may have freed a slot
+                self.wake.set()
+                continue
+            with self.lock:
+                job = self.by_prompt.get(data.get("prompt_id"))
+                if job is None:
+                    continue
+                if kind == "execution_start":
+                    job.update(status=RUNNING, started_at=time.time())
+                elif kind == "execution_success":
+                    self.finish(job, DONE)
+                elif kind in ("execution_error", "execution_interrupted"):
+                    self.finish(job, FAILED, data.get("exception_message") or kind.replace("_", " "))
+                else:
+                    continue
+            self.wake.set()
+
+    async def reconcile(self):
+        """Settle dispatched jobs from /queue and /history; requeue prompts ComfyUI lost."""
+        with self.lock:
+            outstanding = dict(self.by_prompt)
+        if not outstanding:
+            return
+        queue = await self.client.get_queue()
+        queued = {item[1] for key in ("queue_running", "queue_pending") for item in queue.get(key) or []}
+        for prompt_id, job in outstanding.items():
+            if prompt_id in queued:
+                continue
+            entry = (await self.client.get_history(prompt_id)).get(prompt_id)
+            with self.lock:
+                if self.by_prompt.get(prompt_id) is not job:
+                    continue
+                if entry is None:
+                    # ComfyUI restarted and dropped it
+                    del self.by_prompt[prompt_id]
+                    self.requeue(job)
+                elif entry.get("status", {}).get("status_str") == "success":
+                    self.finish(job, DONE)
+                else:
+                    self.finish(job, FAILED, "failed in ComfyUI")
+
+    def describe(self, job):
+        """Public fields of a job."""
+        return {key: job[key] for key in ("id", "user", "priority", "status", "prompt_id", "cost", "preempted",
+                                          "submitted_at", "dispatched_at", "started_at", "finished_at", "message")}
+
+    def latency_stats(self):
+        """Per-class wait (submit to start) and latency (submit to finish) percentiles in seconds."""
+        with self.lock:
+            finished = list(self.finished)
+        stats = {}
+        for priority in CLASSES:
+            jobs = [job for job in finished if job["priority"] == priority and job["status"] == DONE]
+            stats[priority] = {
+                "jobs": len(jobs),
+                "wait": percentiles([job["started_at"] - job["submitted_at"] for job in jobs if job["started_at"]]),
+                "latency": percentiles([job["finished_at"] - job["submitted_at"] for job in jobs]),
+            }
+        return stats
+
+    def status(self):
+        """Get held and dispatched jobs, per-user backlog, counters and latency percentiles."""
+        with self.lock:
+            jobs = [self.describe(job) for job in self.jobs.values()]
+            backlog = {priority: {user: len(queue) for user, queue in by_user.items() if queue}
+                       for priority, by_user in self.queues.items()}
+            counters = dict(self.counters)
+        jobs.sort(key=lambda job: job["submitted_at"])
+        return {
+            "policy": self.policy,
+            "depth": self.depth,
+            "preempt": self.preempt,
+            "backlog": backlog,
+            "jobs": jobs,
+            "counters": counters,
+            "latency": self.latency_stats(),
+        }
+
+    def job(self, job_id):
+        """Get a job, held or recently finished, or None."""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is not None:
+                return self.describe(job)
+            for done in reversed(self.finished):
+                if done["id"] == job_id:
+                    return self.describe(done)
+        return None
@@ -0,0 +1,372 @@
+"""
+Headless core of ComfyUI Manager
+
+The Supervisor owns the ComfyUI process and the system monitor. The GUI,
+the daemon and the CLI are all clients of it; nothing here imports tkinter.
+"""
+
+import os
+import json
+import time
+import signal
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+
+from .process_manager import ProcessManager
+from .system_monitor import SystemMonitorThread
+from .output_index import OutputIndex
+from .cache_manager import CacheManager
+from .vram_advisor import VramAdvisor
+from .warmup import WarmupRunner
+from .utils import get_run_dir
+
+
+class Supervisor:
+    """Owns the ComfyUI process and the system monitor."""
+
+    def __init__(self, config):
+        self.config = config
+        self.process_manager = ProcessManager(config)
+        self.system_monitor = SystemMonitorThread(config, self.process_manager)
+        self.output_index = OutputIndex.from_config(config)
+        self.cache_manager = CacheManager(config, self.process_manager)
+        self.advisor = VramAdvisor(config, self.system_monitor)
+        self.process_manager.advisor = self.advisor
+        self.warmup = WarmupRunner(config, self.process_manager)
+        self.process_manager.warmup = self.warmup
+
+        self.started_at = time.time()
+        self.startup_ms = None
+        self.stop_event = threading.Event()
+        self.control_server = None
+        self.prompt_index = None
+        self.archiver = None
+        self.prefetcher = None
+        self.queue_monitor = None
+        self.scheduler = None
+        self._thumbnail_cache = None
+        self._validator = None
+        self._timings = None
+
+        # Daemon files
+        self.run_dir = get_run_dir()
+        self.pid_file = self.run_dir / "daemon.pid"
+        self.state_file = self.run_dir / "state.json"
+        self.output_log = self.run_dir / "comfyui_output.log"
+        self.output_log_max_bytes = config.get("output_log_max_mb", 20) * 1024 * 1024
+        self._output_file = None
+        self._output_lock = threading.Lock()
+
+    def default_mode(self):
+        """Get the configured startup memory mode."""
+        return self.config.get("startup_mode", "auto")
+
+    def start_monitor(self):
+        """Start the system monitor thread."""
+        if not self.system_monitor.is_alive():
+            self.system_monitor.start()
+
+    @property
+    def thumbnail_cache(self):
+        """Thumbnail cache, created on first use."""
+        if self._thumbnail_cache is None:
+            from .thumbnails import ThumbnailCache
+            self._thumbnail_cache = ThumbnailCache.from_config(self.config)
+        return self._thumbnail_cache
+
+    @property
+    def validator(self):
+        """Workflow validator, created on first use."""
+        if self._validator is None:
+            from .validator import WorkflowValidator
+            self._validator = WorkflowValidator(self.config, self.process_manager)
+        return self._validator
+
+    @property
+    def timings(self):
+        """Execution timing recorder, or None if disabled; created on first use."""
+        if self._timings is None and self.config.get("timings_enabled", True):
+            from .system_monitor import read_vram_used
+            from .timings import TimingRecorder
+            try:
+                self._timings = TimingRecorder.from_config(self.config, read_vram_used)
+            except (sqlite3.Error, OSError) as e:
+                logging.error(f"Cannot open timing database: {e}")
+                # Don't retry on every call
+                self._timings = False
+        return self._timings or None
+
+    def start_output_index(self):
+        """Start indexing the output directory."""
+        if self.config.get("output_index_enabled", True):
+            self.output_index.start()
+
+    def start_prompt_index(self):
+        """Catalogue output prompts, following the output index."""
+        if not self.config.get("prompt_index_enabled", True) or self.prompt_index is not None:
+            return
+        from .prompt_index import PromptIndex
+        self.prompt_index = PromptIndex.from_config(self.config, self.output_index)
+        self.prompt_index.start()
+        self.advisor.prompt_index = self.prompt_index
+
+    def start_archiver(self):
+        """Recompress old outputs in the background if enabled."""
+        if not self.config.get("archive_enabled", False) or self.archiver is not None:
+            return
+        from .archiver import OutputArchiver
+        self.archiver = OutputArchiver(self.config, self.output_index, self.system_monitor)
+        self.archiver.start()
+
+    def start_prefetcher(self):
+        """Warm the page cache for likely models if enabled."""
+        if not self.config.get("prefetch_enabled", True) or self.prefetcher is not None:
+            return
+        from .prefetch import ModelPrefetcher
+        self.prefetcher = ModelPrefetcher(self.config, self.prompt_index)
+        self.prefetcher.start()
+
+    def start_queue_monitor(self):
+        """Follow ComfyUI's websocket for live queue state if enabled."""
+        if not self.config.get("comfyui_events_enabled", True) or self.queue_monitor is not None:
+            return
+        from .queue_monitor import QueueMonitor
+        self.queue_monitor = QueueMonitor(self.config)
+        self.queue_monitor.timings = self.timings
+        self.queue_monitor.add_listener(self.on_queue_event)
+        self.queue_monitor.start()
+
+    def on_queue_event(self, event):
+        """Drop the cached node schema when ComfyUI may have restarted."""
+        if event.get("type") == "connected" and self._validator is not None:
+            self._validator.invalidate()
+
+    def start_scheduler(self):
+        """Hold submitted prompts for fair-share dispatch to ComfyUI if enabled."""
+        if not self.config.get("scheduler_enabled", False) or self.scheduler is not None:
+            return
+        from .scheduler import FairScheduler
+        self.scheduler = FairScheduler(self.config)
+        self.scheduler.timings = self.timings
+        self.scheduler.start()
+
+    def start_cache_enforcer(self):
+        """Enforce cache quotas periodically."""
+        self.cache_manager.start_enforcer()
+
+    def start_control_server(self):
+        """Serve the local control API if enabled."""
+        if not self.config.get("control_server", True) or self.control_server is not None:
+            return
+        from .control_server import ControlServer
+        server = ControlServer(self)
+        if server.start():
+            self.control_server = server
+
+    def start(self, mode=None):
+        """Start ComfyUI."""
+        return self.process_manager.start(mode or self.default_mode())
+
+    def stop(self):
+        """Stop ComfyUI."""
+        return self.process_manager.stop()
+
+    def restart(self, mode=None):
+        """Restart ComfyUI, keeping the current mode unless one is given."""
+        mode = mode or self.process_manager.mode or self.default_mode()
+        if self.process_manager.is_running():
+            self.process_manager.stop()
+        return self.process_manager.start(mode)
+
+    def status(self):
+        """Get process status."""
+        running = self.process_manager.is_running()
+        warmup = self.warmup.status()
+        return {
+            "running": running,
+            "pid": self.process_manager.get_pid(),
+            "mode": self.process_manager.mode if running else None,
+            "startup_mode": self.default_mode(),
+            "port": self.config.get("port", 8188),
+            "manager_pid": os.getpid(),
+            "started_at": self.started_at,
+            "startup_ms": self.startup_ms,
+            "mode_reason": self.process_manager.advice["reason"] if running and self.process_manager.advice else None,
+            "ready": running and warmup["state"] == "ready",
+            "warmup": warmup,
+        }
+
+    def metrics(self):
+        """Get the latest system monitor values."""
+        monitor = self.system_monitor
+        return {
+            "cpu_percent": monitor.cpu_percent,
+            "memory_percent": monitor.memory_percent,
+            "gpu_percent": monitor.gpu_percent,
+            "gpu_memory_used": monitor.gpu_memory_used,
+            "gpu_memory_total": monitor.gpu_memory_total,
+            "comfyui_cpu_percent": monitor.comfyui_cpu_percent,
+            "comfyui_io_bytes_per_s": monitor.comfyui_io_bytes_per_s,
+            "timestamp": datetime.now().isoformat(),
+        }
+
+    def logs(self, lines=100):
+        """Get the last lines of ComfyUI output."""
+        return self.process_manager.get_output_tail(lines)
+
+    def shutdown(self):
+        """Stop ComfyUI, the monitor and the control server."""
+        self.warmup.stop()
+        if self.process_manager.is_running():
+            self.process_manager.stop()
+        self.system_monitor.stop()
+        self.output_index.stop()
+        if self.prompt_index is not None:
+            self.prompt_index.stop()
+            self.prompt_index = None
+        if self.archiver is not None:
+            self.archiver.stop()
+            self.archiver = None
+        if self.prefetcher is not None:
+            self.prefetcher.stop()
+            self.prefetcher = None
+        if self.queue_monitor is not None:
+            self.queue_monitor.stop()
+            self.queue_monitor = None
+        if self.scheduler is not None:
+            self.scheduler.stop()
+            self.scheduler = None
+        self.cache_manager.stop()
+        if self._thumbnail_cache is not None:
+            self._thumbnail_cache.close()
+        if self._timings:
+            self._timings.close()
+            self._timings = None
+        if self.control_server is not None:
+            self.control_server.stop()
+            self.control_server = None
+        self.prompt_index = None
+        self._thumbnail_cache = None
+
+    def run_daemon(self, mode=None, autostart=True):
+        """Run headless until SIGTERM/SIGINT, publishing state to the run dir."""
+        if read_daemon_pid() is not None:
+            logging.error("A ComfyUI Manager daemon is already running")
+            return False
+
+        self.pid_file.write_text(str(os.getpid()))
+
+        # SIGTERM/SIGINT exit, SIGHUP restarts ComfyUI, SIGUSR1/2 start/stop it
+        signal.signal(signal.SIGTERM, lambda s, f: self.stop_event.set())
+        signal.signal(signal.SIGINT, lambda s, f: self.stop_event.set())
+        signal.signal(signal.SIGHUP, lambda s, f: self.run_async(self.restart))
+        signal.signal(signal.SIGUSR1, lambda s, f: self.run_async(self.start))
+        signal.signal(signal.SIGUSR2, lambda s, f: self.run_async(self.stop))
+
+        self.process_manager.add_output_listener(self.write_output)
+        self.start_monitor()
+        self.start_output_index()
+        self.start_prompt_index()
+        self.start_archiver()
+        self.start_prefetcher()
+        self.start_queue_monitor()
+        self.start_scheduler()
+        self.start_cache_enforcer()
+        self.start_control_server()
+
+        if autostart:
+            self.start(mode)
+
+        self.startup_ms = process_age() * 1000
+        logging.info(f"Daemon ready in {self.startup_ms:.0f} ms (pid {os.getpid()})")
+
+        try:
+            while not self.stop_event.is_set():
+                self.write_state()
+                self.stop_event.wait(1.0)
+        finally:
+            logging.info("Daemon shutting down")
+            self.shutdown()
+            self.close_output()
+            for path in (self.pid_file, self.state_file):
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+
+        return True
+
+    def run_async(self, func):
+        """Run a lifecycle call off the signal handler."""
+        threading.Thread(target=func, daemon=True).start()
+
+    def write_state(self):
+        """Atomically publish status and metrics for CLI clients."""
+        state = {"status": self.status(), "metrics": self.metrics()}
+        tmp_path = self.state_file.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(state))
+        os.replace(tmp_path, self.state_file)
+
+    def write_output(self, line):
+        """Append a ComfyUI output line to the daemon output log."""
+        with self._output_lock:
+            if self._output_file is None:
+                self._output_file = open(self.output_log, "a", buffering=1)
+            self._output_file.write(line + "\n")
+
+            # Rotate once the log grows past its cap
+            if self._output_file.tell() > self.output_log_max_bytes:
+                self._output_file.close()
+                os.replace(self.output_log, self.output_log.with_suffix(".log.1"))
+                self._output_file = open(self.output_log, "a", buffering=1)
+
+    def close_output(self):
+        """Close the daemon output log."""
+        with self._output_lock:
+            if self._output_file is not None:
+                self._output_file.close()
+                self._output_file = None
+
+
+def process_age():
+    """Seconds since the current process was created."""
+    try:
+        # /proc gives 10 ms resolution; psutil's create_time rounds boot time
+        with open("/proc/uptime", "r") as f:
+            uptime = float(f.read().split()[0])
+        with open("/proc/self/stat", "r") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        start_ticks = int(fields[19])
+        return uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        import psutil
+        return time.time() - psutil.Process().create_time()
+
+
+def read_daemon_pid():
+    """Get the PID of the running daemon, or None."""
+    pid_file = get_run_dir() / "daemon.pid"
+    try:
+        pid = int(pid_file.read_text().strip())
+    except (FileNotFoundError, ValueError):
+        return None
+
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return None
+    except PermissionError:
+        pass
+    return pid
+
+
+def read_daemon_state():
+    """Get the last state published by the daemon, or None."""
+    if read_daemon_pid() is None:
+        return None
+    try:
+        return json.loads((get_run_dir() / "state.json").read_text())
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
@@ -0,0 +1,494 @@
+"""
+Batch parameter sweeps with queue-depth backpressure
+
+A sweep is an API-format workflow plus a spec of node inputs to vary:
+
+    {
+      "mode": "product",
+      "parameters": {
+        "3.seed": {"start": 1, "stop": 101},
+        "KSampler.cfg": [5.0, 6.5, 8.0],
+        "KSampler.sampler_name": ["euler", "dpmpp_2m"]
+      }
+    }
+
+Keys are ``<node id>.<input>`` or ``<class_type>.<input>`` (every node of
+that class). ``product`` runs every combination, ``zip`` pairs the lists
+up. Prompts are generated lazily and only submitted while ComfyUI's queue
+is shorter than the target depth, so a 10,000-prompt sweep never sits in
+ComfyUI's queue at once. Progress is saved after every change, so an
+interrupted sweep resumes where it stopped.
+"""
+
+import os
+import copy
+import json
+import time
+import uuid
+import asyncio
+import sqlite3
+import logging
+import threading
+
+from .comfy_api import ComfyAPIError, ComfyClient
+from .system_monitor import read_vram_used
+from .timings import TimingRecorder
+from .utils import get_app_dir
+from .validator import WorkflowValidator, format_errors
+
+MODES = ("product", "zip")
+
+# Item states
+QUEUED = "queued"
+SUCCESS = "success"
+ERROR = "error"
+
+
+def sweeps_dir():
+    """Get the directory holding sweep state files."""
+    directory = get_app_dir() / "sweeps"
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory
+
+
+def load_workflow(path):
+    """Read an API-format prompt from a JSON file or a ComfyUI output image."""
+    if str(path).lower().endswith((".png", ".webp")):
+        from .png_metadata import read_output_text
+        text = read_output_text(path).get("prompt")
+        if not text:
+            raise ValueError(f"{path} has no prompt metadata")
+        workflow = json.loads(text)
+    else:
+        with open(path) as f:
+            workflow = json.load(f)
+    if isinstance(workflow, dict) and isinstance(workflow.get("prompt"), dict):
+        # A saved /prompt request body
+        workflow = workflow["prompt"]
+    if not isinstance(workflow, dict) or isinstance(workflow.get("nodes"), list):
+        raise ValueError("Sweeps need an API-format workflow (Save (API) in ComfyUI)")
+    return workflow
+
+
+def expand_values(values):
+    """Turn a list or a {"start", "stop", "step"} range into a list."""
+    if isinstance(values, list):
+        return values
+    if isinstance(values, dict) and "start" in values and "stop" in values:
+        start, stop, step = values["start"], values["stop"], values.get("step", 1)
+        if not step:
+            raise ValueError("Range step must not be 0")
+        if all(isinstance(v, int) for v in (start, stop, step)):
+            return list(range(start, stop, step))
+        count = int((stop - start) / step + 1e-9)
+        return [round(start + i * step, 10) for i in range(max(0, count))]
+    raise ValueError(f"Sweep values must be a list or a start/stop range: {values!r}")
+
+
+def resolve_targets(workflow, key):
+    """Get the (node id, input) pairs a parameter key sets."""
+    node, _, name = key.rpartition(".")
+    if not node or not name:
+        raise ValueError(f"Parameter {key!r} must look like <node>.<input>")
+    if node in workflow:
+        nodes = [node]
+    else:
+        nodes = [node_id for node_id, data in workflow.items() if data.get("class_type") == node]
+    if not nodes:
+        raise ValueError(f"No node {node!r} (by id or class) in the workflow")
+    for node_id in nodes:
+        if name not in workflow[node_id].get("inputs", {}):
+            raise ValueError(f"Node {node_id} ({workflow[node_id].get('class_type')}) has no input {name!r}")
+    return [(node_id, name) for node_id in nodes]
+
+
+class Sweep:
+    """Random access to the prompts of a sweep."""
+
+    def __init__(self, workflow, spec):
+        self.workflow = workflow
+        self.mode = spec.get("mode", "product")
+        if self.mode not in MODES:
+            raise ValueError(f"Unknown sweep mode: {self.mode}")
+        parameters = spec.get("parameters") or {}
+        if not parameters:
+            raise ValueError("Sweep spec has no parameters")
+
+        self.axes = []
+        for key, values in parameters.items():
+            self.axes.append((key, resolve_targets(workflow, key), expand_values(values)))
+
+        sizes = [len(values) for _, _, values in self.axes]
+        if self.mode == "zip":
+            if len(set(sizes)) > 1:
+                raise ValueError(f"Zipped parameters need equal lengths, got {sizes}")
+            self.total = sizes[0]
+        else:
+            self.total = 1
+            for size in sizes:
+                self.total *= size
+
+    def params(self, index):
+        """Get {key: value} for prompt ``index``."""
+        if not 0 <= index < self.total:
+            raise IndexError(index)
+        if self.mode == "zip":
+            return {key: values[index] for key, _, values in self.axes}
+        # Mixed-radix decode; the last parameter varies fastest
+        params = {}
+        for key, _, values in reversed(self.axes):
+            index, position = divmod(index, len(values))
+            params[key] = values[position]
+        return {key: params[key] for key, _, _ in self.axes}
+
+    def prompt(self, index):
+        """Build prompt ``index``."""
+        prompt = copy.deepcopy(self.workflow)
+        params = self.params(index)
+        for key, targets, _ in self.axes:
+            for node_id, name in targets:
+                prompt[node_id]["inputs"][name] = params[key]
+        return prompt
+
+
+def list_sweeps():
+    """Get summaries of saved sweeps, newest first."""
+    summaries = []
+    for path in sweeps_dir().glob("*.json"):
+        try:
+            state = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue
+        summaries.append(summarize(state))
+    return sorted(summaries, key=lambda s: s["created"], reverse=True)
+
+
+def summarize(state):
+    """Counts and status of a sweep state."""
+    items = state["items"].values()
+    return {
+        "name": state["name"],
+        "status": state["status"],
+        "created": state["created"],
+        "total": state["total"],
+        "submitted": state["next_index"],
+        "queued": sum(1 for item in items if item["status"] == QUEUED),
+        "succeeded": sum(1 for item in items if item["status"] == SUCCESS),
+        "failed": sum(1 for item in items if item["status"] == ERROR),
+        "message": state.get("message", ""),
+    }
+
+
+class SweepRunner:
+    """Submits a sweep's prompts to ComfyUI, keeping its queue at ``depth``."""
+
+    def __init__(self, config, name, workflow=None, spec=None, depth=None):
+        self.config = config
+        self.name = name
+        self.path = sweeps_dir() / f"{name}.json"
+        self.depth = depth or config.get("sweep_queue_depth", 2)
+        self.poll_interval = config.get("sweep_poll_interval", 5.0)
+
+        if workflow is None:
+            # Resume
+            if not self.path.exists():
+                raise ValueError(f"No sweep named {name!r}")
+            self.state = json.loads(self.path.read_text())
+        else:
+            if self.path.exists():
+                raise ValueError(f"A sweep named {name!r} already exists")
+            self.state = {
+                "name": name,
+                "created": time.time(),
+                "client_id": uuid.uuid4().hex,
+                "workflow": workflow,
+                "spec": spec,
+                "total": 0,
+                "next_index": 0,
+                "items": {},
+                "status": "new",
+                "message": "",
+            }
+        self.sweep = Sweep(self.state["workflow"], self.state["spec"])
+        self.state["total"] = self.sweep.total
+        if workflow is not None:
+            self.save()
+
+        self.lock = threading.Lock()
+        self.by_prompt = {item["prompt_id"]: index for index, item in self.state["items"].items()}
+        self.client = None
+        self.prompt_cache = None
+        self.validator = None
+        self.timings = None
+        self.recording = []
+        self.wake = None
+        self.stopping = False
+        self.loop = None
+        self.thread = None
+        self.listeners = []
+
+    def save(self):
+        """Atomically write the state file."""
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(self.state))
+        os.replace(tmp_path, self.path)
+
+    def progress(self):
+        """Get counts and status."""
+        with self.lock:
+            return summarize(self.state)
+
+    def add_listener(self, callback):
+        """Call ``callback(progress)`` from the runner thread on every change."""
+        self.listeners.append(callback)
+
+    def changed(self):
+        """Save and tell listeners."""
+        with self.lock:
+            self.save()
+        progress = self.progress()
+        for callback in list(self.listeners):
+            try:
+                callback(progress)
+            except Exception as e:
+                logging.error(f"Sweep listener failed: {e}")
+
+    def outstanding(self):
+        """Indexes submitted but not finished."""
+        return [index for index, item in self.state["items"].items() if item["status"] == QUEUED]
+
+    def finish_item(self, prompt_id, status, message=""):
+        """Record a prompt's outcome."""
+        index = self.by_prompt.get(prompt_id)
+        if index is None or self.state["items"][index]["status"] != QUEUED:
+            return
+        with self.lock:
+            item = self.state["items"][index]
+            item["status"] = status
+            item["finished_at"] = time.time()
+            if message:
+                item["message"] = message
+        self.changed()
+        self.wake.set()
+        if status == SUCCESS and self.prompt_cache is not None:
+            self.recording.append(asyncio.ensure_future(self.client.record_result(prompt_id)))
+
+    async def run(self):
+        """Submit and track prompts until the sweep is done or ``stop()`` is called."""
+        self.wake = asyncio.Event()
+        if self.config.get("prompt_cache_enabled", True):
+            from .prompt_cache import CachingComfyClient, PromptCache
+            self.prompt_cache = PromptCache.from_config(self.config)
+            self.client = CachingComfyClient.from_config(self.config, client_id=self.state["client_id"],
+                                                         timeout=30.0, cache=self.prompt_cache)
+        else:
+            self.client = ComfyClient.from_config(self.config, client_id=self.state["client_id"], timeout=30.0)
+        if self.config.get("validate_prompts", True):
+            self.validator = WorkflowValidator(self.config)
+            try:
+                await self.validator.load(self.client)
+            except ComfyAPIError as e:
+                logging.warning(f"Sweep {self.name}: cannot read ComfyUI's node schema, not validating: {e}")
+                self.validator = None
+        if self.config.get("timings_enabled", True):
+            try:
+                self.timings = TimingRecorder.from_config(self.config, read_vram_used)
+            except (sqlite3.Error, OSError) as e:
+                logging.warning(f"Sweep {self.name}: cannot open the timing database: {e}")
+        self.state["status"] = "running"
+        self.changed()
+        logging.info(f"Sweep {self.name}: {self.sweep.total} prompts, queue depth {self.depth}")
+
+        events = asyncio.ensure_future(self.follow_events())
+        try:
+            await self.reconcile()
+            while not self.stopping:
+                if self.state["next_index"] >= self.sweep.total and not self.outstanding():
+                    self.state["status"] = "done"
+                    break
+                self.wake.clear()
+                try:
+                    await self.fill_queue()
+                except ComfyAPIError as e:
+                    self.state["message"] = str(e)
+                    logging.warning(f"Sweep {self.name}: {e}")
+                if self.state["status"] == "failed":
+                    break
+                try:
+                    await asyncio.wait_for(self.wake.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    # Events can be missed across reconnects; check the queue directly
+                    await self.reconcile()
+            else:
+                self.state["status"] = "paused"
+        finally:
+            events.cancel()
+            # Let finished prompts land in the prompt cache
+            await asyncio.gather(*self.recording, return_exceptions=True)
+            await self.client.close()
+            await asyncio.gather(events, return_exceptions=True)
+            if self.timings is not None:
+                self.timings.close()
+            self.changed()
+        logging.info(f"Sweep {self.name} {self.state['status']}: {self.progress()}")
+        return self.progress()
+
+    async def fill_queue(self):
+        """Submit prompts until ComfyUI's queue reaches the target depth."""
+        queue = await self.client.get_queue()
+        depth = len(queue.get("queue_running") or []) + len(queue.get("queue_pending") or [])
+        while depth < self.depth and self.state["next_index"] < self.sweep.total and not self.stopping:
+            index = self.state["next_index"]
+            queued = await self.submit(index)
+            if self.state["status"] == "failed":
+                return
+            if queued:
+                depth += 1
+
+    async def submit(self, index):
+        """Queue one prompt, recording it before anything else can happen.
+
+        Returns True if it went to ComfyUI's queue, False if it was
+        answered from the prompt cache or rejected. Resubmitting an
+        earlier index never moves the cursor back.
+        """
+        params = self.sweep.params(index)
+        prompt = self.sweep.prompt(index)
+        if self.validator is not None:
+            errors = self.validator.validate(prompt)
+            if errors:
+                self.reject(index, params, format_errors(errors))
+                return False
+        try:
+            response = await self.client.queue_prompt(prompt)
+        except ComfyAPIError as e:
+            if e.status != 400:
+                raise
+            self.reject(index, params, error_message(e.body))
+            return False
+
+        if response.get("cached"):
+            with self.lock:
+                self.state["items"][str(index)] = {"prompt_id": response["prompt_id"], "status": SUCCESS,
+                                                   "params": params, "cache_key": response["cached"]["key"],
+                                                   "finished_at": time.time()}
+                self.state["next_index"] = max(self.state["next_index"], index + 1)
+            self.changed()
+            self.wake.set()
+            return False
+
+        with self.lock:
+            self.state["items"][str(index)] = {"prompt_id": response["prompt_id"], "status": QUEUED,
+                                               "params": params, "submitted_at": time.time()}
+            self.state["next_index"] = max(self.state["next_index"], index + 1)
+            self.by_prompt[response["prompt_id"]] = str(index)
+        if self.timings is not None:
+            self.timings.expect(response["prompt_id"], prompt)
+        self.changed()
+        return True
+
+    def reject(self, index, params, message):
+        """Record an invalid prompt; fail the sweep if no prompt has been accepted yet."""
+        if all(item["status"] == ERROR for item in self.state["items"].values()):
+            # The workflow itself is invalid; every prompt would fail the same way
+            with self.lock:
+                self.state["status"] = "failed"
+                self.state["message"] = f"Prompt {index} is invalid: {message}"
+            logging.error(f"Sweep {self.name}: {self.state['message']}")
+            return
+        with self.lock:
+            self.state["items"][str(index)] = {"prompt_id": None, "status": ERROR, "params": params,
+                                               "message": message}
+            self.state["next_index"] = max(self.state["next_index"], index + 1)
+        self.changed()
+
+    async def reconcile(self):
+        """Settle outstanding prompts from /queue and /history, resubmitting lost ones."""
+        outstanding = self.outstanding()
+        if not outstanding:
+            return
+        try:
+            queue = await self.client.get_queue()
+            in_queue = {item[1] for item in (queue.get("queue_running") or []) + (queue.get("queue_pending") or [])}
+            for index in outstanding:
+                prompt_id = self.state["items"][index]["prompt_id"]
+                if prompt_id in in_queue:
+                    continue
+                history = (await self.client.get_history(prompt_id)).get(prompt_id)
+                if history is not None:
+                    status = history.get("status", {})
+                    completed = status.get("completed", True)
+                    self.finish_item(prompt_id, SUCCESS if completed else ERROR,
+                                     "" if completed else status.get("status_str", "error"))
+                else:
+                    # ComfyUI restarted and lost it
+                    logging.info(f"Sweep {self.name}: resubmitting prompt {index}")
+                    del self.by_prompt[prompt_id]
+                    await self.submit(int(index))
+        except ComfyAPIError as e:
+            logging.debug(f"Sweep {self.name}: cannot reconcile: {e}")
+
+    async def follow_events(self):
+        """Mark prompts finished from websocket events and wake the submit loop."""
+        async for event in self.client.events():
+            if self.timings is not None:
+                self.timings.observe(event)
+            kind = event.get("type")
+            data = event.get("data") or {}
+            if kind == "execution_success":
+                self.finish_item(data.get("prompt_id"), SUCCESS)
+            elif kind == "execution_error":
+                self.finish_item(data.get("prompt_id"), ERROR, data.get("exception_message", "error"))
+            elif kind == "execution_interrupted":
+                self.finish_item(data.get("prompt_id"), ERROR, "interrupted")
+            elif kind in ("status", "connected"):
+                self.wake.set()
+
+    async def cancel(self):
+        """Remove this sweep's pending prompts from ComfyUI's queue."""
+        self.client = self.client or ComfyClient.from_config(self.config, client_id=self.state["client_id"])
+        prompt_ids = [self.state["items"][index]["prompt_id"] for index in self.outstanding()]
+        if prompt_ids:
+            await self.client.delete_queued(prompt_ids)
+        await self.client.close()
+        with self.lock:
+            for index in self.outstanding():
+                self.state["items"][index].update(status=ERROR, message="cancelled")
+            self.state["status"] = "cancelled"
+        self.changed()
+        return len(prompt_ids)
+
+    def start(self):
+        """Run in a background thread."""
+        self.thread = threading.Thread(target=self.run_thread, name=f"sweep-{self.name}", daemon=True)
+        self.thread.start()
+
+    def run_thread(self):
+        """Thread body."""
+        self.loop = asyncio.new_event_loop()
+        try:
+            self.loop.run_until_complete(self.run())
+        except Exception as e:
+            logging.error(f"Sweep {self.name} failed: {e}")
+        finally:
+            self.loop.close()
+
+    def stop(self):
+        """Pause after the current submission; queued prompts keep running."""
+        self.stopping = True
+        if self.loop is not None and not self.loop.is_closed() and self.wake is not None:
+            self.loop.call_soon_threadsafe(self.wake.set)
+
+
+def error_message(body):
+    """Pull a readable message out of a rejected /prompt response."""
+    try:
+        response = json.loads(body)
+    except (TypeError, ValueError):
+        return "rejected"
+    error = response.get("error")
+    message = error.get("message", "rejected") if isinstance(error, dict) else str(error or "rejected")
+    for node_id, node_error in (response.get("node_errors") or {}).items():
+        for detail in node_error.get("errors", [])[:1]:
+            message += f"; node {node_id}: {detail.get('details') or detail.get('message')}"
+    return message
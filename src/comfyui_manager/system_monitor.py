@@ -4,16 +4,48 @@ System monitoring for ComfyUI Manager
 
 import threading
 import time
+import platform
 import psutil
+from collections import deque
 from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
 import logging
 
+
+@lru_cache(maxsize=1)
+def nvml():
+    """The initialized NVML module, or None."""
+    try:
+        import nvidia_smi
+        nvidia_smi.nvmlInit()
+        return nvidia_smi
+    except Exception:
+        return None
+
+
+def read_vram_used():
+    """GPU memory in use on the first GPU in MB, or None if it cannot be read.
+
+    A direct NVML query (microseconds), unlike the monitor's 1 s samples.
+    """
+    module = nvml()
+    if module is None:
+        return None
+    try:
+        handle = module.nvmlDeviceGetHandleByIndex(0)
+        return module.nvmlDeviceGetMemoryInfo(handle).used // (1024 * 1024)
+    except Exception:
+        return None
+
+
 class SystemMonitorThread(threading.Thread):
     """Thread for monitoring system resources."""
     
-    def __init__(self, config):
+    def __init__(self, config, process_manager=None):
         super().__init__(daemon=True)
         self.config = config
+        self.process_manager = process_manager
         self.running = False
         
         # Current values
@@ -23,6 +55,19 @@ class SystemMonitorThread(threading.Thread):
         self.gpu_memory_used = 0
         self.gpu_memory_total = 0
         
+        # Load from the ComfyUI process tree
+        self.comfyui_cpu_percent = 0.0
+        self.comfyui_io_bytes_per_s = 0.0
+        self._tracked = {}
+        self._last_io = None
+        
+        # Sample history: (timestamp, cpu %, memory %, gpu %, vram %)
+        self.history = deque(maxlen=config.get("monitor_history_size", 3600))
+        self.sample_count = 0
+        
+        # Static system facts, gathered once on first request
+        self._static_info = None
+        
         # Try to import GPU monitoring libraries
         self.gpu_available = False
         try:
@@ -56,6 +101,12 @@ class SystemMonitorThread(threading.Thread):
                 # Update GPU usage if available
                 self.update_gpu_stats()
                 
+                # Update ComfyUI process load
+                self.update_process_stats()
+                
+                # Record sample
+                self.record_sample()
+                
                 # Sleep before next update
                 time.sleep(1)
                 
@@ -93,6 +144,165 @@ class SystemMonitorThread(threading.Thread):
             logging.debug(f"GPU monitoring error: {e}")
             self.gpu_percent = 0.0
     
+    def update_process_stats(self):
+        """Update CPU and disk I/O of the ComfyUI process tree."""
+        if self.process_manager is None:
+            return
+        
+        processes = self.process_manager.get_process_tree()
+        if not processes:
+            self.comfyui_cpu_percent = 0.0
+            self.comfyui_io_bytes_per_s = 0.0
+            self._tracked.clear()
+            self._last_io = None
+            return
+        
+        cpu = 0.0
+        io_bytes = 0
+        tracked = {}
+        for proc in processes:
+            # Keep Process objects between samples so cpu_percent has a baseline
+            proc = self._tracked.get(proc.pid, proc)
+            tracked[proc.pid] = proc
+            try:
+                cpu += proc.cpu_percent(interval=None)
+                counters = proc.io_counters()
+                io_bytes += counters.read_bytes + counters.write_bytes
+            except (psutil.Error, AttributeError):
+                continue
+        self._tracked = tracked
+        self.comfyui_cpu_percent = cpu
+        
+        now = time.monotonic()
+        if self._last_io is not None and now > self._last_io[0]:
+            delta = max(0, io_bytes - self._last_io[1])
+            self.comfyui_io_bytes_per_s = delta / (now - self._last_io[0])
+        self._last_io = (now, io_bytes)
+    
+    def record_sample(self):
+        """Append the current values to the history buffer."""
+        vram_percent = 0.0
+        if self.gpu_memory_total:
+            vram_percent = self.gpu_memory_used / self.gpu_memory_total * 100
+        
+        self.history.append((
+            time.time(),
+            self.cpu_percent,
+            self.memory_percent,
+            self.gpu_percent,
+            vram_percent,
+        ))
+        self.sample_count += 1
+    
+    def get_history(self, seconds=None):
+        """Get stored samples, optionally only those from the last N seconds."""
+        samples = list(self.history)
+        if seconds is None or not samples:
+            return samples
+        
+        cutoff = samples[-1][0] - seconds
+        for i, sample in enumerate(samples):
+            if sample[0] >= cutoff:
+                return samples[i:]
+        return []
+    
+    def get_static_info(self):
+        """Get system facts that do not change while running (cached)."""
+        if self._static_info is None:
+            self._static_info = self.collect_static_info()
+        return self._static_info
+    
+    def collect_static_info(self):
+        """Gather static system facts."""
+        info = []
+        
+        # Operating system
+        os_name = platform.platform()
+        try:
+            with open("/etc/os-release", "r") as f:
+                for line in f:
+                    if line.startswith("PRETTY_NAME="):
+                        os_name = line.split("=", 1)[1].strip().strip('"')
+                        break
+        except OSError:
+            pass
+        info.append(("Operating System", os_name))
+        info.append(("Kernel", platform.release()))
+        
+        # CPU
+        info.append(("CPU Model", self.get_cpu_model()))
+        physical = psutil.cpu_count(logical=False)
+        logical = psutil.cpu_count(logical=True)
+        info.append(("CPU Cores", f"{physical} physical / {logical} logical"))
+        
+        # Memory
+        memory = psutil.virtual_memory()
+        info.append(("Total Memory", f"{memory.total / (1024**3):.1f} GB"))
+        
+        # GPU
+        gpu_name, gpu_total = self.get_gpu_identity()
+        info.append(("GPU", gpu_name or "Not available"))
+        info.append(("GPU Memory", f"{gpu_total} MB" if gpu_total else "Not available"))
+        
+        # Disk holding the outputs
+        output_dir = self.config.get("output_dir") or "/"
+        disk_path = Path(output_dir)
+        while not disk_path.exists() and disk_path != disk_path.parent:
+            disk_path = disk_path.parent
+        try:
+            disk = psutil.disk_usage(str(disk_path))
+            info.append(("Output Disk", f"{disk.free // (1024**3)} GB free of {disk.total // (1024**3)} GB"))
+        except OSError:
+            info.append(("Output Disk", "Not available"))
+        
+        # Software
+        info.append(("Python Version", platform.python_version()))
+        info.append(("PyTorch Version", self.get_torch_version()))
+        
+        return info
+    
+    def get_cpu_model(self):
+        """Get the CPU model name."""
+        try:
+            with open("/proc/cpuinfo", "r") as f:
+                for line in f:
+                    if line.startswith("model name"):
+                        return line.split(":", 1)[1].strip()
+        except OSError:
+            pass
+        return platform.processor() or "Unknown"
+    
+    def get_gpu_identity(self):
+        """Get the name and total memory (MB) of the first GPU."""
+        try:
+            if hasattr(self, 'gputil'):
+                gpus = self.gputil.getGPUs()
+                if gpus:
+                    return gpus[0].name, int(gpus[0].memoryTotal)
+            elif hasattr(self, 'nvidia_smi'):
+                handle = self.nvidia_smi.nvmlDeviceGetHandleByIndex(0)
+                name = self.nvidia_smi.nvmlDeviceGetName(handle)
+                if isinstance(name, bytes):
+                    name = name.decode()
+                memory = self.nvidia_smi.nvmlDeviceGetMemoryInfo(handle)
+                return name, memory.total // (1024 * 1024)
+        except Exception as e:
+            logging.debug(f"GPU identity error: {e}")
+        return None, 0
+    
+    def get_torch_version(self):
+        """Get the PyTorch version from ComfyUI's environment without importing it."""
+        env_path = self.config.get("comfyui_env_path")
+        if env_path:
+            for dist_info in Path(env_path).glob("lib/python3*/site-packages/torch-*.dist-info"):
+                return dist_info.name[len("torch-"):-len(".dist-info")]
+        
+        try:
+            from importlib import metadata
+            return metadata.version("torch")
+        except Exception:
+            return "Not detected"
+    
     def stop(self):
         """Stop the monitoring thread."""
         self.running = False
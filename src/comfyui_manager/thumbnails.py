@@ -0,0 +1,237 @@
+"""
+Thumbnail cache for ComfyUI outputs
+
+Thumbnails are generated in a pool of low-priority worker processes,
+decoding at reduced size where the format allows it (Image.draft for
+JPEG, Image.reduce for everything else). They are stored on disk under
+a hash of path + mtime + size, so an unchanged file is never decoded
+twice, and the cache is kept under a byte quota with LRU eviction.
+"""
+
+import os
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from .utils import get_app_dir, process_context
+
+FORMAT_SUFFIXES = {"JPEG": ".jpg", "WEBP": ".webp", "PNG": ".png"}
+
+
+def lower_priority(niceness):
+    """Worker initializer: get out of the way of ComfyUI."""
+    try:
+        os.nice(niceness)
+    except OSError:
+        pass
+    try:
+        # SCHED_IDLE only runs when nothing else wants the CPU
+        os.sched_setscheduler(0, os.SCHED_IDLE, os.sched_param(0))
+    except (AttributeError, OSError):
+        pass
+
+
+def render_thumbnail(source, destination, size, image_format, quality):
+    """Decode ``source`` at reduced size and write a thumbnail. Runs in a worker."""
+    from PIL import Image
+
+    with Image.open(source) as img:
+        # JPEG can decode at 1/2, 1/4 or 1/8 scale directly
+        img.draft("RGB", size)
+
+        if img.mode not in ("RGB", "RGBA", "L", "LA"):
+            img = img.convert("RGBA" if img.info.get("transparency") is not None else "RGB")
+
+        # Other formats: cheap integer box reduction before resampling
+        factor = min(img.width // size[0], img.height // size[1])
+        if factor >= 2:
+            img = img.reduce(factor)
+
+        if img.mode in ("L", "LA"):
+            img = img.convert("RGBA" if img.mode == "LA" else "RGB")
+        if image_format == "JPEG" and img.mode == "RGBA":
+            img = img.convert("RGB")
+
+        img.thumbnail(size, Image.BILINEAR)
+
+        tmp_path = f"{destination}.{os.getpid()}.tmp"
+        img.save(tmp_path, image_format, quality=quality)
+
+    os.replace(tmp_path, destination)
+    return os.path.getsize(destination)
+
+
+class ThumbnailCache:
+    """On-disk thumbnail cache with a size quota and LRU eviction."""
+
+    def __init__(self, cache_dir, max_bytes=512 * 1024 * 1024, size=256,
+                 image_format="WEBP", quality=80, workers=None, niceness=10):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.size = (size, size)
+        self.image_format = image_format
+        self.suffix = FORMAT_SUFFIXES[image_format]
+        self.quality = quality
+        self.workers = workers or max(1, (os.cpu_count() or 2) // 2)
+        self.niceness = niceness
+
+        self.lock = threading.Lock()
+        self.pool = None
+
+        # key -> bytes, least recently used first
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.load_index()
+
+    @classmethod
+    def from_config(cls, config):
+        """Create a cache from configuration."""
+        cache_dir = config.get("thumbnail_cache_dir") or get_app_dir() / "cache" / "thumbnails"
+        return cls(
+            cache_dir,
+            max_bytes=config.get("thumbnail_cache_max_mb", 512) * 1024 * 1024,
+            size=config.get("thumbnail_size", 256),
+            workers=config.get("thumbnail_workers") or None,
+        )
+
+    def load_index(self):
+        """Rebuild the LRU order from the files on disk (oldest access first)."""
+        found = []
+        for path in self.cache_dir.glob(f"*/*{self.suffix}"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            found.append((stat.st_mtime, path.stem, stat.st_size))
+
+        for _, key, size in sorted(found):
+            self.entries[key] = size
+            self.total_bytes += size
+
+    def key(self, path, stat):
+        """Cache key for a source file version and the thumbnail settings."""
+        ident = f"{os.path.abspath(path)}\0{stat.st_mtime_ns}\0{stat.st_size}\0{self.size}\0{self.image_format}"
+        return hashlib.sha1(ident.encode()).hexdigest()
+
+    def entry_path(self, key):
+        """On-disk location of a cache entry."""
+        return self.cache_dir / key[:2] / f"{key}{self.suffix}"
+
+    def lookup(self, path):
+        """Get the cached thumbnail path for ``path``, or None on a miss."""
+        try:
+            key = self.key(path, os.stat(path))
+        except OSError:
+            return None
+
+        with self.lock:
+            if key not in self.entries:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+
+        thumb_path = self.entry_path(key)
+        try:
+            # Persist recency so LRU order survives restarts
+            os.utime(thumb_path)
+        except FileNotFoundError:
+            with self.lock:
+                self.total_bytes -= self.entries.pop(key, 0)
+            return None
+        return thumb_path
+
+    def get(self, path):
+        """Get a thumbnail, generating it on a miss."""
+        thumb_path = self.lookup(path)
+        if thumb_path is not None:
+            return thumb_path
+        return self.generate([path]).get(path)
+
+    def generate(self, paths):
+        """Return {source: thumbnail path}, rendering misses in the worker pool."""
+        results = {}
+        jobs = {}
+        for path in paths:
+            thumb_path = self.lookup(path)
+            if thumb_path is not None:
+                results[path] = thumb_path
+                continue
+            try:
+                key = self.key(path, os.stat(path))
+            except OSError:
+                continue
+            destination = self.entry_path(key)
+            destination.parent.mkdir(exist_ok=True)
+            jobs[path] = (key, self.get_pool().submit(
+                render_thumbnail, path, str(destination), self.size, self.image_format, self.quality
+            ))
+
+        for path, (key, future) in jobs.items():
+            try:
+                size = future.result()
+            except Exception as e:
+                logging.debug(f"Thumbnail failed for {path}: {e}")
+                continue
+            self.add(key, size)
+            results[path] = self.entry_path(key)
+
+        self.evict()
+        return results
+
+    def get_pool(self):
+        """Create the niced worker pool on first use."""
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=process_context(),
+                initializer=lower_priority,
+                initargs=(self.niceness,),
+            )
+        return self.pool
+
+    def add(self, key, size):
+        """Record a new entry."""
+        with self.lock:
+            self.total_bytes += size - self.entries.pop(key, 0)
+            self.entries[key] = size
+
+    def evict(self):
+        """Delete least recently used entries until under quota."""
+        victims = []
+        with self.lock:
+            while self.total_bytes > self.max_bytes and self.entries:
+                key, size = self.entries.popitem(last=False)
+                self.total_bytes -= size
+                victims.append(key)
+
+        for key in victims:
+            try:
+                self.entry_path(key).unlink()
+            except FileNotFoundError:
+                pass
+        if victims:
+            logging.debug(f"Evicted {len(victims)} thumbnails")
+
+    def stats(self):
+        """Get cache usage and hit counts."""
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "total_bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def close(self):
+        """Shut down the worker pool."""
+        if self.pool is not None:
+            self.pool.shutdown(wait=True)
+            self.pool = None
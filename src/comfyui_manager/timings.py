@@ -0,0 +1,614 @@
+"""
+Execution timings and queue ETAs
+
+A SQLite database of how long ComfyUI took: per node (from the
+executing/executed websocket messages of prompts the manager follows)
+and per prompt (from /history, for every prompt). Observations are
+folded into running averages of seconds per unit of work, where a unit
+is a sampler step or one run of any other node, keyed from specific to
+general so there is always an estimate:
+
+    (class, model, resolution) -> (class, resolution) -> (class) -> all nodes
+
+Loader nodes are usually cached by ComfyUI, so each class also tracks
+how often it actually runs. Prompts with node classes never timed fall
+back to the prompt-level averages of prompts with the same node set.
+``backtest()`` replays the recorded traces in order, predicting every
+prompt from what was known when it started.
+
+A recorder can also write the raw messages it sees to a session file;
+``replay_session()`` feeds such a file back through a recorder with its
+original timestamps.
+"""
+
+import os
+import math
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+
+from .model_inventory import MODEL_EXTENSIONS
+from .utils import get_app_dir
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS node_runs (
+    id INTEGER PRIMARY KEY,
+    prompt_id TEXT NOT NULL,
+    node_id TEXT NOT NULL,
+    class_type TEXT NOT NULL,
+    model TEXT,
+    resolution INTEGER,
+    units INTEGER NOT NULL,
+    duration REAL,
+    vram_delta REAL,
+    finished_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS prompt_runs (
+    id INTEGER PRIMARY KEY,
+    prompt_id TEXT UNIQUE NOT NULL,
+    prompt TEXT NOT NULL,
+    cached TEXT NOT NULL DEFAULT '[]',
+    started_at REAL NOT NULL,
+    finished_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS node_runs_finished ON node_runs(finished_at);
+CREATE INDEX IF NOT EXISTS prompt_runs_finished ON prompt_runs(finished_at);
+"""
+
+# Prompts recorded between trims of the oldest rows
+TRIM_EVERY = 1000
+
+# Inputs naming the model a node runs
+MODEL_INPUTS = ("ckpt_name", "unet_name", "model_name", "vae_name", "lora_name", "clip_name", "control_net_name")
+
+
+def prompt_model(prompt):
+    """The main model of a prompt: its first checkpoint or UNet file."""
+    for node in prompt.values():
+        for name in ("ckpt_name", "unet_name"):
+            value = (node.get("inputs") or {}).get(name)
+            if isinstance(value, str):
+                return value
+    return None
+
+
+def prompt_resolution(prompt):
+    """log2 of the largest latent or image size (width x height x batch), or None."""
+    pixels = 0
+    for node in prompt.values():
+        inputs = node.get("inputs") or {}
+        width, height = inputs.get("width"), inputs.get("height")
+        if isinstance(width, int) and isinstance(height, int):
+            batch = inputs.get("batch_size") if isinstance(inputs.get("batch_size"), int) else 1
+            pixels = max(pixels, width * height * batch)
+    # Powers of two: 512x512 is 18, 1024x1024 is 20
+    return round(math.log2(pixels)) if pixels else None
+
+
+def node_features(prompt, node_id, model=None, resolution=None):
+    """(class, model, resolution, units) of one node; units are sampler steps, else 1."""
+    node = prompt[node_id]
+    inputs = node.get("inputs") or {}
+    own_model = None
+    for name in MODEL_INPUTS:
+        value = inputs.get(name)
+        if isinstance(value, str) and value.lower().endswith(tuple(MODEL_EXTENSIONS)):
+            own_model = value
+            break
+    steps = inputs.get("steps")
+    units = steps if isinstance(steps, int) and not isinstance(steps, bool) and steps > 0 else 1
+    return node.get("class_type") or "?", own_model or model, resolution, units
+
+
+def prompt_shape(prompt):
+    """Key for prompts with the same set of node classes."""
+    classes = sorted(str(node.get("class_type")) for node in prompt.values())
+    return hashlib.sha1("\0".join(classes).encode()).hexdigest()[:16]
+
+
+def total_units(prompt):
+    """Sampler steps of a whole prompt (at least 1)."""
+    return max(1, sum(node_features(prompt, node_id)[3] - 1 for node_id in prompt) + 1)
+
+
+class TimingStats:
+    """Running averages of seconds per unit of work, from specific to general keys."""
+
+    def __init__(self, smoothing=0.1):
+        # Weight of a new observation once a key has many; older ones fade out
+        self.smoothing = smoothing
+        # key -> [observations, seconds per unit]
+        self.rates = {}
+        # class -> [times seen, times executed]
+        self.executed = {}
+
+    def update(self, key, value):
+        """Fold one observation into a running average."""
+        entry = self.rates.get(key)
+        if entry is None:
+            self.rates[key] = [1, value]
+            return
+        entry[0] += 1
+        entry[1] += (value - entry[1]) * max(1.0 / entry[0], self.smoothing)
+
+    def observe_node(self, class_type, model, resolution, units, duration):
+        """Record a node run; ``duration`` None means ComfyUI served it from its cache."""
+        seen = self.executed.setdefault(class_type, [0, 0])
+        seen[0] += 1
+        if duration is None:
+            return
+        seen[1] += 1
+        rate = duration / units
+        self.update(("node", class_type, model, resolution), rate)
+        self.update(("node", class_type, None, resolution), rate)
+        self.update(("node", class_type, None, None), rate)
+        self.update(("node", units > 1), rate)
+
+    def observe_prompt(self, prompt, duration):
+        """Record a whole prompt's run time."""
+        rate = duration / total_units(prompt)
+        shape = prompt_shape(prompt)
+        self.update(("prompt", shape, prompt_model(prompt), prompt_resolution(prompt)), rate)
+        self.update(("prompt", shape, None, None), rate)
+        self.update(("prompt",), rate)
+
+    def node_rate(self, class_type, model, resolution, units):
+        """Seconds per unit for a node and whether its class was ever timed."""
+        for key in (("node", class_type, model, resolution), ("node", class_type, None, resolution),
+                    ("node", class_type, None, None)):
+            entry = self.rates.get(key)
+            if entry is not None:
+                return entry[1], True
+        entry = self.rates.get(("node", units > 1))
+        return (entry[1] if entry else 0.0), False
+
+    def estimate_node(self, class_type, model, resolution, units, cached_likelihood=True):
+        """Expected seconds for a node; returns (seconds, known)."""
+        rate, known = self.node_rate(class_type, model, resolution, units)
+        seconds = rate * units
+        seen = self.executed.get(class_type)
+        if cached_likelihood and seen and seen[0]:
+            # ComfyUI reuses outputs of unchanged nodes (loaders, text encoders)
+            seconds *= seen[1] / seen[0]
+        return seconds, known
+
+    def estimate_prompt(self, prompt, skip=()):
+        """Expected seconds for a prompt, leaving out node ids in ``skip``.
+
+        Returns (seconds, per-node seconds, source) where source is "nodes",
+        "prompt" (same node set seen before) or "partial".
+        """
+        model = prompt_model(prompt)
+        resolution = prompt_resolution(prompt)
+        per_node = {}
+        unknown = 0
+        for node_id in prompt:
+            if node_id in skip:
+                continue
+            seconds, known = self.estimate_node(*node_features(prompt, node_id, model, resolution))
+            per_node[node_id] = seconds
+            unknown += not known
+        if not unknown:
+            return sum(per_node.values()), per_node, "nodes"
+
+        shape = prompt_shape(prompt)
+        for key in (("prompt", shape, model, resolution), ("prompt", shape, None, None)):
+            entry = self.rates.get(key)
+            if entry is not None:
+                seconds = entry[1] * total_units(prompt)
+                # Spread it over the nodes in proportion to the node estimates
+                known_total = sum(per_node.values()) or 1.0
+                scale = seconds / known_total if sum(per_node.values()) else 0.0
+                per_node = {node_id: value * scale for node_id, value in per_node.items()}
+                return seconds, per_node, "prompt"
+        return sum(per_node.values()), per_node, "partial"
+
+
+class TimingDatabase:
+    """SQLite store of node and prompt timings with in-memory estimates."""
+
+    def __init__(self, db_path, smoothing=0.1, max_rows=200000):
+        self.db_path = str(db_path)
+        self.max_rows = max_rows
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(self.db_path, check_same_thread=False, timeout=10)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        columns = {row[1] for row in self.db.execute("PRAGMA table_info(node_runs)")}
+        if "vram_delta" not in columns:
+            # Databases from before VRAM was recorded
+            self.db.execute("ALTER TABLE node_runs ADD COLUMN vram_delta REAL")
+        self.stats = TimingStats(smoothing)
+        self.last_node_row = 0
+        self.last_prompt_row = 0
+        self.refreshed_at = 0.0
+        self.recorded = 0
+        self.trim()
+        self.refresh()
+
+    @classmethod
+    def from_config(cls, config):
+        """Open the configured timing database."""
+        return cls(config.get("timings_path") or get_app_dir() / "timings.sqlite",
+                   smoothing=config.get("eta_smoothing", 0.1),
+                   max_rows=config.get("timings_max_rows", 200000))
+
+    def close(self):
+        """Close the database."""
+        with self.lock:
+            self.db.close()
+
+    def refresh(self):
+        """Fold in rows written since the last refresh, by this or another process."""
+        with self.lock:
+            nodes = self.db.execute(
+                "SELECT id, class_type, model, resolution, units, duration FROM node_runs WHERE id > ? ORDER BY id",
+                (self.last_node_row,)).fetchall()
+            prompts = self.db.execute(
+                "SELECT id, prompt, started_at, finished_at FROM prompt_runs WHERE id > ? ORDER BY id",
+                (self.last_prompt_row,)).fetchall()
+            for row_id, class_type, model, resolution, units, duration in nodes:
+                self.stats.observe_node(class_type, model, resolution, units, duration)
+                self.last_node_row = row_id
+            for row_id, prompt, started_at, finished_at in prompts:
+                self.stats.observe_prompt(json.loads(prompt), finished_at - started_at)
+                self.last_prompt_row = row_id
+            self.refreshed_at = time.monotonic()
+        return len(nodes) + len(prompts)
+
+    def maybe_refresh(self, interval=5.0):
+        """Refresh if the last one is older than ``interval`` seconds."""
+        if time.monotonic() - self.refreshed_at > interval:
+            self.refresh()
+
+    def record_prompt(self, prompt_id, prompt, started_at, finished_at, node_times=None, cached=(), node_vram=None):
+        """Store a finished prompt; ``node_times`` is {node_id: seconds} when it was followed.
+
+        ``node_vram`` is {node_id: MB} of VRAM use change across each node, if measured.
+
+        Returns False if the prompt was already recorded.
+        """
+        with self.lock:
+            inserted = self.db.execute(
+                "INSERT OR IGNORE INTO prompt_runs (prompt_id, prompt, cached, started_at, finished_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (prompt_id, json.dumps(prompt), json.dumps(sorted(cached)), started_at, finished_at),
+            ).rowcount
+            if inserted and node_times is not None:
+                model = prompt_model(prompt)
+                resolution = prompt_resolution(prompt)
+                rows = []
+                for node_id in prompt:
+                    if node_id not in node_times and node_id not in cached:
+                        continue
+                    class_type, node_model, _, units = node_features(prompt, node_id, model, resolution)
+                    rows.append((prompt_id, node_id, class_type, node_model, resolution, units,
+                                 node_times.get(node_id), (node_vram or {}).get(node_id), finished_at))
+                self.db.executemany(
+                    "INSERT INTO node_runs (prompt_id, node_id, class_type, model, resolution, units, duration, "
+                    "vram_delta, finished_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self.db.commit()
+        if inserted:
+            self.refresh()
+            self.recorded += 1
+            if self.recorded % TRIM_EVERY == 0:
+                self.trim()
+        return bool(inserted)
+
+    def record_history(self, prompt_id, entry):
+        """Store a prompt from its /history entry; only successful runs are timed."""
+        status = entry.get("status") or {}
+        if status.get("status_str") != "success":
+            return False
+        started_at = finished_at = None
+        cached = ()
+        for name, data in status.get("messages") or []:
+            if name == "execution_start":
+                started_at = data.get("timestamp", 0) / 1000
+            elif name == "execution_success":
+                finished_at = data.get("timestamp", 0) / 1000
+            elif name == "execution_cached":
+                cached = tuple(str(node_id) for node_id in data.get("nodes") or [])
+        prompt = (entry.get("prompt") or [None, None, None])[2]
+        if not started_at or not finished_at or not isinstance(prompt, dict):
+            return False
+        return self.record_prompt(prompt_id, prompt, started_at, finished_at, cached=cached)
+
+    def trim(self):
+        """Drop the oldest rows beyond ``max_rows`` (0 keeps everything)."""
+        if not self.max_rows:
+            return
+        with self.lock:
+            for table in ("node_runs", "prompt_runs"):
+                self.db.execute(
+                    f"DELETE FROM {table} WHERE id <= (SELECT MAX(id) FROM {table}) - ?", (self.max_rows,))
+            self.db.commit()
+
+    def estimate(self, prompt, skip=()):
+        """Expected seconds for a prompt; see ``TimingStats.estimate_prompt``."""
+        with self.lock:
+            return self.stats.estimate_prompt(prompt, skip)
+
+    def summary(self, limit=20):
+        """Recorded counts and the slowest node classes per unit."""
+        with self.lock:
+            nodes, prompts = self.db.execute(
+                "SELECT (SELECT COUNT(*) FROM node_runs), (SELECT COUNT(*) FROM prompt_runs)").fetchone()
+            classes = sorted(
+                ((key[1], entry[0], entry[1]) for key, entry in self.stats.rates.items()
+                 if key[0] == "node" and len(key) == 4 and key[2] is None and key[3] is None),
+                key=lambda item: -item[2])
+        return {
+            "node_runs": nodes,
+            "prompt_runs": prompts,
+            "classes": [{"class_type": name, "runs": count, "seconds_per_unit": round(rate, 4),
+                         "executed_ratio": round(self.stats.executed[name][1] / self.stats.executed[name][0], 3)
+                         if self.stats.executed.get(name, [0])[0] else None}
+                        for name, count, rate in classes[:limit]],
+        }
+
+    def backtest(self, smoothing=None):
+        """Replay the recorded traces, predicting each prompt from what was known when it started.
+
+        Returns error statistics against a baseline that predicts the mean
+        of all earlier prompt durations.
+        """
+        with self.lock:
+            node_rows = self.db.execute(
+                "SELECT finished_at, class_type, model, resolution, units, duration FROM node_runs").fetchall()
+            prompt_rows = self.db.execute(
+                "SELECT started_at, finished_at, prompt, cached FROM prompt_runs").fetchall()
+
+        # Predictions happen at a prompt's start; observations land at finish
+        timeline = [(row[0], 1, "node", row[1:]) for row in node_rows]
+        for started_at, finished_at, prompt, cached in prompt_rows:
+            prompt = json.loads(prompt)
+            timeline.append((started_at, 0, "predict", (prompt, set(json.loads(cached)), finished_at - started_at)))
+            timeline.append((finished_at, 2, "prompt", (prompt, finished_at - started_at)))
+        timeline.sort(key=lambda item: (item[0], item[1]))
+
+        stats = TimingStats(self.stats.smoothing if smoothing is None else smoothing)
+        errors = []
+        baseline_errors = []
+        durations = []
+        sources = {}
+        for _, _, kind, data in timeline:
+            if kind == "node":
+                stats.observe_node(*data)
+            elif kind == "prompt":
+                stats.observe_prompt(*data)
+                durations.append(data[1])
+            else:
+                prompt, cached, actual = data
+                if not durations:
+                    # Nothing to predict from yet
+                    continue
+                predicted, _, source = stats.estimate_prompt(prompt, cached)
+                sources[source] = sources.get(source, 0) + 1
+                errors.append((predicted - actual, actual))
+                baseline_errors.append((sum(durations) / len(durations) - actual, actual))
+        return {
+            "prompts": len(prompt_rows),
+            "predicted": len(errors),
+            "sources": sources,
+            "estimator": error_summary(errors),
+            "baseline_mean": error_summary(baseline_errors),
+        }
+
+
+def error_summary(errors):
+    """Mean absolute error, bias and absolute percentage error percentiles of (error, actual) pairs."""
+    if not errors:
+        return {}
+    absolute = sorted(abs(error) for error, _ in errors)
+    percent = sorted(abs(error) / actual * 100 for error, actual in errors if actual > 0)
+    return {
+        "mae_s": round(sum(absolute) / len(absolute), 3),
+        "bias_s": round(sum(error for error, _ in errors) / len(errors), 3),
+        "ape_p50": round(percent[len(percent) // 2], 1) if percent else None,
+        "ape_p90": round(percent[int(len(percent) * 0.9)], 1) if percent else None,
+    }
+
+
+# Messages worth keeping in a session file
+SESSION_EVENTS = {"execution_start", "execution_cached", "executing", "executed", "execution_success",
+                  "execution_error", "execution_interrupted"}
+
+
+class TimingRecorder:
+    """Turns ComfyUI's execution messages into node timings.
+
+    Call ``expect(prompt_id, prompt)`` for prompts this client queued and
+    pass every websocket message to ``observe``; ComfyUI only sends
+    execution messages to the client that queued the prompt.
+    ``vram_probe`` returns the GPU memory in use (MB) or None; with
+    ``session_path`` the messages are also appended to a session file.
+    """
+
+    def __init__(self, database, vram_probe=None, session_path=None):
+        self.database = database
+        self.vram_probe = vram_probe
+        self.session_path = session_path
+        self.session = None
+        self.lock = threading.Lock()
+        self.prompts = {}
+        # prompt_id -> {"started_at", "node", "node_started", "node_vram", "times", "vram", "cached"}
+        self.running = {}
+
+    @classmethod
+    def from_config(cls, config, vram_probe=None):
+        """Recorder on the configured database, writing sessions if ``timings_session_dir`` is set."""
+        session_path = None
+        session_dir = config.get("timings_session_dir")
+        if session_dir:
+            os.makedirs(session_dir, exist_ok=True)
+            session_path = os.path.join(session_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.jsonl")
+        return cls(TimingDatabase.from_config(config), vram_probe, session_path)
+
+    def close(self):
+        """Close the session file and the database."""
+        with self.lock:
+            if self.session is not None:
+                self.session.close()
+                self.session = None
+        self.database.close()
+
+    def write_session(self, line):
+        """Append one record to the session file (call with the lock held)."""
+        if self.session_path is None:
+            return
+        try:
+            if self.session is None:
+                self.session = open(self.session_path, "a", encoding="utf-8")
+            self.session.write(json.dumps(line) + "\n")
+            self.session.flush()
+        except OSError as e:
+            logging.warning(f"Cannot write timing session {self.session_path}: {e}")
+            self.session_path = None
+
+    def expect(self, prompt_id, prompt, now=None):
+        """Remember a prompt's nodes until it runs."""
+        with self.lock:
+            self.prompts[prompt_id] = prompt
+            self.write_session({"t": now or time.time(), "prompt_id": prompt_id, "prompt": prompt})
+            if len(self.prompts) > 10000:
+                # Prompts that never ran (deleted, or queued elsewhere)
+                for stale in list(self.prompts)[:1000]:
+                    if stale not in self.running:
+                        del self.prompts[stale]
+
+    def observe(self, event, now=None, vram=None):
+        """Apply one websocket message; ``now`` and ``vram`` override the clock and probe for replays."""
+        kind = event.get("type")
+        if kind not in SESSION_EVENTS:
+            return
+        data = event.get("data") or {}
+        prompt_id = data.get("prompt_id")
+        if prompt_id is None:
+            return
+        now = now or time.time()
+        if vram is None and self.vram_probe is not None and kind != "executed":
+            vram = self.vram_probe()
+        finished = None
+        with self.lock:
+            self.write_session({"t": now, "event": event, "vram": vram})
+            if kind == "execution_start":
+                self.running[prompt_id] = {"started_at": now, "node": None, "node_started": now, "node_vram": vram,
+                                           "times": {}, "vram": {}, "cached": set()}
+                return
+            run = self.running.get(prompt_id)
+            if run is None:
+                return
+            if kind == "execution_cached":
+                run["cached"].update(str(node_id) for node_id in data.get("nodes") or [])
+            elif kind == "executing":
+                self.end_node(run, now, vram)
+                run["node"] = str(data["node"]) if data.get("node") is not None else None
+                run["node_started"] = now
+                run["node_vram"] = vram
+            elif kind == "execution_success":
+                self.end_node(run, now, vram)
+                # The prompt may still be unknown if it started before queue_prompt returned
+                finished = (self.prompts.pop(prompt_id, None), self.running.pop(prompt_id))
+            elif kind in ("execution_error", "execution_interrupted"):
+                # A partial run would skew the averages
+                self.running.pop(prompt_id, None)
+                self.prompts.pop(prompt_id, None)
+        if finished is not None and finished[0] is not None:
+            prompt, run = finished
+            try:
+                self.database.record_prompt(prompt_id, prompt, run["started_at"], now, run["times"], run["cached"],
+                                            run["vram"])
+            except sqlite3.Error as e:
+                logging.warning(f"Cannot record timings of {prompt_id}: {e}")
+
+    @staticmethod
+    def end_node(run, now, vram):
+        """Close the timing of the node that was executing."""
+        node = run["node"]
+        if node is None:
+            return
+        run["times"][node] = now - run["node_started"]
+        if vram is not None and run["node_vram"] is not None:
+            run["vram"][node] = vram - run["node_vram"]
+
+    def progress(self, prompt_id):
+        """Get (finished or cached node ids, current node, seconds on it) of a followed prompt, or None."""
+        with self.lock:
+            run = self.running.get(prompt_id)
+            if run is None:
+                return None
+            return set(run["times"]) | run["cached"], run["node"], time.time() - run["node_started"]
+
+
+def replay_session(path, recorder):
+    """Feed a recorded session file through a recorder; returns the number of records."""
+    count = 0
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if "prompt" in record:
+                recorder.expect(record["prompt_id"], record["prompt"], now=record["t"])
+            else:
+                recorder.observe(record["event"], now=record["t"], vram=record.get("vram"))
+            count += 1
+    return count
+
+
+def queue_eta(database, queue, state, recorder=None, now=None):
+    """Estimate when each prompt in ComfyUI's queue and the whole queue will finish.
+
+    ``queue`` is a /queue response and ``state`` a QueueMonitor snapshot.
+    """
+    now = now or time.time()
+    database.maybe_refresh()
+    prompts = []
+    clock = 0.0
+
+    for item in queue.get("queue_running") or []:
+        prompt_id, prompt = item[1], item[2]
+        followed = recorder.progress(prompt_id) if recorder is not None else None
+        if followed is not None:
+            done, node, on_node = followed
+            total, per_node, source = database.estimate(prompt)
+            remaining = sum(seconds for node_id, seconds in per_node.items() if node_id not in done)
+            if node in per_node:
+                current = per_node[node]
+                if state.get("prompt_id") == prompt_id and state.get("node") == node and state.get("progress_max"):
+                    # Sampler progress is a better clock than elapsed time
+                    current *= 1 - state["progress"] / state["progress_max"]
+                else:
+                    current = max(0.0, current - on_node)
+                remaining += current - per_node[node]
+        else:
+            total, _, source = database.estimate(prompt)
+            started_at = state.get("started_at") if state.get("prompt_id") == prompt_id else None
+            remaining = max(0.0, total - (now - started_at)) if started_at else total
+        clock += max(0.0, remaining)
+        prompts.append({"prompt_id": prompt_id, "running": True, "estimate_s": round(total, 2),
+                        "remaining_s": round(remaining, 2), "finishes_at": now + clock, "source": source})
+
+    for item in sorted(queue.get("queue_pending") or [], key=lambda pending: pending[0]):
+        total, _, source = database.estimate(item[2])
+        clock += total
+        prompts.append({"prompt_id": item[1], "running": False, "estimate_s": round(total, 2),
+                        "remaining_s": round(total, 2), "finishes_at": now + clock, "source": source})
+
+    return {"prompts": prompts, "remaining_s": round(clock, 2), "finishes_at": now + clock if prompts else None}
+
+
+def format_duration(seconds):
+    """Short duration like "1h 04m", "3m 20s" or "12s"."""
+    seconds = int(round(seconds))
+    if seconds >= 3600:
+        return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m {seconds % 60:02d}s"
+    return f"{seconds}s"
@@ -0,0 +1,205 @@
+"""
+Curses dashboard for ComfyUI Manager
+
+A terminal client of the control API for SSH sessions. Only rows whose
+text changed are redrawn, and the refresh rate backs off when the
+dashboard's own CPU use goes over its budget.
+"""
+
+import time
+import curses
+import logging
+import threading
+
+from .control_client import ControlClient, ControlError
+
+SPARK_CHARS = " ▁▂▃▄▅▆▇█"
+
+MODES = ["auto", "lowvram", "normalvram", "highvram", "cpu"]
+
+MODE_NAMES = {
+    "auto": "Auto",
+    "lowvram": "Low VRAM",
+    "normalvram": "Normal VRAM",
+    "highvram": "High VRAM",
+    "cpu": "CPU Only",
+}
+
+
+def sparkline(values, width, max_value=100.0):
+    """Render the last ``width`` values as a block-character sparkline."""
+    values = values[-width:]
+    chars = []
+    top = len(SPARK_CHARS) - 1
+    for value in values:
+        level = int(round(min(max(value, 0.0), max_value) / max_value * top))
+        chars.append(SPARK_CHARS[level])
+    return "".join(chars).rjust(width)
+
+
+class TuiDashboard:
+    """Terminal dashboard mirroring the Dashboard, Control and Monitor tabs."""
+
+    def __init__(self, stdscr, client, refresh_hz=4.0, cpu_budget=2.0):
+        self.stdscr = stdscr
+        self.client = client
+        self.refresh_hz = refresh_hz
+        self.interval = 1.0 / refresh_hz
+        self.cpu_budget = cpu_budget
+
+        # Last text drawn on each row, so unchanged rows are skipped
+        self.rows = {}
+
+        self.status = {}
+        self.history = []
+        self.output = []
+        self.message = ""
+        self.last_history_fetch = 0.0
+
+        # Own CPU usage, measured over one-second windows
+        self.cpu_percent = 0.0
+        self.cpu_window_start = (time.monotonic(), time.process_time())
+
+    def run(self):
+        """Main loop: fetch, draw, wait for a key or the next frame."""
+        curses.curs_set(0)
+        curses.use_default_colors()
+        self.stdscr.timeout(int(self.interval * 1000))
+
+        while True:
+            self.fetch()
+            self.draw()
+
+            key = self.stdscr.getch()
+            if key in (ord("q"), ord("Q")):
+                break
+            self.handle_key(key)
+            self.measure_cpu()
+
+    def fetch(self):
+        """Pull status, history and output from the manager."""
+        try:
+            self.status = self.client.status()
+
+            # The monitor samples about once a second; no need to ask faster
+            now = time.monotonic()
+            if now - self.last_history_fetch >= 1.0:
+                width = max(10, self.stdscr.getmaxyx()[1] - 24)
+                self.history = self.client.metrics_history(seconds=width * 1.2)
+                self.last_history_fetch = now
+
+            height = self.stdscr.getmaxyx()[0]
+            self.output = self.client.logs_tail(max(1, height - 16))
+        except ControlError as e:
+            self.message = f"Connection error: {e}"
+
+    def draw(self):
+        """Draw every row, touching only the ones whose text changed."""
+        height, width = self.stdscr.getmaxyx()
+        lines = self.render(width)
+
+        for row in range(height - 1):
+            text = lines[row] if row < len(lines) else ""
+            text = text[:width - 1].ljust(width - 1)
+            if self.rows.get(row) == text:
+                continue
+            try:
+                attr = curses.A_BOLD if text.startswith(("──", "ComfyUI Manager")) else curses.A_NORMAL
+                self.stdscr.addstr(row, 0, text, attr)
+            except curses.error:
+                pass
+            self.rows[row] = text
+
+        self.stdscr.noutrefresh()
+        curses.doupdate()
+
+    def render(self, width):
+        """Build the screen as a list of row strings."""
+        status = self.status
+        running = status.get("running")
+        spark_width = max(10, width - 24)
+
+        lines = [
+            f"ComfyUI Manager  {time.strftime('%H:%M:%S')}",
+            "── Dashboard " + "─" * max(0, width - 14),
+            f"  Status: {'RUNNING' if running else 'stopped':<10} "
+            f"PID: {status.get('pid') or 'N/A':<8} "
+            f"Mode: {MODE_NAMES.get(status.get('mode'), 'Not running')}",
+            f"  Web UI: http://localhost:{status.get('port', 8188)}  "
+            f"Startup mode: {MODE_NAMES.get(status.get('startup_mode'), 'N/A')}",
+            "── Monitor " + "─" * max(0, width - 12),
+        ]
+
+        for index, label in enumerate(("CPU", "RAM", "GPU", "VRAM"), start=1):
+            values = [sample[index] for sample in self.history]
+            current = values[-1] if values else 0.0
+            lines.append(f"  {label:<5}{current:5.1f}% {sparkline(values, spark_width)}")
+
+        lines.append("── Output " + "─" * max(0, width - 11))
+        lines.extend("  " + line for line in self.output)
+
+        height = self.stdscr.getmaxyx()[0]
+        lines = lines[:height - 3]
+        while len(lines) < height - 3:
+            lines.append("")
+
+        lines.append(self.message)
+        lines.append(
+            "[s]tart [x] stop [r]estart [m]ode [q]uit"
+            f"   tui cpu {self.cpu_percent:.1f}%/{self.cpu_budget:.1f}% @ {self.refresh_hz:g} Hz"
+        )
+        return lines
+
+    def handle_key(self, key):
+        """Run control actions for key presses."""
+        if key in (ord("s"), ord("S")):
+            self.action("Starting ComfyUI...", "start")
+        elif key in (ord("x"), ord("X")):
+            self.action("Stopping ComfyUI...", "stop")
+        elif key in (ord("r"), ord("R")):
+            self.action("Restarting ComfyUI...", "restart")
+        elif key in (ord("m"), ord("M")):
+            # Cycle the saved startup mode, not the mode ComfyUI is running in
+            current = self.status.get("startup_mode")
+            mode = MODES[(MODES.index(current) + 1) % len(MODES)] if current in MODES else MODES[0]
+            self.status["startup_mode"] = mode
+            self.action(f"Startup mode set to {MODE_NAMES[mode]}", "set_mode", mode)
+        elif key == curses.KEY_RESIZE:
+            self.rows.clear()
+            self.stdscr.clear()
+
+    def action(self, message, method, *args):
+        """Run a lifecycle call on its own connection without blocking the UI."""
+        self.message = message
+
+        def worker():
+            client = ControlClient(self.client.socket_path, timeout=60)
+            try:
+                getattr(client, method)(*args)
+            except ControlError as e:
+                self.message = f"Failed: {e}"
+            finally:
+                client.close()
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def measure_cpu(self):
+        """Track own CPU use and lower the refresh rate when over budget."""
+        wall_start, cpu_start = self.cpu_window_start
+        wall = time.monotonic() - wall_start
+        if wall < 1.0:
+            return
+
+        self.cpu_percent = (time.process_time() - cpu_start) / wall * 100
+        self.cpu_window_start = (time.monotonic(), time.process_time())
+
+        if self.cpu_percent > self.cpu_budget and self.refresh_hz > 1.0:
+            self.refresh_hz = max(1.0, self.refresh_hz / 2)
+            self.interval = 1.0 / self.refresh_hz
+            self.stdscr.timeout(int(self.interval * 1000))
+            logging.info(f"TUI over CPU budget ({self.cpu_percent:.1f}%), refreshing at {self.refresh_hz:g} Hz")
+
+
+def run_tui(client, refresh_hz=4.0, cpu_budget=2.0):
+    """Run the dashboard until the user quits."""
+    curses.wrapper(lambda stdscr: TuiDashboard(stdscr, client, refresh_hz, cpu_budget).run())
@@ -74,9 +74,29 @@ def check_dependencies():
     
     return dependencies
 
+def get_app_dir():
+    """Get the per-user data directory of the manager."""
+    return Path.home() / ".comfyui-manager"
+
+def get_run_dir():
+    """Get the directory holding daemon state files."""
+    run_dir = get_app_dir() / "run"
+    run_dir.mkdir(parents=True, exist_ok=True)
+    return run_dir
+
+def process_context():
+    """Get the start method for worker process pools.
+
+    The manager runs several threads, and a forked child can inherit a lock
+    one of them held (logging, sqlite), so workers are never forked from it.
+    """
+    import multiprocessing
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return multiprocessing.get_context(method)
+
 def setup_logging():
     """Setup logging configuration."""
-    log_dir = Path.home() / ".comfyui-manager" / "logs"
+    log_dir = get_app_dir() / "logs"
     log_dir.mkdir(parents=True, exist_ok=True)
     
     log_file = log_dir / "comfyui_manager.log"
@@ -92,6 +112,13 @@ def setup_logging():
     
     return str(log_file)
 
+def format_bytes(size):
+    """Format a byte count for display."""
+    for unit in ("B", "KB", "MB", "GB", "TB"):
+        if abs(size) < 1024 or unit == "TB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
 def get_resource_path(relative_path):
     """Get absolute path to resource, works for dev and for PyInstaller."""
     try:
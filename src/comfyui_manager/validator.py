@@ -0,0 +1,258 @@
+"""
+Workflow pre-validation against ComfyUI's node schema
+
+ComfyUI only reports a broken prompt (unknown node, wrong input type,
+missing model) when it reaches the front of the queue. The validator
+fetches /object_info once, keeps it until ComfyUI restarts, and compiles
+every node class into a list of per-input checks, so a prompt can be
+checked in well under a millisecond before it is submitted.
+
+Model file inputs are checked against the models on disk rather than
+the cached schema's file lists, which go stale as models are added.
+"""
+
+import os
+import time
+import asyncio
+import logging
+import threading
+
+from .comfy_api import ComfyClient
+from .model_inventory import MODEL_EXTENSIONS, configured_models_dir, model_names
+
+# Stand-in for an unknown node class in link checks
+NO_CLASS = ({}, frozenset(), (), False)
+
+# Seconds between rescans of the models directory after a miss
+MODEL_RESCAN_INTERVAL = 5.0
+
+
+def types_match(expected, actual):
+    """Check whether an output type can feed an input type (``*`` and unions allowed)."""
+    if expected == actual or expected == "*" or actual == "*":
+        return True
+    return bool(set(str(expected).split(",")) & set(str(actual).split(",")))
+
+
+def compile_input(spec):
+    """Build a check for one input spec: a function of the value returning an error or None.
+
+    Returns (type name, check, lists model files). Links are checked
+    separately, so checks only see literal values.
+    """
+    kind = spec[0] if isinstance(spec, (list, tuple)) and spec else spec
+    options = spec[1] if isinstance(spec, (list, tuple)) and len(spec) > 1 and isinstance(spec[1], dict) else {}
+
+    if kind == "COMBO" and isinstance(options.get("options"), list):
+        kind = options["options"]
+    if isinstance(kind, list):
+        allowed = frozenset(str(choice) for choice in kind)
+        model_files = any(os.path.splitext(choice)[1].lower() in MODEL_EXTENSIONS for choice in allowed)
+
+        def check_combo(value):
+            if str(value) not in allowed:
+                return f"{value!r} is not one of the {len(allowed)} allowed values"
+            return None
+        return "COMBO", check_combo, model_files
+
+    low = options.get("min")
+    high = options.get("max")
+
+    if kind == "INT":
+        def check_int(value):
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or value != int(value):
+                return f"{value!r} is not an integer"
+            if low is not None and value < low:
+                return f"{value} is below the minimum {low}"
+            if high is not None and value > high:
+                return f"{value} is above the maximum {high}"
+            return None
+        return kind, check_int, False
+
+    if kind == "FLOAT":
+        def check_float(value):
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                return f"{value!r} is not a number"
+            if low is not None and value < low:
+                return f"{value} is below the minimum {low}"
+            if high is not None and value > high:
+                return f"{value} is above the maximum {high}"
+            return None
+        return kind, check_float, False
+
+    if kind == "STRING":
+        def check_string(value):
+            return None if isinstance(value, str) else f"{value!r} is not a string"
+        return kind, check_string, False
+
+    if kind == "BOOLEAN":
+        def check_boolean(value):
+            return None if isinstance(value, bool) else f"{value!r} is not a boolean"
+        return kind, check_boolean, False
+
+    def check_linked(value):
+        return f"needs a link from a {kind} output"
+    return str(kind), check_linked, False
+
+
+def compile_schema(object_info):
+    """Compile /object_info into {class_type: (inputs, required names, outputs, is output node)}.
+
+    ``inputs`` is {input: (type name, check, lists model files)}.
+    """
+    schema = {}
+    for class_type, info in object_info.items():
+        spec = info.get("input") or {}
+        required = spec.get("required") or {}
+        inputs = {name: compile_input(item) for name, item in (spec.get("optional") or {}).items()}
+        inputs.update((name, compile_input(item)) for name, item in required.items())
+        schema[class_type] = (inputs, frozenset(required), list(info.get("output") or []),
+                              bool(info.get("output_node")))
+    return schema
+
+
+def format_errors(errors, limit=3):
+    """One-line summary of validation errors."""
+    parts = [f"node {e['node']} ({e['class_type']})" + (f" {e['input']}" if e["input"] else "") + f": {e['message']}"
+             for e in errors[:limit]]
+    if len(errors) > limit:
+        parts.append(f"{len(errors) - limit} more")
+    return "; ".join(parts)
+
+
+class WorkflowValidator:
+    """Checks API-format prompts against ComfyUI's cached node schema."""
+
+    def __init__(self, config, process_manager=None):
+        self.config = config
+        self.process_manager = process_manager
+        self.models_dir = configured_models_dir(config)
+        self.check_models = config.get("validate_models", True)
+
+        self.lock = threading.Lock()
+        self.schema = None
+        self.identity = None
+        self.fetched_at = None
+        self.models = None
+        self.models_scanned_at = 0.0
+
+    def comfyui_identity(self):
+        """Something that changes when ComfyUI restarts under our process manager."""
+        return self.process_manager.get_pid() if self.process_manager is not None else None
+
+    def invalidate(self):
+        """Drop the cached schema; the next check fetches it again."""
+        with self.lock:
+            self.schema = None
+
+    def is_stale(self):
+        """Check whether the schema must be (re)fetched."""
+        return self.schema is None or self.identity != self.comfyui_identity()
+
+    async def load(self, client=None):
+        """Fetch and compile /object_info if there is no current copy."""
+        if not self.is_stale():
+            return self.schema
+        own_client = client is None
+        client = client or ComfyClient.from_config(self.config, timeout=30.0)
+        try:
+            object_info = await client.object_info()
+        finally:
+            if own_client:
+                await client.close()
+        start = time.perf_counter()
+        schema = compile_schema(object_info)
+        with self.lock:
+            self.schema = schema
+            self.identity = self.comfyui_identity()
+            self.fetched_at = time.time()
+        logging.info(f"Compiled {len(schema)} ComfyUI node classes in {(time.perf_counter() - start) * 1000:.0f} ms")
+        return schema
+
+    def load_blocking(self):
+        """Fetch the schema from a thread without an event loop."""
+        if self.is_stale():
+            asyncio.run(self.load())
+        return self.schema
+
+    def model_path(self, name):
+        """Find a model file by the name ComfyUI uses, rescanning at most every few seconds."""
+        name = name.replace("\\", "/")
+        if self.models is not None and name in self.models:
+            return self.models[name]
+        if time.monotonic() - self.models_scanned_at > MODEL_RESCAN_INTERVAL:
+            self.models = model_names(self.models_dir)
+            self.models_scanned_at = time.monotonic()
+        return self.models.get(name)
+
+    def validate(self, prompt):
+        """Check a prompt; returns a list of {"node", "class_type", "input", "message"} (empty if valid).
+
+        Call ``load()`` first.
+        """
+        schema = self.schema
+        if schema is None:
+            raise RuntimeError("ComfyUI node schema is not loaded")
+        if not isinstance(prompt, dict) or not prompt:
+            return [{"node": None, "class_type": None, "input": None, "message": "prompt is empty"}]
+        check_models = self.check_models and os.path.isdir(self.models_dir)
+
+        errors = []
+        has_output = False
+        for node_id, node in prompt.items():
+            class_type = node.get("class_type") if isinstance(node, dict) else None
+            compiled = schema.get(class_type)
+            if compiled is None:
+                errors.append({"node": node_id, "class_type": class_type, "input": None,
+                               "message": "node type is not installed in ComfyUI"})
+                continue
+            specs, required, _, is_output = compiled
+            has_output = has_output or is_output
+            inputs = node.get("inputs") or {}
+
+            if not required <= inputs.keys():
+                for name in sorted(required - inputs.keys()):
+                    errors.append({"node": node_id, "class_type": class_type, "input": name,
+                                   "message": "required input is missing"})
+            for name, value in inputs.items():
+                spec = specs.get(name)
+                if spec is None:
+                    # ComfyUI ignores inputs it does not know
+                    continue
+                kind, check, model_files = spec
+                if type(value) is list and len(value) == 2 and type(value[1]) is int:
+                    # Links make up most inputs, so the valid case is checked inline
+                    source = prompt.get(value[0])
+                    outputs = schema.get(source.get("class_type"), NO_CLASS)[2] if source is not None else ()
+                    if 0 <= value[1] < len(outputs) and outputs[value[1]] == kind:
+                        continue
+                    message = self.check_link(prompt, value, kind)
+                elif model_files and check_models:
+                    # The schema's file list is as old as the cache; the disk is not
+                    message = None if self.model_path(str(value)) else f"model file {value!r} not found"
+                else:
+                    message = check(value)
+                if message is not None:
+                    errors.append({"node": node_id, "class_type": class_type, "input": name, "message": message})
+
+        if not has_output and not errors:
+            errors.append({"node": None, "class_type": None, "input": None, "message": "prompt has no output node"})
+        return errors
+
+    def check_link(self, prompt, value, kind):
+        """Check a [node id, slot] link; returns an error or None."""
+        node_id, slot = value
+        source = prompt.get(node_id if type(node_id) is str else str(node_id))
+        if source is None:
+            return f"links to missing node {node_id}"
+        compiled = self.schema.get(source.get("class_type"))
+        if compiled is None:
+            # Reported on the source node itself
+            return None
+        outputs = compiled[2]
+        if not 0 <= slot < len(outputs):
+            return f"links to output {slot} of node {node_id}, which has {len(outputs)}"
+        actual = outputs[slot]
+        if actual != kind and kind != "COMBO" and not types_match(kind, actual):
+            return f"expects {kind} but node {node_id} output {slot} is {actual}"
+        return None
@@ -0,0 +1,269 @@
+"""
+VRAM fit advisor for the startup memory mode
+
+Sizes the models a workflow loads from their safetensors headers (at the
+precision ComfyUI is told to run them in), adds a fixed allowance for the
+CUDA context and activations, and compares three footprints against the
+GPU's VRAM:
+
+* everything resident at once       -> highvram
+* the largest stage plus the VAE    -> normalvram (text encoders are
+                                       offloaded before sampling)
+* the largest single model          -> normalvram (models are swapped
+                                       in and out between stages)
+* anything larger                   -> lowvram
+
+All estimation works on plain header summaries and a VRAM figure, so it
+can be exercised with synthetic headers and fake GPU totals.
+"""
+
+import os
+import json
+import logging
+
+from .model_inventory import ModelInventory, configured_models_dir, model_names
+from .png_metadata import read_output_text
+from .utils import get_app_dir
+
+MB = 1024 * 1024
+
+# Bytes per parameter for ComfyUI's precision flags
+PRECISION_BYTES = {"fp32": 4, "fp16": 2, "bf16": 2, "fp8": 1, "fp8_e4m3fn": 1, "fp8_e5m2": 1}
+
+# Loader inputs in API-format prompts
+LOADER_INPUTS = {
+    "ckpt_name": "checkpoint",
+    "unet_name": "unet",
+    "clip_name": "text_encoder",
+    "clip_name1": "text_encoder",
+    "clip_name2": "text_encoder",
+    "clip_name3": "text_encoder",
+    "vae_name": "vae",
+    "lora_name": "lora",
+    "control_net_name": "controlnet",
+}
+
+# Loader node types in UI-format workflows
+LOADER_NODES = {
+    "CheckpointLoaderSimple": "checkpoint",
+    "CheckpointLoader": "checkpoint",
+    "UNETLoader": "unet",
+    "UnetLoaderGGUF": "unet",
+    "CLIPLoader": "text_encoder",
+    "DualCLIPLoader": "text_encoder",
+    "TripleCLIPLoader": "text_encoder",
+    "VAELoader": "vae",
+    "LoraLoader": "lora",
+    "LoraLoaderModelOnly": "lora",
+    "ControlNetLoader": "controlnet",
+}
+
+# Which stage a model's weights are resident in; LoRAs and ControlNets
+# are used while the UNet samples
+STAGES = {
+    "unet": "unet",
+    "lora": "unet",
+    "controlnet": "unet",
+    "other": "unet",
+    "text_encoder": "text_encoder",
+    "vae": "vae",
+}
+
+# Folders to size when there is no workflow to go by
+FALLBACK_FOLDERS = ("checkpoints", "unet", "diffusion_models")
+
+MODEL_SUFFIXES = (".safetensors", ".sft", ".ckpt", ".pt", ".pth", ".bin", ".gguf")
+
+
+def workflow_models(workflow):
+    """Get (role, name) for every model an API prompt or UI workflow loads."""
+    models = []
+    if isinstance(workflow, dict) and isinstance(workflow.get("nodes"), list):
+        # UI format: loader widgets hold the file names
+        for node in workflow["nodes"]:
+            role = LOADER_NODES.get(node.get("type"))
+            if role is None:
+                continue
+            for value in node.get("widgets_values") or []:
+                if isinstance(value, str) and value.lower().endswith(MODEL_SUFFIXES):
+                    models.append((role, value))
+    elif isinstance(workflow, dict):
+        for node in workflow.values():
+            if not isinstance(node, dict):
+                continue
+            for key, value in (node.get("inputs") or {}).items():
+                if key in LOADER_INPUTS and isinstance(value, str):
+                    models.append((LOADER_INPUTS[key], value))
+    return list(dict.fromkeys(models))
+
+
+def precision_flags(precision_mode="fp16", extra_args=""):
+    """Get bytes per parameter for the unet, text encoders and VAE.
+
+    ``precision_mode`` sets all three; ``--<dtype>-unet``, ``--<dtype>-text-enc``
+    and ``--<dtype>-vae`` flags in ``extra_args`` override single parts.
+    """
+    default = PRECISION_BYTES.get(precision_mode)
+    precision = {"unet": default, "text_encoder": default, "vae": default}
+    for arg in extra_args.split():
+        for suffix, part in (("-unet", "unet"), ("-text-enc", "text_encoder"), ("-vae", "vae")):
+            if arg.startswith("--") and arg.endswith(suffix):
+                dtype = arg[2:-len(suffix)]
+                if dtype in PRECISION_BYTES:
+                    precision[part] = PRECISION_BYTES[dtype]
+    return precision
+
+
+def model_parts(role, summary, file_size, precision):
+    """Split one model into (stage, bytes in VRAM) parts.
+
+    Checkpoints are split by tensor prefix; weights are counted at the
+    runtime precision when one is forced, else at their stored size.
+    """
+    components = (summary or {}).get("components")
+    if not components:
+        # No header to go by: the file size is the best guess
+        return [(STAGES.get(role, "unet"), file_size)]
+
+    if role != "checkpoint":
+        parameters = sum(c[0] for c in components.values())
+        stored = sum(c[1] for c in components.values())
+        components = {role: [parameters, stored]}
+
+    parts = []
+    for component, (parameters, stored) in components.items():
+        stage = STAGES.get(component, "unet")
+        runtime = precision.get(stage) if component != "lora" else None
+        parts.append((stage, parameters * runtime if runtime else stored))
+    return parts
+
+
+def estimate_vram(parts, overhead_bytes):
+    """Estimate footprints from (stage, bytes) parts.
+
+    Returns {"stages", "all_resident", "staged_peak", "largest"} in bytes.
+    """
+    stages = {"unet": 0, "text_encoder": 0, "vae": 0}
+    for stage, size in parts:
+        stages[stage] += size
+    largest = max((size for _, size in parts), default=0)
+    return {
+        "stages": stages,
+        "all_resident": sum(stages.values()) + overhead_bytes,
+        "staged_peak": max(stages["unet"], stages["text_encoder"]) + stages["vae"] + overhead_bytes,
+        "largest": largest + overhead_bytes,
+    }
+
+
+def recommend_mode(estimate, vram_bytes, headroom=0.9):
+    """Pick lowvram/normalvram/highvram for an estimate; returns (mode, reason)."""
+    if not vram_bytes:
+        return "normalvram", "GPU VRAM unknown"
+    budget = vram_bytes * headroom
+    gb = 1024 ** 3
+    if estimate["all_resident"] <= budget:
+        return "highvram", f"all models fit: {estimate['all_resident'] / gb:.1f} of {vram_bytes / gb:.1f} GB"
+    if estimate["staged_peak"] <= budget:
+        return "normalvram", (f"largest stage fits: {estimate['staged_peak'] / gb:.1f} of "
+                              f"{vram_bytes / gb:.1f} GB, all models need {estimate['all_resident'] / gb:.1f} GB")
+    if estimate["largest"] <= budget:
+        return "normalvram", (f"largest model fits: {estimate['largest'] / gb:.1f} of {vram_bytes / gb:.1f} GB, "
+                              f"largest stage needs {estimate['staged_peak'] / gb:.1f} GB")
+    return "lowvram", f"largest model needs {estimate['largest'] / gb:.1f} of {vram_bytes / gb:.1f} GB"
+
+
+class VramAdvisor:
+    """Recommends the memory mode for a workflow on this GPU."""
+
+    def __init__(self, config, system_monitor=None, prompt_index=None):
+        self.config = config
+        self.system_monitor = system_monitor
+        self.prompt_index = prompt_index
+        self.models_dir = configured_models_dir(config)
+        self.inventory = ModelInventory(self.models_dir, get_app_dir() / "cache" / "models")
+
+    def vram_bytes(self):
+        """Get the GPU's total VRAM: configured, else from the monitor."""
+        override = self.config.get("gpu_vram_gb", 0)
+        if override:
+            return int(override * 1024 ** 3)
+        monitor = self.system_monitor
+        if monitor is None:
+            return 0
+        if not monitor.gpu_memory_total and monitor.gpu_available:
+            monitor.update_gpu_stats()
+        return monitor.gpu_memory_total * MB
+
+    def latest_workflow(self):
+        """Get the prompt of the newest catalogued output, or None."""
+        if self.prompt_index is None:
+            return None
+        for result in self.prompt_index.search(limit=5):
+            prompt = read_output_text(result["path"]).get("prompt")
+            if prompt:
+                try:
+                    return json.loads(prompt)
+                except ValueError:
+                    continue
+        return None
+
+    def fallback_models(self):
+        """Size the largest checkpoint or UNet when no workflow is known."""
+        largest = None
+        for folder in FALLBACK_FOLDERS:
+            directory = os.path.join(self.models_dir, folder)
+            for path in model_names(directory).values():
+                size = os.path.getsize(path)
+                if largest is None or size > largest[0]:
+                    largest = (size, "checkpoint" if folder == "checkpoints" else "unet", path)
+        return [] if largest is None else [(largest[1], largest[2])]
+
+    def recommend(self, workflow=None):
+        """Recommend a mode for ``workflow`` (API or UI JSON), else the latest one used.
+
+        Returns {"mode", "reason", "vram_bytes", "estimate", "models", "missing", "source"}.
+        """
+        source = "workflow"
+        if workflow is None:
+            workflow = self.latest_workflow()
+            source = "latest output"
+
+        by_name = model_names(self.models_dir)
+        models = []
+        missing = []
+        if workflow is not None:
+            for role, name in workflow_models(workflow):
+                path = by_name.get(name.replace("\\", "/"))
+                if path is None:
+                    missing.append(name)
+                else:
+                    models.append((role, path))
+        if not models:
+            models = self.fallback_models()
+            source = "largest model"
+
+        precision = precision_flags(self.config.get("precision_mode", "fp16"), self.config.get("extra_args", ""))
+        real_paths = {path: os.path.realpath(path) for _, path in models}
+        summaries = self.inventory.headers.hash_files(list(real_paths.values()))
+        self.inventory.headers.save()
+
+        parts = []
+        sized = []
+        for role, path in models:
+            model = model_parts(role, summaries.get(real_paths[path]), os.path.getsize(path), precision)
+            parts.extend(model)
+            sized.append({"role": role, "path": path, "bytes": sum(size for _, size in model)})
+
+        estimate = estimate_vram(parts, self.config.get("advisor_overhead_mb", 1536) * MB)
+        vram = self.vram_bytes()
+        mode, reason = recommend_mode(estimate, vram, self.config.get("advisor_headroom", 0.9))
+        logging.info(f"VRAM advisor: {mode} ({reason}; sized from {source})")
+        return {
+            "mode": mode,
+            "reason": reason,
+            "vram_bytes": vram,
+            "estimate": estimate,
+            "models": sized,
+            "missing": missing,
+            "source": source,
+        }
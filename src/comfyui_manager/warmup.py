@@ -0,0 +1,278 @@
+"""
+Warm-up after ComfyUI starts
+
+With cuDNN benchmarking on, the first generation at each resolution is
+slow while cuDNN tries kernels for every convolution shape, and the first
+use of a checkpoint pays for loading it. After each launch the runner
+waits for ComfyUI's API, then queues the configured warm-up workflows at
+the front of the queue, once per configured resolution and checkpoint,
+with few steps and previews instead of saved images. ComfyUI is only
+reported ready when they have finished. Every launch is appended to
+launches.jsonl with how long each stage took.
+"""
+
+import copy
+import json
+import time
+import uuid
+import asyncio
+import logging
+import threading
+
+from .comfy_api import ComfyAPIError, ComfyClient
+from .utils import get_app_dir
+
+STOPPED = "stopped"
+STARTING = "starting"
+WARMING = "warming"
+READY = "ready"
+
+# Inputs that name the main model of a workflow
+CHECKPOINT_INPUTS = ("ckpt_name", "unet_name")
+
+
+def warmup_prompts(workflows, resolutions=None, models=None, steps=1):
+    """Expand {name: prompt} over resolutions ([width, height]) and checkpoints.
+
+    Returns a list of (label, prompt). Sampler steps are capped at
+    ``steps`` and SaveImage nodes become PreviewImage, so warm-up leaves
+    nothing in the output directory.
+    """
+    prompts = []
+    for name, workflow in workflows.items():
+        for size in resolutions or [None]:
+            for model in models or [None]:
+                prompt = copy.deepcopy(workflow)
+                for node in prompt.values():
+                    inputs = node.setdefault("inputs", {})
+                    if isinstance(inputs.get("steps"), int) and steps:
+                        inputs["steps"] = min(inputs["steps"], steps)
+                    if size is not None and isinstance(inputs.get("width"), int) \
+                            and isinstance(inputs.get("height"), int):
+                        inputs["width"], inputs["height"] = size
+                    if model is not None:
+                        for key in CHECKPOINT_INPUTS:
+                            if isinstance(inputs.get(key), str):
+                                inputs[key] = model
+                    if node.get("class_type") == "SaveImage":
+                        node["class_type"] = "PreviewImage"
+                        node["inputs"] = {"images": inputs.get("images")}
+                label = name
+                if size is not None:
+                    label += f" {size[0]}x{size[1]}"
+                if model is not None:
+                    label += f" {model}"
+                prompts.append((label, prompt))
+    return prompts
+
+
+def launch_history(limit=20):
+    """The last ``limit`` recorded launches, oldest first."""
+    path = get_app_dir() / "launches.jsonl"
+    if not path.exists():
+        return []
+    launches = []
+    with open(path) as f:
+        for line in f:
+            try:
+                launches.append(json.loads(line))
+            except ValueError:
+                continue
+    return launches[-limit:]
+
+
+class WarmupRunner:
+    """Tracks ComfyUI's readiness after each launch and runs the warm-up workflows."""
+
+    def __init__(self, config, process_manager=None):
+        self.config = config
+        self.process_manager = process_manager
+        self.lock = threading.Lock()
+        self.thread = None
+        self.cancel = threading.Event()
+        self.state = {"state": STOPPED, "pid": None, "launched_at": None, "api_ready_s": None,
+                      "warmup_s": None, "ready_s": None, "done": 0, "total": 0, "items": []}
+
+    def status(self):
+        """Get a copy of the current launch's state."""
+        with self.lock:
+            state = dict(self.state, items=list(self.state["items"]))
+        if state["state"] != STOPPED and not self.alive(state["pid"]):
+            state["state"] = STOPPED
+        return state
+
+    def is_ready(self):
+        """Check whether ComfyUI is up and warmed."""
+        return self.status()["state"] == READY
+
+    def alive(self, pid):
+        """Check that the launch we are warming is still the running ComfyUI."""
+        if self.process_manager is None:
+            return True
+        return self.process_manager.is_running() and self.process_manager.get_pid() == pid
+
+    def launch(self, mode=None):
+        """Start following a new ComfyUI launch (called by the process manager)."""
+        self.stop()
+        pid = self.process_manager.get_pid() if self.process_manager is not None else None
+        with self.lock:
+            self.state = {"state": STARTING, "pid": pid, "mode": mode, "launched_at": time.time(),
+                          "api_ready_s": None, "warmup_s": None, "ready_s": None, "done": 0, "total": 0,
+                          "items": []}
+        self.cancel.clear()
+        self.thread = threading.Thread(target=self.run, name="warmup", daemon=True)
+        self.thread.start()
+
+    def rerun(self):
+        """Warm up the running ComfyUI again, e.g. after changing the warm-up workflows."""
+        if self.thread is not None and self.thread.is_alive():
+            return False
+        with self.lock:
+            # Times are measured from now rather than from the launch
+            self.state.update(state=STARTING, launched_at=time.time(), rerun=True, api_ready_s=None,
+                              warmup_s=None, ready_s=None, items=[], done=0, total=0)
+        self.cancel.clear()
+        self.thread = threading.Thread(target=self.run, name="warmup", daemon=True)
+        self.thread.start()
+        return True
+
+    def stop(self):
+        """Abandon the current launch's warm-up."""
+        self.cancel.set()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout=5)
+        self.thread = None
+
+    def run(self):
+        """Thread body: wait for the API, warm up, mark ready and record the launch."""
+        try:
+            asyncio.run(self.warm())
+        except Exception as e:
+            logging.error(f"Warm-up failed: {e}")
+            with self.lock:
+                if self.state["state"] != STOPPED:
+                    # A broken warm-up must not keep ComfyUI from being used
+                    self.state["state"] = READY
+        with self.lock:
+            launch = dict(self.state)
+        if launch["state"] == READY:
+            self.record(launch)
+
+    def load_workflows(self):
+        """Read the configured warm-up workflows as {name: prompt}."""
+        from .sweep import load_workflow
+
+        workflows = {}
+        for path in self.config.get("warmup_workflows", []):
+            try:
+                workflows[str(path).rsplit("/", 1)[-1]] = load_workflow(path)
+            except (OSError, ValueError) as e:
+                logging.error(f"Cannot load warm-up workflow {path}: {e}")
+        return workflows
+
+    async def warm(self):
+        """Warm the current launch; leaves the state READY or STOPPED."""
+        client = ComfyClient.from_config(self.config, client_id=uuid.uuid4().hex, timeout=10.0)
+        try:
+            with self.lock:
+                pid = self.state["pid"]
+                launched_at = self.state["launched_at"]
+            if not await self.wait_for_api(client, pid):
+                with self.lock:
+                    self.state["state"] = STOPPED
+                return
+            api_ready = time.time()
+            prompts = warmup_prompts(self.load_workflows(), self.config.get("warmup_resolutions", []),
+                                     self.config.get("warmup_models", []), self.config.get("warmup_steps", 1))
+            with self.lock:
+                self.state.update(state=WARMING, api_ready_s=round(api_ready - launched_at, 2), total=len(prompts))
+            if prompts:
+                logging.info(f"Warming up ComfyUI with {len(prompts)} prompts")
+                await self.run_prompts(client, prompts, pid)
+            if self.cancel.is_set() or not self.alive(pid):
+                with self.lock:
+                    self.state["state"] = STOPPED
+                return
+            now = time.time()
+            with self.lock:
+                self.state.update(state=READY, warmup_s=round(now - api_ready, 2), ready_s=round(now - launched_at, 2))
+            logging.info(f"ComfyUI ready {now - launched_at:.1f} s after launch "
+                         f"(warm-up {now - api_ready:.1f} s)")
+        finally:
+            await client.close()
+
+    async def wait_for_api(self, client, pid):
+        """Poll until ComfyUI answers; False if it exits, times out or we are cancelled."""
+        deadline = time.monotonic() + self.config.get("warmup_ready_timeout", 600)
+        while not self.cancel.is_set() and self.alive(pid) and time.monotonic() < deadline:
+            try:
+                await client.request("GET", "/system_stats")
+                return True
+            except (ComfyAPIError, OSError):
+                await asyncio.sleep(self.config.get("warmup_poll_interval", 1.0))
+        return False
+
+    async def run_prompts(self, client, prompts, pid):
+        """Queue warm-up prompts one at a time at the front of the queue and time them."""
+        waiting = {}
+        connected = asyncio.Event()
+
+        async def follow():
+            async for event in client.events():
+                if event.get("type") == "connected":
+                    connected.set()
+                data = event.get("data") or {}
+                future = waiting.get(data.get("prompt_id"))
+                if future is None or future.done():
+                    continue
+                if event.get("type") == "execution_success":
+                    future.set_result(None)
+                elif event.get("type") in ("execution_error", "execution_interrupted"):
+                    future.set_exception(RuntimeError(data.get("exception_message") or event["type"]))
+
+        events = asyncio.ensure_future(follow())
+        timeout = self.config.get("warmup_timeout", 600)
+        try:
+            # Execution messages only reach a connected client
+            await asyncio.wait_for(connected.wait(), 30)
+            for label, prompt in prompts:
+                if self.cancel.is_set() or not self.alive(pid):
+                    break
+                prompt_id = str(uuid.uuid4())
+                waiting[prompt_id] = asyncio.get_running_loop().create_future()
+                start = time.monotonic()
+                item = {"label": label, "status": "done", "seconds": None}
+                try:
+                    await client.queue_prompt(prompt, front=True, prompt_id=prompt_id)
+                    await self.wait_for(waiting[prompt_id], timeout, pid)
+                except (ComfyAPIError, RuntimeError, asyncio.TimeoutError) as e:
+                    item.update(status="error", message=str(e) or "timed out")
+                    logging.warning(f"Warm-up prompt {label} failed: {item['message']}")
+                item["seconds"] = round(time.monotonic() - start, 2)
+                with self.lock:
+                    self.state["items"].append(item)
+                    self.state["done"] += 1
+        finally:
+            events.cancel()
+            await client.close()
+            await asyncio.gather(events, return_exceptions=True)
+
+    async def wait_for(self, future, timeout, pid):
+        """Wait for a prompt to finish, giving up if ComfyUI exits or we are cancelled."""
+        deadline = time.monotonic() + timeout
+        while not future.done():
+            if self.cancel.is_set() or not self.alive(pid):
+                raise RuntimeError("ComfyUI stopped")
+            if time.monotonic() > deadline:
+                raise asyncio.TimeoutError()
+            await asyncio.wait([future], timeout=0.5)
+        future.result()
+
+    def record(self, launch):
+        """Append a launch to launches.jsonl."""
+        path = get_app_dir() / "launches.jsonl"
+        try:
+            with open(path, "a") as f:
+                f.write(json.dumps(launch) + "\n")
+        except OSError as e:
+            logging.error(f"Cannot record launch: {e}")
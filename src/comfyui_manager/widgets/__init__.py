@@ -2,14 +2,21 @@
 Widgets package for ComfyUI Manager
 """
 
-from .dialogs import AboutDialog, SettingsDialog, confirmation_dialog, info_dialog
+from .dialogs import AboutDialog, SettingsDialog, CacheDialog, ModelsDialog, SweepDialog, confirmation_dialog, info_dialog
+from .charts import SparklineChart
+from .console import ConsoleWidget
 from .widgets import StatusBar, SystemMonitor, DashboardTab, ControlTab, MonitorTab, ConfigTab, LogsTab
 
 __all__ = [
     'AboutDialog',
     'SettingsDialog',
+    'CacheDialog',
+    'ModelsDialog',
+    'SweepDialog',
     'confirmation_dialog',
     'info_dialog',
+    'SparklineChart',
+    'ConsoleWidget',
     'StatusBar',
     'SystemMonitor',
     'DashboardTab',
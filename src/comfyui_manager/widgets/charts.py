@@ -0,0 +1,152 @@
+"""
+Canvas charts for ComfyUI Manager
+"""
+
+import tkinter as tk
+from collections import deque
+
+
+class SparklineChart(tk.Canvas):
+    """Scrolling line chart drawn incrementally on a Canvas.
+
+    Each new point shifts the existing segments left with a single
+    ``move`` call and appends one line segment, so the cost per sample
+    does not depend on how many points are on screen.
+    """
+
+    def __init__(self, parent, label, color="#4CAF50", max_value=100.0,
+                 step=3, width=300, height=80, **kwargs):
+        super().__init__(
+            parent,
+            width=width,
+            height=height,
+            background="#1e1e1e",
+            highlightthickness=0,
+            **kwargs
+        )
+        self.label = label
+        self.color = color
+        self.max_value = max_value
+        self.step = step
+        self.pad = 4
+
+        # Samples folded into one point (1 = live resolution)
+        self.bucket = 1
+        self._bucket_values = []
+
+        # Visible points and their segment item ids, oldest first
+        self.points = deque(maxlen=self.visible_points(width))
+        self.segments = deque()
+
+        self.grid_lines()
+        self.title_item = self.create_text(
+            self.pad + 2, self.pad, text=label, anchor=tk.NW,
+            fill="#cccccc", font=("Arial", 8)
+        )
+        self.value_item = self.create_text(
+            width - self.pad - 2, self.pad, text="", anchor=tk.NE,
+            fill=color, font=("Arial", 9, "bold")
+        )
+
+        self.bind("<Configure>", self.on_resize)
+
+    def visible_points(self, width):
+        """Number of points that fit in the given width."""
+        return max(2, (width - 2 * self.pad) // self.step + 1)
+
+    def grid_lines(self):
+        """Draw the static 25/50/75% guide lines."""
+        self.delete("grid")
+        width = self.winfo_reqwidth() if not self.winfo_ismapped() else self.winfo_width()
+        for fraction in (0.25, 0.5, 0.75):
+            y = self.value_to_y(self.max_value * fraction)
+            self.create_line(
+                0, y, width, y, fill="#333333", dash=(2, 4), tags=("grid",)
+            )
+        self.tag_lower("grid")
+
+    def value_to_y(self, value):
+        """Convert a value to a canvas y coordinate."""
+        height = self.winfo_height() if self.winfo_ismapped() else self.winfo_reqheight()
+        usable = height - 2 * self.pad
+        value = min(max(value, 0.0), self.max_value)
+        return self.pad + usable * (1.0 - value / self.max_value)
+
+    def right_edge(self):
+        """X coordinate of the newest point."""
+        width = self.winfo_width() if self.winfo_ismapped() else self.winfo_reqwidth()
+        return width - self.pad
+
+    def add_value(self, value):
+        """Add a sample, emitting a point once a full bucket is collected."""
+        self._bucket_values.append(value)
+        if len(self._bucket_values) < self.bucket:
+            return
+
+        point = max(self._bucket_values)
+        self._bucket_values = []
+        self.append_point(point)
+
+    def append_point(self, value):
+        """Scroll the chart left by one step and draw the newest segment."""
+        x = self.right_edge()
+        y = self.value_to_y(value)
+
+        if self.points:
+            self.move("series", -self.step, 0)
+            prev_y = self.value_to_y(self.points[-1])
+            segment = self.create_line(
+                x - self.step, prev_y, x, y,
+                fill=self.color, width=2, tags=("series",)
+            )
+            self.segments.append(segment)
+
+        self.points.append(value)
+
+        # Drop segments that scrolled past the left edge
+        while len(self.segments) >= self.points.maxlen:
+            self.delete(self.segments.popleft())
+
+        self.itemconfig(self.value_item, text=f"{value:.1f}%")
+
+    def set_values(self, values, bucket=1):
+        """Redraw the chart from a list of samples, folding them into buckets."""
+        self.bucket = max(1, bucket)
+        self._bucket_values = []
+
+        points = []
+        for i in range(0, len(values) - len(values) % self.bucket, self.bucket):
+            points.append(max(values[i:i + self.bucket]))
+        self._bucket_values = list(values[len(points) * self.bucket:])
+
+        self.redraw(points[-self.points.maxlen:])
+
+    def redraw(self, points):
+        """Replace every segment with a fresh drawing of the given points."""
+        self.delete("series")
+        self.segments.clear()
+        self.points.clear()
+
+        x = self.right_edge() - (len(points) - 1) * self.step
+        prev_y = None
+        for value in points:
+            y = self.value_to_y(value)
+            if prev_y is not None:
+                self.segments.append(self.create_line(
+                    x - self.step, prev_y, x, y,
+                    fill=self.color, width=2, tags=("series",)
+                ))
+            self.points.append(value)
+            prev_y = y
+            x += self.step
+
+        if points:
+            self.itemconfig(self.value_item, text=f"{points[-1]:.1f}%")
+
+    def on_resize(self, event):
+        """Re-layout the chart for a new canvas size."""
+        points = list(self.points)
+        self.points = deque(points, maxlen=self.visible_points(event.width))
+        self.coords(self.value_item, event.width - self.pad - 2, self.pad)
+        self.grid_lines()
+        self.redraw(list(self.points))
@@ -0,0 +1,95 @@
+"""
+Bounded output console for ComfyUI Manager
+"""
+
+import tkinter as tk
+from tkinter import ttk
+from collections import deque
+
+
+class ConsoleWidget(ttk.Frame):
+    """Read-only text console with a line cap and batched inserts.
+
+    ``write`` may be called from any thread: lines are queued and flushed
+    into the Text widget at most once per frame from the Tk event loop.
+    """
+
+    def __init__(self, parent, max_lines=5000, trim_chunk=500,
+                 flush_interval=16, height=10, **kwargs):
+        super().__init__(parent, **kwargs)
+        self.max_lines = max_lines
+        self.trim_chunk = trim_chunk
+        self.flush_interval = flush_interval
+
+        # Lines waiting for the next flush (deque appends are thread-safe)
+        self._pending = deque()
+        self._line_count = 0
+        self.dropped_lines = 0
+
+        self.setup_ui(height)
+        self._flush_job = self.after(self.flush_interval, self._flush)
+        self.bind("<Destroy>", self._on_destroy, add="+")
+
+    def setup_ui(self, height):
+        """Setup UI elements."""
+        self.text = tk.Text(self, height=height, wrap=tk.NONE, state=tk.DISABLED, undo=False)
+        scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.text.yview)
+        self.text.config(yscrollcommand=scrollbar.set)
+
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+    def write(self, line):
+        """Queue a line for display. Safe to call from any thread."""
+        self._pending.append(line.rstrip("\n"))
+
+    def clear(self):
+        """Remove all lines from the console."""
+        self._pending.clear()
+        self.text.config(state=tk.NORMAL)
+        self.text.delete("1.0", tk.END)
+        self.text.config(state=tk.DISABLED)
+        self._line_count = 0
+
+    def is_at_bottom(self):
+        """Return True if the view is scrolled to the last line."""
+        return self.text.yview()[1] >= 0.999
+
+    def _drain(self):
+        """Take every pending line, keeping at most max_lines of them."""
+        count = len(self._pending)
+        lines = [self._pending.popleft() for _ in range(count)]
+        if len(lines) > self.max_lines:
+            self.dropped_lines += len(lines) - self.max_lines
+            lines = lines[-self.max_lines:]
+        return lines
+
+    def _flush(self):
+        """Insert all pending lines in one batch and trim the buffer."""
+        if self._pending:
+            lines = self._drain()
+            follow = self.is_at_bottom()
+
+            self.text.config(state=tk.NORMAL)
+            self.text.insert(tk.END, "\n".join(lines) + "\n")
+            self._line_count += len(lines)
+
+            # Trim in chunks so the delete cost is paid rarely
+            if self._line_count > self.max_lines + self.trim_chunk:
+                excess = self._line_count - self.max_lines
+                self.text.delete("1.0", f"{excess + 1}.0")
+                self._line_count -= excess
+
+            self.text.config(state=tk.DISABLED)
+
+            # Only follow new output when the user has not scrolled up
+            if follow:
+                self.text.see(tk.END)
+
+        self._flush_job = self.after(self.flush_interval, self._flush)
+
+    def _on_destroy(self, event):
+        """Cancel the flush loop when the widget goes away."""
+        if event.widget is self and self._flush_job is not None:
+            self.after_cancel(self._flush_job)
+            self._flush_job = None
@@ -7,6 +7,11 @@ from tkinter import ttk, messagebox
 import webbrowser
 from pathlib import Path
 import json
+import time
+import logging
+import threading
+
+from ..utils import format_bytes
 
 class AboutDialog:
     """About dialog window."""
@@ -451,6 +456,427 @@ class SettingsDialog:
         y = (self.top.winfo_screenheight() // 2) - (height // 2)
         self.top.geometry(f'{width}x{height}+{x}+{y}')
 
+class CacheDialog:
+    """Cache usage, quotas and cleanup."""
+    
+    def __init__(self, parent, cache_manager):
+        self.parent = parent
+        self.cache_manager = cache_manager
+        self.report = {}
+        self.top = tk.Toplevel(parent)
+        self.top.title("Caches")
+        self.top.geometry("640x340")
+        
+        # Make dialog modal
+        self.top.transient(parent)
+        self.top.grab_set()
+        
+        self.setup_ui()
+        self.center_window()
+        self.refresh()
+    
+    def setup_ui(self):
+        """Setup UI elements."""
+        main_frame = ttk.Frame(self.top, padding=10)
+        main_frame.pack(fill=tk.BOTH, expand=True)
+        
+        # Cache table
+        columns = ("size", "quota", "in_use", "path")
+        self.tree = ttk.Treeview(main_frame, columns=columns, height=5)
+        self.tree.heading("#0", text="Cache")
+        self.tree.heading("size", text="Size")
+        self.tree.heading("quota", text="Quota")
+        self.tree.heading("in_use", text="In Use")
+        self.tree.heading("path", text="Path")
+        self.tree.column("#0", width=120)
+        self.tree.column("size", width=80)
+        self.tree.column("quota", width=80)
+        self.tree.column("in_use", width=80)
+        self.tree.column("path", width=240)
+        self.tree.pack(fill=tk.BOTH, expand=True)
+        
+        # Progress
+        self.progress_bar = ttk.Progressbar(main_frame, mode="determinate")
+        self.progress_bar.pack(fill=tk.X, pady=(10, 0))
+        self.status_label = ttk.Label(main_frame, text="Measuring caches...")
+        self.status_label.pack(fill=tk.X, pady=(5, 10))
+        
+        # Buttons frame
+        buttons_frame = ttk.Frame(main_frame)
+        buttons_frame.pack(fill=tk.X)
+        
+        self.enforce_btn = ttk.Button(
+            buttons_frame,
+            text="Enforce Quotas",
+            command=lambda: self.run("enforce")
+        )
+        self.enforce_btn.pack(side=tk.LEFT, padx=5)
+        
+        self.clear_btn = ttk.Button(
+            buttons_frame,
+            text="Clear Selected",
+            command=lambda: self.run("clear")
+        )
+        self.clear_btn.pack(side=tk.LEFT, padx=5)
+        
+        close_btn = ttk.Button(
+            buttons_frame,
+            text="Close",
+            command=self.top.destroy,
+            width=10
+        )
+        close_btn.pack(side=tk.RIGHT, padx=5)
+    
+    def refresh(self):
+        """Measure caches in the background and fill the table."""
+        def worker():
+            self.report = self.cache_manager.measure()
+            self.top.after(0, self.show_report)
+        
+        threading.Thread(target=worker, daemon=True).start()
+    
+    def show_report(self):
+        """Fill the table from the last measurement."""
+        if not self.top.winfo_exists():
+            return
+        self.tree.delete(*self.tree.get_children())
+        for name, info in self.report.items():
+            quota = format_bytes(info["quota_bytes"]) if info["quota_bytes"] else "unlimited"
+            self.tree.insert("", tk.END, iid=name, text=name, values=(
+                format_bytes(info["bytes"]),
+                quota,
+                format_bytes(info["in_use_bytes"]),
+                info["path"],
+            ))
+        total = sum(info["bytes"] for info in self.report.values())
+        self.status_label.config(text=f"Total: {format_bytes(total)}")
+    
+    def run(self, action):
+        """Start a cleanup job and follow its progress."""
+        names = list(self.tree.selection())
+        if action == "clear":
+            if not names:
+                messagebox.showinfo("Clear Cache", "Select the caches to clear")
+                return
+            if not messagebox.askyesno("Clear Cache", f"Clear {', '.join(names)}?\nFiles in use by ComfyUI are kept."):
+                return
+        
+        if not self.cache_manager.run_in_background(action, names):
+            messagebox.showinfo("Clear Cache", "A cleanup is already running")
+            return
+        self.enforce_btn.config(state=tk.DISABLED)
+        self.clear_btn.config(state=tk.DISABLED)
+        self.poll_progress()
+    
+    def poll_progress(self):
+        """Update the progress bar until the job finishes."""
+        if not self.top.winfo_exists():
+            return
+        progress = self.cache_manager.progress
+        self.progress_bar.config(maximum=max(1, progress["total"]), value=progress["done"])
+        self.status_label.config(text=progress["message"])
+        
+        if progress["running"]:
+            self.top.after(200, self.poll_progress)
+        else:
+            self.enforce_btn.config(state=tk.NORMAL)
+            self.clear_btn.config(state=tk.NORMAL)
+            self.refresh()
+    
+    def center_window(self):
+        """Center the dialog window."""
+        self.top.update_idletasks()
+        width = self.top.winfo_width()
+        height = self.top.winfo_height()
+        x = (self.top.winfo_screenwidth() // 2) - (width // 2)
+        y = (self.top.winfo_screenheight() // 2) - (height // 2)
+        self.top.geometry(f'{width}x{height}+{x}+{y}')
+
+class ModelsDialog:
+    """Model inventory with header details and duplicates."""
+    
+    def __init__(self, parent, inventory):
+        self.parent = parent
+        self.inventory = inventory
+        self.report = None
+        self.top = tk.Toplevel(parent)
+        self.top.title("Model Inventory")
+        self.top.geometry("860x480")
+        
+        self.top.transient(parent)
+        
+        self.setup_ui()
+        self.center_window()
+        self.refresh()
+    
+    def setup_ui(self):
+        """Setup UI elements."""
+        main_frame = ttk.Frame(self.top, padding=10)
+        main_frame.pack(fill=tk.BOTH, expand=True)
+        
+        # Model table, grouped by folder
+        table_frame = ttk.Frame(main_frame)
+        table_frame.pack(fill=tk.BOTH, expand=True)
+        columns = ("size", "params", "dtypes", "sha256")
+        self.tree = ttk.Treeview(table_frame, columns=columns)
+        self.tree.heading("#0", text="Model")
+        self.tree.heading("size", text="Size")
+        self.tree.heading("params", text="Parameters")
+        self.tree.heading("dtypes", text="Dtypes")
+        self.tree.heading("sha256", text="SHA-256")
+        self.tree.column("#0", width=300)
+        self.tree.column("size", width=80)
+        self.tree.column("params", width=90)
+        self.tree.column("dtypes", width=100)
+        self.tree.column("sha256", width=120)
+        self.tree.tag_configure("duplicate", foreground="#d9534f")
+        
+        scrollbar = ttk.Scrollbar(table_frame, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        
+        self.status_label = ttk.Label(main_frame, text="Scanning models...")
+        self.status_label.pack(fill=tk.X, pady=(5, 10))
+        
+        buttons_frame = ttk.Frame(main_frame)
+        buttons_frame.pack(fill=tk.X)
+        
+        self.refresh_btn = ttk.Button(
+            buttons_frame,
+            text="Rescan",
+            command=self.refresh
+        )
+        self.refresh_btn.pack(side=tk.LEFT, padx=5)
+        
+        close_btn = ttk.Button(
+            buttons_frame,
+            text="Close",
+            command=self.top.destroy,
+            width=10
+        )
+        close_btn.pack(side=tk.RIGHT, padx=5)
+    
+    def refresh(self):
+        """Scan in the background; hashing new models can take a while."""
+        self.refresh_btn.config(state=tk.DISABLED)
+        self.status_label.config(text="Scanning models...")
+        
+        def worker():
+            try:
+                self.report = self.inventory.scan()
+            except Exception as e:
+                logging.error(f"Model scan failed: {e}")
+                self.report = None
+            self.top.after(0, self.show_report)
+        
+        threading.Thread(target=worker, daemon=True).start()
+    
+    def show_report(self):
+        """Fill the table from the last scan."""
+        if not self.top.winfo_exists():
+            return
+        self.refresh_btn.config(state=tk.NORMAL)
+        if self.report is None:
+            self.status_label.config(text="Scan failed, see the log for details")
+            return
+        
+        duplicates = {path for group in self.report["duplicates"] for path in group["duplicates"]}
+        self.tree.delete(*self.tree.get_children())
+        folders = {}
+        for model in self.report["models"]:
+            folder = model["folder"]
+            if folder not in folders:
+                folders[folder] = self.tree.insert("", tk.END, text=folder, open=True)
+            params = f"{model['parameters'] / 1e6:,.0f}M" if model.get("parameters") else ""
+            tags = ("duplicate",) if (model["link"] or model["path"]) in duplicates else ()
+            self.tree.insert(folders[folder], tk.END, text=model["name"], tags=tags, values=(
+                format_bytes(model["size"]),
+                params,
+                "/".join(sorted(model.get("dtypes", {}))) or model["format"],
+                (model["sha256"] or "")[:12],
+            ))
+        
+        self.status_label.config(text=(
+            f"{len(self.report['models'])} models, {format_bytes(self.report['total_bytes'])}; "
+            f"{len(self.report['duplicates'])} duplicate groups, "
+            f"{format_bytes(self.report['reclaimable_bytes'])} reclaimable"
+        ))
+    
+    def center_window(self):
+        """Center the dialog window."""
+        self.top.update_idletasks()
+        width = self.top.winfo_width()
+        height = self.top.winfo_height()
+        x = (self.top.winfo_screenwidth() // 2) - (width // 2)
+        y = (self.top.winfo_screenheight() // 2) - (height // 2)
+        self.top.geometry(f'{width}x{height}+{x}+{y}')
+
+class SweepDialog:
+    """Start, pause and resume batch parameter sweeps."""
+    
+    EXAMPLE_SPEC = {
+        "mode": "product",
+        "parameters": {"KSampler.seed": {"start": 1, "stop": 9}, "KSampler.cfg": [5.0, 7.0]},
+    }
+    
+    def __init__(self, parent, config):
+        self.parent = parent
+        self.config = config
+        self.runner = None
+        self.top = tk.Toplevel(parent)
+        self.top.title("Batch Sweep")
+        self.top.geometry("620x520")
+        
+        self.top.transient(parent)
+        self.top.protocol("WM_DELETE_WINDOW", self.close)
+        
+        self.setup_ui()
+        self.center_window()
+        self.load_sweeps()
+        self.update_progress()
+    
+    def setup_ui(self):
+        """Setup UI elements."""
+        from tkinter import filedialog
+        
+        main_frame = ttk.Frame(self.top, padding=10)
+        main_frame.pack(fill=tk.BOTH, expand=True)
+        main_frame.columnconfigure(1, weight=1)
+        
+        # New sweep
+        ttk.Label(main_frame, text="Workflow (API JSON or output image):").grid(row=0, column=0, sticky=tk.W)
+        self.workflow_var = tk.StringVar()
+        ttk.Entry(main_frame, textvariable=self.workflow_var).grid(row=0, column=1, sticky=tk.W+tk.E, padx=5)
+        ttk.Button(
+            main_frame,
+            text="Browse...",
+            command=lambda: self.workflow_var.set(filedialog.askopenfilename(
+                parent=self.top, filetypes=[("Workflows", "*.json *.png *.webp"), ("All files", "*")]
+            ) or self.workflow_var.get())
+        ).grid(row=0, column=2)
+        
+        ttk.Label(main_frame, text="Sweep spec:").grid(row=1, column=0, sticky=tk.NW, pady=(10, 0))
+        self.spec_text = tk.Text(main_frame, height=10, font=("Courier", 9))
+        self.spec_text.grid(row=1, column=1, columnspan=2, sticky=tk.NSEW, padx=5, pady=(10, 0))
+        self.spec_text.insert("1.0", json.dumps(self.EXAMPLE_SPEC, indent=2))
+        main_frame.rowconfigure(1, weight=1)
+        
+        options_frame = ttk.Frame(main_frame)
+        options_frame.grid(row=2, column=1, columnspan=2, sticky=tk.W, padx=5, pady=5)
+        ttk.Label(options_frame, text="Name:").pack(side=tk.LEFT)
+        self.name_var = tk.StringVar(value=time.strftime("sweep-%Y%m%d-%H%M%S"))
+        ttk.Entry(options_frame, textvariable=self.name_var, width=24).pack(side=tk.LEFT, padx=5)
+        ttk.Label(options_frame, text="Queue depth:").pack(side=tk.LEFT, padx=(10, 0))
+        self.depth_var = tk.IntVar(value=self.config.get("sweep_queue_depth", 2))
+        ttk.Spinbox(options_frame, from_=1, to=64, textvariable=self.depth_var, width=5).pack(side=tk.LEFT, padx=5)
+        
+        # Saved sweeps
+        ttk.Label(main_frame, text="Saved sweeps:").grid(row=3, column=0, sticky=tk.W)
+        self.saved_var = tk.StringVar()
+        self.saved_combo = ttk.Combobox(main_frame, textvariable=self.saved_var, state="readonly")
+        self.saved_combo.grid(row=3, column=1, sticky=tk.W+tk.E, padx=5)
+        
+        # Progress
+        self.progress_bar = ttk.Progressbar(main_frame, mode="determinate")
+        self.progress_bar.grid(row=4, column=0, columnspan=3, sticky=tk.W+tk.E, pady=(10, 0))
+        self.status_label = ttk.Label(main_frame, text="")
+        self.status_label.grid(row=5, column=0, columnspan=3, sticky=tk.W, pady=(5, 10))
+        
+        buttons_frame = ttk.Frame(main_frame)
+        buttons_frame.grid(row=6, column=0, columnspan=3, sticky=tk.W+tk.E)
+        
+        self.start_btn = ttk.Button(buttons_frame, text="Start", command=self.start)
+        self.start_btn.pack(side=tk.LEFT, padx=5)
+        self.resume_btn = ttk.Button(buttons_frame, text="Resume Saved", command=self.resume)
+        self.resume_btn.pack(side=tk.LEFT, padx=5)
+        self.pause_btn = ttk.Button(buttons_frame, text="Pause", command=self.pause, state=tk.DISABLED)
+        self.pause_btn.pack(side=tk.LEFT, padx=5)
+        
+        close_btn = ttk.Button(
+            buttons_frame,
+            text="Close",
+            command=self.close,
+            width=10
+        )
+        close_btn.pack(side=tk.RIGHT, padx=5)
+    
+    def load_sweeps(self):
+        """List saved sweeps that have prompts left."""
+        from ..sweep import list_sweeps
+        names = [s["name"] for s in list_sweeps() if s["status"] not in ("done", "cancelled")]
+        self.saved_combo["values"] = names
+        if names and not self.saved_var.get():
+            self.saved_var.set(names[0])
+    
+    def start(self):
+        """Start a new sweep from the form."""
+        from ..sweep import SweepRunner, load_workflow
+        try:
+            workflow = load_workflow(self.workflow_var.get())
+            spec = json.loads(self.spec_text.get("1.0", tk.END))
+            self.run(SweepRunner(self.config, self.name_var.get().strip(), workflow, spec, self.depth_var.get()))
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Batch Sweep", str(e), parent=self.top)
+    
+    def resume(self):
+        """Resume the selected saved sweep."""
+        from ..sweep import SweepRunner
+        if not self.saved_var.get():
+            return
+        try:
+            self.run(SweepRunner(self.config, self.saved_var.get(), depth=self.depth_var.get()))
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Batch Sweep", str(e), parent=self.top)
+    
+    def run(self, runner):
+        """Run a sweep in the background."""
+        self.runner = runner
+        runner.start()
+        self.start_btn.config(state=tk.DISABLED)
+        self.resume_btn.config(state=tk.DISABLED)
+        self.pause_btn.config(state=tk.NORMAL)
+    
+    def pause(self):
+        """Stop submitting; prompts already queued still run."""
+        if self.runner is not None:
+            self.runner.stop()
+        self.pause_btn.config(state=tk.DISABLED)
+    
+    def update_progress(self):
+        """Show the running sweep's progress."""
+        if not self.top.winfo_exists():
+            return
+        if self.runner is not None:
+            progress = self.runner.progress()
+            self.progress_bar["maximum"] = max(1, progress["total"])
+            self.progress_bar["value"] = progress["succeeded"] + progress["failed"]
+            text = (f"{progress['name']}: {progress['status']}, {progress['succeeded']}/{progress['total']} done, "
+                    f"{progress['queued']} queued, {progress['failed']} failed")
+            self.status_label.config(text=f"{text}\n{progress['message']}" if progress["message"] else text)
+            if not self.runner.thread.is_alive():
+                self.start_btn.config(state=tk.NORMAL)
+                self.resume_btn.config(state=tk.NORMAL)
+                self.pause_btn.config(state=tk.DISABLED)
+                self.runner = None
+                self.load_sweeps()
+        self.top.after(250, self.update_progress)
+    
+    def close(self):
+        """Close the dialog; a running sweep is paused and can be resumed later."""
+        if self.runner is not None:
+            self.runner.stop()
+        self.top.destroy()
+    
+    def center_window(self):
+        """Center the dialog window."""
+        self.top.update_idletasks()
+        width = self.top.winfo_width()
+        height = self.top.winfo_height()
+        x = (self.top.winfo_screenwidth() // 2) - (width // 2)
+        y = (self.top.winfo_screenheight() // 2) - (height // 2)
+        self.top.geometry(f'{width}x{height}+{x}+{y}')
+
 def confirmation_dialog(parent, title, message):
     """Show confirmation dialog."""
     return messagebox.askyesno(title, message)
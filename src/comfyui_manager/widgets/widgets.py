@@ -9,6 +9,19 @@ import time
 from datetime import datetime
 from pathlib import Path
 
+from .console import ConsoleWidget
+from ..utils import format_bytes
+from .charts import SparklineChart
+
+MODE_NAMES = {
+    "auto": "Auto",
+    "lowvram": "Low VRAM",
+    "normalvram": "Normal VRAM",
+    "highvram": "High VRAM",
+    "cpu": "CPU Only",
+}
+
+
 class StatusBar(ttk.Frame):
     """Status bar widget."""
     
@@ -88,11 +101,18 @@ class SystemMonitor:
 class DashboardTab(ttk.Frame):
     """Dashboard tab."""
     
-    def __init__(self, parent, config, process_manager):
+    def __init__(self, parent, config, process_manager, output_index=None, cache_manager=None, queue_monitor=None):
         super().__init__(parent)
         self.config = config
         self.process_manager = process_manager
+        self.output_index = output_index
+        self.cache_manager = cache_manager
+        self.queue_monitor = queue_monitor
+        self.queue_changed = True
         self.setup_ui()
+        if queue_monitor is not None:
+            # Set from the monitor thread; the Tk thread redraws
+            queue_monitor.add_listener(self.on_queue_event)
     
     def setup_ui(self):
         """Setup UI elements."""
@@ -113,12 +133,18 @@ class DashboardTab(ttk.Frame):
         self.mode_value = ttk.Label(stats_frame, text="Normal VRAM", font=("Arial", 10, "bold"))
         self.images_value = ttk.Label(stats_frame, text="0", font=("Arial", 10, "bold"))
         self.queue_value = ttk.Label(stats_frame, text="0", font=("Arial", 10, "bold"))
+        self.running_value = ttk.Label(stats_frame, text="-", font=("Arial", 10, "bold"))
+        self.progress_value = ttk.Label(stats_frame, text="-", font=("Arial", 10, "bold"))
+        self.eta_value = ttk.Label(stats_frame, text="-", font=("Arial", 10, "bold"))
         
         stats = [
             ("Status:", self.status_value),
             ("Memory Mode:", self.mode_value),
             ("Images:", self.images_value),
             ("Queue:", self.queue_value),
+            ("Running:", self.running_value),
+            ("Progress:", self.progress_value),
+            ("Queue ETA:", self.eta_value),
         ]
         
         for i, (label, value_widget) in enumerate(stats):
@@ -177,6 +203,7 @@ class DashboardTab(ttk.Frame):
         mode_buttons_frame.pack(fill=tk.X)
         
         modes = [
+            ("Auto", "auto", "Sized from your models"),
             ("Low", "lowvram", "For GPUs with ≤ 4GB"),
             ("Normal", "normalvram", "Recommended for RTX 5060"),
             ("High", "highvram", "For GPUs with ≥ 12GB"),
@@ -214,20 +241,55 @@ Port: {port}"""
         
         # Start periodic updates
         self.after(1000, self.update_dashboard)
+        self.after(250, self.update_queue)
+        self.after(1000, self.update_eta)
+    
+    def update_eta(self):
+        """Redraw when the queue is expected to be done."""
+        # Computed in the monitor thread; the database is never touched from Tk
+        eta = self.queue_monitor.latest_eta() if self.queue_monitor is not None else None
+        if eta and eta["prompts"]:
+            from ..timings import format_duration
+            finishes = datetime.fromtimestamp(eta["finishes_at"]).strftime("%H:%M")
+            self.eta_value.config(text=f"~{format_duration(eta['remaining_s'])} (done {finishes})")
+        else:
+            self.eta_value.config(text="-")
+        self.after(1000, self.update_eta)
+    
+    def on_queue_event(self, event):
+        """Note a queue change pushed by ComfyUI."""
+        self.queue_changed = True
+    
+    def update_queue(self):
+        """Redraw queue depth, running prompt and progress after pushed events."""
+        if self.queue_monitor is not None and self.queue_changed:
+            self.queue_changed = False
+            state = self.queue_monitor.snapshot()
+            if not state["connected"]:
+                self.queue_value.config(text="Not connected")
+                self.running_value.config(text="-")
+                self.progress_value.config(text="-")
+            else:
+                self.queue_value.config(text=str(state["queue_remaining"]))
+                prompt_id = state["prompt_id"]
+                node = f" (node {state['node']})" if state["node"] else ""
+                self.running_value.config(text=f"{prompt_id[:8]}{node}" if prompt_id else "Idle")
+                if state["progress_max"]:
+                    percent = 100 * state["progress"] / state["progress_max"]
+                    self.progress_value.config(
+                        text=f"{state['progress']}/{state['progress_max']} ({percent:.0f}%)"
+                    )
+                else:
+                    self.progress_value.config(text="-")
+        self.after(250, self.update_queue)
     
     def set_memory_mode(self, mode):
         """Set memory mode from dashboard."""
-        mode_names = {
-            "lowvram": "Low VRAM",
-            "normalvram": "Normal VRAM",
-            "highvram": "High VRAM",
-        }
-        
         from . import dialogs
         if dialogs.confirmation_dialog(
             self, 
             "Change Memory Mode",
-            f"Change memory mode to {mode_names.get(mode, mode)}?\n"
+            f"Change memory mode to {MODE_NAMES.get(mode, mode)}?\n"
             "This will take effect on next start."
         ):
             # In a real implementation, you would save this preference
@@ -237,8 +299,8 @@ Port: {port}"""
         """Start ComfyUI."""
         from . import dialogs
         if dialogs.confirmation_dialog(self, "Start ComfyUI", "Start ComfyUI now?"):
-            # Use normalvram as default from dashboard
-            success = self.process_manager.start("normalvram")
+            # Use the configured startup mode from the dashboard
+            success = self.process_manager.start(self.config.get("startup_mode", "auto"))
             
             if success:
                 self.start_btn.config(state=tk.DISABLED)
@@ -265,11 +327,10 @@ Port: {port}"""
         webbrowser.open(f"http://localhost:{port}")
     
     def clear_cache(self):
-        """Clear cache."""
+        """Show cache usage and cleanup."""
         from . import dialogs
-        if dialogs.confirmation_dialog(self, "Clear Cache", "Clear all cache files?"):
-            print("Clearing cache...")
-            # Implement cache clearing here
+        if self.cache_manager is not None:
+            dialogs.CacheDialog(self, self.cache_manager)
     
     def update_dashboard(self):
         """Update dashboard display."""
@@ -291,6 +352,16 @@ Port: {port}"""
             self.start_btn.config(state=tk.NORMAL)
             self.stop_btn.config(state=tk.DISABLED)
         
+        # Update image count from the output index (O(1))
+        if self.output_index is not None:
+            stats = self.output_index.stats()
+            if stats["ready"]:
+                self.images_value.config(
+                    text=f"{stats['count']:,} ({format_bytes(stats['total_bytes'])})"
+                )
+            else:
+                self.images_value.config(text="Indexing...")
+        
         # Schedule next update
         self.after(1000, self.update_dashboard)
     
@@ -324,9 +395,10 @@ class ControlTab(ttk.Frame):
         )
         desc_label.pack(anchor=tk.W, pady=(0, 10))
         
-        self.mode_var = tk.StringVar(value="normalvram")
+        self.mode_var = tk.StringVar(value=self.config.get("startup_mode", "auto"))
         
         modes = [
+            ("auto", "Auto - Pick from the workflow's model sizes and GPU VRAM"),
             ("lowvram", "Low VRAM (≤ 4GB) - Models loaded to GPU only when needed"),
             ("normalvram", "Normal VRAM (6-8GB) - Recommended for RTX 5060"),
             ("highvram", "High VRAM (≥ 12GB) - Keep all models in GPU memory"),
@@ -348,7 +420,7 @@ class ControlTab(ttk.Frame):
             rb.pack(side=tk.LEFT, anchor=tk.W)
             
             # Add small indicator
-            if value == "normalvram":
+            if value == "auto":
                 indicator = ttk.Label(frame, text="✓ Recommended", foreground="green")
                 indicator.pack(side=tk.RIGHT, padx=10)
         
@@ -409,13 +481,15 @@ class ControlTab(ttk.Frame):
         log_frame = ttk.LabelFrame(self, text="Output", padding=10)
         log_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=(0, 20))
         
-        self.log_text = tk.Text(log_frame, height=10)
-        self.log_text.pack(fill=tk.BOTH, expand=True)
+        self.console = ConsoleWidget(
+            log_frame,
+            max_lines=self.config.get("console_max_lines", 5000),
+            height=10
+        )
+        self.console.pack(fill=tk.BOTH, expand=True)
         
-        scrollbar = ttk.Scrollbar(self.log_text)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        self.log_text.config(yscrollcommand=scrollbar.set)
-        scrollbar.config(command=self.log_text.yview)
+        # Stream ComfyUI output into the console
+        self.process_manager.add_output_listener(self.console.write)
         
         # Start periodic status update
         self.after(1000, self.update_status)
@@ -423,24 +497,12 @@ class ControlTab(ttk.Frame):
     def on_mode_change(self):
         """Handle mode change."""
         mode = self.mode_var.get()
-        mode_names = {
-            "lowvram": "Low VRAM",
-            "normalvram": "Normal VRAM",
-            "highvram": "High VRAM",
-            "cpu": "CPU Only"
-        }
-        self.log(f"Memory mode changed to: {mode_names.get(mode, mode)}")
+        self.log(f"Memory mode changed to: {MODE_NAMES.get(mode, mode)}")
     
     def start_comfyui(self):
         """Start ComfyUI by executing the bash script with memory mode."""
         mode = self.mode_var.get()
-        mode_names = {
-            "lowvram": "Low VRAM",
-            "normalvram": "Normal VRAM",
-            "highvram": "High VRAM",
-            "cpu": "CPU Only"
-        }
-        mode_display = mode_names.get(mode, mode)
+        mode_display = MODE_NAMES.get(mode, mode)
         
         self.log(f"Starting ComfyUI in {mode_display} mode...")
         
@@ -455,6 +517,9 @@ class ControlTab(ttk.Frame):
         
         if success:
             self.log(f"✓ ComfyUI started successfully in {mode_display} mode")
+            advice = self.process_manager.advice
+            if advice:
+                self.log(f"Auto mode picked {advice['mode']}: {advice['reason']}")
             self.update_button_states()
         else:
             self.log("✗ Failed to start ComfyUI")
@@ -480,13 +545,7 @@ class ControlTab(ttk.Frame):
     def restart_comfyui(self):
         """Restart ComfyUI."""
         mode = self.mode_var.get()
-        mode_names = {
-            "lowvram": "Low VRAM",
-            "normalvram": "Normal VRAM",
-            "highvram": "High VRAM",
-            "cpu": "CPU Only"
-        }
-        mode_display = mode_names.get(mode, mode)
+        mode_display = MODE_NAMES.get(mode, mode)
         
         self.log(f"Restarting ComfyUI in {mode_display} mode...")
         
@@ -519,20 +578,14 @@ class ControlTab(ttk.Frame):
             self.status_label.config(text="Status: Running", foreground="green")
             pid = self.process_manager.get_pid()
             self.pid_label.config(text=f"PID: {pid}")
-            self.mode_label.config(text=f"Mode: Running")
+            self.mode_label.config(text=f"Mode: {self.process_manager.mode}")
         else:
             self.status_label.config(text="Status: Stopped", foreground="red")
             self.pid_label.config(text="PID: N/A")
             
             # Show selected mode
             mode = self.mode_var.get()
-            mode_names = {
-                "lowvram": "Low VRAM",
-                "normalvram": "Normal VRAM",
-                "highvram": "High VRAM",
-                "cpu": "CPU Only"
-            }
-            mode_display = mode_names.get(mode, mode)
+            mode_display = MODE_NAMES.get(mode, mode)
             self.mode_label.config(text=f"Mode: {mode_display} (selected)")
         
         # Schedule next update
@@ -542,8 +595,7 @@ class ControlTab(ttk.Frame):
         """Add message to log."""
         from datetime import datetime
         timestamp = datetime.now().strftime("%H:%M:%S")
-        self.log_text.insert(tk.END, f"[{timestamp}] {message}\n")
-        self.log_text.see(tk.END)
+        self.console.write(f"[{timestamp}] {message}")
     
     def refresh(self):
         """Refresh control tab."""
@@ -554,10 +606,19 @@ class ControlTab(ttk.Frame):
 class MonitorTab(ttk.Frame):
     """Monitor tab."""
     
+    # History windows offered in the zoom selector (seconds, 0 = live)
+    ZOOM_WINDOWS = [
+        ("Live", 0),
+        ("5 min", 300),
+        ("15 min", 900),
+        ("1 hour", 3600),
+    ]
+    
     def __init__(self, parent, config, system_monitor):
         super().__init__(parent)
         self.config = config
         self.system_monitor = system_monitor
+        self.last_sample_count = 0
         self.setup_ui()
     
     def setup_ui(self):
@@ -567,6 +628,42 @@ class MonitorTab(ttk.Frame):
         monitor.frame.pack(fill=tk.X, padx=20, pady=20)
         self.monitor_widget = monitor
         
+        # History charts
+        history_frame = ttk.LabelFrame(self, text="History", padding=10)
+        history_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=(0, 20))
+        
+        zoom_frame = ttk.Frame(history_frame)
+        zoom_frame.grid(row=0, column=0, columnspan=2, sticky=tk.W, pady=(0, 5))
+        
+        ttk.Label(zoom_frame, text="Window:").pack(side=tk.LEFT, padx=(0, 5))
+        self.zoom_var = tk.StringVar(value=self.ZOOM_WINDOWS[0][0])
+        zoom_combo = ttk.Combobox(
+            zoom_frame,
+            textvariable=self.zoom_var,
+            values=[name for name, _ in self.ZOOM_WINDOWS],
+            state="readonly",
+            width=10
+        )
+        zoom_combo.pack(side=tk.LEFT)
+        zoom_combo.bind("<<ComboboxSelected>>", lambda e: self.apply_zoom())
+        
+        charts = [
+            ("CPU", "#4CAF50"),
+            ("RAM", "#2196F3"),
+            ("GPU", "#FF9800"),
+            ("VRAM", "#E91E63"),
+        ]
+        
+        self.charts = []
+        for i, (label, color) in enumerate(charts):
+            chart = SparklineChart(history_frame, label, color=color, height=80)
+            chart.grid(row=1 + i // 2, column=i % 2, sticky=(tk.W, tk.E, tk.N, tk.S), padx=2, pady=2)
+            self.charts.append(chart)
+        
+        for i in range(2):
+            history_frame.columnconfigure(i, weight=1)
+            history_frame.rowconfigure(1 + i, weight=1)
+        
         # Stats
         stats_frame = ttk.LabelFrame(self, text="Detailed Statistics", padding=10)
         stats_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=(0, 20))
@@ -577,7 +674,7 @@ class MonitorTab(ttk.Frame):
             stats_frame,
             columns=columns,
             show="headings",
-            height=10
+            height=6
         )
         
         # Define headings
@@ -586,7 +683,7 @@ class MonitorTab(ttk.Frame):
         
         # Define columns
         self.stats_tree.column("Metric", width=200)
-        self.stats_tree.column("Value", width=100)
+        self.stats_tree.column("Value", width=300)
         
         # Add scrollbar
         scrollbar = ttk.Scrollbar(
@@ -600,22 +697,29 @@ class MonitorTab(ttk.Frame):
         self.stats_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         
-        # Add sample data
-        sample_data = [
-            ("CPU Cores", "16"),
-            ("Total Memory", "32 GB"),
-            ("GPU Memory", "8 GB"),
-            ("Disk Space", "512 GB"),
-            ("Python Version", "3.11.5"),
-            ("PyTorch Version", "2.1.0"),
-        ]
-        
-        for item in sample_data:
-            self.stats_tree.insert("", tk.END, values=item)
+        self.fill_stats()
         
         # Start updating monitor
         self.after(1000, self.update_monitor)
     
+    def fill_stats(self):
+        """Fill the statistics tree with cached system facts."""
+        self.stats_tree.delete(*self.stats_tree.get_children())
+        for item in self.system_monitor.get_static_info():
+            self.stats_tree.insert("", tk.END, values=item)
+    
+    def apply_zoom(self):
+        """Redraw the charts for the selected history window."""
+        seconds = dict(self.ZOOM_WINDOWS).get(self.zoom_var.get(), 0)
+        samples = self.system_monitor.get_history(seconds or None)
+        
+        for i, chart in enumerate(self.charts):
+            values = [sample[i + 1] for sample in samples]
+            bucket = 1
+            if seconds:
+                bucket = -(-len(values) // chart.points.maxlen)
+            chart.set_values(values, bucket=bucket)
+    
     def update_monitor(self):
         """Update monitor widgets."""
         if hasattr(self.system_monitor, 'cpu_percent'):
@@ -623,12 +727,22 @@ class MonitorTab(ttk.Frame):
             self.monitor_widget.update_memory(self.system_monitor.memory_percent)
             self.monitor_widget.update_gpu(self.system_monitor.gpu_percent)
         
+        # Feed only the samples recorded since the last update
+        new_count = self.system_monitor.sample_count - self.last_sample_count
+        if new_count > 0:
+            history = self.system_monitor.history
+            new_samples = list(history)[-min(new_count, len(history)):]
+            for sample in new_samples:
+                for i, chart in enumerate(self.charts):
+                    chart.add_value(sample[i + 1])
+            self.last_sample_count = self.system_monitor.sample_count
+        
         # Schedule next update
         self.after(1000, self.update_monitor)
     
     def refresh(self):
         """Refresh monitor tab."""
-        print("Refreshing monitor tab...")
+        self.apply_zoom()
 
 class ConfigTab(ttk.Frame):
     """Configuration tab."""